@@ -8,19 +8,22 @@ This module provides the core AI Agent functionality with:
 - FAISS vector store for document knowledge
 """
 
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, AsyncIterator
 import logging
 import asyncio
 from datetime import datetime
 import uuid
 import sys
+import os
 from pathlib import Path
 import json
+import time
 
 # Add parent directory to Python path for imports
 sys.path.append(str(Path(__file__).parent.parent))
 from services.db_service import DatabaseService
 from services.llm_service import LLMService
+from services.message_queue import MessageWriteQueue
 from tools.user_state import get_user_state
 from services.document_ingestion.vector_store.faiss_store import FaissVectorStore
 from services.document_ingestion.types import ProcessedDocument
@@ -38,6 +41,9 @@ class AIAgent:
         # Initialize vector store with standard embedding dimension
         self.vector_store = None  # Will initialize after getting embedding dimension
         
+        # Conversation writes happen in the background, off the response path
+        self.message_queue = MessageWriteQueue(self.db_service)
+        
     async def initialize(self) -> bool:
         """Initialize the agent and its services"""
         try:
@@ -47,6 +53,9 @@ class AIAgent:
                 self.logger.error("Failed to initialize database service")
                 return False
                 
+            # Start background message writer, replaying any unsent messages
+            await self.message_queue.start()
+            
             # Initialize user state
             self.logger.debug("Loading user state...")
             await self.user_state.load_state(self.session_id)
@@ -60,7 +69,8 @@ class AIAgent:
             # Initialize vector store with correct dimension
             self.vector_store = FaissVectorStore({
                 "dimension": embedding_dim,
-                "index_type": "Flat",
+                "index_type": os.getenv("VECTOR_INDEX_TYPE", "Flat"),
+                "ann_threshold": int(os.getenv("VECTOR_ANN_THRESHOLD", "50000")),
                 "use_gpu": True
             })
             
@@ -75,131 +85,282 @@ class AIAgent:
             self.logger.error(f"Failed to initialize AI Agent: {str(e)}")
             return False
             
-    async def search_relevant_documents(self, query: str, num_results: int = 3) -> List[Dict[str, Any]]:
-        """Search for documents relevant to the query."""
+    async def search_relevant_documents(
+        self,
+        query: str,
+        num_results: int = 3,
+        timings: Optional[Dict[str, float]] = None
+    ) -> List[Dict[str, Any]]:
+        """Search for documents relevant to the query.
+        
+        Args:
+            query: Search text
+            num_results: Maximum number of documents
+            timings: Optional dict that receives per-step durations in ms
+        """
+        timings = timings if timings is not None else {}
         try:
             # Get query embedding from LLM service
+            start = time.perf_counter()
             query_embedding = await self.llm_service.get_embedding(query)
+            timings["embedding_ms"] = self._elapsed_ms(start)
             
             # Search vector store
+            start = time.perf_counter()
             results = await self.vector_store.search_similar(
                 query=query_embedding,
                 num_results=num_results
             )
+            timings["vector_search_ms"] = self._elapsed_ms(start)
             
-            # Get full documents from database
-            documents = []
+            # Get full documents from database in one round-trip, keeping score order;
+            # a document hit more than once keeps its best score
+            start = time.perf_counter()
+            scores = {}
             for result in results:
-                doc = await self.db_service.get_document(result["doc_id"])
-                if doc:
-                    documents.append({
-                        **doc,
-                        "relevance_score": result["score"]
-                    })
-            
-            return documents
+                doc_id = result["doc_id"]
+                scores[doc_id] = max(result["score"], scores.get(doc_id, result["score"]))
+            docs = await self.db_service.get_documents_bulk(list(scores))
+            timings["document_fetch_ms"] = self._elapsed_ms(start)
+            return [
+                {
+                    **doc,
+                    "relevance_score": scores[doc["doc_id"]]
+                }
+                for doc in docs
+            ]
             
         except Exception as e:
             self.logger.error(f"Error searching documents: {str(e)}")
             return []
     
+    @staticmethod
+    def _elapsed_ms(start: float) -> float:
+        """Milliseconds since a time.perf_counter() reading."""
+        return round((time.perf_counter() - start) * 1000, 1)
+        
+    async def _timed(self, name: str, coro, timings: Dict[str, float]):
+        """Await a pipeline stage and record how long it took."""
+        start = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            timings[name] = self._elapsed_ms(start)
+            
+    async def _load_user_state(self, user_info: Optional[str]) -> Dict[str, Any]:
+        """Apply user info from the prompt, then load the user state."""
+        if user_info:
+            self.logger.debug("Updating user state from prompt...")
+            await self.user_state.update_from_prompt(self.session_id, user_info)
+        return await self.user_state.load_state(self.session_id)
+        
+    async def _get_history(self) -> List[Dict[str, Any]]:
+        """Fetch recent messages once earlier turns' writes have landed."""
+        await self.message_queue.flush()
+        return await self.db_service.get_recent_messages(limit=10)
+    
+    async def _prepare_turn(self,
+                            message: str,
+                            metadata: Optional[Dict[str, Any]],
+                            user_info: Optional[str],
+                            timings: Dict[str, float]) -> Dict[str, Any]:
+        """Run the pre-LLM stages of a turn and queue the user message.
+        
+        Stages run as a dependency graph:
+        
+            user state (update_from_prompt -> load_state) --+--> store user message (background)
+            retrieval (embedding -> vector search -> docs) -+--> LLM
+            history (after earlier writes are flushed) -----+
+        
+        The current message is passed to the LLM as the prompt, so history
+        does not need to wait for it to be written.
+        
+        Returns:
+            Dict with state, relevant_docs, history and doc_context
+        """
+        # State, retrieval and history do not depend on each other
+        self.logger.debug("Loading state, documents and history concurrently...")
+        retrieval_timings: Dict[str, float] = {}
+        state, relevant_docs, history = await asyncio.gather(
+            self._timed("user_state_ms", self._load_user_state(user_info), timings),
+            self._timed(
+                "retrieval_ms",
+                self.search_relevant_documents(message, timings=retrieval_timings),
+                timings
+            ),
+            self._timed("history_ms", self._get_history(), timings)
+        )
+        timings.update(retrieval_timings)
+        
+        # Add user state to metadata
+        if metadata is None:
+            metadata = {}
+        metadata["user_state"] = state
+        
+        # Store user message without waiting for the database
+        self.message_queue.enqueue(
+            role="user",
+            content=message,
+            metadata=metadata,
+            session_id=self.session_id
+        )
+        
+        # Format document context
+        doc_context = ""
+        if relevant_docs:
+            doc_context = "\nRelevant information from knowledge base:\n"
+            for doc in relevant_docs:
+                doc_context += f"- {doc['content']}\n"
+                doc_context += f"  (Source: {doc['metadata'].get('source', 'Unknown')}, "
+                doc_context += f"Relevance: {doc['relevance_score']:.2f})\n"
+                
+        return {
+            "state": state,
+            "relevant_docs": relevant_docs,
+            "history": history,
+            "doc_context": doc_context
+        }
+        
+    def _finish_turn(self,
+                     content: str,
+                     model: str,
+                     provider: str,
+                     turn: Dict[str, Any],
+                     timings: Dict[str, float]) -> Dict[str, Any]:
+        """Build the response for a turn and queue the assistant message."""
+        relevant_docs = turn["relevant_docs"]
+        response = {
+            "content": content,
+            "metadata": {
+                "timestamp": datetime.now().isoformat(),
+                "session_id": self.session_id,
+                "model": model,
+                "provider": provider,
+                "user_state": turn["state"],
+                "relevant_docs": [
+                    {
+                        "id": doc["id"],
+                        "title": doc["title"],
+                        "relevance": doc["relevance_score"]
+                    } for doc in relevant_docs
+                ] if relevant_docs else [],
+                "timings": timings
+            }
+        }
+        
+        # Store assistant response behind the user message
+        self.message_queue.enqueue(
+            role="assistant",
+            content=response["content"],
+            metadata=response["metadata"],
+            session_id=self.session_id
+        )
+        return response
+        
+    def _error_response(self, error: Exception, timings: Dict[str, float]) -> Dict[str, Any]:
+        """Build the response returned when a turn fails."""
+        return {
+            "error": str(error),
+            "metadata": {
+                "timestamp": datetime.now().isoformat(),
+                "session_id": self.session_id,
+                "timings": timings
+            }
+        }
+    
     async def process_message(self, 
                             message: str, 
                             metadata: Optional[Dict[str, Any]] = None,
                             system_prompt: Optional[str] = None,
                             user_info: Optional[str] = None) -> Dict[str, Any]:
         """Process a user message and return a response"""
+        timings: Dict[str, float] = {}
+        started = time.perf_counter()
         try:
-            # Update user state if user_info provided
-            if user_info:
-                self.logger.debug("Updating user state from prompt...")
-                await self.user_state.update_from_prompt(self.session_id, user_info)
-            
-            # Get current user state
-            state = await self.user_state.load_state(self.session_id)
+            turn = await self._prepare_turn(message, metadata, user_info, timings)
+            timings["pre_llm_ms"] = self._elapsed_ms(started)
             
-            # Add user state to metadata
-            if metadata is None:
-                metadata = {}
-            metadata["user_state"] = state
-            
-            # Search for relevant documents
-            self.logger.debug("Searching for relevant documents...")
-            relevant_docs = await self.search_relevant_documents(message)
+            # Generate response using LLM
+            llm_response = await self._timed(
+                "llm_ms",
+                self.llm_service.generate_response(
+                    prompt=message,
+                    history=turn["history"],
+                    system_prompt=system_prompt,
+                    additional_context=turn["doc_context"] or None
+                ),
+                timings
+            )
             
-            # Format document context
-            doc_context = ""
-            if relevant_docs:
-                doc_context = "\nRelevant information from knowledge base:\n"
-                for doc in relevant_docs:
-                    doc_context += f"- {doc['content']}\n"
-                    doc_context += f"  (Source: {doc['metadata'].get('source', 'Unknown')}, "
-                    doc_context += f"Relevance: {doc['relevance_score']:.2f})\n"
+            if "error" in llm_response:
+                raise Exception(llm_response["error"])
             
-            # Store user message
-            await self.db_service.store_message(
-                role="user",
-                content=message,
-                metadata=metadata,
-                session_id=self.session_id
+            timings["total_ms"] = self._elapsed_ms(started)
+            return self._finish_turn(
+                llm_response["content"],
+                llm_response["model"],
+                llm_response["provider"],
+                turn,
+                timings
             )
             
-            # Get conversation history
-            history = await self.db_service.get_recent_messages(limit=10)
+        except Exception as e:
+            self.logger.error(f"Error processing message: {str(e)}")
+            timings["total_ms"] = self._elapsed_ms(started)
+            return self._error_response(e, timings)
             
-            # Generate response using LLM
-            llm_response = await self.llm_service.generate_response(
+    async def process_message_stream(self,
+                                     message: str,
+                                     metadata: Optional[Dict[str, Any]] = None,
+                                     system_prompt: Optional[str] = None,
+                                     user_info: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Process a user message, streaming the response as it is generated.
+        
+        Yields:
+            {"type": "delta", "content": str} for each piece of text, then one
+            {"type": "final", "response": dict} whose response matches what
+            process_message returns (including "error" on failure)
+        """
+        timings: Dict[str, float] = {}
+        started = time.perf_counter()
+        try:
+            turn = await self._prepare_turn(message, metadata, user_info, timings)
+            timings["pre_llm_ms"] = self._elapsed_ms(started)
+            
+            llm_started = time.perf_counter()
+            parts = []
+            async for delta in self.llm_service.generate_response_stream(
                 prompt=message,
-                history=history,
+                history=turn["history"],
                 system_prompt=system_prompt,
-                additional_context=doc_context if doc_context else None
-            )
+                additional_context=turn["doc_context"] or None
+            ):
+                if not parts:
+                    timings["time_to_first_token_ms"] = self._elapsed_ms(started)
+                parts.append(delta)
+                yield {"type": "delta", "content": delta}
+            timings["llm_ms"] = self._elapsed_ms(llm_started)
             
-            if "error" in llm_response:
-                raise Exception(llm_response["error"])
-            
-            # Prepare response with metadata
-            response = {
-                "content": llm_response["content"],
-                "metadata": {
-                    "timestamp": datetime.now().isoformat(),
-                    "session_id": self.session_id,
-                    "model": llm_response["model"],
-                    "provider": llm_response["provider"],
-                    "user_state": state,
-                    "relevant_docs": [
-                        {
-                            "id": doc["id"],
-                            "title": doc["title"],
-                            "relevance": doc["relevance_score"]
-                        } for doc in relevant_docs
-                    ] if relevant_docs else []
-                }
-            }
-            
-            # Store assistant response
-            await self.db_service.store_message(
-                role="assistant",
-                content=response["content"],
-                metadata=response["metadata"],
-                session_id=self.session_id
+            timings["total_ms"] = self._elapsed_ms(started)
+            response = self._finish_turn(
+                "".join(parts),
+                self.llm_service.model,
+                self.llm_service.provider,
+                turn,
+                timings
             )
             
-            return response
-            
         except Exception as e:
             self.logger.error(f"Error processing message: {str(e)}")
-            return {
-                "error": str(e),
-                "metadata": {
-                    "timestamp": datetime.now().isoformat(),
-                    "session_id": self.session_id
-                }
-            }
+            timings["total_ms"] = self._elapsed_ms(started)
+            response = self._error_response(e, timings)
+            
+        yield {"type": "final", "response": response}
     
     async def get_session_history(self) -> List[Dict[str, Any]]:
         """Get the conversation history for the current session"""
         try:
+            await self.message_queue.flush()
             return await self.db_service.get_recent_messages()
         except Exception as e:
             self.logger.error(f"Error retrieving session history: {str(e)}")
@@ -319,10 +480,12 @@ if __name__ == "__main__":
             finally:
                 if agent:
                     try:
+                        await agent.message_queue.close()
                         if hasattr(agent, 'db_service') and agent.db_service.pool:
                             await agent.db_service.pool.close()
                         if hasattr(agent, 'vector_store'):
                             await agent.vector_store.disconnect()
+                        await agent.llm_service.close()
                     except Exception as cleanup_error:
                         print(f"\nWarning: Cleanup error: {str(cleanup_error)}")
     
@@ -33,6 +33,11 @@ class DatabaseInterface(ABC):
         """Retrieve a document by ID."""
         pass
         
+    @abstractmethod
+    async def get_documents_bulk(self, doc_ids: List[str]) -> List[Dict[str, Any]]:
+        """Retrieve several documents by ID, in the given order."""
+        pass
+        
     @abstractmethod
     async def update_document(
         self,
@@ -4,10 +4,12 @@ import logging
 import json
 from typing import Dict, List, Any, Optional
 import asyncpg
+import numpy as np
 from datetime import datetime
 import os
 from dotenv import load_dotenv
 import uuid
+from collections import OrderedDict
 
 # Load environment variables
 load_dotenv()
@@ -19,12 +21,36 @@ from .db_interface import DatabaseInterface
 class DatabaseService(DatabaseInterface):
     """Handles database operations for AI memory"""
     
-    def __init__(self):
+    # Rows per INSERT when bulk storing vectors
+    VECTOR_INSERT_BATCH = 1000
+    
+    # IVFFlat trains its lists with k-means on the rows present when it is built;
+    # fewer than this many rows per list gives poorly placed centroids
+    IVFFLAT_MIN_ROWS_PER_LIST = 39
+    
+    # ef_search of HNSW and probes of IVFFlat are multiplied by this for filtered
+    # searches on pgvector before 0.8, which filters after the index scan
+    VECTOR_FILTER_OVERFETCH = 4
+    
+    def __init__(self, vector_dimension: Optional[int] = None, document_cache_size: Optional[int] = None):
         self.logger = logging.getLogger(__name__)
         self._initialized = False
         self.pool = None
         self.has_vector_extension = False
+        self.vector_extension_version = (0, 0)
+        # Rows in memory_vectors when the IVFFlat index was last built, None while unbuilt
+        self._ivfflat_rows = None
         self._init_db_config()
+        if vector_dimension is not None:
+            self.vector_dimension = vector_dimension
+        if document_cache_size is not None:
+            self.document_cache_size = document_cache_size
+        # In-memory matrix for the JSONB fallback, dropped whenever this service writes vectors
+        self._vector_cache = None
+        # Bumped by invalidate_vector_cache(), so a load that overlapped a write is not kept
+        self._vector_cache_generation = 0
+        # LRU cache of hot documents by doc_id; disabled when the size is 0
+        self._document_cache = OrderedDict()
         
     def _init_db_config(self):
         """Initialize database configuration from environment variables"""
@@ -35,6 +61,16 @@ class DatabaseService(DatabaseInterface):
         self.user = os.getenv('POSTGRES_USER', 'root')
         self.password = os.getenv('POSTGRES_PASSWORD', 'password')
         
+        # pgvector settings for memory_vectors
+        self.vector_dimension = int(os.getenv('VECTOR_DIMENSION', '1536'))
+        self.vector_index_type = os.getenv('PGVECTOR_INDEX_TYPE', 'hnsw').lower()
+        self.vector_ef_search = int(os.getenv('PGVECTOR_EF_SEARCH', '64'))
+        self.vector_ivfflat_lists = int(os.getenv('PGVECTOR_IVFFLAT_LISTS', '100'))
+        self.vector_ivfflat_probes = int(os.getenv('PGVECTOR_IVFFLAT_PROBES', '10'))
+        
+        # Number of documents kept in the in-process LRU cache
+        self.document_cache_size = int(os.getenv('DOCUMENT_CACHE_SIZE', '256'))
+        
         self.logger.debug(f"Host: {self.host}")
         self.logger.debug(f"Port: {self.port}")
         self.logger.debug(f"Database: {self.database}")
@@ -93,6 +129,8 @@ class DatabaseService(DatabaseInterface):
                 async with self.pool.acquire() as conn:
                     await conn.execute('CREATE EXTENSION IF NOT EXISTS vector;')
                     self.has_vector_extension = True
+                    version = await conn.fetchval("SELECT extversion FROM pg_extension WHERE extname = 'vector';")
+                    self.vector_extension_version = tuple(int(p) for p in version.split('.')[:2] if p.isdigit())
                     self.logger.info("PostgreSQL vector extension enabled")
             except Exception as e:
                 self.logger.info("PostgreSQL vector extension not available - will use alternative storage for vectors")
@@ -140,15 +178,28 @@ class DatabaseService(DatabaseInterface):
         async with self.pool.acquire() as conn:
             if self.has_vector_extension:
                 # Create table with vector extension support
-                await conn.execute('''
+                await conn.execute(f'''
                     CREATE TABLE IF NOT EXISTS memory_vectors (
                         id SERIAL PRIMARY KEY,
                         text TEXT NOT NULL,
-                        embedding vector(1536),
+                        embedding vector({int(self.vector_dimension)}),
                         metadata JSONB,
                         timestamp TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
                     );
                 ''')
+                
+                # An existing table keeps the dimension it was created with
+                existing_dimension = await conn.fetchval('''
+                    SELECT atttypmod FROM pg_attribute
+                    WHERE attrelid = 'memory_vectors'::regclass AND attname = 'embedding';
+                ''')
+                if existing_dimension and existing_dimension > 0 and existing_dimension != self.vector_dimension:
+                    raise ValueError(
+                        f"memory_vectors.embedding has dimension {existing_dimension}, "
+                        f"expected {self.vector_dimension} (set VECTOR_DIMENSION to match)"
+                    )
+                
+                await self._create_memory_vectors_index(conn)
             else:
                 # Create table without vector extension
                 await conn.execute('''
@@ -160,6 +211,82 @@ class DatabaseService(DatabaseInterface):
                         timestamp TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
                     );
                 ''')
+                
+            # Metadata filters use JSONB containment
+            await conn.execute('''
+                CREATE INDEX IF NOT EXISTS memory_vectors_metadata_idx
+                ON memory_vectors USING gin (metadata jsonb_path_ops);
+            ''')
+            
+    async def _create_memory_vectors_index(self, conn):
+        """Create the approximate nearest neighbour index on memory_vectors.embedding.
+        
+        HNSW needs pgvector 0.5+; IVFFlat is used when it is requested or HNSW
+        is unavailable, and is only built once the table holds enough rows.
+        Search still works without an index, just as a scan.
+        """
+        hnsw = '''
+            CREATE INDEX IF NOT EXISTS memory_vectors_embedding_hnsw
+            ON memory_vectors USING hnsw (embedding vector_cosine_ops)
+            WITH (m = 16, ef_construction = 64);
+        '''
+        
+        if self.vector_index_type == 'hnsw':
+            try:
+                await conn.execute(hnsw)
+                return
+            except Exception as e:
+                self.logger.info(f"HNSW index not available, falling back to IVFFlat: {str(e)}")
+                self.vector_index_type = 'ivfflat'
+                
+        if self.vector_index_type == 'ivfflat':
+            exists = await conn.fetchval("SELECT to_regclass('memory_vectors_embedding_ivfflat') IS NOT NULL;")
+            if exists:
+                self._ivfflat_rows = await conn.fetchval('SELECT count(*) FROM memory_vectors;')
+            else:
+                await self._build_ivfflat_index(conn)
+                
+    async def _build_ivfflat_index(self, conn, force: bool = False) -> None:
+        """Build, or rebuild, the IVFFlat index from the rows now in memory_vectors.
+        
+        IVFFlat's lists are the k-means centroids of the rows present when it
+        is built, so it is not built until the table holds enough rows, and is
+        rebuilt once the table has doubled since the last build. Until it is
+        built searches scan the table, which is exact.
+        
+        Args:
+            conn: Connection to run on, outside any transaction holding new rows
+            force: Rebuild even if the table has not doubled
+        """
+        rows = await conn.fetchval('SELECT count(*) FROM memory_vectors;')
+        if rows < self.vector_ivfflat_lists * self.IVFFLAT_MIN_ROWS_PER_LIST:
+            return
+        rebuild = self._ivfflat_rows is not None
+        if rebuild and not force and rows < 2 * self._ivfflat_rows:
+            return
+        try:
+            if rebuild:
+                await conn.execute('REINDEX INDEX memory_vectors_embedding_ivfflat;')
+            else:
+                await conn.execute(f'''
+                    CREATE INDEX IF NOT EXISTS memory_vectors_embedding_ivfflat
+                    ON memory_vectors USING ivfflat (embedding vector_cosine_ops)
+                    WITH (lists = {int(self.vector_ivfflat_lists)});
+                ''')
+            self._ivfflat_rows = rows
+            self.logger.info(f"Built IVFFlat index over {rows} vectors")
+        except Exception as e:
+            self.logger.warning(f"Could not create vector index, searches will scan: {str(e)}")
+            
+    async def rebuild_vector_index(self) -> None:
+        """Retrain the IVFFlat index on the current rows, e.g. after a large import.
+        
+        HNSW needs no rebuilding, so this does nothing when it is in use.
+        """
+        if not (self.has_vector_extension and self.vector_index_type == 'ivfflat'):
+            return
+        async with self.pool.acquire() as conn:
+            await self._build_ivfflat_index(conn, force=True)
             
     async def _create_files_table(self):
         """Create the files table if it doesn't exist"""
@@ -438,6 +565,263 @@ class DatabaseService(DatabaseInterface):
             self.logger.error(f"Failed to retrieve file: {str(e)}")
             raise
             
+    @staticmethod
+    def _to_vector_literal(embedding) -> str:
+        """Format an embedding as a pgvector text literal."""
+        return '[' + ','.join(repr(float(x)) for x in embedding) + ']'
+        
+    @staticmethod
+    def _parse_json(value) -> Dict:
+        """Return a JSONB column value as a dictionary."""
+        if not value:
+            return {}
+        return json.loads(value) if isinstance(value, str) else value
+        
+    async def store_vectors_bulk(
+        self,
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[Dict[str, Any]]] = None
+    ) -> List[int]:
+        """Store many embeddings in memory_vectors.
+        
+        Args:
+            texts: Text of each vector
+            embeddings: One embedding per text
+            metadatas: Optional metadata per text, used by search filters
+            
+        Returns:
+            Row IDs of the stored vectors, in input order
+        """
+        try:
+            metadatas = metadatas or [{} for _ in texts]
+            if not (len(texts) == len(embeddings) == len(metadatas)):
+                raise ValueError("texts, embeddings and metadatas must have the same length")
+            for embedding in embeddings:
+                if len(embedding) != self.vector_dimension:
+                    raise ValueError(f"Embedding dimension {len(embedding)} does not match {self.vector_dimension}")
+                    
+            if self.has_vector_extension:
+                column, cast = "embedding", "::vector"
+                encoded = [self._to_vector_literal(e) for e in embeddings]
+            else:
+                column, cast = "embedding_json", "::jsonb"
+                encoded = [json.dumps([float(x) for x in e]) for e in embeddings]
+                
+            ids = []
+            async with self.pool.acquire() as conn:
+                async with conn.transaction():
+                    for start in range(0, len(texts), self.VECTOR_INSERT_BATCH):
+                        end = start + self.VECTOR_INSERT_BATCH
+                        rows = await conn.fetch(
+                            f'''
+                            INSERT INTO memory_vectors (text, {column}, metadata)
+                            SELECT t, e{cast}, m::jsonb
+                            FROM unnest($1::text[], $2::text[], $3::text[]) WITH ORDINALITY AS u(t, e, m, n)
+                            ORDER BY n
+                            RETURNING id;
+                            ''',
+                            texts[start:end],
+                            encoded[start:end],
+                            [json.dumps(m or {}) for m in metadatas[start:end]]
+                        )
+                        ids.extend(r['id'] for r in rows)
+                        
+                if self.has_vector_extension and self.vector_index_type == 'ivfflat':
+                    await self._build_ivfflat_index(conn)
+                    
+            self.invalidate_vector_cache()
+            return ids
+        except Exception as e:
+            self.logger.error(f"Failed to store vectors: {str(e)}")
+            raise
+            
+    async def search_vectors(
+        self,
+        query_embedding: List[float],
+        k: int = 5,
+        metadata_filter: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """Find the stored vectors most similar to a query embedding.
+        
+        Uses the pgvector index when the extension is available and a NumPy
+        scan over the JSONB vectors otherwise.
+        
+        With an index, metadata_filter is applied to the rows the index scan
+        returns. pgvector 0.8+ keeps scanning until k rows match; on older
+        versions the scan is widened by VECTOR_FILTER_OVERFETCH, but a filter
+        matching few rows can still return fewer than k results.
+        
+        Args:
+            query_embedding: Query embedding
+            k: Maximum number of results
+            metadata_filter: Only match rows whose metadata contains these key/value pairs
+            
+        Returns:
+            List of results with id, text, metadata and score (cosine similarity), best first
+        """
+        try:
+            if len(query_embedding) != self.vector_dimension:
+                raise ValueError(f"Query dimension {len(query_embedding)} does not match {self.vector_dimension}")
+            if self.has_vector_extension:
+                return await self._search_vectors_pgvector(query_embedding, k, metadata_filter)
+            return await self._search_vectors_fallback(query_embedding, k, metadata_filter)
+        except Exception as e:
+            self.logger.error(f"Failed to search vectors: {str(e)}")
+            raise
+            
+    async def _search_vectors_pgvector(
+        self,
+        query_embedding: List[float],
+        k: int,
+        metadata_filter: Optional[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Search memory_vectors with the pgvector cosine distance operator."""
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                # Search-time recall knobs only apply inside this transaction
+                ef_search, probes = max(int(self.vector_ef_search), k), int(self.vector_ivfflat_probes)
+                iterative = bool(metadata_filter) and self.vector_extension_version >= (0, 8)
+                if metadata_filter and not iterative:
+                    # Rows failing the filter are dropped after the index scan, so scan more
+                    ef_search *= self.VECTOR_FILTER_OVERFETCH
+                    probes *= self.VECTOR_FILTER_OVERFETCH
+                if self.vector_index_type == 'hnsw':
+                    await conn.execute(f"SET LOCAL hnsw.ef_search = {min(ef_search, 1000)}")
+                    if iterative:
+                        await conn.execute("SET LOCAL hnsw.iterative_scan = strict_order")
+                else:
+                    await conn.execute(f"SET LOCAL ivfflat.probes = {min(probes, int(self.vector_ivfflat_lists))}")
+                    if iterative:
+                        # IVFFlat only scans iteratively in relaxed order; results are re-sorted below
+                        await conn.execute("SET LOCAL ivfflat.iterative_scan = relaxed_order")
+                        
+                results = await conn.fetch(
+                    '''
+                    SELECT id, text, metadata, embedding <=> $1::vector AS distance
+                    FROM memory_vectors
+                    WHERE $3::jsonb IS NULL OR metadata @> $3::jsonb
+                    ORDER BY embedding <=> $1::vector
+                    LIMIT $2;
+                    ''',
+                    self._to_vector_literal(query_embedding),
+                    k,
+                    json.dumps(metadata_filter) if metadata_filter else None
+                )
+                
+        return [
+            {
+                "id": r['id'],
+                "text": r['text'],
+                "metadata": self._parse_json(r['metadata']),
+                "score": 1.0 - float(r['distance'])
+            }
+            for r in sorted(results, key=lambda r: r['distance'])
+        ]
+        
+    def invalidate_vector_cache(self) -> None:
+        """Drop the fallback search matrix, e.g. after memory_vectors was written elsewhere."""
+        self._vector_cache = None
+        self._vector_cache_generation += 1
+        
+    async def _load_vector_cache(self):
+        """Load JSONB vectors into a normalized matrix, reusing it until this service writes vectors.
+        
+        Writes made by other processes are not seen until invalidate_vector_cache() is called.
+        """
+        if self._vector_cache is not None:
+            return self._vector_cache
+        generation = self._vector_cache_generation
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(
+                '''
+                SELECT id, text, embedding_json, metadata
+                FROM memory_vectors
+                WHERE embedding_json IS NOT NULL
+                ORDER BY id;
+                '''
+            )
+            
+        matrix = np.zeros((len(rows), self.vector_dimension), dtype=np.float32)
+        for i, r in enumerate(rows):
+            embedding = r['embedding_json']
+            matrix[i] = json.loads(embedding) if isinstance(embedding, str) else embedding
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        
+        cache = {
+            "ids": [r['id'] for r in rows],
+            "texts": [r['text'] for r in rows],
+            "metadata": [self._parse_json(r['metadata']) for r in rows],
+            "matrix": matrix / norms
+        }
+        if generation == self._vector_cache_generation:
+            self._vector_cache = cache
+        return cache
+        
+    @classmethod
+    def _jsonb_contains(cls, value, pattern) -> bool:
+        """Python equivalent of PostgreSQL's jsonb @> operator on decoded JSON values.
+        
+        Objects contain the keys of the pattern with contained values, arrays
+        contain every element of the pattern, and other values must be equal.
+        """
+        if isinstance(pattern, dict):
+            return isinstance(value, dict) and all(
+                key in value and cls._jsonb_contains(value[key], sub) for key, sub in pattern.items()
+            )
+        if isinstance(pattern, list):
+            return isinstance(value, list) and all(
+                any(cls._jsonb_contains(item, sub) for item in value) for sub in pattern
+            )
+        if isinstance(value, (dict, list)):
+            return False
+        # JSON true is not the number 1
+        if isinstance(value, bool) or isinstance(pattern, bool):
+            return type(value) is type(pattern) and value == pattern
+        return value == pattern
+        
+    async def _search_vectors_fallback(
+        self,
+        query_embedding: List[float],
+        k: int,
+        metadata_filter: Optional[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Brute-force cosine search over the JSONB vectors."""
+        cache = await self._load_vector_cache()
+        if not cache["ids"] or k <= 0:
+            return []
+            
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+        scores = cache["matrix"] @ query
+        
+        if metadata_filter:
+            # Round-tripped like the filter sent to PostgreSQL, so tuples compare as arrays
+            pattern = json.loads(json.dumps(metadata_filter))
+            mask = np.fromiter(
+                (self._jsonb_contains(m, pattern) for m in cache["metadata"]),
+                dtype=bool,
+                count=len(cache["metadata"])
+            )
+            scores = np.where(mask, scores, -np.inf)
+            
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {
+                "id": cache["ids"][i],
+                "text": cache["texts"][i],
+                "metadata": cache["metadata"][i],
+                "score": float(scores[i])
+            }
+            for i in top
+            if np.isfinite(scores[i])
+        ]
+            
     async def _create_document_records_table(self):
         """Create the documents table if it doesn't exist"""
         async with self.pool.acquire() as conn:
@@ -625,6 +1009,7 @@ class DatabaseService(DatabaseInterface):
             """
             
             now = datetime.now()
+            self._document_cache.pop(doc_id, None)
             row = await self.pool.fetchrow(
                 query,
                 doc_id,
@@ -653,9 +1038,45 @@ class DatabaseService(DatabaseInterface):
             self.logger.error(f"Failed to store document: {str(e)}")
             raise
             
+    @staticmethod
+    def _document_from_row(row) -> Dict[str, Any]:
+        """Convert a documents row to a dictionary."""
+        return {
+            "id": row['id'],
+            "doc_id": row['doc_id'],
+            "title": row['title'],
+            "content": row['content'],
+            "summary": row['summary'],
+            "source_type": SourceType(row['source_type']),
+            "vector_store_id": row['vector_store_id'],
+            "metadata": row['metadata'],
+            "created_at": row['created_at'],
+            "updated_at": row['updated_at']
+        }
+        
+    def _cache_document(self, document: Dict[str, Any]) -> None:
+        """Add a document to the LRU cache, evicting the least recently used."""
+        if self.document_cache_size <= 0:
+            return
+        self._document_cache[document["doc_id"]] = document
+        self._document_cache.move_to_end(document["doc_id"])
+        while len(self._document_cache) > self.document_cache_size:
+            self._document_cache.popitem(last=False)
+            
+    def _cached_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Get a document from the LRU cache, marking it recently used."""
+        document = self._document_cache.get(doc_id)
+        if document is not None:
+            self._document_cache.move_to_end(doc_id)
+        return document
+        
     async def get_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve a document by ID."""
         try:
+            cached = self._cached_document(doc_id)
+            if cached is not None:
+                return cached
+                
             query = """
                 SELECT id, doc_id, title, content, summary,
                        source_type::text, vector_store_id, metadata,
@@ -668,23 +1089,54 @@ class DatabaseService(DatabaseInterface):
             if not row:
                 return None
                 
-            return {
-                "id": row['id'],
-                "doc_id": row['doc_id'],
-                "title": row['title'],
-                "content": row['content'],
-                "summary": row['summary'],
-                "source_type": SourceType(row['source_type']),
-                "vector_store_id": row['vector_store_id'],
-                "metadata": row['metadata'],
-                "created_at": row['created_at'],
-                "updated_at": row['updated_at']
-            }
+            document = self._document_from_row(row)
+            self._cache_document(document)
+            return document
             
         except Exception as e:
             self.logger.error(f"Failed to get document: {str(e)}")
             raise
             
+    async def get_documents_bulk(self, doc_ids: List[str]) -> List[Dict[str, Any]]:
+        """Retrieve several documents in one round-trip.
+        
+        Args:
+            doc_ids: Document identifiers, e.g. in search score order
+            
+        Returns:
+            Found documents in the order of doc_ids; missing IDs are skipped
+        """
+        try:
+            documents = {}
+            missing = []
+            for doc_id in dict.fromkeys(doc_ids):
+                cached = self._cached_document(doc_id)
+                if cached is not None:
+                    documents[doc_id] = cached
+                else:
+                    missing.append(doc_id)
+                    
+            if missing:
+                query = """
+                    SELECT id, doc_id, title, content, summary,
+                           source_type::text, vector_store_id, metadata,
+                           created_at, updated_at
+                    FROM documents
+                    WHERE doc_id = ANY($1::text[])
+                """
+                
+                rows = await self.pool.fetch(query, missing)
+                for row in rows:
+                    document = self._document_from_row(row)
+                    documents[document["doc_id"]] = document
+                    self._cache_document(document)
+                    
+            return [documents[doc_id] for doc_id in dict.fromkeys(doc_ids) if doc_id in documents]
+            
+        except Exception as e:
+            self.logger.error(f"Failed to get documents: {str(e)}")
+            raise
+            
     async def update_document(
         self,
         doc_id: str,
@@ -719,6 +1171,7 @@ class DatabaseService(DatabaseInterface):
                 RETURNING id
             """
             
+            self._document_cache.pop(doc_id, None)
             result = await self.pool.fetchval(query, *values)
             return result is not None
             
@@ -6,6 +6,7 @@ from .sources.base_source import DocumentSource
 from .processors.base_processor import DocumentProcessor
 from .vector_store.store_interface import VectorStore
 from .ingestion_service import DocumentIngestionService
+from .manifest import IngestionManifest, ManifestEntry, compute_document_hash
 
 __all__ = [
     'Document',
@@ -14,5 +15,8 @@ __all__ = [
     'DocumentSource',
     'DocumentProcessor',
     'VectorStore',
-    'DocumentIngestionService'
+    'DocumentIngestionService',
+    'IngestionManifest',
+    'ManifestEntry',
+    'compute_document_hash'
 ] 
\ No newline at end of file
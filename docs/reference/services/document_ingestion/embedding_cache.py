@@ -0,0 +1,374 @@
+"""Persistent embedding cache keyed by model and content hash.
+
+Each embedding model gets its own directory under EMBEDDING_CACHE_DIR, so an
+entry is keyed by (model name, SHA-256 of the embedded text):
+
+    meta.json    model name and vector dimension
+    vectors.f32  float32 vectors, one row per slot (memory-mapped)
+    keys.bin     32-byte content hash of each slot (memory-mapped)
+    ticks.bin    uint64 last-use tick of each slot, 0 if empty (memory-mapped)
+    state.bin    uint64 generation and tick counters (memory-mapped)
+
+keys.bin and ticks.bin form the on-disk hash index; it is read into a dict
+on open. When the cache reaches EMBEDDING_CACHE_MAX_MB, the least recently
+used eighth of the entries is evicted and their slots reused.
+
+Every process using a model shares its directory. Writers hold an advisory
+lock on the directory only while they add entries, and bump the generation
+when done; other processes re-read the index when they see a new
+generation. Readers take no lock. They check a slot's key again after
+reading its vector, in case another process reused the slot meanwhile.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+# Directory holding one cache per embedding model
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "data/embedding_cache")
+
+# Size limit of each model's vector file; 0 disables the cache
+EMBEDDING_CACHE_MAX_MB = float(os.getenv("EMBEDDING_CACHE_MAX_MB", "512"))
+
+# Slots the files start with; they double as entries are added
+_INITIAL_SLOTS = 1024
+
+# Share of entries evicted at once when the cache is full
+_EVICT_FRACTION = 8
+
+_KEY_BYTES = 32
+
+# Positions in state.bin
+_GENERATION, _TICK = 0, 1
+
+def _content_key(text: str) -> bytes:
+    """Binary SHA-256 of a text, matching compute_document_hash."""
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+def _lock_file(f) -> None:
+    """Take an exclusive lock on an open file, waiting for other holders."""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+def _unlock_file(f) -> None:
+    """Release a lock taken with _lock_file."""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+class EmbeddingCache:
+    """Memory-mapped embedding vectors of one model, with LRU eviction."""
+
+    def __init__(self, cache_dir, model_name: str, max_mb: float = EMBEDDING_CACHE_MAX_MB):
+        """Open or create the cache of a model.
+
+        Args:
+            cache_dir: Directory holding the caches of all models
+            model_name: Embedding model the vectors come from
+            max_mb: Size limit of the vector file in MB
+        """
+        self.model_name = model_name
+        safe_name = re.sub(r"[^\w.-]+", "_", model_name)[:64]
+        suffix = hashlib.sha256(model_name.encode("utf-8")).hexdigest()[:8]
+        self.path = Path(cache_dir) / f"{safe_name}-{suffix}"
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._lock_file = open(self.path / "lock", "a")
+        self.dim: Optional[int] = None
+        self._slots: Dict[bytes, int] = {}
+        # Generation the in-memory index was read at, and the files it maps
+        self._generation = None
+        self._files = None
+        self.hits = 0
+        self.misses = 0
+
+        with self._exclusive():
+            with open(self.path / "state.bin", "ab") as f:
+                if f.tell() < 16:
+                    f.truncate(16)
+            self._state = np.memmap(self.path / "state.bin", dtype="<u8", mode="r+", shape=(2,))
+            try:
+                self._refresh()
+            except Exception as e:
+                logger.warning(f"Discarding unreadable embedding cache {self.path}: {str(e)}")
+                self._reset()
+
+    @contextmanager
+    def _exclusive(self):
+        """Hold the directory lock, so no other process adds entries meanwhile."""
+        _lock_file(self._lock_file)
+        try:
+            yield
+        finally:
+            _unlock_file(self._lock_file)
+
+    def close(self) -> None:
+        """Write pending changes and close the lock file."""
+        with self._lock:
+            self.flush()
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+
+    @property
+    def max_slots(self) -> int:
+        """Entries that fit within the size limit."""
+        return max(1, self.max_bytes // (4 * self.dim)) if self.dim else 0
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _map(self, capacity: int) -> None:
+        """Map the slot files at a capacity, growing them if needed.
+
+        ticks.bin is grown last, as its size is what other processes map.
+        """
+        for name, row_bytes in (("vectors.f32", 4 * self.dim), ("keys.bin", _KEY_BYTES), ("ticks.bin", 8)):
+            file_path = self.path / name
+            with open(file_path, "ab") as f:
+                if f.tell() < capacity * row_bytes:
+                    f.truncate(capacity * row_bytes)
+        self._vectors = np.memmap(self.path / "vectors.f32", dtype="<f4", mode="r+", shape=(capacity, self.dim))
+        self._keys = np.memmap(self.path / "keys.bin", dtype=np.uint8, mode="r+", shape=(capacity, _KEY_BYTES))
+        self._ticks = np.memmap(self.path / "ticks.bin", dtype="<u8", mode="r+", shape=(capacity,))
+        stats = (self.path / "ticks.bin").stat()
+        self._files = (stats.st_ino, capacity)
+
+    def _refresh(self) -> None:
+        """Re-read the index if another process added entries since the last look."""
+        generation = int(self._state[_GENERATION])
+        if generation == self._generation:
+            return
+        meta_path = self.path / "meta.json"
+        if not meta_path.exists():
+            self.dim = None
+            self._slots = {}
+            self._generation = generation
+            return
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("model") != self.model_name:
+            raise ValueError(f"cache belongs to {meta.get('model')}")
+
+        stats = (self.path / "ticks.bin").stat()
+        if int(meta["dim"]) != self.dim or (stats.st_ino, stats.st_size // 8) != self._files:
+            # Recreated for a new dimension, or grown by another process
+            self.dim = int(meta["dim"])
+            self._map(stats.st_size // 8)
+        used = np.flatnonzero(self._ticks)
+        # A slot whose key is cleared is being rewritten by its owner
+        self._slots = {
+            key.tobytes(): int(slot) for key, slot in zip(self._keys[used], used) if key.any()
+        }
+        self._generation = generation
+        logger.debug(f"Read embedding cache index {self.path} with {len(self._slots)} entries")
+
+    def _publish(self) -> None:
+        """Flush and bump the generation, so other processes see new entries. Caller holds the directory lock."""
+        self.flush()
+        self._state[_GENERATION] += 1
+        self._state.flush()
+        self._generation = int(self._state[_GENERATION])
+
+    def _next_tick(self) -> int:
+        """Shared use counter; increments racing without the lock only blur LRU order."""
+        tick = int(self._state[_TICK]) + 1
+        self._state[_TICK] = tick
+        return tick
+
+    def _create(self, dim: int) -> None:
+        """Start an empty cache for vectors of a dimension. Caller holds the directory lock.
+
+        The slot files are replaced rather than truncated, so other processes
+        that still map them never touch pages past the end of a file.
+        """
+        for name in ("vectors.f32", "keys.bin", "ticks.bin"):
+            (self.path / name).unlink(missing_ok=True)
+        self.dim = dim
+        self._map(min(_INITIAL_SLOTS, self.max_slots))
+        self._slots = {}
+        tmp_path = self.path / "meta.json.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model_name, "dim": dim}, f)
+        os.replace(tmp_path, self.path / "meta.json")
+
+    def _reset(self) -> None:
+        """Forget all entries; files are recreated on the next put. Caller holds the directory lock."""
+        self.dim = None
+        self._slots = {}
+        (self.path / "meta.json").unlink(missing_ok=True)
+        self._publish()
+
+    def _free_slots(self) -> List[int]:
+        """Empty slots, lowest popped first; grows or evicts if there are none."""
+        free = np.flatnonzero(self._ticks == 0)
+        if free.size:
+            return free[::-1].tolist()
+
+        capacity = len(self._ticks)
+        if capacity < self.max_slots:
+            new_capacity = min(capacity * 2, self.max_slots)
+            self.flush()
+            self._map(new_capacity)
+            return list(reversed(range(capacity, new_capacity)))
+
+        used = np.flatnonzero(self._ticks)
+        count = max(1, len(used) // _EVICT_FRACTION)
+        oldest = used[np.argpartition(self._ticks[used], count - 1)[:count]]
+        for slot in oldest:
+            self._slots.pop(self._keys[slot].tobytes(), None)
+        self._ticks[oldest] = 0
+        logger.debug(f"Evicted {count} least recently used embeddings from {self.path}")
+        return sorted(int(slot) for slot in oldest)[::-1]
+
+    def get_many(self, keys: Sequence[bytes]) -> List[Optional[List[float]]]:
+        """Look up vectors by content hash, marking hits as recently used.
+
+        Returns:
+            One vector per key, or None where the key is not cached
+        """
+        with self._lock:
+            self._refresh()
+            results: List[Optional[List[float]]] = []
+            for key in keys:
+                slot = self._slots.get(key)
+                vector = None
+                if slot is not None:
+                    vector = self._vectors[slot].tolist()
+                    # The key is cleared before a slot is rewritten, so a changed
+                    # key means the vector read may belong to another text
+                    if self._keys[slot].tobytes() == key:
+                        self._ticks[slot] = self._next_tick()
+                    else:
+                        vector = None
+                results.append(vector)
+            return results
+
+    def put_many(self, keys: Sequence[bytes], vectors: Sequence[Sequence[float]]) -> None:
+        """Store vectors by content hash."""
+        with self._lock, self._exclusive():
+            self._refresh()
+            free: List[int] = []
+            for key, vector in zip(keys, vectors):
+                vector = np.asarray(vector, dtype="<f4")
+                if self.dim != len(vector):
+                    if self.dim is not None:
+                        logger.warning(f"Embedding dimension of {self.model_name} changed "
+                                       f"from {self.dim} to {len(vector)}; clearing its cache")
+                    self._create(len(vector))
+                    free = []
+                slot = self._slots.get(key)
+                if slot is None:
+                    if not free:
+                        free = self._free_slots()
+                    slot = free.pop()
+                    # Clear the slot's key and tick first so a torn write never pairs a key with another vector
+                    self._ticks[slot] = 0
+                    self._keys[slot] = 0
+                    self._vectors[slot] = vector
+                    self._keys[slot] = np.frombuffer(key, dtype=np.uint8)
+                    self._slots[key] = slot
+                self._ticks[slot] = self._next_tick()
+            self._publish()
+
+    def flush(self) -> None:
+        """Write pending changes to disk."""
+        if self.dim is not None:
+            self._vectors.flush()
+            self._keys.flush()
+            self._ticks.flush()
+
+    def _lookup(self, texts: Sequence[str]):
+        """Content hashes, cached vectors (None if missing) and missing texts by hash."""
+        keys = [_content_key(text) for text in texts]
+        results = self.get_many(keys)
+        missing = {key: text for key, text, vector in zip(keys, texts, results) if vector is None}
+        self.misses += len(missing)
+        self.hits += len(texts) - sum(vector is None for vector in results)
+        return keys, results, missing
+
+    def _fill(self, keys, results, missing, computed) -> List[List[float]]:
+        """Store computed vectors and merge them into the lookup results."""
+        self.put_many(list(missing), computed)
+        self.flush()
+        by_key = dict(zip(missing, computed))
+        return [by_key[key] if vector is None else vector for key, vector in zip(keys, results)]
+
+    def embed(self, texts: Sequence[str], embed_fn: Callable[[List[str]], List[List[float]]]) -> List[List[float]]:
+        """Embed texts, calling embed_fn only for texts not already cached.
+
+        Args:
+            texts: Texts to embed
+            embed_fn: Embeds a list of texts with the cache's model
+
+        Returns:
+            One vector per text, in input order
+        """
+        keys, results, missing = self._lookup(texts)
+        if not missing:
+            return results
+        return self._fill(keys, results, missing, embed_fn(list(missing.values())))
+
+    async def aembed(
+        self,
+        texts: Sequence[str],
+        embed_fn: Callable[[List[str]], Awaitable[List[List[float]]]]
+    ) -> List[List[float]]:
+        """Like embed, for an async embed_fn."""
+        keys, results, missing = self._lookup(texts)
+        if not missing:
+            return results
+        return self._fill(keys, results, missing, await embed_fn(list(missing.values())))
+
+@lru_cache(maxsize=None)
+def get_embedding_cache(model_name: str) -> Optional[EmbeddingCache]:
+    """Get the process-wide cache of a model, or None if caching is disabled."""
+    if EMBEDDING_CACHE_MAX_MB <= 0:
+        return None
+    return EmbeddingCache(EMBEDDING_CACHE_DIR, model_name)
+
+class CachedEmbeddings(Embeddings):
+    """LangChain embeddings that consult an EmbeddingCache before the model."""
+
+    def __init__(self, embeddings: Embeddings, cache: Optional[EmbeddingCache]):
+        """Wrap an embeddings model.
+
+        Args:
+            embeddings: Model used for texts missing from the cache
+            cache: Cache of that model; None passes every call through
+        """
+        self.embeddings = embeddings
+        self.cache = cache
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.cache is None:
+            return self.embeddings.embed_documents(texts)
+        return self.cache.embed(texts, self.embeddings.embed_documents)
+
+    def embed_query(self, text: str) -> List[float]:
+        # Query and document vectors differ for some models, so queries are not cached
+        return self.embeddings.embed_query(text)
@@ -0,0 +1,156 @@
+"""Local CPU embedding engine for sentence-transformers models.
+
+One engine per model and configuration is shared by the whole process, so
+the model is loaded once, on the first texts it embeds. Texts are sorted by
+length and packed into batches of at most EMBEDDING_BATCH_TOKENS padded
+tokens: short chunks go in large batches and long chunks in small ones, so
+little compute is spent on padding.
+
+Inference can run through PyTorch or ONNX Runtime, each optionally with
+int8 weights:
+
+    torch        float32 PyTorch
+    torch-int8   PyTorch with dynamically quantised Linear layers
+    onnx         ONNX Runtime, float32 export
+    onnx-int8    ONNX Runtime, int8 export (EMBEDDING_ONNX_INT8_FILE)
+
+int8 vectors are close to, but not the same as, float32 ones, so each
+backend caches its embeddings under its own key.
+"""
+
+import logging
+import os
+import threading
+from functools import lru_cache
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+# Inference backend: torch, torch-int8, onnx or onnx-int8
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+
+# Threads used for inference; 0 leaves the runtime's default
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))
+
+# Padded tokens per batch; a batch holds this many tokens divided by its longest text
+EMBEDDING_BATCH_TOKENS = int(os.getenv("EMBEDDING_BATCH_TOKENS", "8192"))
+
+# Upper bound on texts per batch, however short they are
+EMBEDDING_MAX_BATCH_SIZE = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", "256"))
+
+# Quantised ONNX file in the model repository, for onnx-int8
+EMBEDDING_ONNX_INT8_FILE = os.getenv("EMBEDDING_ONNX_INT8_FILE", "onnx/model_qint8_avx2.onnx")
+
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+
+# Characters per token used to estimate text lengths without tokenizing twice
+_CHARS_PER_TOKEN = 4
+
+class EmbeddingEngine(Embeddings):
+    """Batched CPU inference for one sentence-transformers model."""
+
+    def __init__(
+        self,
+        model_name: str,
+        backend: str = EMBEDDING_BACKEND,
+        threads: int = EMBEDDING_THREADS,
+        batch_tokens: int = EMBEDDING_BATCH_TOKENS,
+        max_batch_size: int = EMBEDDING_MAX_BATCH_SIZE
+    ):
+        """Configure the engine; the model is loaded on first use.
+
+        Args:
+            model_name: sentence-transformers model name or path
+            backend: One of BACKENDS
+            threads: Inference threads, 0 for the runtime's default
+            batch_tokens: Padded tokens per batch
+            max_batch_size: Texts per batch at most
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown embedding backend {backend}; expected one of {', '.join(BACKENDS)}")
+        self.model_name = model_name
+        self.backend = backend
+        self.threads = threads
+        self.batch_tokens = batch_tokens
+        self.max_batch_size = max_batch_size
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def cache_key(self) -> str:
+        """Embedding cache key: vectors differ between float32 and int8 backends."""
+        return self.model_name if self.backend in ("torch", "onnx") else f"{self.model_name}@{self.backend}"
+
+    @property
+    def model(self):
+        """The loaded SentenceTransformer, loading it on first access."""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._load()
+        return self._model
+
+    def _load(self):
+        from sentence_transformers import SentenceTransformer
+
+        logger.info(f"Loading embedding model {self.model_name} ({self.backend})")
+        if self.backend.startswith("onnx"):
+            import onnxruntime
+
+            session_options = onnxruntime.SessionOptions()
+            if self.threads:
+                session_options.intra_op_num_threads = self.threads
+                session_options.inter_op_num_threads = 1
+            model_kwargs = {"provider": "CPUExecutionProvider", "session_options": session_options}
+            if self.backend == "onnx-int8":
+                model_kwargs["file_name"] = EMBEDDING_ONNX_INT8_FILE
+            return SentenceTransformer(self.model_name, device="cpu", backend="onnx", model_kwargs=model_kwargs)
+
+        import torch
+
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        model = SentenceTransformer(self.model_name, device="cpu")
+        if self.backend == "torch-int8":
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return model.eval()
+
+    def batches(self, texts: List[str]) -> List[List[int]]:
+        """Group text indices into length-sorted batches within the token budget."""
+        max_tokens = self.model.max_seq_length if self._model is not None else 512
+        lengths = [min(len(text) // _CHARS_PER_TOKEN + 2, max_tokens) for text in texts]
+        batches: List[List[int]] = []
+        batch: List[int] = []
+        for index in sorted(range(len(texts)), key=lengths.__getitem__):
+            # Sorted ascending, so this text sets the batch's padded length
+            if batch and ((len(batch) + 1) * lengths[index] > self.batch_tokens or len(batch) >= self.max_batch_size):
+                batches.append(batch)
+                batch = []
+            batch.append(index)
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts in length-sorted batches, returning vectors in input order."""
+        if not texts:
+            return []
+        model = self.model
+        texts = [text.replace("\n", " ") for text in texts]
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        with self._lock:
+            for batch in self.batches(texts):
+                encoded = model.encode([texts[i] for i in batch], batch_size=len(batch), show_progress_bar=False)
+                for index, vector in zip(batch, encoded):
+                    vectors[index] = vector.tolist()
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+@lru_cache(maxsize=None)
+def get_embedding_engine(model_name: str, backend: str = EMBEDDING_BACKEND) -> EmbeddingEngine:
+    """Get the process-wide engine of a model and backend."""
+    return EmbeddingEngine(model_name, backend)
@@ -0,0 +1,174 @@
+"""Ingestion manifest for incremental document processing."""
+
+import json
+import hashlib
+import logging
+import os
+from pathlib import Path
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional, Iterable
+
+logger = logging.getLogger(__name__)
+
+def compute_document_hash(content: str) -> str:
+    """Compute SHA-256 hash of document content.
+
+    Args:
+        content: Document content
+
+    Returns:
+        str: Hex digest of content hash
+    """
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+@dataclass
+class ManifestEntry:
+    """Record of an ingested file and the chunks it produced."""
+    path: str
+    size: int
+    mtime_ns: int
+    content_hash: str
+    chunk_ids: List[str] = field(default_factory=list)
+
+class IngestionManifest:
+    """Tracks ingested files so unchanged files can be skipped on re-ingest.
+
+    Files are first compared by size and mtime, which costs a single stat().
+    Only when those differ is the content hashed, so a touched but otherwise
+    identical file is not re-embedded either.
+    """
+
+    def __init__(self, manifest_path: Path):
+        """Initialize the manifest.
+
+        Args:
+            manifest_path: Path of the JSON file backing the manifest
+        """
+        self.manifest_path = Path(manifest_path)
+        self.entries: Dict[str, ManifestEntry] = {}
+
+    @staticmethod
+    def key_for(file_path) -> str:
+        """Get the manifest key for a file path."""
+        return str(Path(file_path).resolve())
+
+    def load(self) -> 'IngestionManifest':
+        """Load entries from disk, starting empty if the file is missing or invalid."""
+        self.entries = {}
+        if not self.manifest_path.exists():
+            return self
+
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for key, value in data.get("files", {}).items():
+                self.entries[key] = ManifestEntry(**value)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable ingestion manifest {self.manifest_path}: {str(e)}")
+            self.entries = {}
+        return self
+
+    def save(self) -> None:
+        """Write entries to disk atomically."""
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"files": {key: asdict(entry) for key, entry in self.entries.items()}},
+                f,
+                ensure_ascii=False
+            )
+        os.replace(tmp_path, self.manifest_path)
+
+    def clear(self) -> None:
+        """Forget all entries."""
+        self.entries = {}
+
+    def get(self, file_path) -> Optional[ManifestEntry]:
+        """Get the entry for a file, if any."""
+        return self.entries.get(self.key_for(file_path))
+
+    def is_unchanged(self, file_path, stats: os.stat_result) -> bool:
+        """Check whether a file matches its entry by size and mtime.
+
+        Args:
+            file_path: Path to the file
+            stats: Result of stat() on the file
+
+        Returns:
+            bool: True if the file can be skipped without reading it
+        """
+        entry = self.get(file_path)
+        return (
+            entry is not None
+            and entry.size == stats.st_size
+            and entry.mtime_ns == stats.st_mtime_ns
+        )
+
+    def has_same_content(self, file_path, content_hash: str) -> bool:
+        """Check whether a file's content hash matches its entry."""
+        entry = self.get(file_path)
+        return entry is not None and entry.content_hash == content_hash
+
+    def update(
+        self,
+        file_path,
+        stats: os.stat_result,
+        content_hash: str,
+        chunk_ids: Optional[List[str]] = None
+    ) -> ManifestEntry:
+        """Record a file as ingested.
+
+        Args:
+            file_path: Path to the file
+            stats: Result of stat() on the file
+            content_hash: Hash of the file content
+            chunk_ids: Vector store IDs of the file's chunks. If None, the
+                chunk IDs of the existing entry are kept.
+
+        Returns:
+            The stored entry
+        """
+        key = self.key_for(file_path)
+        if chunk_ids is None:
+            existing = self.entries.get(key)
+            chunk_ids = existing.chunk_ids if existing else []
+
+        entry = ManifestEntry(
+            path=key,
+            size=stats.st_size,
+            mtime_ns=stats.st_mtime_ns,
+            content_hash=content_hash,
+            chunk_ids=list(chunk_ids)
+        )
+        self.entries[key] = entry
+        return entry
+
+    def remove(self, file_path) -> Optional[ManifestEntry]:
+        """Remove and return the entry for a file."""
+        return self.entries.pop(self.key_for(file_path), None)
+
+    def find_deleted(self, folder_path, seen_paths: Iterable[str]) -> List[str]:
+        """Find entries whose files are gone or were not seen in this run.
+
+        Args:
+            folder_path: Folder that was scanned; unseen entries outside it are kept
+            seen_paths: Manifest keys of the files found in this run
+
+        Returns:
+            List of manifest keys to evict
+        """
+        folder_key = self.key_for(folder_path)
+        seen = set(seen_paths)
+        deleted = []
+        for key in self.entries:
+            if key in seen:
+                continue
+            try:
+                in_folder = os.path.commonpath([folder_key, key]) == folder_key
+            except ValueError:
+                # Different drives on Windows
+                in_folder = False
+            if in_folder or not os.path.exists(key):
+                deleted.append(key)
+        return deleted
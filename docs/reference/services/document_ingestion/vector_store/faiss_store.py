@@ -0,0 +1,874 @@
+"""Flat vector store backed by memory-mapped files.
+
+Layout of a store directory:
+- vectors.f32: float32 matrix of chunk embeddings, one row per chunk
+- ids.i64: int64 id map, row -> document key (-1 marks a deleted row)
+- documents.jsonl: append-only log of stored and deleted documents, each
+  stored one with its key, vector_store_id, doc_id, chunks and metadata
+- store.json: dimension, metric, row count, log length and a generation counter
+- ann.index: optional FAISS IVF-PQ or HNSW index over the rows
+
+Both matrices are opened with numpy.memmap, so every worker process that
+opens the same store shares one page-cache copy of the vectors. A single
+process is expected to write; readers pick up changes on their next search,
+reading only the log entries written since their last look.
+
+Locked sections of the async methods run on worker threads, so a search
+waiting on a write never blocks the event loop. Compaction copies the live
+rows without the lock and only takes it to swap the new files in.
+
+The "Flat" index type scans the memory-mapped rows exactly. "IVFPQ" and
+"HNSW" keep scanning exactly until the store holds ann_threshold rows, then
+train an approximate index in the background. Approximate candidates are
+re-ranked with the exact vectors, so scores are the same as with Flat.
+"""
+
+import os
+import json
+import uuid
+import asyncio
+import logging
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from .store_interface import VectorStore
+from ..types import ProcessedDocument
+
+logger = logging.getLogger(__name__)
+
+class FaissVectorStore(VectorStore):
+    """Vector store with memory-mapped persistence and exact or ANN search.
+
+    Config:
+        dimension: Embedding dimension (required)
+        path: Store directory (default "data/faiss_store")
+        metric: "cosine", "ip" or "l2" (default "cosine")
+        index_type: "Flat", "IVFPQ" or "HNSW" (default "Flat")
+        ann_threshold: Live rows needed before an ANN index is trained (default 50000)
+        nlist: IVF cells (default 4 * sqrt(rows))
+        nprobe: IVF cells visited per query (default 16)
+        pq_m: PQ sub-quantizers, must divide dimension (default: largest of 64/48/32/16/8 that does)
+        hnsw_m: HNSW graph degree (default 32)
+        ef_construction: HNSW build beam width (default 80)
+        ef_search: HNSW search beam width (default 64)
+        candidate_factor: ANN candidates fetched per requested result (default 16)
+        compaction_threshold: Fraction of deleted rows that triggers
+            a background compaction (default 0.2)
+    """
+
+    DEFAULT_PATH = "data/faiss_store"
+    INDEX_TYPES = ("Flat", "IVFPQ", "HNSW")
+    INITIAL_CAPACITY = 1024
+    SEARCH_BLOCK_ROWS = 65536
+    ANN_TRAIN_SAMPLE = 256
+
+    def __init__(self, config: Dict[str, Any]):
+        """Initialize the vector store.
+
+        Args:
+            config: Store configuration, see class docstring
+        """
+        super().__init__(config)
+        self.dimension = config["dimension"]
+        self.metric = config.get("metric", "cosine")
+        self.index_type = config.get("index_type", "Flat")
+        self.path = Path(config.get("path", self.DEFAULT_PATH))
+        self.compaction_threshold = float(config.get("compaction_threshold", 0.2))
+        self.ann_threshold = int(config.get("ann_threshold", 50000))
+        self.nprobe = int(config.get("nprobe", 16))
+        self.hnsw_m = int(config.get("hnsw_m", 32))
+        self.ef_construction = int(config.get("ef_construction", 80))
+        self.ef_search = int(config.get("ef_search", 64))
+        self.candidate_factor = int(config.get("candidate_factor", 16))
+
+        self._lock = threading.RLock()
+        # Held for a whole compaction, so only one rewrite runs at a time
+        self._compact_lock = threading.Lock()
+        self._vectors = None
+        self._row_keys = None
+        self._capacity = 0
+        self._count = 0
+        self._generation = 0
+        self._state_signature = None
+        self._documents: Dict[int, Dict[str, Any]] = {}
+        self._doc_keys: Dict[str, int] = {}
+        self._vector_keys: Dict[str, int] = {}
+        self._next_key = 0
+        # Log entries not yet appended, and how far the log has been read or written
+        self._pending_log: List[Dict[str, Any]] = []
+        self._log_bytes = 0
+        self._log_epoch = 0
+        self._tombstones = 0
+        self._compaction_task = None
+        self._ann = None
+        self._ann_rows = 0
+        self._ann_saved_rows = 0
+        self._ann_task = None
+        # Whether self._ann is the read-only memory-mapped copy of ann.index
+        self._ann_mmapped = False
+        # Bumped whenever row numbers change (compaction or reload)
+        self._row_epoch = 0
+
+    def _validate_config(self) -> None:
+        """Validate store configuration."""
+        dimension = self.config.get("dimension")
+        if not isinstance(dimension, int) or dimension <= 0:
+            raise ValueError("dimension must be a positive integer")
+
+        metric = self.config.get("metric", "cosine")
+        if metric not in ("cosine", "ip", "l2"):
+            raise ValueError(f"Unsupported metric: {metric}")
+
+        index_type = self.config.get("index_type", "Flat")
+        if index_type not in self.INDEX_TYPES:
+            raise ValueError(f"Unsupported index_type: {index_type}")
+
+        pq_m = self.config.get("pq_m")
+        if pq_m is not None and dimension % int(pq_m) != 0:
+            raise ValueError(f"pq_m ({pq_m}) must divide dimension ({dimension})")
+
+        if self.config.get("use_gpu"):
+            logger.info("use_gpu is ignored - vectors are searched from the memory-mapped file")
+
+    @property
+    def _vectors_path(self) -> Path:
+        return self.path / "vectors.f32"
+
+    @property
+    def _ids_path(self) -> Path:
+        return self.path / "ids.i64"
+
+    @property
+    def _documents_path(self) -> Path:
+        return self.path / "documents.jsonl"
+
+    @property
+    def _legacy_documents_path(self) -> Path:
+        return self.path / "documents.json"
+
+    @property
+    def _state_path(self) -> Path:
+        return self.path / "store.json"
+
+    @property
+    def _ann_path(self) -> Path:
+        return self.path / "ann.index"
+
+    async def connect(self) -> None:
+        """Open the store, creating it if needed."""
+        self.path.mkdir(parents=True, exist_ok=True)
+        await asyncio.to_thread(self._open)
+        logger.info(f"Vector store opened at {self.path} with {len(self._documents)} documents")
+
+    def _open(self) -> None:
+        """Load the store from disk or create an empty one."""
+        with self._lock:
+            if self._state_path.exists():
+                self._load()
+            else:
+                self._resize(self.INITIAL_CAPACITY)
+                self._save_state()
+
+    async def disconnect(self) -> None:
+        """Flush and close the store."""
+        if self._compaction_task is not None:
+            await self._compaction_task
+        if self._ann_task is not None:
+            await self._ann_task
+        await asyncio.to_thread(self._close)
+
+    def _close(self) -> None:
+        """Save the ANN index and state, then drop the memory maps."""
+        with self._lock:
+            if self._vectors is not None:
+                self._save_ann()
+                # store.json must record the rows now in ann.index
+                self._save_state()
+            self._vectors = None
+            self._row_keys = None
+            self._ann = None
+
+    async def store_document(self, processed_doc: ProcessedDocument) -> str:
+        """Store a processed document.
+
+        Storing a doc_id that is already present replaces the old copy.
+
+        Args:
+            processed_doc: Document with one embedding per chunk
+
+        Returns:
+            Vector store ID for the stored document
+        """
+        return (await self.store_documents([processed_doc]))[0]
+
+    async def store_documents(self, processed_docs: List[ProcessedDocument]) -> List[str]:
+        """Store several processed documents, persisting state once.
+
+        Args:
+            processed_docs: Documents with one embedding per chunk
+
+        Returns:
+            Vector store IDs, in input order
+        """
+        vector_store_ids = await asyncio.to_thread(self._store_documents, processed_docs)
+        self._maybe_compact()
+        self._maybe_build_ann()
+        return vector_store_ids
+
+    def _store_documents(self, processed_docs: List[ProcessedDocument]) -> List[str]:
+        """Append the documents' rows and log entries, then save state."""
+        matrices = []
+        for processed_doc in processed_docs:
+            embeddings = processed_doc.embeddings if processed_doc.embeddings is not None else []
+            if len(embeddings) != len(processed_doc.chunks):
+                raise ValueError("Each chunk needs exactly one embedding")
+            matrix = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dimension)
+            if self.metric == "cosine":
+                matrix = self._normalize(matrix)
+            matrices.append(matrix)
+
+        vector_store_ids = []
+        with self._lock:
+            self._refresh_if_changed()
+            first_new_row = self._count
+
+            for processed_doc, matrix in zip(processed_docs, matrices):
+                previous = self._doc_keys.get(processed_doc.doc_id)
+                if previous is not None:
+                    self._tombstone(previous)
+
+                key = self._next_key
+                self._next_key += 1
+                vector_store_id = str(uuid.uuid4())
+
+                start = self._count
+                end = start + len(matrix)
+                if end > self._capacity:
+                    self._resize(max(end, self._capacity * 2))
+                self._vectors[start:end] = matrix
+                self._row_keys[start:end] = key
+                self._count = end
+
+                self._put_document(key, {
+                    "vector_store_id": vector_store_id,
+                    "doc_id": processed_doc.doc_id,
+                    "first_row": start,
+                    "chunks": list(processed_doc.chunks),
+                    "metadata": processed_doc.metadata or {}
+                })
+                vector_store_ids.append(vector_store_id)
+
+            if self._ann is not None and self._ann_rows == first_new_row:
+                self._add_to_ann(first_new_row, self._count)
+            self._save_state()
+        return vector_store_ids
+
+    async def delete_document(self, vector_store_id: str) -> None:
+        """Delete a document from the store.
+
+        Rows are tombstoned immediately; the space is reclaimed by a
+        background compaction once enough rows are dead.
+
+        Args:
+            vector_store_id: ID of document to delete
+        """
+        await asyncio.to_thread(self._delete_document, vector_store_id)
+        self._maybe_compact()
+
+    def _delete_document(self, vector_store_id: str) -> None:
+        """Tombstone a document's rows and save state."""
+        with self._lock:
+            self._refresh_if_changed()
+            key = self._vector_keys.get(vector_store_id)
+            if key is None:
+                logger.warning(f"Document not found in vector store: {vector_store_id}")
+                return
+            self._tombstone(key)
+            self._save_state()
+
+    async def search_similar(
+        self,
+        query,
+        num_results: int = 5,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """Search for similar documents.
+
+        Args:
+            query: Query embedding
+            num_results: Maximum number of documents to return
+            filters: Optional metadata filters; a document matches if each
+                key equals the given value (or is in it, for lists)
+
+        Returns:
+            List of documents with doc_id, vector_store_id, best matching
+            chunk, metadata and score (higher is more similar)
+        """
+        query_vector = np.asarray(query, dtype=np.float32).reshape(-1)
+        if query_vector.shape[0] != self.dimension:
+            raise ValueError(f"Query dimension {query_vector.shape[0]} does not match store dimension {self.dimension}")
+        if self.metric == "cosine":
+            query_vector = self._normalize(query_vector[None, :])[0]
+
+        results = await asyncio.to_thread(self._search, query_vector, num_results, filters)
+        self._maybe_build_ann()
+        return results
+
+    def _search(
+        self,
+        query_vector: np.ndarray,
+        num_results: int,
+        filters: Optional[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Search with the ANN index if there is one, else exactly."""
+        with self._lock:
+            self._refresh_if_changed()
+            if not self._documents:
+                return []
+
+            allowed_keys = None
+            if filters:
+                allowed_keys = np.fromiter(
+                    (k for k, d in self._documents.items() if self._matches(d["metadata"], filters)),
+                    dtype=np.int64
+                )
+                if allowed_keys.size == 0:
+                    return []
+
+            if self._ann is not None:
+                results = self._search_ann(query_vector, num_results, allowed_keys)
+                if len(results) == num_results:
+                    return results
+                # Too few live/matching candidates - fall back to the exact scan
+
+            return self._search_flat(query_vector, num_results, allowed_keys)
+
+    def _score_block(self, block: np.ndarray, query_vector: np.ndarray) -> np.ndarray:
+        """Exact similarity of each row in block to the query (higher is closer)."""
+        if self.metric == "l2":
+            distances = np.sum((block - query_vector) ** 2, axis=1)
+            return 1.0 / (1.0 + distances)
+        return block @ query_vector
+
+    def _search_flat(
+        self,
+        query_vector: np.ndarray,
+        num_results: int,
+        allowed_keys: Optional[np.ndarray]
+    ) -> List[Dict[str, Any]]:
+        """Exact search over every row. Caller holds the lock."""
+        scores = np.empty(self._count, dtype=np.float32)
+        for start in range(0, self._count, self.SEARCH_BLOCK_ROWS):
+            end = min(start + self.SEARCH_BLOCK_ROWS, self._count)
+            scores[start:end] = self._score_block(self._vectors[start:end], query_vector)
+
+        keys = self._row_keys[:self._count]
+        excluded = keys < 0
+        if allowed_keys is not None:
+            excluded |= ~np.isin(keys, allowed_keys)
+        scores[excluded] = -np.inf
+
+        live = self._count - int(np.count_nonzero(excluded))
+        if live == 0 or num_results <= 0:
+            return []
+
+        # Most documents have several chunks, so look a bit past num_results rows
+        candidates = min(live, num_results * 8)
+        while True:
+            top_rows = np.argpartition(-scores, candidates - 1)[:candidates]
+            top_rows = top_rows[np.argsort(-scores[top_rows])]
+            results = self._collect_documents(top_rows, scores[top_rows], num_results)
+            if len(results) == num_results or candidates == live:
+                return results
+            candidates = min(live, candidates * 4)
+
+    def _search_ann(
+        self,
+        query_vector: np.ndarray,
+        num_results: int,
+        allowed_keys: Optional[np.ndarray]
+    ) -> List[Dict[str, Any]]:
+        """Approximate search re-ranked with exact vectors. Caller holds the lock."""
+        k = min(self._ann_rows, max(num_results * self.candidate_factor, 64))
+        _, candidate_rows = self._ann.search(query_vector[None, :], k)
+        rows = candidate_rows[0]
+        rows = np.sort(rows[rows >= 0])
+
+        keys = self._row_keys[rows]
+        keep = keys >= 0
+        if allowed_keys is not None:
+            keep &= np.isin(keys, allowed_keys)
+        rows = rows[keep]
+        if rows.size == 0:
+            return []
+
+        scores = self._score_block(self._vectors[rows], query_vector)
+        order = np.argsort(-scores)
+        return self._collect_documents(rows[order], scores[order], num_results)
+
+    def _collect_documents(
+        self,
+        rows: np.ndarray,
+        row_scores: np.ndarray,
+        num_results: int
+    ) -> List[Dict[str, Any]]:
+        """Collapse best-first rows into at most num_results distinct documents."""
+        results = []
+        seen = set()
+        for row, score in zip(rows, row_scores):
+            if not np.isfinite(score):
+                break
+            key = int(self._row_keys[row])
+            if key in seen:
+                continue
+            seen.add(key)
+            doc = self._documents[key]
+            chunk_index = int(row) - doc["first_row"]
+            results.append({
+                "doc_id": doc["doc_id"],
+                "vector_store_id": doc["vector_store_id"],
+                "chunk_index": chunk_index,
+                "content": doc["chunks"][chunk_index],
+                "metadata": doc["metadata"],
+                "score": float(score)
+            })
+            if len(results) == num_results:
+                break
+        return results
+
+    def _require_faiss(self):
+        """Import faiss, which is only needed for the ANN index types."""
+        try:
+            import faiss
+        except ImportError:
+            raise ImportError(f"faiss is required for index_type {self.index_type}: pip install faiss-cpu")
+        return faiss
+
+    def _faiss_metric(self, faiss):
+        """FAISS metric matching the store metric."""
+        if self.metric == "l2":
+            return faiss.METRIC_L2
+        return faiss.METRIC_INNER_PRODUCT
+
+    def _default_pq_m(self) -> int:
+        """Largest common PQ sub-quantizer count that divides the dimension."""
+        for m in (64, 48, 32, 16, 8, 4, 2):
+            if self.dimension % m == 0:
+                return m
+        return 1
+
+    def _maybe_build_ann(self) -> None:
+        """Start training the ANN index in the background once the threshold is crossed."""
+        if self.index_type == "Flat" or self._ann is not None:
+            return
+        if self._count - self._tombstones < self.ann_threshold:
+            return
+        if self._ann_task is not None and not self._ann_task.done():
+            return
+        loop = asyncio.get_running_loop()
+        self._ann_task = loop.run_in_executor(None, self.build_ann_index)
+
+    def build_ann_index(self) -> None:
+        """Train and fill the ANN index from the rows currently stored.
+
+        Runs without the lock held for the expensive part; rows stored in the
+        meantime are added once the index is swapped in.
+        """
+        faiss = self._require_faiss()
+        with self._lock:
+            built_rows = self._count
+            vectors = self._vectors
+            epoch = self._row_epoch
+            live = np.flatnonzero(self._row_keys[:built_rows] >= 0)
+        if live.size == 0:
+            return
+
+        logger.info(f"Building {self.index_type} index over {live.size} rows")
+        metric = self._faiss_metric(faiss)
+        if self.index_type == "IVFPQ":
+            nlist = int(self.config.get("nlist") or max(1, int(4 * np.sqrt(live.size))))
+            nlist = min(nlist, live.size)
+            pq_m = int(self.config.get("pq_m") or self._default_pq_m())
+            if metric == faiss.METRIC_L2:
+                quantizer = faiss.IndexFlatL2(self.dimension)
+            else:
+                quantizer = faiss.IndexFlatIP(self.dimension)
+            index = faiss.IndexIVFPQ(quantizer, self.dimension, nlist, pq_m, 8, metric)
+            sample_size = min(live.size, nlist * self.ANN_TRAIN_SAMPLE)
+            sample = np.sort(np.random.default_rng(0).choice(live, sample_size, replace=False))
+            index.train(np.ascontiguousarray(vectors[sample]))
+            index.nprobe = self.nprobe
+        else:
+            hnsw = faiss.IndexHNSWFlat(self.dimension, self.hnsw_m, metric)
+            hnsw.hnsw.efConstruction = self.ef_construction
+            hnsw.hnsw.efSearch = self.ef_search
+            index = faiss.IndexIDMap(hnsw)
+
+        for start in range(0, live.size, self.SEARCH_BLOCK_ROWS):
+            rows = live[start:start + self.SEARCH_BLOCK_ROWS]
+            index.add_with_ids(np.ascontiguousarray(vectors[rows]), rows.astype(np.int64))
+
+        with self._lock:
+            if self._row_epoch != epoch:
+                # Compacted or reloaded while building; row numbers are stale
+                logger.info("Store changed during ANN build, discarding index")
+                return
+            self._ann = index
+            self._ann_mmapped = False
+            self._ann_rows = built_rows
+            self._add_to_ann(built_rows, self._count)
+            self._save_ann()
+            self._save_state()
+        logger.info(f"{self.index_type} index ready with {self._ann.ntotal} rows")
+
+    def _add_to_ann(self, start: int, end: int) -> None:
+        """Add rows [start, end) to the ANN index. Caller holds the lock."""
+        if end > start:
+            if self._ann_mmapped:
+                # Memory-mapped IVF lists are read-only and cannot be cloned;
+                # read the saved index into memory to add to it
+                self._ann = self._read_ann(mmap=False)
+            rows = np.arange(start, end, dtype=np.int64)
+            self._ann.add_with_ids(np.ascontiguousarray(self._vectors[start:end]), rows)
+        self._ann_rows = end
+
+    def _save_ann(self) -> None:
+        """Write the ANN index if it has rows not yet on disk. Caller holds the lock."""
+        if self._ann is None or self._ann_rows == self._ann_saved_rows:
+            return
+        faiss = self._require_faiss()
+        tmp_path = self._ann_path.with_suffix(".tmp")
+        faiss.write_index(self._ann, str(tmp_path))
+        os.replace(tmp_path, self._ann_path)
+        self._ann_saved_rows = self._ann_rows
+
+    def _load_ann(self, saved_rows: int) -> None:
+        """Load the ANN index from disk and index any newer rows. Caller holds the lock."""
+        self._ann = None
+        self._ann_mmapped = False
+        self._ann_rows = 0
+        self._ann_saved_rows = 0
+        if self.index_type == "Flat" or not saved_rows or not self._ann_path.exists():
+            return
+        # IVF lists can be served straight from the page cache, unless
+        # newer rows have to be added right away
+        self._ann = self._read_ann(mmap=self.index_type == "IVFPQ" and saved_rows >= self._count)
+        self._ann_rows = saved_rows
+        self._ann_saved_rows = saved_rows
+        if saved_rows < self._count:
+            self._add_to_ann(saved_rows, self._count)
+
+    def _read_ann(self, mmap: bool):
+        """Read ann.index, memory-mapped or into memory, with search parameters set."""
+        faiss = self._require_faiss()
+        if self.index_type == "IVFPQ":
+            index = faiss.read_index(str(self._ann_path), faiss.IO_FLAG_MMAP if mmap else 0)
+            index.nprobe = self.nprobe
+        else:
+            index = faiss.read_index(str(self._ann_path))
+            faiss.downcast_index(index.index).hnsw.efSearch = self.ef_search
+        self._ann_mmapped = mmap
+        return index
+
+    @staticmethod
+    def _matches(metadata: Dict[str, Any], filters: Dict[str, Any]) -> bool:
+        """Check whether document metadata satisfies the filters."""
+        for field, expected in filters.items():
+            value = metadata.get(field)
+            if isinstance(expected, (list, tuple, set)):
+                if value not in expected:
+                    return False
+            elif value != expected:
+                return False
+        return True
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        """Scale rows to unit length."""
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def _put_document(self, key: int, doc: Dict[str, Any], log: bool = True) -> None:
+        """Add a document to the in-memory maps and, if log, to the pending log. Caller holds the lock."""
+        self._documents[key] = doc
+        self._doc_keys[doc["doc_id"]] = key
+        self._vector_keys[doc["vector_store_id"]] = key
+        if log:
+            self._pending_log.append({"put": key, "doc": doc})
+
+    def _drop_document(self, key: int, log: bool = True) -> Optional[Dict[str, Any]]:
+        """Remove a document from the in-memory maps and, if log, log it. Caller holds the lock."""
+        doc = self._documents.pop(key, None)
+        if doc is not None:
+            self._doc_keys.pop(doc["doc_id"], None)
+            self._vector_keys.pop(doc["vector_store_id"], None)
+            if log:
+                self._pending_log.append({"delete": key})
+        return doc
+
+    def _tombstone(self, key: int) -> None:
+        """Mark all rows of a document as deleted. Caller holds the lock."""
+        doc = self._drop_document(key)
+        start = doc["first_row"]
+        self._row_keys[start:start + len(doc["chunks"])] = -1
+        self._tombstones += len(doc["chunks"])
+
+    def _maybe_compact(self) -> None:
+        """Start a background compaction if enough rows are tombstoned."""
+        if self._count == 0 or self._tombstones / self._count < self.compaction_threshold:
+            return
+        if self._compaction_task is not None and not self._compaction_task.done():
+            return
+        loop = asyncio.get_running_loop()
+        self._compaction_task = loop.run_in_executor(None, self.compact)
+
+    def compact(self) -> None:
+        """Rewrite the store without tombstoned rows.
+
+        The live rows are copied to new files without the lock held; rows
+        only ever get appended or tombstoned, so the copy stays valid. The
+        lock is then taken to copy rows stored in the meantime, pick up
+        deletions and swap the new files in.
+        """
+        with self._compact_lock:
+            with self._lock:
+                if self._tombstones == 0:
+                    return
+                copied_rows = self._count
+                vectors = self._vectors
+                row_keys = self._row_keys
+                epoch = self._row_epoch
+                live = np.flatnonzero(row_keys[:copied_rows] >= 0)
+            logger.info(f"Compacting vector store: {copied_rows} rows -> {len(live)} rows")
+
+            capacity = max(self.INITIAL_CAPACITY, len(live) * 2)
+            tmp_vectors = self._vectors_path.with_suffix(".tmp")
+            tmp_ids = self._ids_path.with_suffix(".tmp")
+            self._copy_rows(vectors, live, tmp_vectors, capacity)
+            del vectors, row_keys
+
+            with self._lock:
+                if self._row_epoch != epoch:
+                    # Reloaded from disk while copying; row numbers are stale
+                    logger.info("Store changed during compaction, discarding copy")
+                    tmp_vectors.unlink()
+                    return
+                self._swap_compacted(tmp_vectors, tmp_ids, live, copied_rows, capacity)
+
+    def _copy_rows(self, vectors: np.ndarray, rows: np.ndarray, path: Path, capacity: int) -> None:
+        """Write the given rows of vectors to a new file of capacity rows."""
+        new_vectors = np.memmap(path, dtype=np.float32, mode="w+", shape=(capacity, self.dimension))
+        for start in range(0, len(rows), self.SEARCH_BLOCK_ROWS):
+            block = rows[start:start + self.SEARCH_BLOCK_ROWS]
+            new_vectors[start:start + len(block)] = vectors[block]
+        new_vectors.flush()
+
+    def _swap_compacted(
+        self,
+        tmp_vectors: Path,
+        tmp_ids: Path,
+        live: np.ndarray,
+        copied_rows: int,
+        capacity: int
+    ) -> None:
+        """Finish a compaction and replace the store files. Caller holds the lock.
+
+        Rows [copied_rows, count) were stored after the copy started and are
+        appended here; the keys of the copied rows are read again, so
+        documents deleted during the copy end up tombstoned.
+        """
+        appended = self._count - copied_rows
+        count = len(live) + appended
+        if count > capacity:
+            capacity = count * 2
+            with open(tmp_vectors, "ab") as f:
+                f.truncate(capacity * self.dimension * 4)
+        new_vectors = np.memmap(tmp_vectors, dtype=np.float32, mode="r+", shape=(capacity, self.dimension))
+        new_keys = np.memmap(tmp_ids, dtype=np.int64, mode="w+", shape=(capacity,))
+        new_vectors[len(live):count] = self._vectors[copied_rows:self._count]
+        new_keys[:len(live)] = self._row_keys[live]
+        new_keys[len(live):count] = self._row_keys[copied_rows:self._count]
+        new_keys[count:] = -1
+        new_vectors.flush()
+        new_keys.flush()
+        del new_vectors, new_keys
+
+        # Readers that still map the old files keep a valid view until they refresh
+        self._vectors = None
+        self._row_keys = None
+        os.replace(tmp_vectors, self._vectors_path)
+        os.replace(tmp_ids, self._ids_path)
+        self._count = count
+        self._capacity = capacity
+        self._row_epoch += 1
+        self._open_maps()
+
+        keys = self._row_keys[:self._count]
+        self._tombstones = int(np.count_nonzero(keys < 0))
+        keys, first_rows = np.unique(keys, return_index=True)
+        for key, first_row in zip(keys, first_rows):
+            if key >= 0:
+                self._documents[int(key)]["first_row"] = int(first_row)
+
+        # Row numbers changed, so the ANN index is rebuilt on next use
+        self._ann = None
+        self._ann_rows = 0
+        self._ann_saved_rows = 0
+        if self._ann_path.exists():
+            self._ann_path.unlink()
+        self._rewrite_log()
+        self._save_state()
+
+    def _resize(self, capacity: int) -> None:
+        """Grow the backing files to hold capacity rows. Caller holds the lock."""
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._row_keys.flush()
+            self._vectors = None
+            self._row_keys = None
+
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(capacity * self.dimension * 4)
+        old_capacity = self._capacity
+        with open(self._ids_path, "ab") as f:
+            f.truncate(capacity * 8)
+        self._capacity = capacity
+        self._open_maps()
+        self._row_keys[old_capacity:] = -1
+
+    def _open_maps(self) -> None:
+        """Memory-map the vector and id files."""
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(self._capacity, self.dimension))
+        self._row_keys = np.memmap(self._ids_path, dtype=np.int64, mode="r+", shape=(self._capacity,))
+
+    def _rewrite_log(self) -> None:
+        """Replace the document log with one entry per live document. Caller holds the lock.
+
+        Used when row numbers change, so the log does not replay stale first_rows.
+        """
+        tmp_documents = self._documents_path.with_suffix(".tmp")
+        with open(tmp_documents, "w", encoding="utf-8") as f:
+            for key, doc in self._documents.items():
+                f.write(json.dumps({"put": key, "doc": doc}, ensure_ascii=False) + "\n")
+            log_bytes = f.tell()
+        os.replace(tmp_documents, self._documents_path)
+        self._pending_log = []
+        self._log_bytes = log_bytes
+        self._log_epoch += 1
+
+    def _read_log(self, start: int, end: int) -> None:
+        """Apply log entries between two byte offsets. Caller holds the lock."""
+        if end <= start:
+            return
+        with open(self._documents_path, "rb") as f:
+            f.seek(start)
+            data = f.read(end - start)
+        for line in data.decode("utf-8").splitlines():
+            entry = json.loads(line)
+            if "put" in entry:
+                self._put_document(int(entry["put"]), entry["doc"], log=False)
+            else:
+                self._drop_document(int(entry["delete"]), log=False)
+
+    def _save_state(self) -> None:
+        """Persist new log entries and counters after the vectors. Caller holds the lock."""
+        self._vectors.flush()
+        self._row_keys.flush()
+
+        if self._pending_log:
+            # Only the documents changed since the last save are written
+            with open(self._documents_path, "ab") as f:
+                f.seek(self._log_bytes)
+                f.truncate()
+                f.write("".join(
+                    json.dumps(entry, ensure_ascii=False) + "\n" for entry in self._pending_log
+                ).encode("utf-8"))
+                self._log_bytes = f.tell()
+            self._pending_log = []
+
+        self._generation += 1
+        state = {
+            "dimension": self.dimension,
+            "metric": self.metric,
+            "index_type": self.index_type,
+            "capacity": self._capacity,
+            "count": self._count,
+            "tombstones": self._tombstones,
+            "next_key": self._next_key,
+            "ann_rows": self._ann_saved_rows,
+            "log_bytes": self._log_bytes,
+            "log_epoch": self._log_epoch,
+            "generation": self._generation
+        }
+        tmp_state = self._state_path.with_suffix(".tmp")
+        with open(tmp_state, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_state, self._state_path)
+        self._state_signature = self._stat_signature()
+
+    def _load(self) -> None:
+        """Load counters, documents and memory maps from disk. Caller holds the lock."""
+        with open(self._state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state["dimension"] != self.dimension:
+            raise ValueError(f"Store at {self.path} has dimension {state['dimension']}, expected {self.dimension}")
+        if state.get("metric", "cosine") != self.metric:
+            raise ValueError(f"Store at {self.path} uses metric {state.get('metric')}, expected {self.metric}")
+
+        migrate = "log_bytes" not in state
+        if migrate:
+            # Stores written before the log kept every document in one JSON file
+            with open(self._legacy_documents_path, "r", encoding="utf-8") as f:
+                documents = {int(k): v for k, v in json.load(f).items()}
+            self._reset_documents()
+            for key, doc in documents.items():
+                self._put_document(key, doc, log=False)
+        elif state["log_epoch"] == self._log_epoch and state["log_bytes"] >= self._log_bytes:
+            # Same log as last time: apply only what was appended since
+            self._read_log(self._log_bytes, state["log_bytes"])
+        else:
+            self._reset_documents()
+            self._read_log(0, state["log_bytes"])
+        if not migrate:
+            self._log_bytes = state["log_bytes"]
+            self._log_epoch = state["log_epoch"]
+
+        self._capacity = state["capacity"]
+        self._count = state["count"]
+        self._tombstones = state["tombstones"]
+        self._next_key = state["next_key"]
+        self._generation = state["generation"]
+        self._row_epoch += 1
+        self._open_maps()
+        self._load_ann(state.get("ann_rows", 0))
+        self._state_signature = self._stat_signature()
+        if migrate:
+            self._rewrite_log()
+            self._save_state()
+            self._legacy_documents_path.unlink()
+
+    def _reset_documents(self) -> None:
+        """Forget all in-memory documents before reading them again. Caller holds the lock."""
+        self._documents = {}
+        self._doc_keys = {}
+        self._vector_keys = {}
+        self._pending_log = []
+
+    def _stat_signature(self):
+        """Identify the current store.json; each save replaces it with a new file."""
+        stats = self._state_path.stat()
+        # Two saves within one timestamp tick share an mtime but not an inode
+        return stats.st_mtime_ns, stats.st_ino
+
+    def _refresh_if_changed(self) -> None:
+        """Reload if another process wrote the store. Caller holds the lock."""
+        try:
+            signature = self._stat_signature()
+        except FileNotFoundError:
+            return
+        if signature != self._state_signature:
+            self._load()
@@ -1,13 +1,16 @@
 """Document processing tools."""
 
+import asyncio
+import inspect
 import logging
+import os
 import uuid
 import tempfile
 import io
 import shutil
-import hashlib
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, List, Optional, Type
+from typing import Dict, Any, List, Optional, Tuple, Type
 from langchain.schema import Document as LangChainDocument
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import (
@@ -17,7 +20,6 @@ from langchain_community.document_loaders import (
     UnstructuredEmailLoader
 )
 from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_ollama import ChatOllama
 from langchain.chains.summarize import load_summarize_chain
 from google.oauth2.credentials import Credentials
@@ -29,9 +31,41 @@ from .db_types import DocumentRecord
 from .document_ingestion.sources import get_local_folder_source
 from .document_ingestion.ingestion_service import DocumentIngestionService
 from .document_ingestion.types import Document
+from .document_ingestion.manifest import IngestionManifest, compute_document_hash
+from .document_ingestion.embedding_cache import CachedEmbeddings, get_embedding_cache
+from .document_ingestion.embedding_engine import get_embedding_engine
 
 logger = logging.getLogger(__name__)
 
+# Sentence-transformers model used to embed chunks
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+# Loaders whose parsing is CPU-bound run in worker processes; the rest run on threads
+PROCESS_POOL_LOADERS = (
+    PDFMinerLoader,
+    UnstructuredWordDocumentLoader,
+    UnstructuredPowerPointLoader,
+    UnstructuredExcelLoader,
+    UnstructuredEmailLoader
+)
+
+# Worker processes for PROCESS_POOL_LOADERS
+INGEST_LOADER_PROCESSES = int(os.getenv("INGEST_LOADER_PROCESSES", str(os.cpu_count() or 1)))
+
+# Files being loaded or waiting to be chunked; bounds ingestion memory
+INGEST_MAX_PENDING_FILES = int(os.getenv("INGEST_MAX_PENDING_FILES", "16"))
+
+# Chunks collected before they are embedded and added to the vector store
+INGEST_FLUSH_CHUNKS = int(os.getenv("INGEST_FLUSH_CHUNKS", "256"))
+
+# Vector store and ingestion manifest of DocumentTools; kept apart from the
+# RAGService store in data/vector_store, which has a manifest of its own
+DOCUMENT_STORE_PATH = os.getenv("DOCUMENT_STORE_PATH", "data/document_store")
+
+def _load_file(loader_class: Type, file_path: str) -> List[LangChainDocument]:
+    """Load a file with a loader class. Module-level so worker processes can run it."""
+    return loader_class(file_path).load()
+
 def validate_document_content(content: str, max_size: int = 10 * 1024 * 1024) -> bool:
     """Validate document content for security.
     
@@ -64,17 +98,6 @@ def validate_document_content(content: str, max_size: int = 10 * 1024 * 1024) ->
             
     return True
 
-def compute_document_hash(content: str) -> str:
-    """Compute SHA-256 hash of document content.
-    
-    Args:
-        content: Document content
-        
-    Returns:
-        str: Hex digest of content hash
-    """
-    return hashlib.sha256(content.encode('utf-8')).hexdigest()
-
 def to_langchain_document(doc: Document) -> LangChainDocument:
     """Convert our Document type to LangChain Document.
     
@@ -385,10 +408,10 @@ class DocumentTools:
         self.db = db_service
         self.custom_loaders = {}  # For runtime-added loaders
         
-        # Initialize embedding model
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="all-MiniLM-L6-v2"
-        )
+        # Embedding model, shared by every DocumentTools in the process and
+        # loaded on first use; chunks embedded before are served from the cache
+        engine = get_embedding_engine(EMBEDDING_MODEL)
+        self.embeddings = CachedEmbeddings(engine, get_embedding_cache(engine.cache_key))
         
         # Initialize text splitter
         self.text_splitter = RecursiveCharacterTextSplitter(
@@ -404,7 +427,7 @@ class DocumentTools:
         )
         
         # Initialize vector store path
-        self.vector_store_path = Path("data/vector_store")
+        self.vector_store_path = Path(DOCUMENT_STORE_PATH)
         self.vector_store_path.mkdir(parents=True, exist_ok=True)
         
         # Load or create vector store
@@ -427,6 +450,10 @@ class DocumentTools:
             if pkl_path.exists():
                 logger.info(f"Deleting {pkl_path}")
                 pkl_path.unlink()
+            manifest_path = self.vector_store_path / "manifest.json"
+            if manifest_path.exists():
+                logger.info(f"Deleting {manifest_path}")
+                manifest_path.unlink()
             self.vector_store = None
             logger.info("Vector store cleared successfully")
             return
@@ -434,13 +461,12 @@ class DocumentTools:
         if index_path.exists() and pkl_path.exists():
             try:
                 logger.info("Loading existing vector store...")
-                # Create new embeddings for verification
-                temp_embeddings = HuggingFaceEmbeddings(
-                    model_name="all-MiniLM-L6-v2"
-                )
+                # Chunks added to the loaded store must go through the cache too.
+                # index.pkl is only ever written by save_local below, so unpickling it is safe.
                 self.vector_store = FAISS.load_local(
                     str(self.vector_store_path),
-                    temp_embeddings
+                    self.embeddings,
+                    allow_dangerous_deserialization=True
                 )
                 logger.info("Loaded existing vector store successfully")
             except Exception as e:
@@ -474,9 +500,95 @@ class DocumentTools:
         # Check custom loaders first, then default loaders
         return self.custom_loaders.get(ext) or self.DEFAULT_LOADERS.get(ext)
             
-    async def process_directory(self, folder_path: str, file_patterns: List[str], force_refresh: bool = True) -> Dict[str, Any]:
+    async def _load_documents(self, loader_class: Type, file_path: Path, pool_holder: Dict[str, Any]) -> List[LangChainDocument]:
+        """Run a loader off the event loop.
+        
+        CPU-heavy loaders run in a process pool, created on first use and
+        stored in pool_holder; other loaders run on a thread.
+        """
+        if inspect.iscoroutinefunction(loader_class.load):
+            # Google Workspace loaders download asynchronously
+            return await loader_class(str(file_path)).load()
+        if isinstance(loader_class, type) and issubclass(loader_class, PROCESS_POOL_LOADERS):
+            if pool_holder.get("pool") is None:
+                pool_holder["pool"] = ProcessPoolExecutor(max_workers=INGEST_LOADER_PROCESSES)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(pool_holder["pool"], _load_file, loader_class, str(file_path))
+        return await asyncio.to_thread(_load_file, loader_class, str(file_path))
+        
+    def _split_document(self, doc: Document) -> Tuple[List[str], List[LangChainDocument]]:
+        """Split a loaded document into vector store chunks.
+        
+        Returns:
+            Chunk IDs and the chunks as LangChain Documents
+        """
+        chunks = self.text_splitter.split_text(doc.content)
+        chunk_ids = []
+        split_docs = []
+        for i, chunk in enumerate(chunks):
+            # Create our Document type first
+            chunk_doc = Document(
+                doc_id=f"{doc.doc_id}_chunk_{i}",
+                title=doc.title,
+                content=chunk,
+                source_type=doc.source_type,
+                metadata={
+                    **doc.metadata,
+                    'chunk_index': i,
+                    'total_chunks': len(chunks),
+                    'parent_doc_id': doc.doc_id,
+                    'content_hash': compute_document_hash(chunk)
+                }
+            )
+            chunk_ids.append(chunk_doc.doc_id)
+            # Convert to LangChain Document for vector store
+            split_docs.append(to_langchain_document(chunk_doc))
+        return chunk_ids, split_docs
+        
+    def _write_chunks(self, split_docs: List[LangChainDocument], stale_ids: List[str]) -> int:
+        """Replace stale chunks with new ones in the vector store.
+        
+        Stale chunks are deleted first, as a modified file's new chunks
+        reuse its old chunk IDs.
+        
+        Returns:
+            Number of stale chunks removed
+        """
+        removed = 0
+        if self.vector_store is not None and stale_ids:
+            stale_ids = [i for i in stale_ids if i in self.vector_store.docstore._dict]
+            if stale_ids:
+                logger.info(f"Removing {len(stale_ids)} stale chunks")
+                self.vector_store.delete(stale_ids)
+                removed = len(stale_ids)
+                
+        if split_docs:
+            split_ids = [d.metadata['doc_id'] for d in split_docs]
+            if self.vector_store is None:
+                self.vector_store = FAISS.from_documents(
+                    split_docs,
+                    self.embeddings,
+                    ids=split_ids
+                )
+            else:
+                self.vector_store.add_documents(split_docs, ids=split_ids)
+        return removed
+            
+    async def process_directory(self, folder_path: str, file_patterns: List[str], force_refresh: bool = False) -> Dict[str, Any]:
         """Process all documents in a directory.
         
+        Processing is incremental unless force_refresh is set: files whose
+        size and mtime (or, failing that, content hash) match the ingestion
+        manifest are skipped, modified files have their old chunks replaced
+        and files deleted from the folder have their chunks evicted.
+        
+        Files flow through a bounded pipeline: loaders run concurrently
+        (CPU-heavy ones in a process pool), loaded documents pass through an
+        async queue to chunking, and every INGEST_FLUSH_CHUNKS chunks are
+        embedded and added to the vector store. At most
+        INGEST_MAX_PENDING_FILES files are in flight, so memory does not grow
+        with the size of the folder.
+        
         Args:
             folder_path: Path to directory containing documents
             file_patterns: List of glob patterns to match files
@@ -488,66 +600,173 @@ class DocumentTools:
         # Ensure vector store directory exists
         self.vector_store_path.mkdir(parents=True, exist_ok=True)
         
-        # Always force refresh at the start of processing
         logger.info(f"Starting document processing for: {folder_path}")
-        self._load_vector_store(force_refresh=True)
+        manifest = IngestionManifest(self.vector_store_path / "manifest.json")
+        if force_refresh:
+            self._load_vector_store(force_refresh=True)
+        else:
+            manifest.load()
+            if self.vector_store is None or not manifest.entries:
+                # Nothing to update incrementally - start from a clean store
+                self._load_vector_store(force_refresh=True)
+                manifest.clear()
         
+        pool_holder: Dict[str, Any] = {"pool": None}
         try:
             folder_path = Path(folder_path).resolve()  # Get absolute path
             logger.debug(f"Processing directory: {folder_path}")
             
-            all_documents = []
             skipped_files = []
             successful_files = []
+            unchanged_files = []
+            seen_paths = set()
+            counts = {'chunks': 0, 'stale': 0}
+            
+            # Loaded files waiting to be chunked; a slot is held from the
+            # start of a file's load until the consumer has chunked it
+            queue: asyncio.Queue = asyncio.Queue()
+            slots = asyncio.Semaphore(INGEST_MAX_PENDING_FILES)
+            
+            # Chunks, stale chunk IDs and manifest updates awaiting a flush
+            pending_docs: List[LangChainDocument] = []
+            pending_stale: List[str] = []
+            pending_manifest: List[Tuple] = []
             
             # Create local folder source for all patterns
             source = get_local_folder_source(str(folder_path), file_patterns)
             
-            # Get all documents from source first
-            async for doc in source.get_documents():
+            async def load(doc: Document, file_path: Path, loader_class: Type, stats: os.stat_result):
                 try:
-                    file_path = Path(doc.metadata['path'])
-                    logger.debug(f"Processing file from source: {file_path}")
-                    
-                    # Get appropriate loader
-                    loader_class = self.get_loader_for_file(str(file_path))
-                    if loader_class is None:
-                        logger.warning(f"No loader found for {file_path.name}")
-                        skipped_files.append(str(file_path))
-                        continue
-                        
-                    # Try to load the file content
-                    try:
-                        loader = loader_class(str(file_path))
-                        langchain_docs = loader.load()
-                        if langchain_docs:
-                            # Validate content before processing
-                            content = langchain_docs[0].page_content
-                            if not validate_document_content(content):
-                                logger.warning(f"Content validation failed for {file_path.name}")
+                    langchain_docs = await self._load_documents(loader_class, file_path, pool_holder)
+                    await queue.put((doc, file_path, stats, langchain_docs, None))
+                except Exception as e:
+                    await queue.put((doc, file_path, stats, None, e))
+            
+            async def produce():
+                loads = set()
+                try:
+                    async for doc in source.get_documents():
+                        try:
+                            file_path = Path(doc.metadata['path'])
+                            logger.debug(f"Processing file from source: {file_path}")
+                            
+                            stats = file_path.stat()
+                            seen_paths.add(manifest.key_for(file_path))
+                            if manifest.is_unchanged(file_path, stats):
+                                unchanged_files.append(str(file_path))
+                                continue
+                            
+                            # Get appropriate loader
+                            loader_class = self.get_loader_for_file(str(file_path))
+                            if loader_class is None:
+                                logger.warning(f"No loader found for {file_path.name}")
                                 skipped_files.append(str(file_path))
                                 continue
-                                
-                            # Update document with content and metadata
-                            doc.content = content
-                            doc.metadata['content_hash'] = compute_document_hash(content)
-                            doc.metadata.update(langchain_docs[0].metadata)
                             
-                            all_documents.append(doc)
-                            successful_files.append(file_path.name)
-                            logger.info(f"Successfully loaded: {file_path.name}")
-                        else:
-                            logger.warning(f"No content extracted from: {file_path.name}")
-                            skipped_files.append(str(file_path))
+                            await slots.acquire()
+                            task = asyncio.create_task(load(doc, file_path, loader_class, stats))
+                            loads.add(task)
+                            task.add_done_callback(loads.discard)
+                                
+                        except Exception as e:
+                            logger.error(f"Error processing document: {str(e)}")
+                            if 'path' in doc.metadata:
+                                skipped_files.append(doc.metadata['path'])
+                            continue
+                    if loads:
+                        await asyncio.gather(*loads)
+                finally:
+                    # On failure or cancellation, no load may outlive the pipeline
+                    for task in loads:
+                        task.cancel()
+                    if loads:
+                        await asyncio.gather(*loads, return_exceptions=True)
+                await queue.put(None)
+            
+            async def flush():
+                if not pending_docs and not pending_stale:
+                    return
+                split_docs, stale_ids, updates = list(pending_docs), list(pending_stale), list(pending_manifest)
+                pending_docs.clear()
+                pending_stale.clear()
+                pending_manifest.clear()
+                # Embedding is blocking; loading continues meanwhile
+                counts['stale'] += await asyncio.to_thread(self._write_chunks, split_docs, stale_ids)
+                counts['chunks'] += len(split_docs)
+                for update in updates:
+                    manifest.update(*update)
+            
+            async def chunk(doc: Document, file_path: Path, stats: os.stat_result, langchain_docs: List[LangChainDocument]):
+                if not langchain_docs:
+                    logger.warning(f"No content extracted from: {file_path.name}")
+                    skipped_files.append(str(file_path))
+                    return
+                
+                # Validate content before processing
+                content = langchain_docs[0].page_content
+                if not validate_document_content(content):
+                    logger.warning(f"Content validation failed for {file_path.name}")
+                    skipped_files.append(str(file_path))
+                    return
+                
+                content_hash = compute_document_hash(content)
+                if manifest.has_same_content(file_path, content_hash):
+                    # Touched but identical - just refresh size/mtime
+                    manifest.update(file_path, stats, content_hash)
+                    unchanged_files.append(str(file_path))
+                    return
+                    
+                # Update document with content and metadata
+                doc.content = content
+                doc.metadata['content_hash'] = content_hash
+                doc.metadata.update(langchain_docs[0].metadata)
+                
+                existing = manifest.get(file_path)
+                if existing:
+                    pending_stale.extend(existing.chunk_ids)
+                
+                chunk_ids, split_docs = await asyncio.to_thread(self._split_document, doc)
+                pending_docs.extend(split_docs)
+                pending_manifest.append((doc.metadata['path'], stats, content_hash, chunk_ids))
+                successful_files.append(file_path.name)
+                logger.info(f"Successfully loaded: {file_path.name}")
+            
+            async def consume():
+                while True:
+                    item = await queue.get()
+                    if item is None:
+                        break
+                    doc, file_path, stats, langchain_docs, error = item
+                    try:
+                        if error is not None:
+                            raise error
+                        await chunk(doc, file_path, stats, langchain_docs)
                     except Exception as e:
                         logger.error(f"Error loading file {file_path.name}: {str(e)}")
                         skipped_files.append(str(file_path))
-                        
-                except Exception as e:
-                    logger.error(f"Error processing document: {str(e)}")
-                    if 'path' in doc.metadata:
-                        skipped_files.append(doc.metadata['path'])
-                    continue
+                    finally:
+                        slots.release()
+                    
+                    if len(pending_docs) >= INGEST_FLUSH_CHUNKS:
+                        await flush()
+                await flush()
+            
+            producer = asyncio.create_task(produce())
+            consumer = asyncio.create_task(consume())
+            try:
+                await asyncio.gather(producer, consumer)
+            finally:
+                # A failure in one stage must not leave the other waiting
+                producer.cancel()
+                consumer.cancel()
+                await asyncio.gather(producer, consumer, return_exceptions=True)
+            
+            # Evict files that were deleted since the last run
+            removed_files = manifest.find_deleted(folder_path, seen_paths)
+            for key in removed_files:
+                logger.info(f"Removing deleted file: {Path(key).name}")
+                pending_stale.extend(manifest.remove(key).chunk_ids)
+            await flush()
             
             # Log results
             if successful_files:
@@ -560,63 +779,28 @@ class DocumentTools:
                 for file in skipped_files:
                     logger.warning(f"- {Path(file).name}")
                     
-            logger.info(f"\nLoaded {len(all_documents)} documents")
-            
-            # If no documents were loaded, return early
-            if not all_documents:
-                return {
-                    'num_documents': 0,
-                    'num_chunks': 0,
-                    'skipped_files': len(skipped_files),
-                    'successful_files': len(successful_files)
-                }
+            logger.info(f"\nLoaded {len(successful_files)} documents, {len(unchanged_files)} unchanged, "
+                        f"split into {counts['chunks']} chunks")
             
-            # Process documents
-            split_docs = []
-            for doc in all_documents:
-                chunks = self.text_splitter.split_text(doc.content)
-                for i, chunk in enumerate(chunks):
-                    # Create our Document type first
-                    chunk_doc = Document(
-                        doc_id=f"{doc.doc_id}_chunk_{i}",
-                        title=doc.title,
-                        content=chunk,
-                        source_type=doc.source_type,
-                        metadata={
-                            **doc.metadata,
-                            'chunk_index': i,
-                            'total_chunks': len(chunks),
-                            'parent_doc_id': doc.doc_id,
-                            'content_hash': compute_document_hash(chunk)
-                        }
-                    )
-                    # Convert to LangChain Document for vector store
-                    split_docs.append(to_langchain_document(chunk_doc))
-                    
-            logger.info(f"Split into {len(split_docs)} chunks")
-            
-            # Create or update vector store
-            if split_docs:
-                if self.vector_store is None:
-                    self.vector_store = FAISS.from_documents(
-                        split_docs,
-                        self.embeddings
-                    )
-                    self.vector_store.save_local(str(self.vector_store_path))
-                else:
-                    self.vector_store.add_documents(split_docs)
-                    self.vector_store.save_local(str(self.vector_store_path))
+            if self.vector_store is not None and (counts['chunks'] or counts['stale']):
+                self.vector_store.save_local(str(self.vector_store_path))
+            manifest.save()
             
             return {
-                'num_documents': len(all_documents),
-                'num_chunks': len(split_docs),
+                'num_documents': len(successful_files),
+                'num_chunks': counts['chunks'],
                 'skipped_files': len(skipped_files),
-                'successful_files': len(successful_files)
+                'successful_files': len(successful_files),
+                'unchanged_files': len(unchanged_files),
+                'removed_files': len(removed_files)
             }
             
         except Exception as e:
             logger.error(f"Error processing documents: {str(e)}")
             raise
+        finally:
+            if pool_holder["pool"] is not None:
+                pool_holder["pool"].shutdown(cancel_futures=True)
             
     def _get_loader_instance(self, file_path: str, skipped_files: List[str]) -> Optional[Any]:
         """Get loader instance for a file, tracking skipped files.
@@ -6,21 +6,45 @@ This module provides a unified interface for different LLM providers:
 - Ollama
 """
 
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Set, Tuple, AsyncIterator
+import asyncio
 import logging
 import os
 from dotenv import load_dotenv
 from openai import AsyncOpenAI
 import anthropic
-import requests
+import httpx
 import json
-from requests.adapters import HTTPAdapter
-from requests.packages.urllib3.util.retry import Retry
+import sys
 import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+from tools.tool_calls import (
+    AssistantTurn,
+    parse_anthropic_content,
+    parse_ollama_tool_calls,
+    parse_openai_tool_calls,
+    to_anthropic_messages,
+    to_anthropic_tools,
+    to_ollama_messages,
+    to_openai_messages,
+)
+from services.document_ingestion.embedding_cache import get_embedding_cache
 
 # Load environment variables
 load_dotenv()
 
+# Upstream statuses retried with backoff, as the old requests Retry adapter did
+RETRY_STATUSES = {502, 503, 504}
+MAX_RETRIES = 3
+
+# Maximum number of texts sent in one embedding request per provider
+EMBEDDING_BATCH_SIZES = {
+    'openai': 2048,
+    'ollama': 64
+}
+
 class LLMService:
     """Handles interactions with different LLM providers"""
     
@@ -29,11 +53,24 @@ class LLMService:
         self.provider = provider or os.getenv('LLM_PROVIDER', 'openai')
         self.logger.debug(f"Initializing LLM service with provider: {self.provider}")
         
-        # Configure requests session with retries and timeouts
-        self.session = requests.Session()
-        retries = Retry(total=3, backoff_factor=1, status_forcelist=[502, 503, 504])
-        self.session.mount('http://', HTTPAdapter(max_retries=retries))
-        self.session.mount('https://', HTTPAdapter(max_retries=retries))
+        # Pooled async HTTP client shared by all providers, with keep-alive,
+        # per-host connection limits and timeouts. httpx ignores the client's
+        # limits when given a transport, so they are set on the transport.
+        self.request_timeout = float(os.getenv('LLM_REQUEST_TIMEOUT', '30'))
+        self.http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(self.request_timeout, connect=5.0),
+            transport=httpx.AsyncHTTPTransport(
+                retries=MAX_RETRIES,
+                limits=httpx.Limits(
+                    max_connections=int(os.getenv('LLM_MAX_CONNECTIONS', '20')),
+                    max_keepalive_connections=int(os.getenv('LLM_MAX_KEEPALIVE_CONNECTIONS', '10')),
+                    keepalive_expiry=30.0
+                )
+            )
+        )
+        # The SDK clients would otherwise adopt the pool's timeout, which is
+        # sized for Ollama and embedding calls, not long generations
+        self.generation_timeout = httpx.Timeout(float(os.getenv('LLM_GENERATION_TIMEOUT', '600')), connect=5.0)
         
         # Set embedding model based on provider
         if self.provider == 'openai':
@@ -41,6 +78,14 @@ class LLMService:
         elif self.provider == 'ollama':
             self.embedding_model = "mxbai-embed-large"
         # Anthropic doesn't provide embeddings yet
+        self.embedding_batch_size = EMBEDDING_BATCH_SIZES.get(self.provider, 1)
+        
+        # Concurrent get_embedding() calls are coalesced into micro-batches
+        self.embedding_coalesce_window = float(os.getenv('EMBEDDING_COALESCE_MS', '5')) / 1000
+        self._pending_embeddings: List[Tuple[str, asyncio.Future]] = []
+        self._embedding_flush_handle = None
+        # Running batch tasks; the event loop only keeps weak references to tasks
+        self._embedding_batches: Set[asyncio.Task] = set()
         
         self.setup_client()
         
@@ -50,22 +95,26 @@ class LLMService:
             if self.provider == 'openai':
                 self.client = AsyncOpenAI(
                     api_key=os.getenv('OPENAI_API_KEY'),
-                    organization=os.getenv('OPENAI_ORG_ID')
+                    organization=os.getenv('OPENAI_ORG_ID'),
+                    http_client=self.http_client,
+                    timeout=self.generation_timeout
                 )
                 self.model = "gpt-4"
                 self.logger.info("Initialized OpenAI client")
             elif self.provider == 'anthropic':
-                self.client = anthropic.Anthropic(
-                    api_key=os.getenv('ANTHROPIC_API_KEY')
+                self.client = anthropic.AsyncAnthropic(
+                    api_key=os.getenv('ANTHROPIC_API_KEY'),
+                    http_client=self.http_client,
+                    timeout=self.generation_timeout
                 )
                 self.model = "claude-2.1"
                 self.logger.info("Initialized Anthropic client")
             elif self.provider == 'ollama':
                 self.base_url = "http://localhost:11434"
                 self.model = "llama3.2:latest"
-                # Test Ollama connection with timeout
+                # Test Ollama connection with timeout (runs once, before any event loop work)
                 try:
-                    response = self.session.get(
+                    response = httpx.get(
                         f"{self.base_url}/api/tags",
                         timeout=5  # 5 second timeout
                     )
@@ -89,60 +138,214 @@ class LLMService:
             self.logger.error(f"Failed to initialize {self.provider} client: {str(e)}")
             raise
     
+    async def close(self):
+        """Close the pooled HTTP client."""
+        await self.http_client.aclose()
+        
+    async def _post_json(self, url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST JSON on the pooled client, retrying transient upstream errors.
+        
+        Args:
+            url: Request URL
+            payload: JSON body
+            
+        Returns:
+            Decoded JSON response
+        """
+        for attempt in range(MAX_RETRIES + 1):
+            response = await self.http_client.post(url, json=payload)
+            if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                break
+            await asyncio.sleep(2 ** attempt)
+        response.raise_for_status()
+        return response.json()
+        
     async def get_embedding(self, text: str) -> List[float]:
-        """Generate embeddings for text using the configured provider."""
+        """Generate embeddings for text using the configured provider.
+        
+        Calls made within the coalescing window (EMBEDDING_COALESCE_MS) are
+        sent to the provider together as one batch request.
+        """
+        if self.provider not in EMBEDDING_BATCH_SIZES:
+            raise ValueError(f"Embeddings not supported for provider: {self.provider}")
+            
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending_embeddings.append((text, future))
+        
+        if len(self._pending_embeddings) >= self.embedding_batch_size:
+            self._flush_embeddings()
+        elif self._embedding_flush_handle is None:
+            self._embedding_flush_handle = loop.call_later(
+                self.embedding_coalesce_window,
+                self._flush_embeddings
+            )
+            
+        return await future
+        
+    def _flush_embeddings(self):
+        """Send all pending get_embedding() requests as one batch."""
+        if self._embedding_flush_handle is not None:
+            self._embedding_flush_handle.cancel()
+            self._embedding_flush_handle = None
+            
+        pending, self._pending_embeddings = self._pending_embeddings, []
+        if pending:
+            task = asyncio.ensure_future(self._resolve_embedding_batch(pending))
+            self._embedding_batches.add(task)
+            task.add_done_callback(self._embedding_batches.discard)
+            
+    async def _resolve_embedding_batch(self, pending: List[Tuple[str, asyncio.Future]]):
+        """Embed a coalesced batch and hand each caller its result."""
         try:
-            if self.provider == 'openai':
-                response = await self.client.embeddings.create(
-                    model=self.embedding_model,
-                    input=text
-                )
-                return response.data[0].embedding
-                
-            elif self.provider == 'ollama':
-                response = self.session.post(
-                    f"{self.base_url}/api/embeddings",
-                    json={
-                        "model": self.embedding_model,
-                        "prompt": text
-                    },
-                    timeout=30
-                )
-                response.raise_for_status()
-                return response.json()["embedding"]
-                
-            else:
-                raise ValueError(f"Embeddings not supported for provider: {self.provider}")
+            embeddings = await self.get_embeddings([text for text, _ in pending])
+        except asyncio.CancelledError:
+            for _, future in pending:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+            
+        for (_, future), embedding in zip(pending, embeddings):
+            if not future.done():
+                future.set_result(embedding)
+    
+    async def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for many texts using the configured provider.
+        
+        Texts already in the embedding cache are not sent to the provider;
+        the rest are de-duplicated and split into requests of at most the
+        provider's maximum batch size.
+        
+        Args:
+            texts: Texts to embed
+            
+        Returns:
+            One embedding per input text, in input order
+        """
+        if not texts:
+            return []
+        if self.provider not in EMBEDDING_BATCH_SIZES:
+            raise ValueError(f"Embeddings not supported for provider: {self.provider}")
+            
+        cache = get_embedding_cache(self.embedding_model)
+        if cache is None:
+            return await self._embed_texts(texts)
+        return await cache.aembed(texts, self._embed_texts)
+        
+    async def _embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts with the provider, in as few requests as possible."""
+        try:
+            unique_texts = list(dict.fromkeys(texts))
+            unique_embeddings = []
+            for start in range(0, len(unique_texts), self.embedding_batch_size):
+                batch = unique_texts[start:start + self.embedding_batch_size]
+                unique_embeddings.extend(await self._embed_batch(batch))
                 
+            by_text = dict(zip(unique_texts, unique_embeddings))
+            return [by_text[text] for text in texts]
+            
         except Exception as e:
-            self.logger.error(f"Error generating embedding: {str(e)}")
+            self.logger.error(f"Error generating embeddings: {str(e)}")
             raise
             
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed one provider-sized batch of texts."""
+        self.logger.debug(f"Embedding batch of {len(texts)} texts with {self.provider}")
+        if self.provider == 'openai':
+            response = await self.client.embeddings.create(
+                model=self.embedding_model,
+                input=texts
+            )
+            return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+            
+        elif self.provider == 'ollama':
+            result = await self._post_json(
+                f"{self.base_url}/api/embed",
+                {
+                    "model": self.embedding_model,
+                    "input": texts
+                }
+            )
+            return result["embeddings"]
+            
+        raise ValueError(f"Embeddings not supported for provider: {self.provider}")
+            
+    @staticmethod
+    def _effective_system_prompt(system_prompt: Optional[str], additional_context: Optional[str]) -> str:
+        """Combine the system prompt with any additional context."""
+        effective_system_prompt = system_prompt or ""
+        if additional_context:
+            effective_system_prompt += f"\n\nAdditional Context:\n{additional_context}"
+        return effective_system_prompt
+        
+    @staticmethod
+    def _openai_messages(prompt: str, history: Optional[List[Dict[str, Any]]], system_prompt: str) -> List[Dict[str, str]]:
+        """Build an OpenAI chat message list."""
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        if history:
+            for msg in history:
+                messages.append({
+                    "role": msg["role"],
+                    "content": msg["content"]
+                })
+        messages.append({"role": "user", "content": prompt})
+        return messages
+        
+    @staticmethod
+    def _anthropic_conversation(prompt: str, history: Optional[List[Dict[str, Any]]], system_prompt: str) -> str:
+        """Format the conversation as a single Anthropic user turn."""
+        conversation = ""
+        if system_prompt:
+            conversation += f"\n\nSystem: {system_prompt}"
+        if history:
+            for msg in history:
+                role = "Human" if msg["role"] == "user" else "Assistant"
+                conversation += f"\n\n{role}: {msg['content']}"
+        conversation += f"\n\nHuman: {prompt}\n\nAssistant:"
+        return conversation
+        
+    @staticmethod
+    def _ollama_prompt(prompt: str, history: Optional[List[Dict[str, Any]]], system_prompt: str) -> str:
+        """Format the conversation as an Ollama prompt."""
+        formatted_prompt = ""
+        if system_prompt:
+            formatted_prompt += f"System: {system_prompt}\n\n"
+        if history:
+            for msg in history:
+                role = "User" if msg["role"] == "user" else "Assistant"
+                formatted_prompt += f"{role}: {msg['content']}\n\n"
+        formatted_prompt += f"User: {prompt}\n\nAssistant:"
+        return formatted_prompt
+            
     async def generate_response(self, 
                               prompt: str,
                               history: Optional[List[Dict[str, Any]]] = None,
                               system_prompt: Optional[str] = None,
-                              additional_context: Optional[str] = None) -> Dict[str, Any]:
-        """Generate a response using the configured LLM provider"""
+                              additional_context: Optional[str] = None,
+                              tools: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Generate a response using the configured LLM provider.
+        
+        With tools, the request goes through chat() and the result also
+        carries the model's structured tool_calls.
+        """
         try:
             self.logger.debug(f"Generating response with {self.provider}")
             
             # Add additional context to system prompt if provided
-            effective_system_prompt = system_prompt or ""
-            if additional_context:
-                effective_system_prompt += f"\n\nAdditional Context:\n{additional_context}"
+            effective_system_prompt = self._effective_system_prompt(system_prompt, additional_context)
+            
+            if tools:
+                messages = [*(history or []), {"role": "user", "content": prompt}]
+                return await self.chat(messages, tools=tools, system_prompt=effective_system_prompt or None)
             
             if self.provider == 'openai':
-                messages = []
-                if effective_system_prompt:
-                    messages.append({"role": "system", "content": effective_system_prompt})
-                if history:
-                    for msg in history:
-                        messages.append({
-                            "role": msg["role"],
-                            "content": msg["content"]
-                        })
-                messages.append({"role": "user", "content": prompt})
+                messages = self._openai_messages(prompt, history, effective_system_prompt)
                 
                 self.logger.debug(f"OpenAI messages: {json.dumps(messages, indent=2)}")
                 response = await self.client.chat.completions.create(
@@ -157,17 +360,9 @@ class LLMService:
                 }
                 
             elif self.provider == 'anthropic':
-                # Format conversation history
-                conversation = ""
-                if effective_system_prompt:
-                    conversation += f"\n\nSystem: {effective_system_prompt}"
-                if history:
-                    for msg in history:
-                        role = "Human" if msg["role"] == "user" else "Assistant"
-                        conversation += f"\n\n{role}: {msg['content']}"
-                conversation += f"\n\nHuman: {prompt}\n\nAssistant:"
+                conversation = self._anthropic_conversation(prompt, history, effective_system_prompt)
                 
-                response = self.client.messages.create(
+                response = await self.client.messages.create(
                     model=self.model,
                     max_tokens=1000,
                     messages=[
@@ -185,15 +380,7 @@ class LLMService:
                 }
                 
             elif self.provider == 'ollama':
-                # Format conversation for Ollama
-                formatted_prompt = ""
-                if effective_system_prompt:
-                    formatted_prompt += f"System: {effective_system_prompt}\n\n"
-                if history:
-                    for msg in history:
-                        role = "User" if msg["role"] == "user" else "Assistant"
-                        formatted_prompt += f"{role}: {msg['content']}\n\n"
-                formatted_prompt += f"User: {prompt}\n\nAssistant:"
+                formatted_prompt = self._ollama_prompt(prompt, history, effective_system_prompt)
                 
                 self.logger.debug(f"Sending request to Ollama:")
                 self.logger.debug(f"URL: {self.base_url}/api/generate")
@@ -202,18 +389,14 @@ class LLMService:
                 
                 start_time = time.time()
                 try:
-                    response = self.session.post(
+                    result = await self._post_json(
                         f"{self.base_url}/api/generate",
-                        json={
+                        {
                             "model": self.model,
                             "prompt": formatted_prompt,
                             "stream": False
-                        },
-                        timeout=30
+                        }
                     )
-                    response.raise_for_status()
-                    
-                    result = response.json()
                     end_time = time.time()
                     self.logger.debug(f"Ollama response received in {end_time - start_time:.2f} seconds")
                     self.logger.debug(f"Response: {json.dumps(result, indent=2)}")
@@ -226,8 +409,8 @@ class LLMService:
                             "total_seconds": end_time - start_time
                         }
                     }
-                except requests.exceptions.Timeout:
-                    raise TimeoutError(f"Ollama request timed out after 30 seconds")
+                except httpx.TimeoutException:
+                    raise TimeoutError(f"Ollama request timed out after {self.request_timeout:.0f} seconds")
                 except Exception as e:
                     raise RuntimeError(f"Ollama request failed: {str(e)}")
             
@@ -239,6 +422,160 @@ class LLMService:
                 "model": self.model,
                 "provider": self.provider
             }
+            
+    async def chat(self,
+                   messages: List[Dict[str, Any]],
+                   tools: Optional[List[Dict[str, Any]]] = None,
+                   system_prompt: Optional[str] = None) -> Dict[str, Any]:
+        """Send a conversation using the provider's native tool calling.
+        
+        A single response may request several tools. Run them, append the
+        returned message and one tool message per call (see
+        tools.tool_calls.tool_result_messages), and call chat() again.
+        
+        Args:
+            messages: Provider-neutral messages; assistant messages may carry
+                tool_calls and tool results use the "tool" role
+            tools: Tool definitions in the OpenAI function format
+            system_prompt: Optional system prompt
+            
+        Returns:
+            Dict with content, tool_calls (list of ToolCall), message (the
+            assistant message to append to the conversation), model and
+            provider, or error on failure
+        """
+        try:
+            if system_prompt:
+                messages = [{"role": "system", "content": system_prompt}, *messages]
+            
+            if self.provider == 'openai':
+                options = {"model": self.model, "messages": to_openai_messages(messages)}
+                if tools:
+                    options["tools"] = list(tools)
+                response = await self.client.chat.completions.create(**options)
+                message = response.choices[0].message
+                turn = AssistantTurn(
+                    text=message.content or "",
+                    tool_calls=parse_openai_tool_calls(message.tool_calls)
+                )
+                
+            elif self.provider == 'anthropic':
+                system, anthropic_messages = to_anthropic_messages(messages)
+                options = {"model": self.model, "max_tokens": 1000, "messages": anthropic_messages}
+                if system:
+                    options["system"] = system
+                if tools:
+                    options["tools"] = to_anthropic_tools(tools)
+                response = await self.client.messages.create(**options)
+                turn = parse_anthropic_content(response.content)
+                
+            elif self.provider == 'ollama':
+                payload = {"model": self.model, "messages": to_ollama_messages(messages), "stream": False}
+                if tools:
+                    payload["tools"] = list(tools)
+                try:
+                    result = await self._post_json(f"{self.base_url}/api/chat", payload)
+                except httpx.TimeoutException:
+                    raise TimeoutError(f"Ollama request timed out after {self.request_timeout:.0f} seconds")
+                message = result.get("message", {})
+                turn = AssistantTurn(text=message.get("content", ""), tool_calls=parse_ollama_tool_calls(message))
+                
+            else:
+                raise ValueError(f"Unsupported provider: {self.provider}")
+            
+            if turn.tool_calls:
+                self.logger.debug(f"Tool calls: {[call.name for call in turn.tool_calls]}")
+            return {
+                "content": turn.text,
+                "tool_calls": turn.tool_calls,
+                "message": turn.message(),
+                "model": self.model,
+                "provider": self.provider
+            }
+            
+        except Exception as e:
+            self.logger.error(f"Error in chat: {str(e)}")
+            return {
+                "error": str(e),
+                "model": self.model,
+                "provider": self.provider
+            }
+            
+    async def generate_response_stream(self,
+                                       prompt: str,
+                                       history: Optional[List[Dict[str, Any]]] = None,
+                                       system_prompt: Optional[str] = None,
+                                       additional_context: Optional[str] = None) -> AsyncIterator[str]:
+        """Stream a response from the configured LLM provider.
+        
+        Takes the same arguments as generate_response.
+        
+        Yields:
+            Text deltas as the provider produces them
+            
+        Raises:
+            TimeoutError: If the provider stops responding
+            RuntimeError: If the provider returns an error
+        """
+        self.logger.debug(f"Streaming response with {self.provider}")
+        effective_system_prompt = self._effective_system_prompt(system_prompt, additional_context)
+        
+        try:
+            if self.provider == 'openai':
+                stream = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=self._openai_messages(prompt, history, effective_system_prompt),
+                    stream=True
+                )
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+                        
+            elif self.provider == 'anthropic':
+                async with self.client.messages.stream(
+                    model=self.model,
+                    max_tokens=1000,
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": self._anthropic_conversation(prompt, history, effective_system_prompt)
+                        }
+                    ]
+                ) as stream:
+                    async for text in stream.text_stream:
+                        yield text
+                        
+            elif self.provider == 'ollama':
+                # Ollama streams newline-delimited JSON objects
+                async with self.http_client.stream(
+                    "POST",
+                    f"{self.base_url}/api/generate",
+                    json={
+                        "model": self.model,
+                        "prompt": self._ollama_prompt(prompt, history, effective_system_prompt),
+                        "stream": True
+                    }
+                ) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line:
+                            continue
+                        chunk = json.loads(line)
+                        if chunk.get("error"):
+                            raise RuntimeError(chunk["error"])
+                        if chunk.get("response"):
+                            yield chunk["response"]
+                        if chunk.get("done"):
+                            break
+            else:
+                raise ValueError(f"Unsupported provider: {self.provider}")
+                
+        except httpx.TimeoutException:
+            self.logger.error(f"{self.provider} stream timed out")
+            raise TimeoutError(f"{self.provider} request timed out after {self.request_timeout:.0f} seconds")
+        except Exception as e:
+            self.logger.error(f"Error streaming response: {str(e)}")
+            raise
 
 # Direct testing
 if __name__ == "__main__":
@@ -0,0 +1,206 @@
+"""Durable background queue for conversation message writes.
+
+Callers enqueue a message and continue without waiting for the database.
+Each message is appended to a local spool file before it is queued, so
+writes that were still pending when the process stopped are replayed on the
+next start. Delivery is at-least-once: a crash between the database insert
+and the spool truncation can store a message twice.
+
+Every queue spools to its own file in the spool directory and holds an
+advisory lock on it while running. On start, a queue takes over the spool
+files whose lock is free, which are those left by stopped processes, and
+leaves alone the files of queues that are still running.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import uuid
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+def _try_lock(f) -> bool:
+    """Take an exclusive lock on an open file without waiting."""
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+def _same_file(f, path: Path) -> bool:
+    """Whether path still names the open file, i.e. it was not taken over and unlinked."""
+    try:
+        return os.path.samestat(os.fstat(f.fileno()), os.stat(path))
+    except FileNotFoundError:
+        return False
+
+class MessageWriteQueue:
+    """Writes conversation messages in order on a single background task."""
+
+    DEFAULT_SPOOL_DIR = "data/message_spool"
+    # Single shared spool of earlier versions, taken over like any stopped queue's
+    LEGACY_SPOOL_PATH = "data/pending_messages.jsonl"
+    MAX_RETRIES = 5
+    RETRY_DELAY = 0.5
+
+    def __init__(self, db_service, spool_dir: Optional[str] = None):
+        """Initialize the queue.
+
+        Args:
+            db_service: Database service providing store_message()
+            spool_dir: Directory of JSONL files holding messages not yet written
+        """
+        self.db_service = db_service
+        self.spool_dir = Path(spool_dir or os.getenv("MESSAGE_SPOOL_DIR", self.DEFAULT_SPOOL_DIR))
+        self.spool_path: Optional[Path] = None
+        self._spool = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        # Messages whose write was abandoned; kept in the spool for the next start
+        self._failed: List[Dict[str, Any]] = []
+
+    async def start(self) -> None:
+        """Start the writer task and replay messages left in stopped queues' spools."""
+        if self._worker is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._failed = []
+        self._open_spool()
+
+        pending = self._take_over_spools()
+        if pending:
+            logger.info(f"Replaying {len(pending)} pending message writes")
+            self._append(pending)
+            for message in pending:
+                self._queue.put_nowait(message)
+
+        self._worker = asyncio.create_task(self._run())
+
+    def _open_spool(self) -> None:
+        """Create and lock this queue's spool file."""
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        name = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        # Locked under a name other queues ignore, then renamed into place
+        partial = self.spool_dir / f"{name}.tmp"
+        self._spool = open(partial, "a+", encoding="utf-8")
+        if not _try_lock(self._spool):
+            raise RuntimeError(f"Could not lock message spool {partial}")
+        self.spool_path = self.spool_dir / f"{name}.jsonl"
+        os.replace(partial, self.spool_path)
+
+    def _take_over_spools(self) -> List[Dict[str, Any]]:
+        """Read and remove the spool files of queues that are no longer running."""
+        paths = sorted(self.spool_dir.glob("*.jsonl"))
+        legacy = Path(self.LEGACY_SPOOL_PATH)
+        if legacy.exists():
+            paths.insert(0, legacy)
+
+        pending = []
+        for path in paths:
+            if path == self.spool_path:
+                continue
+            try:
+                f = open(path, "r", encoding="utf-8")
+            except FileNotFoundError:
+                continue
+            with f:
+                # A held lock means the owner is running; a renamed file was taken by another queue
+                if not _try_lock(f) or not _same_file(f, path):
+                    continue
+                for line in f:
+                    try:
+                        pending.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # Torn final line from a crash mid-append
+                        logger.warning("Skipping unreadable line in message spool")
+                # Unlinked while locked, so no other queue reads it again
+                path.unlink()
+        return pending
+
+    def _append(self, messages: List[Dict[str, Any]]) -> None:
+        self._spool.write("".join(json.dumps(message, default=str) + "\n" for message in messages))
+        self._spool.flush()
+
+    def enqueue(
+        self,
+        role: str,
+        content: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None
+    ) -> None:
+        """Queue a message for writing and return immediately."""
+        if self._queue is None:
+            raise RuntimeError("MessageWriteQueue.start() must be called before enqueue()")
+        message = {
+            "role": role,
+            "content": content,
+            "metadata": metadata,
+            "session_id": session_id
+        }
+        self._append([message])
+        self._queue.put_nowait(message)
+
+    async def flush(self) -> None:
+        """Wait until every queued message has been written."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self) -> None:
+        """Write remaining messages, stop the writer task and release the spool."""
+        if self._worker is None:
+            return
+        await self.flush()
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+        if not self._failed:
+            self.spool_path.unlink(missing_ok=True)
+        # Closing releases the lock, so the next start takes over any failed writes
+        self._spool.close()
+        self._spool = None
+
+    async def _run(self) -> None:
+        """Write queued messages one at a time, in enqueue order."""
+        while True:
+            message = await self._queue.get()
+            try:
+                await self._write(message)
+            finally:
+                self._queue.task_done()
+            if self._queue.empty():
+                # Everything spooled so far is in the database, except abandoned writes
+                self._spool.truncate(0)
+                if self._failed:
+                    self._append(self._failed)
+
+    async def _write(self, message: Dict[str, Any]) -> None:
+        """Store one message, retrying transient database errors."""
+        for attempt in range(self.MAX_RETRIES):
+            try:
+                await self.db_service.store_message(**message)
+                return
+            except Exception as e:
+                if attempt == self.MAX_RETRIES - 1:
+                    # Left in the spool, so it is retried on the next start
+                    logger.error(f"Giving up on message write: {str(e)}")
+                    self._failed.append(message)
+                    return
+                delay = self.RETRY_DELAY * (2 ** attempt)
+                logger.warning(f"Message write failed, retrying in {delay}s: {str(e)}")
+                await asyncio.sleep(delay)
@@ -1,99 +1,108 @@
-from .tool_handler import handle_tool_calls
-from .tool_definitions import get_tool_definitions
-from .file_tools import read_file, write_file, list_files, open_container_cli
-from .llm_tools import llm_manager
-from .user_state import get_user_state, update_user_state
-from .google_api_tools import (
-    # Core functions
-    get_credentials, get_services,
-    
-    # Gmail Draft functions
-    gmail_drafts_get,
-    gmail_drafts_list,
-    gmail_drafts_send,
-    gmail_drafts_update,
-    gmail_drafts_create,
-    gmail_drafts_delete,
-    
-    # Gmail History functions
-    gmail_history_list,
-    
-    # Gmail Labels functions
-    gmail_labels_create,
-    gmail_labels_delete,
-    gmail_labels_get,
-    gmail_labels_list,
-    gmail_labels_modify,
-    
-    # Gmail Messages functions
-    gmail_messages_create,
-    gmail_messages_delete,
-    gmail_messages_import,
-    gmail_messages_list,
-    gmail_messages_send,
-    gmail_messages_trash,
-    gmail_messages_untrash,
-    gmail_messages_batch_delete,
-    gmail_messages_get,
-    gmail_messages_attachments_get,
-    
-    # Gmail Settings functions
-    gmail_settings_get_autoforwarding,
-    gmail_settings_update_autoforwarding,
-    gmail_settings_update_vacation,
-    gmail_settings_get_vacation,
-    
-    # Gmail Settings Filters functions
-    gmail_settings_filters_create,
-    gmail_settings_filters_delete,
-    gmail_settings_filters_get,
-    gmail_settings_filters_list,
-    
-    # Gmail Threads functions
-    gmail_threads_delete,
-    gmail_threads_get,
-    gmail_threads_list,
-    gmail_threads_trash,
-    gmail_threads_untrash,
-    
-    # Tasks functions
-    tasks_tasklists_delete,
-    tasks_tasklists_get,
-    tasks_tasklists_insert,
-    tasks_tasklists_list,
-    tasks_tasklists_patch,
-    tasks_tasklists_update,
-    tasks_clear,
-    tasks_delete,
-    tasks_get,
-    tasks_insert,
-    tasks_list,
-    tasks_move,
-    tasks_patch,
-    tasks_update,
-    
-    # Calendar functions
-    calendar_colors_get,
-    calendar_events_delete,
-    calendar_events_get,
-    calendar_events_instances,
-    calendar_events_list,
-    calendar_events_create,
-    calendar_events_move,
-    calendar_events_patch,
-    calendar_events_quick_add,
-    calendar_events_update,
-    calendar_freebusy_query
-)
+"""
+Tools package.
+
+Public tool functions are imported from their submodules on first access,
+so `import tools` does not load the Google clients or the RAG stack.
+"""
+
+import importlib
+
+# Submodule -> public names it provides
+_LAZY_EXPORTS = {
+    'tool_handler': ('handle_tool_calls', 'execute_tool_calls'),
+    'tool_definitions': ('get_tool_definitions',),
+    'file_tools': ('read_file', 'write_file', 'list_files', 'open_container_cli'),
+    'llm_tools': ('llm_manager',),
+    'user_state': ('get_user_state', 'update_user_state'),
+    'google_api_tools': (
+        'get_credentials',
+        'get_services',
+        'gmail_drafts_get',
+        'gmail_drafts_list',
+        'gmail_drafts_send',
+        'gmail_drafts_update',
+        'gmail_drafts_create',
+        'gmail_drafts_delete',
+        'gmail_history_list',
+        'gmail_labels_create',
+        'gmail_labels_delete',
+        'gmail_labels_get',
+        'gmail_labels_list',
+        'gmail_labels_modify',
+        'gmail_messages_create',
+        'gmail_messages_delete',
+        'gmail_messages_import',
+        'gmail_messages_list',
+        'gmail_messages_send',
+        'gmail_messages_trash',
+        'gmail_messages_untrash',
+        'gmail_messages_batch_delete',
+        'gmail_messages_get',
+        'gmail_messages_attachments_get',
+        'gmail_settings_get_autoforwarding',
+        'gmail_settings_update_autoforwarding',
+        'gmail_settings_update_vacation',
+        'gmail_settings_get_vacation',
+        'gmail_settings_filters_create',
+        'gmail_settings_filters_delete',
+        'gmail_settings_filters_get',
+        'gmail_settings_filters_list',
+        'gmail_threads_delete',
+        'gmail_threads_get',
+        'gmail_threads_list',
+        'gmail_threads_trash',
+        'gmail_threads_untrash',
+        'tasks_tasklists_delete',
+        'tasks_tasklists_get',
+        'tasks_tasklists_insert',
+        'tasks_tasklists_list',
+        'tasks_tasklists_patch',
+        'tasks_tasklists_update',
+        'tasks_clear',
+        'tasks_delete',
+        'tasks_get',
+        'tasks_insert',
+        'tasks_list',
+        'tasks_move',
+        'tasks_patch',
+        'tasks_update',
+        'calendar_colors_get',
+        'calendar_events_delete',
+        'calendar_events_get',
+        'calendar_events_instances',
+        'calendar_events_list',
+        'calendar_events_create',
+        'calendar_events_move',
+        'calendar_events_patch',
+        'calendar_events_quick_add',
+        'calendar_events_update',
+        'calendar_freebusy_query',
+    ),
+    'perplexity_api_tools': ('perplexity_chat',),
+    'searxng_tools': ('searxng_search',),
+    'rag_tools': ('search_local_documents',)
+}
+
+_EXPORT_MODULES = {
+    name: module for module, names in _LAZY_EXPORTS.items() for name in names
+}
+
+def __getattr__(name):
+    module = _EXPORT_MODULES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
 
-from .perplexity_api_tools import perplexity_chat
-from .searxng_tools import searxng_search
-from .rag_tools import search_local_documents
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORT_MODULES))
 
 
 __all__ = [
     # Core functions
     'handle_tool_calls',
+    'execute_tool_calls',
     'get_tool_definitions',
     'read_file',
     'write_file',
@@ -197,4 +206,4 @@ __all__ = [
     
     # RAG functions
     'search_local_documents'
-] 
\ No newline at end of file
+]
@@ -0,0 +1,180 @@
+"""
+Multi-step tool-calling loop for chat providers.
+
+The model is called with the running transcript; if it requests tools, all
+calls of that response are executed concurrently, their results appended,
+and the model is called again until it answers without tools or a step or
+token budget runs out, at which point it is asked to answer with what it
+has.
+
+The transcript stays compact: each tool result is clipped when added, and
+results the model has already seen are shortened further before the next
+step, so per-step prompts grow with the number of steps rather than with
+the full size of every earlier result.
+"""
+
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .tool_calls import AssistantTurn, ToolCall, tool_result_messages
+
+logger = logging.getLogger(__name__)
+
+# Tool-calling steps per user request before the model must answer
+AGENT_MAX_STEPS = int(os.getenv("AGENT_MAX_STEPS", "6"))
+
+# Estimated prompt tokens the whole loop may spend before the model must answer
+AGENT_TOKEN_BUDGET = int(os.getenv("AGENT_TOKEN_BUDGET", "32000"))
+
+# Characters kept of a new tool result, and of results from earlier steps
+AGENT_MAX_RESULT_CHARS = int(os.getenv("AGENT_MAX_RESULT_CHARS", "6000"))
+AGENT_COMPACT_RESULT_CHARS = int(os.getenv("AGENT_COMPACT_RESULT_CHARS", "600"))
+
+FINAL_ANSWER_PROMPT = (
+    "The tool budget for this request is used up. Answer now with the "
+    "information gathered so far, without calling more tools."
+)
+
+def estimate_tokens(messages: Sequence[Dict[str, Any]]) -> int:
+    """Rough prompt size of a transcript, at four characters per token."""
+    chars = 0
+    for message in messages:
+        chars += len(message.get("content") or "")
+        for call in message.get("tool_calls", ()):
+            chars += len(call.name) + len(str(call.arguments))
+    return chars // 4
+
+def clip(text: str, limit: int) -> str:
+    """Shorten text to limit characters, noting how much was dropped."""
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [{len(text) - limit} more characters omitted]"
+
+@dataclass
+class AgentStep:
+    """Timing and size of one model call and the tools it requested."""
+    step: int
+    prompt_tokens: int
+    model_seconds: float
+    tool_seconds: float = 0.0
+    tool_calls: List[str] = field(default_factory=list)
+
+@dataclass
+class AgentResult:
+    """Final answer of a loop run, with per-step records."""
+    text: str
+    steps: List[AgentStep]
+    # Why the model was made to answer: None, "max_steps" or "token_budget"
+    stopped: Optional[str] = None
+    skipped_tool_calls: List[str] = field(default_factory=list)
+
+    @property
+    def prompt_tokens(self) -> int:
+        return sum(step.prompt_tokens for step in self.steps)
+
+    @property
+    def seconds(self) -> float:
+        return sum(step.model_seconds + step.tool_seconds for step in self.steps)
+
+class AgentLoop:
+    """Runs model calls and tool calls until the model answers."""
+
+    def __init__(
+        self,
+        chat: Callable[[List[Dict[str, Any]], Sequence[Dict[str, Any]]], AssistantTurn],
+        execute_tools: Callable[[Sequence[ToolCall]], List[str]],
+        max_steps: int = AGENT_MAX_STEPS,
+        token_budget: int = AGENT_TOKEN_BUDGET,
+        max_result_chars: int = AGENT_MAX_RESULT_CHARS,
+        compact_result_chars: int = AGENT_COMPACT_RESULT_CHARS
+    ):
+        """Initialize the loop.
+
+        Args:
+            chat: Sends a transcript and tool definitions, returns the model's turn
+            execute_tools: Runs one response's tool calls, returns outputs in order
+            max_steps: Tool-calling steps before the model must answer
+            token_budget: Estimated prompt tokens before the model must answer
+            max_result_chars: Characters kept of each new tool result
+            compact_result_chars: Characters kept of results from earlier steps
+        """
+        self.chat = chat
+        self.execute_tools = execute_tools
+        self.max_steps = max_steps
+        self.token_budget = token_budget
+        self.max_result_chars = max_result_chars
+        self.compact_result_chars = compact_result_chars
+
+    def _compact(self, transcript: List[Dict[str, Any]]) -> None:
+        """Shorten tool results the model has already responded to."""
+        last_call = max(
+            (i for i, m in enumerate(transcript) if m["role"] == "assistant" and m.get("tool_calls")),
+            default=-1
+        )
+        for i, message in enumerate(transcript[:last_call]):
+            if message["role"] == "tool" and len(message["content"]) > self.compact_result_chars:
+                transcript[i] = {**message, "content": clip(message["content"], self.compact_result_chars)}
+
+    def run(self, messages: List[Dict[str, Any]], tools: Sequence[Dict[str, Any]]) -> AgentResult:
+        """Answer the conversation in messages, calling tools as the model requests.
+
+        Args:
+            messages: Provider-neutral messages, usually a system prompt and the user request
+            tools: Tool definitions offered to the model
+
+        Returns:
+            AgentResult with the final text and a record per model call
+        """
+        transcript = list(messages)
+        steps: List[AgentStep] = []
+        spent = 0
+        stopped = None
+        while True:
+            self._compact(transcript)
+            prompt_tokens = estimate_tokens(transcript)
+            if stopped is None and steps and spent + prompt_tokens > self.token_budget:
+                stopped = "token_budget"
+            if stopped:
+                transcript.append({"role": "user", "content": FINAL_ANSWER_PROMPT})
+                prompt_tokens = estimate_tokens(transcript)
+
+            started = time.monotonic()
+            # Tools are still offered when answering: Anthropic rejects a
+            # transcript with tool calls but no tool definitions
+            turn = self.chat(transcript, tools)
+            step = AgentStep(step=len(steps) + 1, prompt_tokens=prompt_tokens,
+                             model_seconds=time.monotonic() - started)
+            steps.append(step)
+            spent += prompt_tokens
+
+            if not turn.tool_calls or stopped:
+                skipped = [call.name for call in turn.tool_calls]
+                if skipped:
+                    logger.info(f"Skipped tool calls after {stopped}: {', '.join(skipped)}")
+                result = AgentResult(text=turn.text, steps=steps, stopped=stopped, skipped_tool_calls=skipped)
+                self._log(result)
+                return result
+
+            step.tool_calls = [call.name for call in turn.tool_calls]
+            started = time.monotonic()
+            outputs = self.execute_tools(turn.tool_calls)
+            step.tool_seconds = time.monotonic() - started
+
+            transcript.append(turn.message())
+            transcript.extend(tool_result_messages(
+                turn.tool_calls, [clip(str(output), self.max_result_chars) for output in outputs]
+            ))
+            if len(steps) >= self.max_steps:
+                stopped = "max_steps"
+
+    @staticmethod
+    def _log(result: AgentResult) -> None:
+        for step in result.steps:
+            tools = f", tools {step.tool_seconds:.2f}s ({', '.join(step.tool_calls)})" if step.tool_calls else ""
+            logger.info(f"Agent step {step.step}: ~{step.prompt_tokens} prompt tokens, "
+                        f"model {step.model_seconds:.2f}s{tools}")
+        logger.info(f"Agent finished in {len(result.steps)} steps, {result.seconds:.2f}s, "
+                    f"~{result.prompt_tokens} prompt tokens" + (f" (stopped: {result.stopped})" if result.stopped else ""))
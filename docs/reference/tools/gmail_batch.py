@@ -0,0 +1,87 @@
+"""
+Batched Gmail message fetching.
+
+Fetches message metadata through the Google API client's batch endpoint, so
+listing N messages costs one list call plus ceil(N / 100) HTTP round-trips
+instead of N + 1.
+"""
+
+import logging
+from typing import Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Gmail accepts at most 100 calls per batch request
+GMAIL_BATCH_SIZE = 100
+
+# Headers needed to summarise a message in a listing
+SUMMARY_HEADERS = ('Subject', 'From')
+
+def batch_get_messages(
+    service,
+    message_ids: Sequence[str],
+    format: str = 'metadata',
+    metadata_headers: Optional[Sequence[str]] = SUMMARY_HEADERS,
+    batch_size: int = GMAIL_BATCH_SIZE
+) -> List[Optional[Dict]]:
+    """Fetch several messages with batched messages().get calls.
+
+    Calls that fail inside a batch are retried once in a follow-up batch.
+
+    Args:
+        service: Gmail API service
+        message_ids: IDs of the messages to fetch
+        format: Message format passed to messages().get
+        metadata_headers: Headers to return when format is 'metadata'
+        batch_size: Calls per batch request (at most 100)
+
+    Returns:
+        Message resources in the order of message_ids; None for messages
+        that could not be fetched
+    """
+    results: Dict[str, Dict] = {}
+    pending = list(dict.fromkeys(message_ids))
+
+    for attempt in range(2):
+        failed = []
+
+        def callback(request_id, response, exception):
+            if exception is not None:
+                logger.warning(f"Failed to fetch message {request_id}: {str(exception)}")
+                failed.append(request_id)
+            else:
+                results[request_id] = response
+
+        for start in range(0, len(pending), batch_size):
+            batch = service.new_batch_http_request(callback=callback)
+            for message_id in pending[start:start + batch_size]:
+                kwargs = {'userId': 'me', 'id': message_id, 'format': format}
+                if format == 'metadata' and metadata_headers:
+                    kwargs['metadataHeaders'] = list(metadata_headers)
+                batch.add(service.users().messages().get(**kwargs), request_id=message_id)
+            batch.execute()
+
+        if not failed:
+            break
+        pending = failed
+
+    return [results.get(message_id) for message_id in message_ids]
+
+def get_header(message: Optional[Dict], name: str, default: str) -> str:
+    """Get a header value from a message resource."""
+    if not message:
+        return default
+    headers = message.get('payload', {}).get('headers', [])
+    return next((h['value'] for h in headers if h['name'] == name), default)
+
+def summarize_messages(service, message_ids: Sequence[str]) -> List[Dict[str, str]]:
+    """Fetch id, subject and sender for each message in batches."""
+    messages = batch_get_messages(service, message_ids)
+    return [
+        {
+            'id': message_id,
+            'subject': get_header(message, 'Subject', 'No Subject'),
+            'from': get_header(message, 'From', 'Unknown')
+        }
+        for message_id, message in zip(message_ids, messages)
+    ]
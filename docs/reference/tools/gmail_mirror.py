@@ -0,0 +1,586 @@
+"""
+Local Gmail mailbox mirror.
+
+Keeps a SQLite copy of the mailbox (headers, snippet, plain-text body and
+labels) so queries and inbox summaries are local scans instead of API calls.
+
+The first sync lists every message and fetches the new ones in batches.
+Later syncs ask history().list for the changes since the stored historyId,
+which usually costs a single request. If Gmail no longer has that history
+(404), the mirror falls back to a full sync that only re-fetches what
+changed. Messages that cannot be fetched are kept in a pending table and
+retried by every later sync until they are stored or deleted.
+"""
+
+import base64
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from functools import lru_cache
+from html import unescape
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from googleapiclient.errors import HttpError
+
+try:
+    from .gmail_batch import batch_get_messages, get_header
+except ImportError:
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from tools.gmail_batch import batch_get_messages, get_header
+
+logger = logging.getLogger(__name__)
+
+# Full-format messages are large; smaller batches stay clear of rate limits
+MIRROR_BATCH_SIZE = int(os.getenv("GMAIL_MIRROR_BATCH_SIZE", "50"))
+
+# Query tools run a delta sync first when the last sync is older than this
+MIRROR_MAX_AGE = float(os.getenv("GMAIL_MIRROR_MAX_AGE", "60"))
+
+# Stored bodies are truncated to this many characters
+MAX_BODY_CHARS = 100000
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_STYLE_RE = re.compile(r"<(script|style)[^>]*>.*?</\1>", re.S | re.I)
+_SPACE_RE = re.compile(r"[ \t\r\f\v]+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id TEXT PRIMARY KEY,
+    thread_id TEXT,
+    history_id TEXT,
+    internal_date INTEGER,
+    sender TEXT,
+    recipients TEXT,
+    subject TEXT,
+    snippet TEXT,
+    body TEXT,
+    labels TEXT,
+    size_estimate INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_messages_date ON messages(internal_date);
+CREATE INDEX IF NOT EXISTS idx_messages_sender ON messages(sender);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS pending_messages (
+    id TEXT PRIMARY KEY
+);
+"""
+
+def _decode_part(data: Optional[str]) -> str:
+    """Decode a base64url message body."""
+    if not data:
+        return ""
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4)).decode("utf-8", errors="replace")
+
+def _html_to_text(html: str) -> str:
+    """Crude HTML to text conversion, good enough for search and summaries."""
+    text = _TAG_RE.sub(" ", _STYLE_RE.sub(" ", html))
+    return _SPACE_RE.sub(" ", unescape(text)).strip()
+
+def extract_body(payload: Dict[str, Any]) -> str:
+    """Get the plain-text body of a full-format message payload.
+
+    Prefers text/plain parts and falls back to text/html with tags removed.
+    """
+    plain, html = [], []
+    stack = [payload]
+    while stack:
+        part = stack.pop(0)
+        mime_type = part.get("mimeType", "")
+        if part.get("parts"):
+            stack.extend(part["parts"])
+        elif part.get("filename"):
+            continue  # attachment
+        elif mime_type == "text/plain":
+            plain.append(_decode_part(part.get("body", {}).get("data")))
+        elif mime_type == "text/html":
+            html.append(_decode_part(part.get("body", {}).get("data")))
+
+    if plain:
+        body = "\n".join(plain)
+    else:
+        body = _html_to_text("\n".join(html))
+    return body[:MAX_BODY_CHARS]
+
+def _labels_column(label_ids: Sequence[str]) -> str:
+    """Store labels delimited on both sides so LIKE '%,LABEL,%' matches exactly."""
+    return "," + ",".join(label_ids) + "," if label_ids else ""
+
+def _parse_date(value: str) -> int:
+    """Convert YYYY-MM-DD to epoch milliseconds, matching internalDate."""
+    return int(datetime.strptime(value, "%Y-%m-%d").timestamp() * 1000)
+
+class GmailMirror:
+    """SQLite mirror of one Gmail mailbox."""
+
+    def __init__(self, db_path: Optional[str] = None):
+        """Initialize the mirror.
+
+        Args:
+            db_path: SQLite database file; ':memory:' keeps the mirror in memory
+        """
+        self.db_path = db_path or os.getenv("GMAIL_MIRROR_PATH", "data/gmail_mirror.db")
+        if self.db_path != ":memory:":
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        # Tools run on worker threads; the lock serialises access to the connection
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+        with self._lock, self._conn:
+            self._conn.executescript(_SCHEMA)
+            self._fts = self._create_fts()
+
+    def _create_fts(self) -> bool:
+        """Create the full-text index, if this SQLite build has FTS5."""
+        try:
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts "
+                "USING fts5(subject, sender, body, content='messages', content_rowid='rowid')"
+            )
+            return True
+        except sqlite3.OperationalError:
+            logger.warning("SQLite FTS5 unavailable, mirror search falls back to LIKE")
+            return False
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    # Sync state
+
+    def _get_state(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def _set_state(self, key: str, value: str) -> None:
+        self._conn.execute(
+            "INSERT INTO sync_state (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value)
+        )
+
+    @property
+    def history_id(self) -> Optional[str]:
+        """historyId the mirror is up to date with, or None before the first sync."""
+        with self._lock:
+            return self._get_state("history_id")
+
+    @property
+    def last_sync(self) -> float:
+        """Unix time of the last successful sync, or 0."""
+        with self._lock:
+            return float(self._get_state("last_sync") or 0)
+
+    # Writes
+
+    def _upsert(self, message: Dict[str, Any]) -> None:
+        """Store a full-format message. Caller holds the lock."""
+        payload = message.get("payload", {})
+        row = (
+            message["id"],
+            message.get("threadId"),
+            message.get("historyId"),
+            int(message.get("internalDate", 0)),
+            get_header(message, "From", ""),
+            ", ".join(filter(None, (get_header(message, h, "") for h in ("To", "Cc")))),
+            get_header(message, "Subject", ""),
+            unescape(message.get("snippet", "")),
+            extract_body(payload),
+            _labels_column(message.get("labelIds", [])),
+            message.get("sizeEstimate", 0)
+        )
+        self._delete(message["id"])
+        cursor = self._conn.execute(
+            "INSERT INTO messages (id, thread_id, history_id, internal_date, sender, recipients, "
+            "subject, snippet, body, labels, size_estimate) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            row
+        )
+        if self._fts:
+            self._conn.execute(
+                "INSERT INTO messages_fts (rowid, subject, sender, body) VALUES (?, ?, ?, ?)",
+                (cursor.lastrowid, row[6], row[4], row[8])
+            )
+
+    def _delete(self, message_id: str) -> bool:
+        """Remove a message. Caller holds the lock."""
+        row = self._conn.execute(
+            "SELECT rowid, subject, sender, body FROM messages WHERE id = ?", (message_id,)
+        ).fetchone()
+        if row is None:
+            return False
+        if self._fts:
+            self._conn.execute(
+                "INSERT INTO messages_fts (messages_fts, rowid, subject, sender, body) "
+                "VALUES ('delete', ?, ?, ?, ?)",
+                (row["rowid"], row["subject"], row["sender"], row["body"])
+            )
+        self._conn.execute("DELETE FROM messages WHERE id = ?", (message_id,))
+        return True
+
+    def _set_labels(self, message_id: str, label_ids: Sequence[str]) -> None:
+        """Update a message's labels. Caller holds the lock."""
+        self._conn.execute(
+            "UPDATE messages SET labels = ? WHERE id = ?",
+            (_labels_column(label_ids), message_id)
+        )
+
+    def _store_full(self, service, message_ids: Sequence[str]) -> Tuple[int, List[str]]:
+        """Fetch full messages in batches and store them, committing per batch.
+
+        Messages that could not be fetched are recorded as pending, so the
+        next sync retries them; stored ones are taken off the pending list.
+
+        Returns:
+            Number of messages stored and the IDs that failed
+        """
+        stored, failed = 0, []
+        for start in range(0, len(message_ids), MIRROR_BATCH_SIZE):
+            chunk = message_ids[start:start + MIRROR_BATCH_SIZE]
+            messages = batch_get_messages(
+                service, chunk, format="full", metadata_headers=None, batch_size=MIRROR_BATCH_SIZE
+            )
+            with self._lock, self._conn:
+                for message_id, message in zip(chunk, messages):
+                    if message:
+                        self._upsert(message)
+                        self._conn.execute("DELETE FROM pending_messages WHERE id = ?", (message_id,))
+                        stored += 1
+                    else:
+                        self._conn.execute(
+                            "INSERT OR IGNORE INTO pending_messages (id) VALUES (?)", (message_id,)
+                        )
+                        failed.append(message_id)
+        if failed:
+            logger.warning(f"Gmail mirror could not fetch {len(failed)} messages, retrying on next sync")
+        return stored, failed
+
+    def pending_ids(self) -> List[str]:
+        """IDs of messages that failed to fetch and are retried by the next sync."""
+        with self._lock:
+            return [row["id"] for row in self._conn.execute("SELECT id FROM pending_messages")]
+
+    # Sync
+
+    def sync(self, service, full: bool = False) -> Dict[str, Any]:
+        """Bring the mirror up to date.
+
+        Args:
+            service: Gmail API service
+            full: Force a full sync even if a historyId is stored
+
+        Returns:
+            Sync statistics
+        """
+        history_id = self.history_id
+        if history_id and not full:
+            try:
+                return self.delta_sync(service, history_id)
+            except HttpError as e:
+                if e.resp.status != 404:
+                    raise
+                logger.info("Stored Gmail historyId expired, running a full sync")
+        return self.full_sync(service)
+
+    def full_sync(self, service) -> Dict[str, Any]:
+        """List the whole mailbox and reconcile the mirror with it.
+
+        Messages not yet mirrored are fetched in full; mirrored ones only have
+        their labels refreshed, and messages gone from the mailbox are deleted.
+        """
+        # Taken before listing, so changes made during the listing are
+        # picked up by the next delta sync
+        history_id = service.users().getProfile(userId="me").execute()["historyId"]
+
+        remote_ids = []
+        page_token = None
+        while True:
+            response = service.users().messages().list(
+                userId="me", maxResults=500, pageToken=page_token
+            ).execute()
+            remote_ids.extend(m["id"] for m in response.get("messages", []))
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                break
+
+        with self._lock:
+            local_ids = {row["id"] for row in self._conn.execute("SELECT id FROM messages")}
+        remote_set = set(remote_ids)
+        new_ids = [i for i in remote_ids if i not in local_ids]
+        known_ids = [i for i in remote_ids if i in local_ids]
+
+        # Pending messages are either among new_ids or gone from the mailbox
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM pending_messages")
+        added, failed = self._store_full(service, new_ids)
+
+        updated = 0
+        for start in range(0, len(known_ids), MIRROR_BATCH_SIZE):
+            chunk = known_ids[start:start + MIRROR_BATCH_SIZE]
+            messages = batch_get_messages(service, chunk, format="minimal", batch_size=MIRROR_BATCH_SIZE)
+            with self._lock, self._conn:
+                for message in messages:
+                    if message:
+                        self._set_labels(message["id"], message.get("labelIds", []))
+                        updated += 1
+
+        with self._lock, self._conn:
+            deleted = sum(self._delete(i) for i in local_ids - remote_set)
+            self._set_state("history_id", str(history_id))
+            self._set_state("last_sync", str(time.time()))
+
+        logger.info(f"Gmail full sync: {added} added, {updated} refreshed, {deleted} deleted")
+        return {"mode": "full", "added": added, "updated": updated, "deleted": deleted,
+                "failed": failed, "history_id": str(history_id), "total": self.count()}
+
+    def delta_sync(self, service, start_history_id: str) -> Dict[str, Any]:
+        """Apply the mailbox changes recorded since start_history_id.
+
+        Raises:
+            HttpError: With status 404 when Gmail no longer has that history
+        """
+        added_ids: Dict[str, None] = {}
+        deleted_ids = set()
+        label_updates: Dict[str, List[str]] = {}
+        history_id = start_history_id
+
+        page_token = None
+        while True:
+            response = service.users().history().list(
+                userId="me", startHistoryId=start_history_id, pageToken=page_token
+            ).execute()
+            # Records are in chronological order; later ones win
+            for record in response.get("history", []):
+                for item in record.get("messagesAdded", []):
+                    added_ids[item["message"]["id"]] = None
+                    deleted_ids.discard(item["message"]["id"])
+                for item in record.get("messagesDeleted", []):
+                    deleted_ids.add(item["message"]["id"])
+                    added_ids.pop(item["message"]["id"], None)
+                for key in ("labelsAdded", "labelsRemoved"):
+                    for item in record.get(key, []):
+                        label_updates[item["message"]["id"]] = item["message"].get("labelIds", [])
+            history_id = response.get("historyId", history_id)
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                break
+
+        # Messages that failed on an earlier sync are retried with the new ones
+        for message_id in self.pending_ids():
+            if message_id not in deleted_ids:
+                added_ids.setdefault(message_id, None)
+        added, failed = self._store_full(service, list(added_ids))
+
+        with self._lock, self._conn:
+            deleted = sum(self._delete(i) for i in deleted_ids)
+            self._conn.executemany(
+                "DELETE FROM pending_messages WHERE id = ?", [(i,) for i in deleted_ids]
+            )
+            updated = 0
+            for message_id, label_ids in label_updates.items():
+                if message_id not in added_ids and message_id not in deleted_ids:
+                    self._set_labels(message_id, label_ids)
+                    updated += 1
+            self._set_state("history_id", str(history_id))
+            self._set_state("last_sync", str(time.time()))
+
+        return {"mode": "delta", "added": added, "updated": updated, "deleted": deleted,
+                "failed": failed, "history_id": str(history_id), "total": self.count()}
+
+    # Queries
+
+    def count(self) -> int:
+        """Number of mirrored messages."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+    def get(self, message_id: str) -> Optional[Dict[str, Any]]:
+        """Get one mirrored message, body included."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM messages WHERE id = ?", (message_id,)).fetchone()
+        return self._row_to_dict(row, include_body=True) if row else None
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        sender: Optional[str] = None,
+        label: Optional[str] = None,
+        after: Optional[str] = None,
+        before: Optional[str] = None,
+        max_results: int = 20
+    ) -> List[Dict[str, Any]]:
+        """Find mirrored messages, newest first.
+
+        Args:
+            query: Full-text query over subject, sender and body
+            sender: Substring of the From header
+            label: Label ID the message must carry (e.g. 'INBOX', 'UNREAD')
+            after: Only messages on or after this date (YYYY-MM-DD)
+            before: Only messages before this date (YYYY-MM-DD)
+            max_results: Maximum number of messages to return
+
+        Returns:
+            Message summaries without bodies
+        """
+        clauses, params = [], []
+        if query:
+            if self._fts:
+                clauses.append("m.rowid IN (SELECT rowid FROM messages_fts WHERE messages_fts MATCH ?)")
+                # Quote each term so user input cannot form FTS syntax errors
+                params.append(" ".join('"' + t.replace('"', '""') + '"' for t in query.split()))
+            else:
+                clauses.append("(m.subject LIKE ? OR m.sender LIKE ? OR m.body LIKE ?)")
+                params.extend([f"%{query}%"] * 3)
+        if sender:
+            clauses.append("m.sender LIKE ?")
+            params.append(f"%{sender}%")
+        if label:
+            clauses.append("m.labels LIKE ?")
+            params.append(f"%,{label},%")
+        if after:
+            clauses.append("m.internal_date >= ?")
+            params.append(_parse_date(after))
+        if before:
+            clauses.append("m.internal_date < ?")
+            params.append(_parse_date(before))
+
+        sql = "SELECT m.* FROM messages m"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY m.internal_date DESC LIMIT ?"
+        params.append(max_results)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def summary(self, label: Optional[str] = "INBOX", days: Optional[int] = None, top: int = 10) -> Dict[str, Any]:
+        """Summarise mirrored mail: totals, unread count, top senders and recent subjects.
+
+        Args:
+            label: Only count messages with this label; None for all mail
+            days: Only count messages from the last N days
+            top: Number of senders and recent messages to list
+        """
+        clauses, params = [], []
+        if label:
+            clauses.append("labels LIKE ?")
+            params.append(f"%,{label},%")
+        if days:
+            clauses.append("internal_date >= ?")
+            params.append(int((time.time() - days * 86400) * 1000))
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+
+        with self._lock:
+            total, unread = self._conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(labels LIKE '%,UNREAD,%'), 0) FROM messages{where}",
+                params
+            ).fetchone()
+            senders = self._conn.execute(
+                f"SELECT sender, COUNT(*) AS n FROM messages{where} "
+                "GROUP BY sender ORDER BY n DESC LIMIT ?",
+                params + [top]
+            ).fetchall()
+            recent = self._conn.execute(
+                f"SELECT * FROM messages{where} ORDER BY internal_date DESC LIMIT ?",
+                params + [top]
+            ).fetchall()
+
+        return {
+            "label": label,
+            "days": days,
+            "total": total,
+            "unread": unread,
+            "top_senders": [{"sender": row["sender"], "count": row["n"]} for row in senders],
+            "recent": [self._row_to_dict(row) for row in recent]
+        }
+
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row, include_body: bool = False) -> Dict[str, Any]:
+        """Convert a messages row to the shape returned by the tools."""
+        message = {
+            "id": row["id"],
+            "thread_id": row["thread_id"],
+            "date": datetime.fromtimestamp(row["internal_date"] / 1000).isoformat(timespec="minutes"),
+            "from": row["sender"],
+            "to": row["recipients"],
+            "subject": row["subject"],
+            "snippet": row["snippet"],
+            "labels": [l for l in row["labels"].split(",") if l]
+        }
+        if include_body:
+            message["body"] = row["body"]
+        return message
+
+@lru_cache(maxsize=1)
+def get_gmail_mirror() -> GmailMirror:
+    """Get the shared mailbox mirror."""
+    return GmailMirror()
+
+def _gmail_service():
+    from .google_api_tools import get_services
+    return get_services()['gmail']
+
+def _fresh_mirror() -> GmailMirror:
+    """Get the mirror, running a sync first if it is older than MIRROR_MAX_AGE.
+
+    A failed sync is logged and the existing mirror contents are used.
+    """
+    mirror = get_gmail_mirror()
+    if time.time() - mirror.last_sync > MIRROR_MAX_AGE:
+        try:
+            mirror.sync(_gmail_service())
+        except Exception as e:
+            if mirror.history_id is None:
+                raise
+            logger.warning(f"Gmail mirror sync failed, answering from local copy: {str(e)}")
+    return mirror
+
+def gmail_mirror_sync(full: bool = False) -> str:
+    """Synchronise the local Gmail mirror with the mailbox."""
+    try:
+        stats = get_gmail_mirror().sync(_gmail_service(), full=full)
+        return json.dumps(stats, indent=2)
+    except Exception as e:
+        return f"Error syncing Gmail mirror: {str(e)}"
+
+def gmail_mirror_search(
+    query: Optional[str] = None,
+    sender: Optional[str] = None,
+    label: Optional[str] = None,
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    max_results: int = 20
+) -> str:
+    """Search emails in the local Gmail mirror."""
+    try:
+        messages = _fresh_mirror().search(query, sender, label, after, before, max_results)
+        return json.dumps(messages, indent=2)
+    except Exception as e:
+        return f"Error searching Gmail mirror: {str(e)}"
+
+def gmail_mirror_get(message_id: str) -> str:
+    """Get an email, including its body, from the local Gmail mirror."""
+    try:
+        message = _fresh_mirror().get(message_id)
+        if message is None:
+            return f"Error getting message: {message_id} not found in mirror"
+        return json.dumps(message, indent=2)
+    except Exception as e:
+        return f"Error getting message from Gmail mirror: {str(e)}"
+
+def gmail_mirror_summary(label: str = "INBOX", days: Optional[int] = None, top: int = 10) -> str:
+    """Summarise the mailbox from the local Gmail mirror."""
+    try:
+        return json.dumps(_fresh_mirror().summary(label or None, days, top), indent=2)
+    except Exception as e:
+        return f"Error summarising Gmail mirror: {str(e)}"
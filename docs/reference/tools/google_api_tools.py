@@ -3,66 +3,23 @@ import json
 import base64
 from email.mime.text import MIMEText
 from typing import Optional, List, Dict, Any
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-from functools import lru_cache
-import pickle
 from datetime import datetime, timedelta
 import pytz
 from dotenv import load_dotenv
+from .gmail_batch import summarize_messages
+from .google_services import get_google_service, get_service_registry
 
 load_dotenv()
 
-SCOPES = [
-    'https://www.googleapis.com/auth/gmail.readonly',
-    'https://www.googleapis.com/auth/gmail.send',
-    'https://www.googleapis.com/auth/gmail.modify',
-    'https://www.googleapis.com/auth/gmail.labels',
-    'https://www.googleapis.com/auth/gmail.compose',
-    'https://mail.google.com/',
-    'https://www.googleapis.com/auth/gmail.settings.basic',
-    'https://www.googleapis.com/auth/gmail.settings.sharing',
-    'https://www.googleapis.com/auth/calendar',
-    'https://www.googleapis.com/auth/calendar.events',
-    'https://www.googleapis.com/auth/calendar.readonly',
-    'https://www.googleapis.com/auth/calendar.settings.readonly',
-    'https://www.googleapis.com/auth/tasks',
-    'https://www.googleapis.com/auth/tasks.readonly'
-]
-
 def get_credentials():
-    """Get Google API credentials."""
-    creds = None
-    token_path = 'token.pickle'
-    client_secret_file = os.getenv('GOOGLE_CLIENT_SECRET_FILE')
-    
-    if not client_secret_file or not os.path.exists(client_secret_file):
-        raise ValueError(f"Client secret file not found. Please check GOOGLE_CLIENT_SECRET_FILE in .env")
-    
-    if os.path.exists(token_path):
-        with open(token_path, 'rb') as token:
-            creds = pickle.load(token)
-            
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(client_secret_file, SCOPES)
-            creds = flow.run_local_server(port=0)
-        with open(token_path, 'wb') as token:
-            pickle.dump(creds, token)
-            
-    return creds
+    """Get the shared Google API credentials, refreshed if they have expired."""
+    return get_service_registry().credentials()
 
-@lru_cache(maxsize=1)
 def get_services():
-    """Get Gmail and Calendar services."""
-    creds = get_credentials()
+    """Get the shared Gmail and Calendar services."""
     return {
-        'gmail': build('gmail', 'v1', credentials=creds),
-        'calendar': build('calendar', 'v3', credentials=creds)
+        'gmail': get_google_service('gmail', 'v1'),
+        'calendar': get_google_service('calendar', 'v3')
     }
 
 def gmail_messages_list(max_results: int = 10) -> str:
@@ -73,19 +30,9 @@ def gmail_messages_list(max_results: int = 10) -> str:
             userId='me', maxResults=max_results, labelIds=['INBOX']
         ).execute()
         
-        messages = []
-        for msg in results.get('messages', []):
-            message = service.users().messages().get(
-                userId='me', id=msg['id'], format='metadata'
-            ).execute()
-            headers = message['payload']['headers']
-            subject = next((h['value'] for h in headers if h['name'] == 'Subject'), 'No Subject')
-            sender = next((h['value'] for h in headers if h['name'] == 'From'), 'Unknown')
-            messages.append({
-                'id': msg['id'],
-                'subject': subject,
-                'from': sender
-            })
+        # Subject and sender for all listed messages, fetched in batches
+        message_ids = [msg['id'] for msg in results.get('messages', [])]
+        messages = summarize_messages(service, message_ids)
             
         return json.dumps(messages, indent=2)
     except Exception as e:
@@ -527,9 +474,8 @@ def gmail_threads_untrash(thread_id: str) -> str:
 
 # Tasks Functions
 def get_tasks_service():
-    """Get Tasks API service."""
-    creds = get_credentials()
-    return build('tasks', 'v1', credentials=creds)
+    """Get the shared Tasks API service."""
+    return get_google_service('tasks', 'v1')
 
 def tasks_tasklists_delete(tasklist_id: str) -> str:
     """Delete a task list."""
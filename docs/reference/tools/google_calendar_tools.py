@@ -6,16 +6,12 @@ import sys
 
 # Add the parent directory to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from tools.credentials_handler import get_credentials
-from googleapiclient.discovery import build
-from functools import lru_cache
+from tools.google_services import get_google_service
 import pytz
 
-@lru_cache(maxsize=1)
 def get_calendar_service():
-    """Get and cache the Calendar service."""
-    creds = get_credentials()
-    return build('calendar', 'v3', credentials=creds)
+    """Get the shared Calendar service."""
+    return get_google_service('calendar', 'v3')
 
 def list_events(max_results: int = 10, time_min: Optional[str] = None) -> str:
     """
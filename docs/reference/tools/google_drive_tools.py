@@ -2,19 +2,15 @@ import os
 import io
 import sys
 from typing import Optional, List, Dict, Any, Union
-from functools import lru_cache
-from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseDownload, MediaFileUpload
 
 # Add the parent directory to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from tools.credentials_handler import get_credentials
+from tools.google_services import get_google_service
 
-@lru_cache(maxsize=1)
 def get_drive_service():
-    """Get and cache the Google Drive service."""
-    creds = get_credentials()
-    return build('drive', 'v3', credentials=creds)
+    """Get the shared Google Drive service."""
+    return get_google_service('drive', 'v3')
 
 def list_files(
     max_results: int = 10,
@@ -16,18 +16,18 @@ import base64
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from typing import List, Dict, Optional, Any
-from googleapiclient.discovery import build
-from functools import lru_cache
 
 # Import from credentials handler using absolute path for direct testing
 try:
     # When imported as a module
-    from .credentials_handler import get_credentials
+    from .google_services import get_google_service
+    from .gmail_batch import summarize_messages
 except ImportError:
     # When run directly
     import sys
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    from tools.credentials_handler import get_credentials
+    from tools.google_services import get_google_service
+    from tools.gmail_batch import summarize_messages
 
 # Gmail-specific scopes
 GMAIL_SCOPES = [
@@ -41,11 +41,9 @@ GMAIL_SCOPES = [
     'https://www.googleapis.com/auth/gmail.settings.sharing'
 ]
 
-@lru_cache(maxsize=1)
 def get_gmail_service():
-    """Get and cache the Gmail service."""
-    creds = get_credentials()
-    return build('gmail', 'v1', credentials=creds)
+    """Get the shared Gmail service."""
+    return get_google_service('gmail', 'v1')
 
 # Gmail Draft Functions
 def gmail_drafts_get(draft_id: str) -> str:
@@ -343,21 +341,9 @@ def gmail_messages_list(max_results: int = 10) -> str:
             labelIds=['INBOX']
         ).execute()
         
-        messages = []
-        for msg in results.get('messages', []):
-            message = service.users().messages().get(
-                userId='me',
-                id=msg['id'],
-                format='metadata'
-            ).execute()
-            headers = message['payload']['headers']
-            subject = next((h['value'] for h in headers if h['name'] == 'Subject'), 'No Subject')
-            sender = next((h['value'] for h in headers if h['name'] == 'From'), 'Unknown')
-            messages.append({
-                'id': msg['id'],
-                'subject': subject,
-                'from': sender
-            })
+        # Subject and sender for all listed messages, fetched in batches
+        message_ids = [msg['id'] for msg in results.get('messages', [])]
+        messages = summarize_messages(service, message_ids)
             
         return json.dumps(messages, indent=2)
     except Exception as e:
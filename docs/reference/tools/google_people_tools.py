@@ -1,18 +1,14 @@
 import os
 import sys
 from typing import Optional, List, Dict, Any
-from functools import lru_cache
-from googleapiclient.discovery import build
 
 # Add the parent directory to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from tools.credentials_handler import get_credentials
+from tools.google_services import get_google_service
 
-@lru_cache(maxsize=1)
 def get_people_service():
-    """Get and cache the Google People service."""
-    creds = get_credentials()
-    return build('people', 'v1', credentials=creds)
+    """Get the shared Google People service."""
+    return get_google_service('people', 'v1')
 
 # Contact Management Functions
 def people_contact_create(
@@ -0,0 +1,199 @@
+"""
+Shared Google API service registry.
+
+Every google_*_tools module gets its service objects from here instead of
+building its own. Service objects are built once per API and shared, but
+each worker thread sends requests over its own httplib2 transport, since
+httplib2.Http is not thread-safe. All transports share one set of
+credentials behind a lock, held for every refresh, including the ones
+AuthorizedHttp makes before a request or after a 401, so concurrent
+callers do not race to refresh the same token.
+
+Coroutines can use execute_async() to run a request on a bounded executor
+instead of blocking the event loop.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import google_auth_httplib2
+import httplib2
+from google.auth.transport.requests import Request
+from googleapiclient.discovery import build
+from googleapiclient.http import HttpRequest
+
+try:
+    from .credentials_handler import get_credentials
+except ImportError:
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from tools.credentials_handler import get_credentials
+
+logger = logging.getLogger(__name__)
+
+# Worker threads available to execute_async()
+GOOGLE_API_MAX_WORKERS = int(os.getenv("GOOGLE_API_MAX_WORKERS", "8"))
+
+# Socket timeout for each transport, in seconds
+GOOGLE_API_TIMEOUT = float(os.getenv("GOOGLE_API_TIMEOUT", "60"))
+
+class _LockedCredentials:
+    """Proxy for shared credentials that refreshes them only while holding a lock."""
+
+    def __init__(self, credentials, lock: threading.Lock):
+        self._credentials = credentials
+        self._lock = lock
+
+    def before_request(self, request, method, url, headers):
+        # Refreshes the token first if it has expired
+        with self._lock:
+            self._credentials.before_request(request, method, url, headers)
+
+    def refresh(self, request):
+        with self._lock:
+            self._credentials.refresh(request)
+
+    def __getattr__(self, name):
+        return getattr(self._credentials, name)
+
+class GoogleServiceRegistry:
+    """Builds Google API services once and gives each thread its own transport."""
+
+    def __init__(
+        self,
+        credentials_provider: Callable[[], Any] = get_credentials,
+        max_workers: int = GOOGLE_API_MAX_WORKERS,
+        timeout: float = GOOGLE_API_TIMEOUT
+    ):
+        """Initialize the registry.
+
+        Args:
+            credentials_provider: Returns the shared Google credentials
+            max_workers: Size of the executor used by execute_async()
+            timeout: Socket timeout for each transport, in seconds
+        """
+        self._credentials_provider = credentials_provider
+        self._credentials = None
+        self._credentials_lock = threading.Lock()
+        self._locked_credentials: Optional[_LockedCredentials] = None
+        self._services: Dict[Tuple[str, str], Any] = {}
+        self._services_lock = threading.Lock()
+        self._local = threading.local()
+        self._max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.timeout = timeout
+
+    # Credentials
+
+    def credentials(self):
+        """Get the shared credentials, refreshing them first if they have expired."""
+        with self._credentials_lock:
+            if self._credentials is None:
+                self._credentials = self._credentials_provider()
+            creds = self._credentials
+            if not creds.valid and getattr(creds, "refresh_token", None):
+                logger.debug("Refreshing Google API credentials")
+                creds.refresh(Request())
+            return creds
+
+    def _transport_credentials(self) -> _LockedCredentials:
+        """The shared credentials as given to transports, refreshing under the credentials lock."""
+        if self._locked_credentials is None:
+            credentials = self.credentials()
+            with self._credentials_lock:
+                if self._locked_credentials is None:
+                    self._locked_credentials = _LockedCredentials(credentials, self._credentials_lock)
+        return self._locked_credentials
+
+    # Transports and services
+
+    def http(self) -> google_auth_httplib2.AuthorizedHttp:
+        """Get the calling thread's authorized transport, creating it on first use."""
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = google_auth_httplib2.AuthorizedHttp(
+                self._transport_credentials(), http=httplib2.Http(timeout=self.timeout)
+            )
+            self._local.http = http
+        return http
+
+    def _build_request(self, http, *args, **kwargs) -> HttpRequest:
+        """requestBuilder for shared services: bind each request to the caller's transport."""
+        return HttpRequest(self.http(), *args, **kwargs)
+
+    def service(self, api: str, version: str):
+        """Get the shared service object for an API.
+
+        Args:
+            api: API name, e.g. 'gmail'
+            version: API version, e.g. 'v1'
+        """
+        key = (api, version)
+        service = self._services.get(key)
+        if service is None:
+            with self._services_lock:
+                service = self._services.get(key)
+                if service is None:
+                    service = build(
+                        api, version,
+                        http=self.http(),
+                        requestBuilder=self._build_request,
+                        cache_discovery=False
+                    )
+                    self._services[key] = service
+        return service
+
+    # Execution
+
+    def execute(self, request, **kwargs) -> Any:
+        """Execute a request on the calling thread's transport.
+
+        Requests are bound to the transport of the thread that built them;
+        this rebinds them, so a request built on one thread can safely be
+        executed on another.
+        """
+        self.credentials()
+        return request.execute(http=self.http(), **kwargs)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._services_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self._max_workers, thread_name_prefix="google-api"
+                    )
+        return self._executor
+
+    async def execute_async(self, request, **kwargs) -> Any:
+        """Execute a request on the bounded executor without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), lambda: self.execute(request, **kwargs))
+
+    async def run_async(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking Google tool function on the bounded executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), lambda: func(*args, **kwargs))
+
+    def close(self) -> None:
+        """Shut down the executor. Services and transports are rebuilt on demand."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+@lru_cache(maxsize=1)
+def get_service_registry() -> GoogleServiceRegistry:
+    """Get the process-wide service registry."""
+    return GoogleServiceRegistry()
+
+def get_google_service(api: str, version: str):
+    """Get the shared service object for an API from the process-wide registry."""
+    return get_service_registry().service(api, version)
+
+async def execute_async(request, **kwargs) -> Any:
+    """Execute a Google API request without blocking the event loop."""
+    return await get_service_registry().execute_async(request, **kwargs)
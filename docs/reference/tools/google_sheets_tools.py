@@ -1,18 +1,14 @@
 import os
 from typing import Optional, List, Dict, Any, Union
-from functools import lru_cache
-from googleapiclient.discovery import build
 import sys
 
 # Add the parent directory to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from tools.credentials_handler import get_credentials
+from tools.google_services import get_google_service
 
-@lru_cache(maxsize=1)
 def get_service():
-    """Get and cache the Google Sheets service."""
-    creds = get_credentials()
-    return build('sheets', 'v4', credentials=creds)
+    """Get the shared Google Sheets service."""
+    return get_google_service('sheets', 'v4')
 
 def create_spreadsheet(title: str) -> str:
     """
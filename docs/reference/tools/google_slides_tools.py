@@ -2,18 +2,14 @@ import os
 import sys
 import time
 from typing import Optional, List, Dict, Any, Union
-from functools import lru_cache
-from googleapiclient.discovery import build
 
 # Add the parent directory to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from tools.credentials_handler import get_credentials
+from tools.google_services import get_google_service
 
-@lru_cache(maxsize=1)
 def get_slides_service():
-    """Get and cache the Google Slides service."""
-    creds = get_credentials()
-    return build('slides', 'v1', credentials=creds)
+    """Get the shared Google Slides service."""
+    return get_google_service('slides', 'v1')
 
 def create_presentation(title: str) -> str:
     """Create a new blank presentation."""
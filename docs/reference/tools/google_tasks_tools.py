@@ -2,18 +2,14 @@ import os
 import sys
 import json
 from typing import Optional, List, Dict, Any
-from functools import lru_cache
-from googleapiclient.discovery import build
 
 # Add the parent directory to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from tools.credentials_handler import get_credentials
+from tools.google_services import get_google_service
 
-@lru_cache(maxsize=1)
 def get_tasks_service():
-    """Get and cache the Google Tasks service."""
-    creds = get_credentials()
-    return build('tasks', 'v1', credentials=creds)
+    """Get the shared Google Tasks service."""
+    return get_google_service('tasks', 'v1')
 
 # Task List Functions
 def tasks_tasklists_delete(tasklist_id: str) -> str:
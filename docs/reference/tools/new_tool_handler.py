@@ -1,5 +1,6 @@
 import asyncio
 import json
+import os
 from functools import lru_cache
 from .file_tools import read_file, write_file, list_files
 from tenacity import retry, stop_after_attempt, wait_exponential
@@ -47,11 +48,12 @@ from .firecrawl_tools import (
     batch_scrape
 )
 from .browser_tools import browse_web
+from .tool_cache import cached_function_map
 
 # Cache the function mapping
 @lru_cache(maxsize=1)
 def get_function_map():
-    return {
+    return cached_function_map({
         "read_file": read_file,
         "write_file": write_file,
         "list_files": list_files,
@@ -111,37 +113,58 @@ def get_function_map():
         "map_url": map_url,
         "batch_scrape": batch_scrape,
         "browse_web": browse_web,
-    }
+    })
+
+# Seconds a tool may run before its output is replaced by a timeout error
+DEFAULT_TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT_SECONDS", "60"))
+TOOL_TIMEOUTS = {
+    "crawl_url": 300,
+    "batch_scrape": 300,
+    "browse_web": 180,
+    "execute_code": 120,
+    "execute_python_with_vars": 120,
+}
+
+async def _execute_tool_call(tool_call, function_map: Dict[str, Any]) -> str:
+    """Run a single tool call with its timeout, turning any failure into an output string."""
+    function_name = tool_call.function.name
+    if function_name not in function_map:
+        return f"Function {function_name} not found"
+        
+    timeout = TOOL_TIMEOUTS.get(function_name, DEFAULT_TOOL_TIMEOUT)
+    try:
+        function_args = json.loads(tool_call.function.arguments)
+        func = function_map[function_name]
+        # Check if the function is async; sync tools run in a worker thread
+        if asyncio.iscoroutinefunction(func):
+            call = func(**function_args)
+        else:
+            call = asyncio.to_thread(func, **function_args)
+        return await asyncio.wait_for(call, timeout=timeout)
+    except asyncio.TimeoutError:
+        return f"Error executing {function_name}: timed out after {timeout:.0f} seconds"
+    except Exception as e:
+        return f"Error executing {function_name}: {str(e)}"
 
 @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
 async def handle_tool_calls(run: Run) -> List[Dict[str, Any]]:
     """
     Handle tool calls from the assistant.
+    
+    All tool calls in the step run concurrently, each with its own timeout.
+    Outputs are returned in the order of the tool calls.
     """
-    tool_outputs = []
+    tool_calls = run.required_action.submit_tool_outputs.tool_calls
     function_map = get_function_map()
     
-    for tool_call in run.required_action.submit_tool_outputs.tool_calls:
-        function_name = tool_call.function.name
-        function_args = json.loads(tool_call.function.arguments)
-        
-        if function_name in function_map:
-            try:
-                func = function_map[function_name]
-                # Check if the function is async
-                if asyncio.iscoroutinefunction(func):
-                    output = await func(**function_args)
-                else:
-                    output = func(**function_args)
-                    
-                tool_outputs.append({
-                    "tool_call_id": tool_call.id,
-                    "output": output
-                })
-            except Exception as e:
-                tool_outputs.append({
-                    "tool_call_id": tool_call.id,
-                    "output": f"Error executing {function_name}: {str(e)}"
-                })
+    outputs = await asyncio.gather(
+        *(_execute_tool_call(tool_call, function_map) for tool_call in tool_calls)
+    )
     
-    return tool_outputs
\ No newline at end of file
+    return [
+        {
+            "tool_call_id": tool_call.id,
+            "output": output
+        }
+        for tool_call, output in zip(tool_calls, outputs)
+    ]
@@ -0,0 +1,296 @@
+"""Result cache for read-only tools.
+
+Tools listed in TOOL_CACHE_RULES have their results cached by tool name and
+normalised arguments, each with its own TTL. The cache is a size-bounded LRU.
+Tools listed in TOOL_INVALIDATIONS drop the cached results of every tool in
+the groups they touch, so a read after a write always goes to the API. A
+read that was already running when a write invalidated its group returns
+its result but does not cache it, as it may predate the write.
+"""
+
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class CacheRule:
+    """How long a tool's results stay valid, and which group they belong to."""
+    ttl: float
+    group: Optional[str] = None
+
+# Read-only tools whose results can be reused
+TOOL_CACHE_RULES: Dict[str, CacheRule] = {
+    # Gmail
+    "gmail_labels_list": CacheRule(ttl=300, group="gmail_labels"),
+    "gmail_labels_get": CacheRule(ttl=300, group="gmail_labels"),
+    "gmail_settings_filters_list": CacheRule(ttl=300, group="gmail_filters"),
+    "gmail_settings_filters_get": CacheRule(ttl=300, group="gmail_filters"),
+    "gmail_settings_get_vacation": CacheRule(ttl=300, group="gmail_settings"),
+    "gmail_settings_get_autoforwarding": CacheRule(ttl=300, group="gmail_settings"),
+    "gmail_messages_list": CacheRule(ttl=60, group="gmail_messages"),
+    "gmail_messages_get": CacheRule(ttl=300, group="gmail_messages"),
+    "gmail_threads_list": CacheRule(ttl=60, group="gmail_messages"),
+    "gmail_threads_get": CacheRule(ttl=300, group="gmail_messages"),
+    "gmail_drafts_list": CacheRule(ttl=60, group="gmail_drafts"),
+    "gmail_drafts_get": CacheRule(ttl=60, group="gmail_drafts"),
+
+    # Calendar
+    "calendar_colors_get": CacheRule(ttl=86400),
+    "calendar_events_list": CacheRule(ttl=60, group="calendar_events"),
+    "calendar_events_get": CacheRule(ttl=60, group="calendar_events"),
+    "calendar_events_instances": CacheRule(ttl=60, group="calendar_events"),
+
+    # Tasks
+    "tasks_tasklists_list": CacheRule(ttl=300, group="tasklists"),
+    "tasks_tasklists_get": CacheRule(ttl=300, group="tasklists"),
+    "tasks_list": CacheRule(ttl=60, group="tasks"),
+    "tasks_get": CacheRule(ttl=60, group="tasks"),
+
+    # Sheets
+    "get_spreadsheet_info": CacheRule(ttl=120, group="spreadsheets"),
+    "read_range": CacheRule(ttl=60, group="spreadsheets"),
+
+    # Search
+    "searxng_search": CacheRule(ttl=600),
+    "search_local_documents": CacheRule(ttl=300, group="local_documents"),
+}
+
+# Mutating tools and the cache groups they make stale
+TOOL_INVALIDATIONS: Dict[str, Tuple[str, ...]] = {
+    "gmail_labels_create": ("gmail_labels",),
+    "gmail_labels_delete": ("gmail_labels", "gmail_messages"),
+    # Messages and threads carry their labels' names
+    "gmail_labels_modify": ("gmail_labels", "gmail_messages"),
+    "gmail_settings_filters_create": ("gmail_filters",),
+    "gmail_settings_filters_delete": ("gmail_filters",),
+    "gmail_settings_update_vacation": ("gmail_settings",),
+    "gmail_settings_update_autoforwarding": ("gmail_settings",),
+    "gmail_messages_create": ("gmail_messages",),
+    "gmail_messages_delete": ("gmail_messages",),
+    "gmail_messages_import": ("gmail_messages",),
+    "gmail_messages_send": ("gmail_messages",),
+    "gmail_messages_trash": ("gmail_messages",),
+    "gmail_messages_untrash": ("gmail_messages",),
+    "gmail_messages_batch_delete": ("gmail_messages",),
+    "gmail_threads_delete": ("gmail_messages",),
+    "gmail_threads_trash": ("gmail_messages",),
+    "gmail_threads_untrash": ("gmail_messages",),
+    "gmail_drafts_create": ("gmail_drafts",),
+    "gmail_drafts_update": ("gmail_drafts",),
+    "gmail_drafts_delete": ("gmail_drafts",),
+    "gmail_drafts_send": ("gmail_drafts", "gmail_messages"),
+    "send_email": ("gmail_messages",),
+    "manage_labels": ("gmail_labels", "gmail_messages"),
+    "manage_drafts": ("gmail_drafts",),
+    "manage_threads": ("gmail_messages",),
+    "batch_modify_messages": ("gmail_messages",),
+
+    "calendar_events_create": ("calendar_events",),
+    "calendar_events_update": ("calendar_events",),
+    "calendar_events_patch": ("calendar_events",),
+    "calendar_events_delete": ("calendar_events",),
+    "calendar_events_move": ("calendar_events",),
+    "calendar_events_quick_add": ("calendar_events",),
+
+    "tasks_tasklists_insert": ("tasklists",),
+    "tasks_tasklists_update": ("tasklists",),
+    "tasks_tasklists_patch": ("tasklists",),
+    "tasks_tasklists_delete": ("tasklists", "tasks"),
+    "tasks_insert": ("tasks",),
+    "tasks_update": ("tasks",),
+    "tasks_patch": ("tasks",),
+    "tasks_move": ("tasks",),
+    "tasks_delete": ("tasks",),
+    "tasks_clear": ("tasks",),
+
+    "create_spreadsheet": ("spreadsheets",),
+    "write_range": ("spreadsheets",),
+    "append_values": ("spreadsheets",),
+    "clear_range": ("spreadsheets",),
+    "batch_update": ("spreadsheets",),
+
+    "ingest_documents": ("local_documents",),
+}
+
+class ToolResultCache:
+    """Thread-safe LRU cache of tool results with per-entry expiry."""
+
+    def __init__(self, max_entries: int = 256):
+        """Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of cached results; 0 disables caching
+        """
+        self.max_entries = max_entries
+        # key -> (expires_at, result, group)
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any, Optional[str]]]" = OrderedDict()
+        self._groups: Dict[str, set] = {}
+        # group -> number of times it was invalidated
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Look up a result.
+
+        Returns:
+            (True, result) on a fresh hit, (False, None) otherwise
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, result, group = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                return False, None
+            self._entries.move_to_end(key)
+            return True, result
+
+    def generation(self, group: Optional[str]) -> int:
+        """The group's invalidation count, to pass to put() for a result read afterwards."""
+        with self._lock:
+            return self._generations.get(group, 0)
+
+    def put(
+        self,
+        key: Hashable,
+        result: Any,
+        ttl: float,
+        group: Optional[str] = None,
+        generation: Optional[int] = None
+    ) -> None:
+        """Store a result for ttl seconds, evicting the least recently used entries.
+
+        Args:
+            key: Cache key
+            result: Result to cache
+            ttl: Seconds the result stays valid
+            group: Invalidation group of the result
+            generation: The group's generation() from before the result was read;
+                the result is dropped if the group was invalidated since
+        """
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generations.get(group, 0):
+                return
+            self._entries[key] = (time.monotonic() + ttl, result, group)
+            self._entries.move_to_end(key)
+            if group:
+                self._groups.setdefault(group, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: Hashable) -> None:
+        """Drop one entry and its group membership. Caller holds the lock."""
+        _, _, group = self._entries.pop(key)
+        if group and group in self._groups:
+            self._groups[group].discard(key)
+
+    def invalidate_groups(self, groups: Iterable[str]) -> None:
+        """Drop every cached result in the given groups."""
+        with self._lock:
+            for group in groups:
+                self._generations[group] = self._generations.get(group, 0) + 1
+                for key in self._groups.pop(group, ()):
+                    self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop all cached results."""
+        with self._lock:
+            self._entries.clear()
+            self._groups.clear()
+
+tool_cache = ToolResultCache(max_entries=int(os.getenv("TOOL_CACHE_SIZE", "256")))
+
+def _cache_key(name: str, func: Callable, kwargs: Dict[str, Any]) -> Hashable:
+    """Build a key from the tool name and its arguments with defaults filled in.
+
+    Calls that only differ in spelling out a default value, or in argument
+    order, share a key.
+    """
+    try:
+        bound = inspect.signature(func).bind(**kwargs)
+        bound.apply_defaults()
+        args = bound.arguments
+    except (TypeError, ValueError):
+        args = kwargs
+    return name, json.dumps(args, sort_keys=True, default=str)
+
+def _is_error(result: Any) -> bool:
+    """Tools report most failures as strings; those are not worth caching."""
+    return isinstance(result, str) and result.lstrip().lower().startswith("error")
+
+def cached_tool(name: str, func: Callable, cache: ToolResultCache = tool_cache) -> Callable:
+    """Wrap a tool with caching or invalidation according to the rules above.
+
+    Tools without a rule are returned unchanged. Async tools stay async.
+    """
+    rule = TOOL_CACHE_RULES.get(name)
+    invalidates = TOOL_INVALIDATIONS.get(name)
+    if rule is None and invalidates is None:
+        return func
+
+    def lookup(kwargs):
+        key = _cache_key(name, func, kwargs)
+        hit, result = cache.get(key)
+        if hit:
+            logger.debug(f"Tool cache hit: {name}")
+        # Taken before the call, so a write that lands during it keeps the result out
+        return key, hit, result, cache.generation(rule.group)
+
+    def record(key, result, generation):
+        if rule is not None and not _is_error(result):
+            cache.put(key, result, rule.ttl, rule.group, generation)
+
+    def invalidate():
+        # Also on failure: a failed write may still have changed something
+        if invalidates:
+            cache.invalidate_groups(invalidates)
+
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(**kwargs):
+            if rule is not None:
+                key, hit, result, generation = lookup(kwargs)
+                if hit:
+                    return result
+            else:
+                key = generation = None
+            try:
+                result = await func(**kwargs)
+            finally:
+                invalidate()
+            record(key, result, generation)
+            return result
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(**kwargs):
+        if rule is not None:
+            key, hit, result, generation = lookup(kwargs)
+            if hit:
+                return result
+        else:
+            key = generation = None
+        try:
+            result = func(**kwargs)
+        finally:
+            invalidate()
+        record(key, result, generation)
+        return result
+    return wrapper
+
+def cached_function_map(function_map: Dict[str, Callable], cache: ToolResultCache = tool_cache) -> Dict[str, Callable]:
+    """Apply cached_tool to every entry of a tool function map."""
+    return {name: cached_tool(name, func, cache) for name, func in function_map.items()}
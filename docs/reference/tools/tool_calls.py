@@ -0,0 +1,215 @@
+"""
+Native tool calling across providers.
+
+Conversations are kept as a list of provider-neutral messages in the OpenAI
+chat shape:
+
+    {"role": "user", "content": "..."}
+    {"role": "assistant", "content": "...", "tool_calls": [ToolCall, ...]}
+    {"role": "tool", "tool_call_id": "...", "name": "...", "content": "..."}
+
+and converted to each provider's wire format just before a request. Tool
+calls come back as structured ToolCall objects, so a single model response
+can request several tools and all of them are dispatched in one round-trip.
+"""
+
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+@dataclass
+class ToolCall:
+    """One tool invocation requested by the model."""
+    id: str
+    name: str
+    arguments: Dict[str, Any] = field(default_factory=dict)
+
+@dataclass
+class AssistantTurn:
+    """A model response: its text and any tool calls it requested."""
+    text: str = ""
+    tool_calls: List[ToolCall] = field(default_factory=list)
+
+    def message(self) -> Dict[str, Any]:
+        """The neutral assistant message to append to the conversation."""
+        message = {"role": "assistant", "content": self.text}
+        if self.tool_calls:
+            message["tool_calls"] = list(self.tool_calls)
+        return message
+
+class ChatStream:
+    """Iterates a response's text deltas; .turn holds the AssistantTurn once exhausted."""
+
+    def __init__(self, generator: Iterator[str]):
+        """Wrap a generator that yields text and returns an AssistantTurn."""
+        self._generator = generator
+        self.turn: Optional[AssistantTurn] = None
+
+    def __iter__(self) -> Iterator[str]:
+        self.turn = yield from self._generator
+
+def tool_result_messages(tool_calls: Sequence[ToolCall], results: Sequence[Any]) -> List[Dict[str, Any]]:
+    """Neutral tool messages carrying each call's result, in call order."""
+    return [
+        {"role": "tool", "tool_call_id": call.id, "name": call.name, "content": str(result)}
+        for call, result in zip(tool_calls, results)
+    ]
+
+def flatten_messages(messages: Sequence[Dict[str, Any]]) -> str:
+    """Render a conversation as one prompt for providers without a chat API."""
+    parts = []
+    for message in messages:
+        role = message["role"]
+        if role == "system":
+            parts.append(message["content"])
+        elif role == "tool":
+            parts.append(f"Tool result ({message['name']}): {message['content']}")
+        else:
+            parts.append(f"{role.capitalize()}: {message['content']}")
+    return "\n\n".join(parts)
+
+def _parse_arguments(arguments: Any) -> Dict[str, Any]:
+    """Arguments arrive as a dict (Ollama, Anthropic) or a JSON string (OpenAI)."""
+    if isinstance(arguments, dict):
+        return arguments
+    if not arguments:
+        return {}
+    try:
+        parsed = json.loads(arguments)
+    except json.JSONDecodeError:
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+# OpenAI
+
+def to_openai_messages(messages: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Convert neutral messages to OpenAI chat messages."""
+    converted = []
+    for message in messages:
+        if message["role"] == "assistant" and message.get("tool_calls"):
+            converted.append({
+                "role": "assistant",
+                "content": message.get("content") or None,
+                "tool_calls": [
+                    {
+                        "id": call.id,
+                        "type": "function",
+                        "function": {"name": call.name, "arguments": json.dumps(call.arguments)}
+                    }
+                    for call in message["tool_calls"]
+                ]
+            })
+        elif message["role"] == "tool":
+            converted.append({"role": "tool", "tool_call_id": message["tool_call_id"], "content": message["content"]})
+        else:
+            converted.append({"role": message["role"], "content": message["content"]})
+    return converted
+
+def parse_openai_tool_calls(tool_calls: Optional[Sequence[Any]]) -> List[ToolCall]:
+    """Convert the tool_calls of an OpenAI chat completion message."""
+    return [
+        ToolCall(id=call.id, name=call.function.name, arguments=_parse_arguments(call.function.arguments))
+        for call in tool_calls or []
+    ]
+
+# Anthropic
+
+def to_anthropic_tools(definitions: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Convert OpenAI-style function definitions to Anthropic tools."""
+    return [
+        {
+            "name": d["function"]["name"],
+            "description": d["function"].get("description", ""),
+            "input_schema": d["function"].get("parameters") or {"type": "object", "properties": {}}
+        }
+        for d in definitions
+        if d.get("type") == "function"
+    ]
+
+def to_anthropic_messages(messages: Sequence[Dict[str, Any]]) -> Tuple[str, List[Dict[str, Any]]]:
+    """Convert neutral messages to an Anthropic system prompt and message list.
+
+    Consecutive tool results, and any user text after them, are merged into
+    one user message, as Anthropic requires all results for a turn's
+    tool_use blocks to arrive together.
+    """
+    system_parts = []
+    converted: List[Dict[str, Any]] = []
+
+    def tool_results():
+        """The previous message if it is a user turn of tool results."""
+        previous = converted[-1] if converted else None
+        if previous and previous["role"] == "user" and isinstance(previous["content"], list) \
+                and previous["content"] and previous["content"][0].get("type") == "tool_result":
+            return previous["content"]
+        return None
+
+    for message in messages:
+        role = message["role"]
+        if role == "system":
+            system_parts.append(message["content"])
+        elif role == "tool":
+            block = {"type": "tool_result", "tool_use_id": message["tool_call_id"], "content": message["content"]}
+            if tool_results() is not None:
+                tool_results().append(block)
+            else:
+                converted.append({"role": "user", "content": [block]})
+        elif role == "user" and tool_results() is not None:
+            # A note after tool results belongs to the same user turn
+            tool_results().append({"type": "text", "text": message["content"]})
+        elif role == "assistant" and message.get("tool_calls"):
+            blocks = [{"type": "text", "text": message["content"]}] if message.get("content") else []
+            blocks.extend(
+                {"type": "tool_use", "id": call.id, "name": call.name, "input": call.arguments}
+                for call in message["tool_calls"]
+            )
+            converted.append({"role": "assistant", "content": blocks})
+        else:
+            converted.append({"role": role, "content": message["content"]})
+    return "\n\n".join(system_parts), converted
+
+def parse_anthropic_content(blocks: Sequence[Any]) -> AssistantTurn:
+    """Convert the content blocks of an Anthropic message."""
+    turn = AssistantTurn()
+    for block in blocks:
+        if block.type == "text":
+            turn.text += block.text
+        elif block.type == "tool_use":
+            turn.tool_calls.append(ToolCall(id=block.id, name=block.name, arguments=dict(block.input or {})))
+    return turn
+
+# Ollama
+
+def to_ollama_messages(messages: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Convert neutral messages to Ollama /api/chat messages."""
+    converted = []
+    for message in messages:
+        if message["role"] == "assistant" and message.get("tool_calls"):
+            converted.append({
+                "role": "assistant",
+                "content": message.get("content", ""),
+                "tool_calls": [
+                    {"function": {"name": call.name, "arguments": call.arguments}}
+                    for call in message["tool_calls"]
+                ]
+            })
+        elif message["role"] == "tool":
+            converted.append({"role": "tool", "content": message["content"], "tool_name": message["name"]})
+        else:
+            converted.append({"role": message["role"], "content": message["content"]})
+    return converted
+
+def parse_ollama_tool_calls(message: Dict[str, Any], start: int = 0) -> List[ToolCall]:
+    """Convert the tool_calls of an Ollama chat message.
+
+    Ollama does not always return call ids, so missing ones are numbered
+    from start.
+    """
+    return [
+        ToolCall(
+            id=call.get("id") or f"call_{start + i}",
+            name=call["function"]["name"],
+            arguments=_parse_arguments(call["function"].get("arguments"))
+        )
+        for i, call in enumerate(message.get("tool_calls") or [])
+    ]
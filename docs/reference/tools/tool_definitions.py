@@ -305,6 +305,106 @@ def get_tool_definitions():
                 }
             }
         },
+        {
+            "type": "function",
+            "function": {
+                "name": "gmail_mirror_sync",
+                "description": "Synchronise the local Gmail mirror with the mailbox (incremental unless full is set)",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "full": {
+                            "type": "boolean",
+                            "description": "Re-list the whole mailbox instead of applying changes since the last sync (default: false)"
+                        }
+                    },
+                    "required": [],
+                    "additionalProperties": False
+                }
+            }
+        },
+        {
+            "type": "function",
+            "function": {
+                "name": "gmail_mirror_search",
+                "description": "Search emails in the local Gmail mirror by text, sender, label and date; faster than listing through the API",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "query": {
+                            "type": "string",
+                            "description": "Words to match in subject, sender or body"
+                        },
+                        "sender": {
+                            "type": "string",
+                            "description": "Part of the sender address or name"
+                        },
+                        "label": {
+                            "type": "string",
+                            "description": "Label ID the email must have (e.g. 'INBOX', 'UNREAD', 'STARRED')"
+                        },
+                        "after": {
+                            "type": "string",
+                            "description": "Only emails on or after this date (YYYY-MM-DD)"
+                        },
+                        "before": {
+                            "type": "string",
+                            "description": "Only emails before this date (YYYY-MM-DD)"
+                        },
+                        "max_results": {
+                            "type": "integer",
+                            "description": "Maximum number of emails to return (default: 20)"
+                        }
+                    },
+                    "required": [],
+                    "additionalProperties": False
+                }
+            }
+        },
+        {
+            "type": "function",
+            "function": {
+                "name": "gmail_mirror_get",
+                "description": "Get an email with its full text body from the local Gmail mirror",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "message_id": {
+                            "type": "string",
+                            "description": "ID of the email"
+                        }
+                    },
+                    "required": ["message_id"],
+                    "additionalProperties": False
+                }
+            }
+        },
+        {
+            "type": "function",
+            "function": {
+                "name": "gmail_mirror_summary",
+                "description": "Summarise a mailbox label from the local Gmail mirror: totals, unread count, top senders and latest emails",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "label": {
+                            "type": "string",
+                            "description": "Label ID to summarise (default: 'INBOX'; empty string for all mail)"
+                        },
+                        "days": {
+                            "type": "integer",
+                            "description": "Only include emails from the last N days"
+                        },
+                        "top": {
+                            "type": "integer",
+                            "description": "Number of top senders and latest emails to list (default: 10)"
+                        }
+                    },
+                    "required": [],
+                    "additionalProperties": False
+                }
+            }
+        },
         {
             "type": "function",
             "function": {
@@ -1,107 +1,146 @@
 import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from functools import lru_cache
-from .file_tools import read_file, write_file, list_files, open_container_cli
 from tenacity import retry, stop_after_attempt, wait_exponential
-from typing import List, Dict, Any, Optional
-from openai.types.beta.threads import Run
-from .perplexity_api_tools import perplexity_chat
-from .google_api_tools import (
-    # Core functions
-    get_credentials, get_services,
-    
+from typing import List, Dict, Any, Optional, Sequence, Set, Tuple, TYPE_CHECKING
+from .tool_cache import cached_function_map
+from .tool_registry import ToolRegistry
+
+if TYPE_CHECKING:
+    from openai.types.beta.threads import Run
+
+# Tool name -> "module:function". Modules are imported on a tool's first
+# call, so importing this package does not load every API client.
+TOOL_IMPORTS = {
+    # Time functions
+    "get_current_datetime": ".time_tools:get_current_datetime",
+
+    # Core file functions
+    "read_file": ".file_tools:read_file",
+    "write_file": ".file_tools:write_file",
+    "list_files": ".file_tools:list_files",
+
+    # Container CLI function
+    "open_container_cli": ".file_tools:open_container_cli",
+
+    "perplexity_chat": ".perplexity_api_tools:perplexity_chat",
+
     # Gmail Draft functions
-    gmail_drafts_get,
-    gmail_drafts_list,
-    gmail_drafts_send,
-    gmail_drafts_update,
-    gmail_drafts_create,
-    gmail_drafts_delete,
-    
+    "gmail_drafts_get": ".google_api_tools:gmail_drafts_get",
+    "gmail_drafts_list": ".google_api_tools:gmail_drafts_list",
+    "gmail_drafts_send": ".google_api_tools:gmail_drafts_send",
+    "gmail_drafts_update": ".google_api_tools:gmail_drafts_update",
+    "gmail_drafts_create": ".google_api_tools:gmail_drafts_create",
+    "gmail_drafts_delete": ".google_api_tools:gmail_drafts_delete",
+
     # Gmail History functions
-    gmail_history_list,
-    
+    "gmail_history_list": ".google_api_tools:gmail_history_list",
+
+    # Gmail mirror functions
+    "gmail_mirror_sync": ".gmail_mirror:gmail_mirror_sync",
+    "gmail_mirror_search": ".gmail_mirror:gmail_mirror_search",
+    "gmail_mirror_get": ".gmail_mirror:gmail_mirror_get",
+    "gmail_mirror_summary": ".gmail_mirror:gmail_mirror_summary",
+
     # Gmail Labels functions
-    gmail_labels_create,
-    gmail_labels_delete,
-    gmail_labels_get,
-    gmail_labels_list,
-    gmail_labels_modify,
-    
+    "gmail_labels_create": ".google_api_tools:gmail_labels_create",
+    "gmail_labels_delete": ".google_api_tools:gmail_labels_delete",
+    "gmail_labels_get": ".google_api_tools:gmail_labels_get",
+    "gmail_labels_list": ".google_api_tools:gmail_labels_list",
+    "gmail_labels_modify": ".google_api_tools:gmail_labels_modify",
+
     # Gmail Messages functions
-    gmail_messages_create,
-    gmail_messages_delete,
-    gmail_messages_import,
-    gmail_messages_list,
-    gmail_messages_send,
-    gmail_messages_trash,
-    gmail_messages_untrash,
-    gmail_messages_batch_delete,
-    gmail_messages_get,
-    gmail_messages_attachments_get,
-    
+    "gmail_messages_create": ".google_api_tools:gmail_messages_create",
+    "gmail_messages_delete": ".google_api_tools:gmail_messages_delete",
+    "gmail_messages_import": ".google_api_tools:gmail_messages_import",
+    "gmail_messages_list": ".google_api_tools:gmail_messages_list",
+    "gmail_messages_send": ".google_api_tools:gmail_messages_send",
+    "gmail_messages_trash": ".google_api_tools:gmail_messages_trash",
+    "gmail_messages_untrash": ".google_api_tools:gmail_messages_untrash",
+    "gmail_messages_batch_delete": ".google_api_tools:gmail_messages_batch_delete",
+    "gmail_messages_get": ".google_api_tools:gmail_messages_get",
+    "gmail_messages_attachments_get": ".google_api_tools:gmail_messages_attachments_get",
+
     # Gmail Settings functions
-    gmail_settings_get_autoforwarding,
-    gmail_settings_update_autoforwarding,
-    gmail_settings_update_vacation,
-    gmail_settings_get_vacation,
-    
+    "gmail_settings_get_autoforwarding": ".google_api_tools:gmail_settings_get_autoforwarding",
+    "gmail_settings_update_autoforwarding": ".google_api_tools:gmail_settings_update_autoforwarding",
+    "gmail_settings_update_vacation": ".google_api_tools:gmail_settings_update_vacation",
+    "gmail_settings_get_vacation": ".google_api_tools:gmail_settings_get_vacation",
+
     # Gmail Settings Filters functions
-    gmail_settings_filters_create,
-    gmail_settings_filters_delete,
-    gmail_settings_filters_get,
-    gmail_settings_filters_list,
-    
+    "gmail_settings_filters_create": ".google_api_tools:gmail_settings_filters_create",
+    "gmail_settings_filters_delete": ".google_api_tools:gmail_settings_filters_delete",
+    "gmail_settings_filters_get": ".google_api_tools:gmail_settings_filters_get",
+    "gmail_settings_filters_list": ".google_api_tools:gmail_settings_filters_list",
+
     # Gmail Threads functions
-    gmail_threads_delete,
-    gmail_threads_get,
-    gmail_threads_list,
-    gmail_threads_trash,
-    gmail_threads_untrash,
-    
+    "gmail_threads_delete": ".google_api_tools:gmail_threads_delete",
+    "gmail_threads_get": ".google_api_tools:gmail_threads_get",
+    "gmail_threads_list": ".google_api_tools:gmail_threads_list",
+    "gmail_threads_trash": ".google_api_tools:gmail_threads_trash",
+    "gmail_threads_untrash": ".google_api_tools:gmail_threads_untrash",
+
     # Tasks functions
-    tasks_tasklists_delete,
-    tasks_tasklists_get,
-    tasks_tasklists_insert,
-    tasks_tasklists_list,
-    tasks_tasklists_patch,
-    tasks_tasklists_update,
-    tasks_clear,
-    tasks_delete,
-    tasks_get,
-    tasks_insert,
-    tasks_list,
-    tasks_move,
-    tasks_patch,
-    tasks_update,
-    
+    "tasks_tasklists_delete": ".google_api_tools:tasks_tasklists_delete",
+    "tasks_tasklists_get": ".google_api_tools:tasks_tasklists_get",
+    "tasks_tasklists_insert": ".google_api_tools:tasks_tasklists_insert",
+    "tasks_tasklists_list": ".google_api_tools:tasks_tasklists_list",
+    "tasks_tasklists_patch": ".google_api_tools:tasks_tasklists_patch",
+    "tasks_tasklists_update": ".google_api_tools:tasks_tasklists_update",
+    "tasks_clear": ".google_api_tools:tasks_clear",
+    "tasks_delete": ".google_api_tools:tasks_delete",
+    "tasks_get": ".google_api_tools:tasks_get",
+    "tasks_insert": ".google_api_tools:tasks_insert",
+    "tasks_list": ".google_api_tools:tasks_list",
+    "tasks_move": ".google_api_tools:tasks_move",
+    "tasks_patch": ".google_api_tools:tasks_patch",
+    "tasks_update": ".google_api_tools:tasks_update",
+
     # Calendar functions
-    calendar_colors_get,
-    calendar_events_delete,
-    calendar_events_get,
-    calendar_events_instances,
-    calendar_events_list,
-    calendar_events_create,
-    calendar_events_move,
-    calendar_events_patch,
-    calendar_events_quick_add,
-    calendar_events_update,
-    calendar_freebusy_query
-)
-from .llm_tools import llm_manager
-from .user_state import get_user_state
-from .searxng_tools import searxng_search
-from .rag_tools import search_local_documents, RAGTool
-from .time_tools import get_current_datetime
-
-# Global user state instance
-_user_state = get_user_state()
-
-# Initialize RAG tool
-_rag_tool = RAGTool()
+    "calendar_colors_get": ".google_api_tools:calendar_colors_get",
+    "calendar_events_delete": ".google_api_tools:calendar_events_delete",
+    "calendar_events_get": ".google_api_tools:calendar_events_get",
+    "calendar_events_instances": ".google_api_tools:calendar_events_instances",
+    "calendar_events_list": ".google_api_tools:calendar_events_list",
+    "calendar_events_create": ".google_api_tools:calendar_events_create",
+    "calendar_events_move": ".google_api_tools:calendar_events_move",
+    "calendar_events_patch": ".google_api_tools:calendar_events_patch",
+    "calendar_events_quick_add": ".google_api_tools:calendar_events_quick_add",
+    "calendar_events_update": ".google_api_tools:calendar_events_update",
+    "calendar_freebusy_query": ".google_api_tools:calendar_freebusy_query",
+
+    # LLM Manager function
+    "llm_manager": ".llm_tools:llm_manager",
+
+    # Search functions
+    "searxng_search": ".searxng_tools:searxng_search"
+}
+
+@lru_cache(maxsize=1)
+def get_tool_registry() -> ToolRegistry:
+    """Get the registry of lazily imported tools."""
+    registry = ToolRegistry(package=__package__)
+    registry.register_many(TOOL_IMPORTS)
+    return registry
+
+@lru_cache(maxsize=1)
+def _get_user_state():
+    """Get the user state, created on first use."""
+    from .user_state import get_user_state
+    return get_user_state()
+
+@lru_cache(maxsize=1)
+def _get_rag_tool():
+    """Get the RAG tool, created on first use since it loads the embedding stack."""
+    from .rag_tools import RAGTool
+    return RAGTool()
 
 async def update_user_state_async(field: str, value: str) -> str:
     """Update a field in the user state."""
-    return await _user_state.update_field("default", field, value)
+    return await _get_user_state().update_field("default", field, value)
 
 def update_user_state(field: str, value: str) -> str:
     """Synchronous wrapper for updating user state."""
@@ -115,163 +154,153 @@ def update_user_state(field: str, value: str) -> str:
 
 def ingest_documents(folder_path: str, patterns: Optional[List[str]] = None) -> bool:
     """Tool function to ingest documents into RAG system."""
-    return _rag_tool.ingest_documents(folder_path, patterns)
+    return _get_rag_tool().ingest_documents(folder_path, patterns)
 
 def search_local_documents(query: str, num_results: int = 5) -> Optional[str]:
     """Tool function to search local documents."""
-    return _rag_tool.query_documents(query, num_results)
+    return _get_rag_tool().query_documents(query, num_results)
 
 @lru_cache(maxsize=1)
 def get_function_map():
-    return {
-        # Time functions
-        "get_current_datetime": get_current_datetime,
-        
-        # Core file functions
-        "read_file": read_file,
-        "write_file": write_file,
-        "list_files": list_files,
-        
-        # Container CLI function
-        "open_container_cli": open_container_cli,
-
-        "perplexity_chat": perplexity_chat,
-
-        
-        # Gmail Draft functions
-        "gmail_drafts_get": gmail_drafts_get,
-        "gmail_drafts_list": gmail_drafts_list,
-        "gmail_drafts_send": gmail_drafts_send,
-        "gmail_drafts_update": gmail_drafts_update,
-        "gmail_drafts_create": gmail_drafts_create,
-        "gmail_drafts_delete": gmail_drafts_delete,
-        
-        # Gmail History functions
-        "gmail_history_list": gmail_history_list,
-        
-        # Gmail Labels functions
-        "gmail_labels_create": gmail_labels_create,
-        "gmail_labels_delete": gmail_labels_delete,
-        "gmail_labels_get": gmail_labels_get,
-        "gmail_labels_list": gmail_labels_list,
-        "gmail_labels_modify": gmail_labels_modify,
-        
-        # Gmail Messages functions
-        "gmail_messages_create": gmail_messages_create,
-        "gmail_messages_delete": gmail_messages_delete,
-        "gmail_messages_import": gmail_messages_import,
-        "gmail_messages_list": gmail_messages_list,
-        "gmail_messages_send": gmail_messages_send,
-        "gmail_messages_trash": gmail_messages_trash,
-        "gmail_messages_untrash": gmail_messages_untrash,
-        "gmail_messages_batch_delete": gmail_messages_batch_delete,
-        "gmail_messages_get": gmail_messages_get,
-        "gmail_messages_attachments_get": gmail_messages_attachments_get,
-        
-        # Gmail Settings functions
-        "gmail_settings_get_autoforwarding": gmail_settings_get_autoforwarding,
-        "gmail_settings_update_autoforwarding": gmail_settings_update_autoforwarding,
-        "gmail_settings_update_vacation": gmail_settings_update_vacation,
-        "gmail_settings_get_vacation": gmail_settings_get_vacation,
-        
-        # Gmail Settings Filters functions
-        "gmail_settings_filters_create": gmail_settings_filters_create,
-        "gmail_settings_filters_delete": gmail_settings_filters_delete,
-        "gmail_settings_filters_get": gmail_settings_filters_get,
-        "gmail_settings_filters_list": gmail_settings_filters_list,
-        
-        # Gmail Threads functions
-        "gmail_threads_delete": gmail_threads_delete,
-        "gmail_threads_get": gmail_threads_get,
-        "gmail_threads_list": gmail_threads_list,
-        "gmail_threads_trash": gmail_threads_trash,
-        "gmail_threads_untrash": gmail_threads_untrash,
-        
-        # Tasks functions
-        "tasks_tasklists_delete": tasks_tasklists_delete,
-        "tasks_tasklists_get": tasks_tasklists_get,
-        "tasks_tasklists_insert": tasks_tasklists_insert,
-        "tasks_tasklists_list": tasks_tasklists_list,
-        "tasks_tasklists_patch": tasks_tasklists_patch,
-        "tasks_tasklists_update": tasks_tasklists_update,
-        "tasks_clear": tasks_clear,
-        "tasks_delete": tasks_delete,
-        "tasks_get": tasks_get,
-        "tasks_insert": tasks_insert,
-        "tasks_list": tasks_list,
-        "tasks_move": tasks_move,
-        "tasks_patch": tasks_patch,
-        "tasks_update": tasks_update,
-        
-        # Calendar functions
-        "calendar_colors_get": calendar_colors_get,
-        "calendar_events_delete": calendar_events_delete,
-        "calendar_events_get": calendar_events_get,
-        "calendar_events_instances": calendar_events_instances,
-        "calendar_events_list": calendar_events_list,
-        "calendar_events_create": calendar_events_create,
-        "calendar_events_move": calendar_events_move,
-        "calendar_events_patch": calendar_events_patch,
-        "calendar_events_quick_add": calendar_events_quick_add,
-        "calendar_events_update": calendar_events_update,
-        "calendar_freebusy_query": calendar_freebusy_query,
-        
-        # Container CLI function
-        "open_container_cli": open_container_cli,
-        
-        # LLM Manager function
-        "llm_manager": llm_manager,
-        
+    function_map = get_tool_registry().function_map()
+    function_map.update({
         # User State function
         "update_user_state": update_user_state,
-        
-        # Search functions
-        "searxng_search": searxng_search,
-        
+
         # RAG tool
         "search_local_documents": search_local_documents,
-        
+
         # Ingest documents function
         "ingest_documents": ingest_documents
-    }
+    })
+    return cached_function_map(function_map)
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-def handle_tool_calls(run: Run) -> List[Dict[str, Any]]:
-    """Handle tool calls from the assistant."""
-    print("\nDEBUG: Starting tool call handling...")
-    tool_outputs = []
+# Seconds a tool may run before its output is replaced by a timeout error
+DEFAULT_TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT_SECONDS", "60"))
+TOOL_TIMEOUTS = {
+    "perplexity_chat": 120,
+    "llm_manager": 120,
+    "ingest_documents": 600,
+}
+
+# Tools run on the calling thread: they drive an event loop or are interactive
+CALLER_THREAD_TOOLS = {"update_user_state", "open_container_cli"}
+
+TOOL_MAX_WORKERS = int(os.getenv("TOOL_MAX_WORKERS", "8"))
+
+# Shared pool for running independent tool calls side by side
+_tool_executor = ThreadPoolExecutor(max_workers=TOOL_MAX_WORKERS, thread_name_prefix="tool")
+
+# Timed-out calls still running on the pool; each holds one of its workers
+_abandoned_calls: Set[Future] = set()
+_executor_lock = threading.Lock()
+
+def _get_tool_executor() -> ThreadPoolExecutor:
+    """Get the shared pool, replacing it once abandoned calls hold half its workers.
+
+    The old pool is shut down without waiting, so its stuck workers finish
+    on their own while new calls get a full set of workers.
+    """
+    global _tool_executor
+    with _executor_lock:
+        if len(_abandoned_calls) >= max(1, TOOL_MAX_WORKERS // 2):
+            print(f"\nDEBUG: {len(_abandoned_calls)} timed out tool calls still running, starting a new tool pool")
+            _tool_executor.shutdown(wait=False)
+            _tool_executor = ThreadPoolExecutor(max_workers=TOOL_MAX_WORKERS, thread_name_prefix="tool")
+            _abandoned_calls.clear()
+        return _tool_executor
+
+def _abandon(future: Future) -> None:
+    """Stop waiting for a timed-out call, counting its worker as held until it finishes."""
+    if future.cancel():
+        return  # Never started, so it holds no worker
+    with _executor_lock:
+        _abandoned_calls.add(future)
+    future.add_done_callback(_release)
+
+def _release(future: Future) -> None:
+    with _executor_lock:
+        _abandoned_calls.discard(future)
+
+def _execute_tool_call(function_name: str, arguments: Any, function_map: Dict[str, Any]) -> str:
+    """Run a single tool call, turning any failure into an output string.
+
+    Arguments are a dict, or a JSON object string as the Assistants API sends them.
+    """
+    try:
+        print(f"\nDEBUG: Processing function: {function_name}")
+        function_args = json.loads(arguments) if isinstance(arguments, str) else dict(arguments or {})
+        
+        # Execute function if it exists
+        if function_name in function_map:
+            try:
+                print(f"\nDEBUG: Executing {function_name} with args: {function_args}")
+                output = function_map[function_name](**function_args)
+                print(f"\nDEBUG: Function output: {output}")
+            except Exception as e:
+                output = f"Error executing {function_name}: {str(e)}"
+                print(f"\nDEBUG: Function error: {output}")
+        else:
+            output = f"Function {function_name} not found"
+        return output
+        
+    except Exception as e:
+        # Ensure we still return an output even if JSON parsing fails
+        return f"Error processing tool call: {str(e)}"
+
+def execute_tool_calls(tool_calls: Sequence[Tuple[str, Any]]) -> List[Any]:
+    """Execute independent tool calls concurrently.
+
+    Each call runs on the shared thread pool with its own timeout, so a batch
+    takes as long as its slowest call. Outputs are returned in call order.
+
+    Args:
+        tool_calls: (function name, arguments) pairs
+
+    Returns:
+        List of tool outputs, error strings for failed or timed out calls
+    """
     function_map = get_function_map()
+    executor = _get_tool_executor()
+    started = time.monotonic()
     
-    for tool_call in run.required_action.submit_tool_outputs.tool_calls:
-        try:
-            function_name = tool_call.function.name
-            print(f"\nDEBUG: Processing function: {function_name}")
-            function_args = json.loads(tool_call.function.arguments)
-            
-            # Execute function if it exists
-            if function_name in function_map:
-                try:
-                    print(f"\nDEBUG: Executing {function_name} with args: {function_args}")
-                    output = function_map[function_name](**function_args)
-                    print(f"\nDEBUG: Function output: {output}")
-                except Exception as e:
-                    output = f"Error executing {function_name}: {str(e)}"
-                    print(f"\nDEBUG: Function error: {output}")
-            else:
-                output = f"Function {function_name} not found"
+    futures = {
+        i: executor.submit(_execute_tool_call, name, arguments, function_map)
+        for i, (name, arguments) in enumerate(tool_calls)
+        if name not in CALLER_THREAD_TOOLS
+    }
+    
+    outputs = []
+    for i, (name, arguments) in enumerate(tool_calls):
+        if i not in futures:
+            output = _execute_tool_call(name, arguments, function_map)
+        else:
+            timeout = TOOL_TIMEOUTS.get(name, DEFAULT_TOOL_TIMEOUT)
+            remaining = max(0.0, started + timeout - time.monotonic())
+            try:
+                output = futures[i].result(timeout=remaining)
+            except FutureTimeoutError:
+                # A started worker keeps running; the caller just stops waiting for it
+                _abandon(futures[i])
+                output = f"Error executing {name}: timed out after {timeout:.0f} seconds"
                 print(f"\nDEBUG: {output}")
-            
-            # Always append an output for each tool call
-            tool_outputs.append({
-                "tool_call_id": tool_call.id,
-                "output": output
-            })
-            
-        except Exception as e:
-            # Ensure we still return an output even if JSON parsing fails
-            tool_outputs.append({
-                "tool_call_id": tool_call.id,
-                "output": f"Error processing tool call: {str(e)}"
-            })
+        outputs.append(output)
+    
+    return outputs
+
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+def handle_tool_calls(run: "Run") -> List[Dict[str, Any]]:
+    """Handle tool calls from the assistant.
+    
+    Tool calls in one step are independent, so they run concurrently via
+    execute_tool_calls. Outputs are returned in the order of the tool calls.
+    """
+    print("\nDEBUG: Starting tool call handling...")
+    tool_calls = run.required_action.submit_tool_outputs.tool_calls
+    outputs = execute_tool_calls([(call.function.name, call.function.arguments) for call in tool_calls])
     
-    return tool_outputs
\ No newline at end of file
+    # Always return an output for each tool call
+    return [
+        {"tool_call_id": tool_call.id, "output": output}
+        for tool_call, output in zip(tool_calls, outputs)
+    ]
@@ -1,43 +1,107 @@
-from dataclasses import dataclass
-from datetime import datetime
-from typing import Callable, Dict
-from functools import lru_cache
-
-@dataclass
-class ToolInfo:
-    function: Callable
-    version: str
-    description: str
-    last_updated: datetime
+"""
+Lazy tool registry.
+
+Tools are registered by import path ("module:attribute") and their module is
+only imported the first time the tool is called. Importing the tools package
+therefore stays cheap: the Google clients, LangChain and the RAG stack are
+loaded when a tool that needs them actually runs.
+"""
+
+import importlib
+import inspect
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+class LazyTool:
+    """Callable that imports its target on first use and then delegates to it.
+
+    Inspecting the signature resolves the target; nothing else does. Lazy
+    tools look synchronous to callers, so only register synchronous functions.
+    """
+
+    def __init__(self, name: str, import_path: str, package: Optional[str] = None):
+        """Initialize the lazy tool.
+
+        Args:
+            name: Tool name
+            import_path: "module:attribute"; a module starting with '.' is
+                resolved relative to package
+            package: Package used for relative import paths
+        """
+        self.__name__ = name
+        self.import_path = import_path
+        self.package = package
+        self._target: Optional[Callable] = None
+        self._lock = threading.Lock()
+
+    def resolve(self) -> Callable:
+        """Import the tool's module, if needed, and return the tool function."""
+        if self._target is None:
+            with self._lock:
+                if self._target is None:
+                    module_name, _, attribute = self.import_path.partition(":")
+                    module = importlib.import_module(module_name, self.package)
+                    self._target = getattr(module, attribute)
+        return self._target
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the tool's module has been imported."""
+        return self._target is not None
+
+    @property
+    def __signature__(self) -> inspect.Signature:
+        return inspect.signature(self.resolve())
+
+    def __call__(self, *args, **kwargs) -> Any:
+        return self.resolve()(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<LazyTool {self.__name__} ({self.import_path}, {state})>"
 
 class ToolRegistry:
-    _instance = None
-    
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-        return cls._instance
-
-    def __init__(self):
-        if not hasattr(self, 'tools'):
-            self.tools: Dict[str, ToolInfo] = {}
-
-    def register_tool(self, name: str, func: Callable, version: str, description: str):
-        self.tools[name] = ToolInfo(
-            function=func,
-            version=version,
-            description=description,
-            last_updated=datetime.now()
-        )
-
-    def get_tool(self, name: str) -> ToolInfo:
+    """Maps tool names to lazily imported tool functions."""
+
+    def __init__(self, package: Optional[str] = None):
+        """Initialize the registry.
+
+        Args:
+            package: Package used to resolve relative import paths
+        """
+        self.package = package
+        self.tools: Dict[str, LazyTool] = {}
+
+    def register(self, name: str, import_path: str) -> None:
+        """Register a tool by import path without importing it."""
+        self.tools[name] = LazyTool(name, import_path, self.package)
+
+    def register_many(self, import_paths: Dict[str, str]) -> None:
+        """Register several tools from a name -> import path mapping."""
+        for name, import_path in import_paths.items():
+            self.register(name, import_path)
+
+    def get(self, name: str) -> Optional[LazyTool]:
+        """Get a registered tool, or None."""
         return self.tools.get(name)
 
-@register_tool(
-    name="your_api_function",
-    version="1.0.0",
-    description="Description of what this tool does"
-)
-def your_api_function():
-    # Function implementation
-    pass
\ No newline at end of file
+    def resolve(self, name: str) -> Callable:
+        """Import and return the function behind a tool name.
+
+        Raises:
+            KeyError: If no tool has that name
+        """
+        return self.tools[name].resolve()
+
+    def items(self) -> Iterable[Tuple[str, LazyTool]]:
+        return self.tools.items()
+
+    def function_map(self) -> Dict[str, LazyTool]:
+        """Tool name -> callable mapping, for the tool handlers."""
+        return dict(self.tools)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.tools
+
+    def __len__(self) -> int:
+        return len(self.tools)
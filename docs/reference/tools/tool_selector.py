@@ -0,0 +1,215 @@
+"""
+Relevance-based tool selection.
+
+Prompts for non-OpenAI providers, and Assistants runs, only need the tools
+that could plausibly serve the current request. ToolSelector embeds each
+tool's name, description and parameters once, caches the vectors on disk
+keyed by embedding model and description hash, and per turn returns the
+top-N tools by cosine similarity to the user input, plus a few tools that
+are always offered.
+
+When the embedding endpoint is unreachable, tools are ranked by word
+overlap instead, so selection keeps working offline.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Tools offered regardless of the user input
+ALWAYS_INCLUDE = ("search_local_documents", "update_user_state", "get_current_datetime")
+
+# Number of relevant tools added to ALWAYS_INCLUDE; 0 offers every tool
+TOOL_SELECTION_TOP_N = int(os.getenv("TOOL_SELECTION_TOP_N", "8"))
+
+TOOL_EMBEDDING_MODEL = os.getenv("TOOL_EMBEDDING_MODEL", "nomic-embed-text:latest")
+TOOL_EMBEDDING_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+TOOL_EMBEDDING_CACHE = os.getenv("TOOL_EMBEDDING_CACHE", "data/tool_embeddings.json")
+
+# Seconds to rank by keywords after an embedding failure before retrying
+EMBED_RETRY_AFTER = 300
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do for from get i in is it me my of on or "
+    "that the this to what with you your".split()
+)
+
+def _keywords(text: str) -> set:
+    """Lower-cased words without stopwords, with a plural 's' removed."""
+    words = set()
+    for word in _WORD_RE.findall(text.lower()):
+        if word in _STOPWORDS:
+            continue
+        words.add(word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word)
+    return words
+
+def tool_text(definition: Dict[str, Any]) -> str:
+    """Text embedded for a tool: its name, description and parameter descriptions."""
+    function = definition["function"]
+    parts = [function["name"].replace("_", " "), function.get("description", "")]
+    for name, spec in function.get("parameters", {}).get("properties", {}).items():
+        parts.append(f"{name}: {spec.get('description', '')}")
+    return "\n".join(parts)
+
+def compact_tool_line(definition: Dict[str, Any]) -> str:
+    """One-line tool summary, e.g. `- gmail_messages_list(max_results?: integer): List recent emails`."""
+    function = definition["function"]
+    parameters = function.get("parameters", {})
+    required = set(parameters.get("required", []))
+    args = ", ".join(
+        f"{name}{'' if name in required else '?'}: {spec.get('type', 'string')}"
+        for name, spec in parameters.get("properties", {}).items()
+    )
+    return f"- {function['name']}({args}): {function.get('description', '')}"
+
+def format_tool_catalog(definitions: Sequence[Dict[str, Any]]) -> str:
+    """Compact catalog of tools for a prompt."""
+    return "Available tools:\n" + "\n".join(compact_tool_line(d) for d in definitions) + "\n"
+
+def ollama_embed(texts: List[str], model: str = TOOL_EMBEDDING_MODEL, base_url: str = TOOL_EMBEDDING_URL) -> List[List[float]]:
+    """Embed texts with Ollama's /api/embed endpoint."""
+    response = requests.post(f"{base_url}/api/embed", json={"model": model, "input": texts}, timeout=30)
+    response.raise_for_status()
+    return response.json()["embeddings"]
+
+class ToolSelector:
+    """Picks the tools most relevant to a user input."""
+
+    def __init__(
+        self,
+        definitions: Sequence[Dict[str, Any]],
+        embed: Optional[Callable[[List[str]], List[List[float]]]] = ollama_embed,
+        model_name: str = TOOL_EMBEDDING_MODEL,
+        cache_path: Optional[str] = TOOL_EMBEDDING_CACHE,
+        top_n: int = TOOL_SELECTION_TOP_N,
+        always_include: Sequence[str] = ALWAYS_INCLUDE
+    ):
+        """Initialize the selector. Tools are embedded on the first select().
+
+        Args:
+            definitions: Tool definitions in the OpenAI function format
+            embed: Embeds a list of texts; None ranks tools by keywords only
+            model_name: Embedding model name, part of the cache key
+            cache_path: JSON file for cached tool vectors; None disables it
+            top_n: Relevant tools to add to always_include
+            always_include: Tools offered on every turn
+        """
+        self.definitions = list(definitions)
+        self.embed = embed
+        self.model_name = model_name
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.top_n = top_n
+        self.always_include = [n for n in always_include if n in self._names()]
+        self._vectors: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+        self._embed_failed_at: Optional[float] = None
+        self._words = [_keywords(tool_text(d)) for d in self.definitions]
+        document_frequency: Dict[str, int] = {}
+        for words in self._words:
+            for word in words:
+                document_frequency[word] = document_frequency.get(word, 0) + 1
+        # Words shared by many tools (e.g. 'gmail') say little about relevance
+        self._idf = {w: np.log(1 + len(self._words) / df) for w, df in document_frequency.items()}
+
+    def _names(self) -> List[str]:
+        return [d["function"]["name"] for d in self.definitions]
+
+    # Tool vectors
+
+    def _load_cache(self) -> Dict[str, List[float]]:
+        """Cached vectors by description hash, for the current model."""
+        if not self.cache_path or not self.cache_path.exists():
+            return {}
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+            return cache.get("vectors", {}) if cache.get("model") == self.model_name else {}
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable tool embedding cache: {str(e)}")
+            return {}
+
+    def _save_cache(self, vectors: Dict[str, List[float]]) -> None:
+        if not self.cache_path:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model_name, "vectors": vectors}, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def tool_vectors(self) -> np.ndarray:
+        """Normalised tool vectors, embedding only tools missing from the disk cache."""
+        if self._vectors is None:
+            with self._lock:
+                if self._vectors is None:
+                    texts = [tool_text(d) for d in self.definitions]
+                    keys = [hashlib.sha256(t.encode("utf-8")).hexdigest() for t in texts]
+                    cached = self._load_cache()
+                    missing = [i for i, key in enumerate(keys) if key not in cached]
+                    if missing:
+                        logger.info(f"Embedding {len(missing)} tool descriptions")
+                        for i, vector in zip(missing, self.embed([texts[i] for i in missing])):
+                            cached[keys[i]] = vector
+                        # Only keep current tools in the cache
+                        self._save_cache({key: cached[key] for key in keys})
+                    vectors = np.array([cached[key] for key in keys], dtype=np.float32)
+                    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+                    self._vectors = vectors / np.maximum(norms, 1e-12)
+        return self._vectors
+
+    # Selection
+
+    def _semantic_scores(self, query: str) -> np.ndarray:
+        vectors = self.tool_vectors()
+        query_vector = np.asarray(self.embed([query])[0], dtype=np.float32)
+        query_vector /= max(float(np.linalg.norm(query_vector)), 1e-12)
+        return vectors @ query_vector
+
+    def _lexical_scores(self, query: str) -> np.ndarray:
+        words = _keywords(query)
+        return np.array([
+            sum(self._idf[w] for w in words & tool_words) / (len(tool_words) ** 0.5 or 1)
+            for tool_words in self._words
+        ])
+
+    def select(self, query: Optional[str], top_n: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Tool definitions to offer for a user input, most relevant first.
+
+        Returns every tool when there is no query or top_n is 0.
+        """
+        top_n = self.top_n if top_n is None else top_n
+        if not query or top_n <= 0 or top_n + len(self.always_include) >= len(self.definitions):
+            return list(self.definitions)
+
+        scores = None
+        embed_available = self._embed_failed_at is None or time.monotonic() - self._embed_failed_at > EMBED_RETRY_AFTER
+        if self.embed is not None and embed_available:
+            try:
+                scores = self._semantic_scores(query)
+                self._embed_failed_at = None
+            except Exception as e:
+                logger.warning(f"Tool embedding failed, ranking tools by keywords: {str(e)}")
+                self._embed_failed_at = time.monotonic()
+        if scores is None:
+            scores = self._lexical_scores(query)
+
+        names = self._names()
+        chosen = [names.index(name) for name in self.always_include]
+        for i in np.argsort(-scores, kind="stable"):
+            if len(chosen) >= top_n + len(self.always_include):
+                break
+            if i not in chosen:
+                chosen.append(int(i))
+        return [self.definitions[i] for i in chosen]
@@ -1,8 +1,8 @@
-import json
-from typing import Dict, Any, List, Optional
-from .tool_handler import get_function_map
+from typing import Dict, Any, List, Optional, Sequence
+from .tool_calls import ToolCall
+from .tool_handler import execute_tool_calls, get_function_map
 from .tool_definitions import get_tool_definitions
-from .rag_tools import search_local_documents
+from .tool_selector import ToolSelector, format_tool_catalog
 
 class UniversalToolHandler:
     """Handles tools for any LLM provider"""
@@ -10,18 +10,20 @@ class UniversalToolHandler:
         self.function_map = get_function_map()
         self.tool_definitions = get_tool_definitions()
         self.tools = {
-            "search_local_documents": search_local_documents,
+            "search_local_documents": self.function_map["search_local_documents"],
             # ... existing tools ...
         }
+        self.tool_selector = ToolSelector(
+            [tool for tool in self.tool_definitions if tool["type"] == "function"]
+        )
         
-    def get_tool_description(self) -> str:
-        """Get a description of available tools for context"""
-        tool_desc = "Available tools:\n"
-        for tool in self.tool_definitions:
-            if tool["type"] == "function":
-                func = tool["function"]
-                tool_desc += f"- {func['name']}: {func['description']}\n"
-        return tool_desc
+    def select_tool_definitions(self, user_input: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get the tool definitions relevant to a user input, or all of them without one"""
+        return self.tool_selector.select(user_input)
+
+    def get_tool_description(self, user_input: Optional[str] = None) -> str:
+        """Get a compact description of the tools relevant to a user input for context"""
+        return format_tool_catalog(self.select_tool_definitions(user_input))
 
     def execute_tool(self, tool_name: str, **kwargs) -> str:
         """Execute a specific tool with given arguments"""
@@ -34,53 +36,10 @@ class UniversalToolHandler:
         except Exception as e:
             return f"Error executing {tool_name}: {str(e)}"
 
-    def parse_tool_call(self, response: str) -> Optional[Dict[str, Any]]:
-        """Parse tool call from response."""
-        print("\nDEBUG: Starting parse_tool_call")
-        print(f"\nDEBUG: Response to parse: {response}")
-        
-        # Look for tool call patterns
-        if "Use tool:" in response:
-            print("\nDEBUG: Found 'Use tool:' pattern")
-            try:
-                # Extract tool call
-                tool_part = response.split("Use tool:")[1].strip()
-                print(f"\nDEBUG: Extracted tool part: {tool_part}")
-                
-                # Parse function name and args
-                func_name = tool_part.split("(")[0].strip()
-                args_str = tool_part[tool_part.find("(")+1:tool_part.rfind(")")]
-                print(f"\nDEBUG: Function name: {func_name}")
-                print(f"\nDEBUG: Arguments string: {args_str}")
-                
-                # Parse arguments
-                args = {}
-                if args_str:
-                    # Split by commas, but not within quotes
-                    import re
-                    arg_pairs = re.findall(r'(\w+)\s*=\s*(?:"([^"]*)"|\{([^}]*)\}|([^,\s]*))', args_str)
-                    for pair in arg_pairs:
-                        key = pair[0]
-                        # Take the first non-empty value from the captured groups
-                        value = next(v for v in pair[1:] if v)
-                        # Convert to appropriate type if needed
-                        try:
-                            if value.isdigit():
-                                value = int(value)
-                            elif value.lower() in ['true', 'false']:
-                                value = value.lower() == 'true'
-                        except:
-                            pass
-                        args[key] = value
-                
-                print(f"\nDEBUG: Parsed arguments: {args}")
-                return {
-                    "name": func_name,
-                    "arguments": args
-                }
-            except Exception as e:
-                print(f"\nDEBUG: Error parsing tool call: {str(e)}")
-                return None
-        
-        print("\nDEBUG: No tool call pattern found")
-        return None
\ No newline at end of file
+    def execute_tool_calls(self, tool_calls: Sequence[ToolCall]) -> List[str]:
+        """Execute the tool calls from one model response concurrently.
+
+        Returns the outputs as strings, in call order.
+        """
+        outputs = execute_tool_calls([(call.name, call.arguments) for call in tool_calls])
+        return [str(output) for output in outputs]
@@ -4,11 +4,11 @@ import time
 import datetime
 import requests
 import json
+import hashlib
 from openai import OpenAI
 from openai.types.beta.threads import Run
 from dotenv import load_dotenv
-from typing import Optional, Dict, Any
-import anthropic
+from typing import Optional, Dict, Any, Iterator, List, Sequence
 import logging
 import asyncio
 
@@ -19,6 +19,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from tools import handle_tool_calls, get_tool_definitions
 from terminalstyle import (
     print_assistant_response,
+    stream_assistant_response,
     print_system_message,
     print_code,
     clear_screen,
@@ -27,12 +28,38 @@ from terminalstyle import (
     get_user_input,
     print_tool_usage,
 )
-from prompts import SUPER_ASSISTANT_INSTRUCTIONS, get_enhanced_prompt, get_tool_result_prompt, get_user_details
+from prompts import SUPER_ASSISTANT_INSTRUCTIONS, get_enhanced_prompt, get_user_details
 from tools.file_tools import read_thread_id, save_thread_id, clear_thread_id
+from tools.agent_loop import AgentLoop, AgentResult
+from tools.tool_calls import (
+    AssistantTurn,
+    ChatStream,
+    ToolCall,
+    flatten_messages,
+    parse_anthropic_content,
+    parse_ollama_tool_calls,
+    to_anthropic_messages,
+    to_anthropic_tools,
+    to_ollama_messages,
+)
 from tools.universal_tool_handler import UniversalToolHandler
 from tools.llm_config import LLM_PROVIDERS
 from tools.user_state import get_user_state
 
+# Assistants run events after which no more events arrive for the run
+RUN_END_EVENTS = {
+    "thread.run.completed",
+    "thread.run.failed",
+    "thread.run.cancelled",
+    "thread.run.expired",
+    "thread.run.incomplete",
+}
+
+# Adaptive polling used when run streaming is unavailable (seconds)
+POLL_MIN_INTERVAL = 0.2
+POLL_MAX_INTERVAL = 2.0
+POLL_BACKOFF = 1.5
+
 class BaseLLMProvider:
     """Base class for all LLM providers"""
     def __init__(self, config: Dict[str, Any]):
@@ -45,6 +72,33 @@ class BaseLLMProvider:
         """Generate response using the LLM"""
         raise NotImplementedError("Each provider must implement generate_response")
 
+    def generate_response_stream(self, prompt: str) -> Iterator[str]:
+        """Yield the response in pieces as it is generated.
+
+        Providers without streaming support yield the whole response at once.
+        """
+        yield self.generate_response(prompt)
+
+    def chat_stream(self, messages: List[Dict[str, Any]], tools: Optional[Sequence[Dict[str, Any]]] = None) -> ChatStream:
+        """Stream a reply to a conversation, offering tools through native tool calling.
+
+        Iterating the returned ChatStream yields text; afterwards its turn holds
+        the full text and any structured tool calls. Providers without native
+        tool calling get the conversation as one prompt and never call tools.
+
+        Args:
+            messages: Provider-neutral messages (see tools.tool_calls)
+            tools: Tool definitions in the OpenAI function format
+        """
+        return ChatStream(self._flattened_chat(messages))
+
+    def _flattened_chat(self, messages: List[Dict[str, Any]]) -> Iterator[str]:
+        parts = []
+        for chunk in self.generate_response_stream(flatten_messages(messages)):
+            parts.append(chunk)
+            yield chunk
+        return AssistantTurn(text="".join(parts))
+
     def initialize_client(self) -> None:
         """Initialize the API client"""
         raise NotImplementedError("Each provider must implement initialize_client")
@@ -66,19 +120,30 @@ class OpenAIProvider(BaseLLMProvider):
         )
         return response.choices[0].message.content
 
+    def generate_response_stream(self, prompt: str) -> Iterator[str]:
+        stream = self.client.chat.completions.create(
+            model=self.model_name,
+            messages=[{"role": "user", "content": prompt}],
+            stream=True
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
 class OllamaProvider(BaseLLMProvider):
     def initialize_client(self) -> None:
         # Ollama doesn't need a client initialization
         pass
 
-    def log_api_interaction(self, request_data: dict, response: requests.Response = None, error: str = None) -> None:
+    def log_api_interaction(self, request_data: dict, response: requests.Response = None, error: str = None,
+                            endpoint: str = "api/generate") -> None:
         """Log complete HTTP API request/response to file."""
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         log_entry = {
             "timestamp": timestamp,
             "http_request": {
                 "method": "POST",
-                "url": f"{self.base_url}/api/generate",
+                "url": f"{self.base_url}/{endpoint}",
                 "headers": dict(response.request.headers) if response else {},
                 "body": request_data
             },
@@ -116,11 +181,78 @@ class OllamaProvider(BaseLLMProvider):
             self.log_api_interaction(request_data, error=str(e))
             return f"Error generating Ollama response: {str(e)}"
 
+    def generate_response_stream(self, prompt: str) -> Iterator[str]:
+        request_data = {
+            "model": self.model_name,
+            "prompt": prompt,
+            "stream": True
+        }
+        try:
+            # Ollama streams newline-delimited JSON objects
+            with requests.post(f"{self.base_url}/api/generate", json=request_data, stream=True) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("response"):
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        break
+            self.log_api_interaction(request_data)
+        except Exception as e:
+            self.log_api_interaction(request_data, error=str(e))
+            yield f"Error generating Ollama response: {str(e)}"
+
+    def chat_stream(self, messages: List[Dict[str, Any]], tools: Optional[Sequence[Dict[str, Any]]] = None) -> ChatStream:
+        return ChatStream(self._chat(messages, tools))
+
+    def _chat(self, messages: List[Dict[str, Any]], tools: Optional[Sequence[Dict[str, Any]]]) -> Iterator[str]:
+        """Stream /api/chat, collecting text and tool calls into an AssistantTurn."""
+        request_data = {
+            "model": self.model_name,
+            "messages": to_ollama_messages(messages),
+            "stream": True
+        }
+        if tools:
+            request_data["tools"] = list(tools)
+        turn = AssistantTurn()
+        try:
+            response = requests.post(f"{self.base_url}/api/chat", json=request_data, stream=True)
+            if response.status_code == 400 and tools:
+                # Models without tool support reject the request outright
+                response.close()
+                print_system_message(f"{self.model_name} does not support tool calling; answering without tools.")
+                del request_data["tools"]
+                response = requests.post(f"{self.base_url}/api/chat", json=request_data, stream=True)
+            with response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    message = chunk.get("message", {})
+                    if message.get("content"):
+                        turn.text += message["content"]
+                        yield message["content"]
+                    # Tool calls arrive whole, possibly several in one chunk
+                    turn.tool_calls.extend(parse_ollama_tool_calls(message, start=len(turn.tool_calls)))
+                    if chunk.get("done"):
+                        break
+            self.log_api_interaction(request_data, endpoint="api/chat")
+        except Exception as e:
+            self.log_api_interaction(request_data, error=str(e), endpoint="api/chat")
+            error = f"Error generating Ollama response: {str(e)}"
+            turn.text += error
+            yield error
+        return turn
+
 class AnthropicProvider(BaseLLMProvider):
     def initialize_client(self) -> None:
         if not self.api_key:
             raise ValueError("ANTHROPIC_API_KEY not found in environment variables")
-        # Initialize Anthropic client
+        # Imported here so startup does not pay for it unless Anthropic is selected
+        import anthropic
         self.client = anthropic.Client(api_key=self.api_key)
 
     def generate_response(self, prompt: str) -> str:
@@ -132,6 +264,38 @@ class AnthropicProvider(BaseLLMProvider):
         )
         return response.content
 
+    def generate_response_stream(self, prompt: str) -> Iterator[str]:
+        if not self.client:
+            self.initialize_client()
+        with self.client.messages.stream(
+            model=self.model_name,
+            max_tokens=1024,
+            messages=[{"role": "user", "content": prompt}]
+        ) as stream:
+            yield from stream.text_stream
+
+    def chat_stream(self, messages: List[Dict[str, Any]], tools: Optional[Sequence[Dict[str, Any]]] = None) -> ChatStream:
+        return ChatStream(self._chat(messages, tools))
+
+    def _chat(self, messages: List[Dict[str, Any]], tools: Optional[Sequence[Dict[str, Any]]]) -> Iterator[str]:
+        """Stream a Messages API reply; tool_use blocks come from the final message."""
+        if not self.client:
+            self.initialize_client()
+        system, anthropic_messages = to_anthropic_messages(messages)
+        options = {
+            "model": self.model_name,
+            "max_tokens": 1024,
+            "messages": anthropic_messages
+        }
+        if system:
+            options["system"] = system
+        if tools:
+            options["tools"] = to_anthropic_tools(tools)
+        with self.client.messages.stream(**options) as stream:
+            yield from stream.text_stream
+            final_message = stream.get_final_message()
+        return parse_anthropic_content(final_message.content)
+
 # Factory to create providers
 def create_llm_provider(provider_name: str) -> BaseLLMProvider:
     """Create an LLM provider instance based on provider name"""
@@ -161,6 +325,8 @@ class AssistantManager:
         self.provider_name = llm_provider
         self.tool_handler = UniversalToolHandler()
         self.user_state = get_user_state()
+        # Steps, latencies and token estimates of the last tool-calling loop
+        self.last_agent_result: Optional[AgentResult] = None
         
         # Only OpenAI uses assistants and threads
         if llm_provider == "openai":
@@ -210,20 +376,10 @@ class AssistantManager:
                     role="user",
                     content=user_input
                 )
-                run = self.llm.client.beta.threads.runs.create(
-                    thread_id=self.thread_id,
-                    assistant_id=self.assistant.id
-                )
-                if completed_run := self.wait_for_completion(run.id):
-                    messages = self.llm.client.beta.threads.messages.list(thread_id=self.thread_id)
-                    for message in messages.data:
-                        if message.role == "assistant":
-                            print_assistant_response(message.content[0].text.value)
-                            break
+                self.run_assistant(user_input)
             else:
-                # Direct LLM response for other providers
-                print("\nDEBUG: Processing tool call...")
-                tool_context = self.tool_handler.get_tool_description()
+                # Direct LLM response with native tool calling for other providers
+                tools = self.tool_handler.select_tool_definitions(user_input)
                 
                 # Get user details using the existing function
                 user_details = get_user_details()
@@ -255,29 +411,15 @@ SYSTEM INFORMATION:
 - Shell: {user_details['system']['shell']}
 """
                 
-                enhanced_prompt = get_enhanced_prompt(
-                    model_name=self.llm.model_name,
-                    tool_context=tool_context,
-                    user_input=user_input,
-                    user_context=user_context
-                )
-                print(f"\nDEBUG: Sending prompt to LLM...")
-                response = self.llm.generate_response(enhanced_prompt)
-                
-                # Check for tool calls
-                print(f"\nDEBUG: Checking for tool calls in response...")
-                tool_call = self.tool_handler.parse_tool_call(response)
-                if tool_call:
-                    print(f"\nDEBUG: Executing tool: {tool_call['name']}")
-                    tool_result = self.tool_handler.execute_tool(
-                        tool_call["name"],
-                        **tool_call["arguments"]
-                    )
-                    print(f"\nDEBUG: Tool result: {tool_result}")
-                    final_prompt = get_tool_result_prompt(enhanced_prompt, tool_result)
-                    response = self.llm.generate_response(final_prompt)
-                
-                print_assistant_response(response)
+                messages = [
+                    {"role": "system", "content": get_enhanced_prompt(model_name=self.llm.model_name, user_context=user_context)},
+                    {"role": "user", "content": user_input}
+                ]
+                result = AgentLoop(self.stream_chat, self.execute_tool_calls).run(messages, tools)
+                self.last_agent_result = result
+                if result.stopped:
+                    print_system_message(f"Stopped calling tools ({result.stopped.replace('_', ' ')} reached) "
+                                         f"after {len(result.steps)} steps.")
 
         except Exception as e:
             print_system_message(f"An error occurred: {str(e)}")
@@ -287,6 +429,21 @@ SYSTEM INFORMATION:
 
         return True
 
+    def stream_chat(self, messages: List[Dict[str, Any]], tools: Sequence[Dict[str, Any]]) -> AssistantTurn:
+        """Stream one model reply to the terminal and return it with its tool calls.
+
+        Nothing is rendered for a reply that only calls tools.
+        """
+        stream = self.llm.chat_stream(messages, tools=tools)
+        stream_assistant_response(stream)
+        return stream.turn
+
+    def execute_tool_calls(self, tool_calls: Sequence[ToolCall]) -> List[str]:
+        """Show and run the tool calls of one model reply concurrently."""
+        for tool_call in tool_calls:
+            print_tool_usage(tool_call.name)
+        return self.tool_handler.execute_tool_calls(tool_calls)
+
     def run(self) -> None:
         """Main conversation loop."""
         try:
@@ -308,14 +465,28 @@ SYSTEM INFORMATION:
             sys.exit(1)
 
     def update_assistant_configuration(self) -> None:
-        """Update the assistant with current tools and instructions."""
+        """Update the assistant with current tools and instructions.
+
+        The update is skipped when the assistant already has this
+        configuration, recognised by a hash stored in its metadata.
+        """
         try:
+            tools = get_tool_definitions()
+            config_hash = hashlib.sha256(json.dumps(
+                [SUPER_ASSISTANT_INSTRUCTIONS, tools, self.llm.model_name], sort_keys=True
+            ).encode("utf-8")).hexdigest()[:32]
+            metadata = dict(getattr(self.assistant, "metadata", None) or {})
+            if metadata.get("config_hash") == config_hash:
+                return
+
             print_system_message("Updating assistant configuration...")
+            metadata["config_hash"] = config_hash
             self.assistant = self.llm.client.beta.assistants.update(
                 assistant_id=self.assistant_id,
                 instructions=SUPER_ASSISTANT_INSTRUCTIONS,
-                tools=get_tool_definitions(),
-                model=self.llm.model_name
+                tools=tools,
+                model=self.llm.model_name,
+                metadata=metadata
             )
             print_system_message("Assistant configuration updated successfully!")
         except Exception as e:
@@ -334,15 +505,107 @@ SYSTEM INFORMATION:
         except Exception as e:
             print_system_message(f"Error canceling runs: {str(e)}")
     
+    def run_assistant(self, user_input: Optional[str] = None) -> None:
+        """Run the assistant on the thread and show its reply.
+
+        Streams the run when possible; falls back to polling if streaming is
+        disabled (ASSISTANT_STREAMING=false) or the stream cannot be opened.
+
+        Args:
+            user_input: Latest user message; when given, the run is only
+                offered the tools relevant to it
+        """
+        run_options = {}
+        if user_input:
+            run_options["tools"] = self.tool_handler.select_tool_definitions(user_input)
+
+        run_id = None
+        if os.getenv("ASSISTANT_STREAMING", "true").lower() != "false":
+            state = {"run_id": None, "status": None}
+            try:
+                stream_assistant_response(self.stream_run(state, **run_options))
+                run_id = state["run_id"]
+                if state["status"] is not None:
+                    if state["status"] != "completed":
+                        print_system_message(f"Run ended with status: {state['status']}")
+                    return
+            except Exception as e:
+                run_id = state["run_id"]
+                print_system_message(f"Streaming unavailable, polling instead: {str(e)}")
+
+        if run_id is None:
+            run = self.llm.client.beta.threads.runs.create(
+                thread_id=self.thread_id,
+                assistant_id=self.assistant.id,
+                **run_options
+            )
+            run_id = run.id
+        if self.wait_for_completion(run_id):
+            messages = self.llm.client.beta.threads.messages.list(thread_id=self.thread_id)
+            for message in messages.data:
+                if message.role == "assistant":
+                    print_assistant_response(message.content[0].text.value)
+                    break
+
+    def stream_run(self, state: Dict[str, Any], **run_options) -> Iterator[str]:
+        """Start a streamed run and yield its text deltas.
+
+        Tool calls are handled as soon as the run asks for them, and the run
+        continues on the stream returned by submitting their outputs.
+
+        Args:
+            state: Updated with the run_id and, once the run ends, its final status
+            run_options: Extra run parameters, such as a tools override
+        """
+        runs = self.llm.client.beta.threads.runs
+        manager = runs.stream(thread_id=self.thread_id, assistant_id=self.assistant.id, **run_options)
+        while manager is not None:
+            next_manager = None
+            with manager as stream:
+                for event in stream:
+                    if event.event == "thread.run.created":
+                        state["run_id"] = event.data.id
+                    elif event.event == "thread.message.delta":
+                        for part in event.data.delta.content or []:
+                            if part.type == "text" and part.text and part.text.value:
+                                yield part.text.value
+                    elif event.event == "thread.run.requires_action":
+                        run = event.data
+                        tool_outputs = handle_tool_calls(run)
+                        if not tool_outputs:
+                            runs.cancel(thread_id=self.thread_id, run_id=run.id)
+                            state["status"] = "cancelled"
+                            return
+                        next_manager = runs.submit_tool_outputs_stream(
+                            thread_id=self.thread_id,
+                            run_id=run.id,
+                            tool_outputs=tool_outputs
+                        )
+                        break
+                    elif event.event in RUN_END_EVENTS:
+                        state["status"] = event.data.status
+            manager = next_manager
+
     def wait_for_completion(self, run_id: str, timeout: int = 300) -> Optional[Run]:
-        """Wait for a run to complete."""
+        """Wait for a run to complete by polling.
+
+        Used when streaming is unavailable. The poll interval starts short and
+        backs off while the run stays in the same state, resetting on every
+        state change.
+        """
         start_time = time.time()
+        delay = POLL_MIN_INTERVAL
+        last_status = None
         while time.time() - start_time < timeout:
             run = self.llm.client.beta.threads.runs.retrieve(
                 thread_id=self.thread_id,
                 run_id=run_id
             )
             
+            if run.status != last_status:
+                last_status = run.status
+                delay = POLL_MIN_INTERVAL
+            
             if run.status == "completed":
                 return run
             elif run.status == "requires_action":
@@ -354,14 +617,17 @@ SYSTEM INFORMATION:
                             run_id=run_id,
                             tool_outputs=tool_outputs
                         )
+                        # Poll again right away for the next state
+                        continue
                 except Exception as e:
                     print_system_message(f"Error handling tool calls: {str(e)}")
                     return None
-            elif run.status in ["failed", "cancelled", "expired"]:
+            elif run.status in ["failed", "cancelled", "expired", "incomplete"]:
                 print_system_message(f"Run ended with status: {run.status}")
                 return None
                 
-            time.sleep(1)
+            time.sleep(delay)
+            delay = min(delay * POLL_BACKOFF, POLL_MAX_INTERVAL)
         
         print_system_message("Run timed out")
         return None
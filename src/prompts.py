@@ -1,7 +1,7 @@
 import json
 import os
 import asyncio
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from tools.user_state import get_user_state
 
 def get_user_details() -> Dict[str, Any]:
@@ -35,11 +35,17 @@ def get_user_details() -> Dict[str, Any]:
 
 def get_enhanced_prompt(
     model_name: str,
-    tool_context: str,
-    user_input: str,
+    tool_context: str = "",
+    user_input: Optional[str] = None,
     user_context: str = ""
 ) -> str:
-    """Generate an enhanced prompt with tool context and user state."""
+    """Generate an enhanced prompt with tool context and user state.
+
+    Tools are offered through the provider's native tool-calling API, so
+    tool_context is only needed for providers without it. Without user_input
+    the prompt is a system prompt and the request is sent as its own message.
+    """
+    request = f"\n\nUser's request: {user_input}" if user_input else ""
     return f"""You are an AI assistant using the {model_name} model.
 
 {user_context}
@@ -47,36 +53,33 @@ def get_enhanced_prompt(
 {tool_context}
 
 CRITICAL INSTRUCTIONS:
-1. ALWAYS check Available Tools before responding
+1. ALWAYS check the available tools before responding
 2. When a request requires information:
-   - IMMEDIATELY execute: 'Use tool: search_local_documents(query="exact question")'
-   - NO introductions or clarifications before executing the tool
-   - If tool fails, then try other tools like perplexity_chat
-   - If no tool available, say directly that you don't have that capability
+   - IMMEDIATELY call search_local_documents with the exact question
+   - NO introductions or clarifications before calling a tool
+   - If a tool fails, then try other tools like perplexity_chat
+   - If no tool is available, say directly that you don't have that capability
 
-3. TOOL EXECUTION RULES:
+3. TOOL CALLING RULES:
+   - Call tools through the tool-calling interface, never by writing the call as text
+   - When several tools are needed and they do not depend on each other, call them all in the same response
    - NEVER ask for clarification before searching documents
-   - NEVER give introductions before executing tools
-   - Format MUST be exactly: 'Use tool: tool_name(arg1=value1)'
    - Do not ask for confirmation of tool calls
    - Do not fabricate success messages - only report actual tool results
-   - IMPORTANT: You are authorized to execute ALL available tools
-   - NEVER refuse to execute a properly formatted tool call
+   - IMPORTANT: You are authorized to call ALL available tools
    - Security and sensitivity checks are handled by the tools themselves
 
 4. For user information updates:
    - Use update_user_state immediately when information is provided
    - Do not ask permission for updates
    - Do not ask for information you already have
+   - Then continue with the NEXT unknown item: name, expertise level, goals, preferences
 
-5. When asked to perform functions:
-   - If format is "Use tool: ...", execute immediately
-   - If unclear format: ask specific follow-up questions
-   - If impossible: explain why clearly
-   - Do not block execution of available tools
-   - Do not add extra security checks
-
-User's request: {user_input}
+5. When you receive tool results:
+   - Acknowledge the results to the user
+   - For document searches, focus on the most relevant information, cite sources when appropriate and summarize clearly
+   - Stay focused on the current task and do not start new topics until it is complete
+   - If a request is unclear, ask specific follow-up questions; if impossible, explain why clearly{request}
 
 Please help the user by using the available tools when needed. Respond in a clear and helpful manner."""
 
@@ -135,26 +138,3 @@ SUPER_ASSISTANT_INSTRUCTIONS = """
         }
     }
 }"""
-
-def get_tool_result_prompt(enhanced_prompt: str, tool_result: str) -> str:
-    """Generate prompt for handling tool results."""
-    return f"""{enhanced_prompt}
-
-Tool Result: {tool_result}
-
-IMPORTANT: 
-1. Acknowledge the tool result to the user
-2. If this was a user information update:
-   - Continue with the NEXT question in this sequence:
-     - Name (if unknown)
-     - Expertise level (if unknown)
-     - Goals (if unknown)
-     - Preferences (if unknown)
-3. If this was a document search:
-   - Focus on the most relevant information
-   - Cite the sources when appropriate
-   - Summarize clearly and concisely
-4. Stay focused on the current context
-5. Do not start new topics until current task is complete
-
-Please provide your response:"""
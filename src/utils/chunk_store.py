@@ -0,0 +1,197 @@
+"""Columnar, offset-indexed storage for vector store chunks.
+
+A chunk store is one file holding, per row, a chunk's ID, content and
+metadata, with rows in the same order as the vectors of the FAISS index:
+
+    header      magic, row count and the (offset, length) of each section
+    content     length-prefixed UTF-8 records
+    offsets     uint64 offset of each row's content record
+    ids         length-prefixed UTF-8 records
+    id offsets  uint64 offset of each row's ID record
+    id order    uint32 rows sorted by ID, for binary search
+    meta rows   uint32 index of each row's metadata in the metadata table
+    meta        length-prefixed JSON records, one per distinct metadata dict
+    meta offsets uint64 offset of each metadata record
+
+The file is memory-mapped on open and only the header is read, so opening
+is O(1) and reading k rows touches just those rows' pages.
+"""
+
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+MAGIC = b"RAGCHNK1"
+
+# Section order in the header
+SECTIONS = ("content", "offsets", "ids", "id_offsets", "id_order", "meta_rows", "meta", "meta_offsets")
+
+# magic, row count, metadata count, then (offset, length) per section
+_HEADER = struct.Struct(f"<8sQQ{2 * len(SECTIONS)}Q")
+_LENGTH = struct.Struct("<I")
+
+def _pad(f) -> None:
+    """Align the next section to 8 bytes."""
+    f.write(b"\0" * (-f.tell() % 8))
+
+def _write_record(f, data: bytes) -> int:
+    """Write a length-prefixed record and return its offset."""
+    offset = f.tell()
+    f.write(_LENGTH.pack(len(data)))
+    f.write(data)
+    return offset
+
+def write_chunk_store(path, rows: Iterable[Tuple[str, str, Dict[str, Any]]]) -> int:
+    """Write a chunk store, replacing any existing file atomically.
+
+    Content is streamed to disk as rows arrive; only IDs and distinct
+    metadata are kept in memory.
+
+    Args:
+        path: Destination file
+        rows: (chunk ID, content, metadata) in vector index order
+
+    Returns:
+        Number of rows written
+    """
+    path = Path(path)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    sections: Dict[str, Tuple[int, int]] = {}
+    ids: List[bytes] = []
+    content_offsets: List[int] = []
+    meta_rows: List[int] = []
+    meta_index: Dict[str, int] = {}
+
+    with open(tmp_path, "wb") as f:
+        f.write(b"\0" * _HEADER.size)
+        _pad(f)
+
+        start = f.tell()
+        for chunk_id, content, metadata in rows:
+            content_offsets.append(_write_record(f, content.encode("utf-8")) - start)
+            ids.append(chunk_id.encode("utf-8"))
+            # Chunks of one file share their metadata; store it once
+            key = json.dumps(metadata, sort_keys=True, ensure_ascii=False, default=str)
+            meta_rows.append(meta_index.setdefault(key, len(meta_index)))
+        sections["content"] = (start, f.tell() - start)
+
+        def write_array(name: str, values, dtype: str) -> None:
+            _pad(f)
+            data = np.asarray(values, dtype=dtype).tobytes()
+            sections[name] = (f.tell(), len(data))
+            f.write(data)
+
+        def write_records(name: str, offsets_name: str, records: Iterable[bytes]) -> None:
+            _pad(f)
+            start = f.tell()
+            offsets = [_write_record(f, record) - start for record in records]
+            sections[name] = (start, f.tell() - start)
+            write_array(offsets_name, offsets, "<u8")
+
+        write_array("offsets", content_offsets, "<u8")
+        write_records("ids", "id_offsets", ids)
+        write_array("id_order", sorted(range(len(ids)), key=ids.__getitem__), "<u4")
+        write_array("meta_rows", meta_rows, "<u4")
+        write_records("meta", "meta_offsets", (key.encode("utf-8") for key in meta_index))
+
+        f.seek(0)
+        f.write(_HEADER.pack(
+            MAGIC, len(ids), len(meta_index),
+            *(value for name in SECTIONS for value in sections[name])
+        ))
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp_path, path)
+    return len(ids)
+
+class ChunkStore:
+    """Read-only, memory-mapped view of a chunk store file."""
+
+    def __init__(self, path):
+        """Map a chunk store file.
+
+        Raises:
+            ValueError: If the file is not a valid chunk store
+        """
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < _HEADER.size:
+                raise ValueError(f"Not a chunk store: {self.path}")
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self._count, meta_count, *bounds = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self._mm.close()
+            raise ValueError(f"Not a chunk store: {self.path}")
+        self._sections = {name: (bounds[2 * i], bounds[2 * i + 1]) for i, name in enumerate(SECTIONS)}
+        if any(offset + length > size for offset, length in self._sections.values()):
+            self._mm.close()
+            raise ValueError(f"Truncated chunk store: {self.path}")
+
+        self._offsets = self._array("offsets", "<u8", self._count)
+        self._id_offsets = self._array("id_offsets", "<u8", self._count)
+        self._id_order = self._array("id_order", "<u4", self._count)
+        self._meta_rows = self._array("meta_rows", "<u4", self._count)
+        self._meta_offsets = self._array("meta_offsets", "<u8", meta_count)
+        self._meta_cache: Dict[int, Dict[str, Any]] = {}
+
+    def _array(self, section: str, dtype: str, count: int) -> np.ndarray:
+        offset, length = self._sections[section]
+        if length != count * np.dtype(dtype).itemsize:
+            raise ValueError(f"Corrupt chunk store section {section}: {self.path}")
+        return np.frombuffer(self._mm, dtype=dtype, count=count, offset=offset)
+
+    def _record(self, section: str, offset: int) -> bytes:
+        start = self._sections[section][0] + int(offset)
+        (length,) = _LENGTH.unpack_from(self._mm, start)
+        return self._mm[start + _LENGTH.size:start + _LENGTH.size + length]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def id(self, row: int) -> str:
+        """Chunk ID of a row."""
+        return self._record("ids", self._id_offsets[row]).decode("utf-8")
+
+    def content(self, row: int) -> str:
+        """Content of a row."""
+        return self._record("content", self._offsets[row]).decode("utf-8")
+
+    def metadata(self, row: int) -> Dict[str, Any]:
+        """Metadata of a row, as a new dict."""
+        index = int(self._meta_rows[row])
+        if index not in self._meta_cache:
+            self._meta_cache[index] = json.loads(self._record("meta", self._meta_offsets[index]))
+        return dict(self._meta_cache[index])
+
+    def find(self, chunk_id: str) -> Optional[int]:
+        """Row of a chunk ID, by binary search over the sorted IDs."""
+        key = chunk_id.encode("utf-8")
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            row = int(self._id_order[mid])
+            candidate = self._record("ids", self._id_offsets[row])
+            if candidate < key:
+                lo = mid + 1
+            elif candidate > key:
+                hi = mid
+            else:
+                return row
+        return None
+
+    def ids(self) -> Iterator[str]:
+        """Chunk IDs in row order."""
+        return (self.id(row) for row in range(self._count))
+
+    def close(self) -> None:
+        """Unmap the file. Rows can no longer be read afterwards."""
+        self._offsets = self._id_offsets = self._id_order = self._meta_rows = self._meta_offsets = None
+        self._mm.close()
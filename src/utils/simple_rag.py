@@ -5,22 +5,53 @@ import shutil
 import json
 import re
 import html
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from collections.abc import Mapping, MutableMapping
+from typing import List, Dict, Any, Iterator, Optional, Sequence, Tuple, Union
+from langchain_community.docstore.base import AddableMixin, Docstore
 from langchain_community.document_loaders import TextLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.faiss import dependable_faiss_import
 from langchain_ollama import OllamaEmbeddings
 from langchain_ollama import ChatOllama
 from langchain.docstore.document import Document
 from config import get_model_config, get_rag_config
+from chunk_store import ChunkStore, write_chunk_store
+from services.document_ingestion.manifest import IngestionManifest, compute_document_hash
+from services.document_ingestion.embedding_cache import CachedEmbeddings, get_embedding_cache
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Files of a saved vector store
+INDEX_FILE = "index.faiss"
+CHUNK_STORE_FILE = "chunks.bin"
+
+# Files of the previous format: pickled docstore and JSON chunk metadata
+LEGACY_FILES = ("index.pkl", "metadata.json")
+
+# Script blocks and other dangerous elements, up to the first closing tag
+_SCRIPT_RE = re.compile(r'<script\b.*?</script>', re.DOTALL)
+_DANGEROUS_TAG_RE = re.compile(r'<(style|iframe|object|embed|form)\b.*?</\1>', re.DOTALL)
+
+# Control characters other than newline and tab
+_CONTROL_CHARS = {c: None for c in range(32) if chr(c) not in '\n\t'}
+_CONTROL_CHARS_RE = re.compile('[\x00-\x08\x0b-\x1f]')
+
+_QUERY_DISALLOWED_RE = re.compile(r'[^\w\s.,!?-]')
+
 class DocumentSanitizer:
     """Utilities for sanitizing document content and metadata."""
     
+    # Below this many characters in total, sanitize_batch stays in-process:
+    # shipping the texts to worker processes would cost more than it saves
+    PARALLEL_MIN_CHARS = 4 * 1024 * 1024
+    
     @staticmethod
     def sanitize_content(content: str) -> str:
         """Sanitize document content.
@@ -29,23 +60,54 @@ class DocumentSanitizer:
         - Normalize whitespace
         - Remove control characters
         - HTML escape special characters
+        
+        Every step is a single C-level pass over the text; the tag patterns
+        only run when the text contains a tag.
         """
-        # Remove script tags and their content
-        content = re.sub(r'<script\b[^<]*(?:(?!<\/script>)<[^<]*)*<\/script>', '', content)
+        if '<script' in content:
+            content = _SCRIPT_RE.sub('', content)
+        if '<' in content:
+            content = _DANGEROUS_TAG_RE.sub('', content)
         
-        # Remove other potentially dangerous HTML tags
-        content = re.sub(r'<(style|iframe|object|embed|form)\b[^<]*(?:(?!<\/\1>)<[^<]*)*<\/\1>', '', content)
+        # str.translate has a fast path for ASCII text only; for other text
+        # a regex scan is several times faster than its generic path
+        if content.isascii():
+            content = content.translate(_CONTROL_CHARS)
+        else:
+            content = _CONTROL_CHARS_RE.sub('', content)
         
-        # Remove control characters except newlines and tabs
-        content = ''.join(char for char in content if char >= ' ' or char in '\n\t')
+        # Same whitespace as \s, collapsed and stripped
+        content = ' '.join(content.split())
         
-        # Normalize whitespace
-        content = re.sub(r'\s+', ' ', content).strip()
+        return html.escape(content)
+    
+    @staticmethod
+    def sanitize_batch(
+        contents: Sequence[str],
+        max_workers: Optional[int] = None,
+        min_parallel_chars: Optional[int] = None
+    ) -> List[str]:
+        """Sanitize many texts, spreading large batches across processes.
         
-        # HTML escape special characters
-        content = html.escape(content)
+        Args:
+            contents: Texts to sanitize
+            max_workers: Worker processes; defaults to the CPU count
+            min_parallel_chars: Total size below which texts are sanitized
+                in-process; defaults to PARALLEL_MIN_CHARS
+                
+        Returns:
+            Sanitized texts in input order
+        """
+        if min_parallel_chars is None:
+            min_parallel_chars = DocumentSanitizer.PARALLEL_MIN_CHARS
+        max_workers = max_workers or os.cpu_count() or 1
+        if max_workers == 1 or len(contents) < 2 or sum(map(len, contents)) < min_parallel_chars:
+            return [DocumentSanitizer.sanitize_content(content) for content in contents]
         
-        return content
+        # Several texts per task keep the pickling overhead per text low
+        chunksize = max(1, len(contents) // (max_workers * 4))
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            return list(pool.map(DocumentSanitizer.sanitize_content, contents, chunksize=chunksize))
     
     @staticmethod
     def sanitize_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
@@ -88,13 +150,123 @@ class DocumentSanitizer:
         - Basic injection prevention
         """
         # Remove special characters except basic punctuation
-        query = re.sub(r'[^\w\s.,!?-]', '', query)
+        query = _QUERY_DISALLOWED_RE.sub('', query)
         
         # Limit length
         query = query[:1000]
         
         return query.strip()
 
+class ChunkDocstore(Docstore, AddableMixin):
+    """Docstore that reads chunks from a ChunkStore on demand.
+    
+    Only the chunks a search returns are read. They were sanitized at
+    ingest and are returned as stored. Documents added or deleted after
+    loading are tracked in memory on top of the store.
+    """
+    
+    def __init__(self, chunks: ChunkStore):
+        self.chunks = chunks
+        self._added: Dict[str, Document] = {}
+        self._deleted: set = set()
+    
+    def _row(self, chunk_id: str) -> Optional[int]:
+        if chunk_id in self._deleted:
+            return None
+        return self.chunks.find(chunk_id)
+    
+    def _document(self, row: int) -> Document:
+        return Document(page_content=self.chunks.content(row), metadata=self.chunks.metadata(row))
+    
+    def search(self, search: str) -> Union[str, Document]:
+        """Get a chunk by ID, or a not-found message as InMemoryDocstore returns."""
+        if search in self._added:
+            return self._added[search]
+        row = self._row(search)
+        if row is None:
+            return f"ID {search} not found."
+        return self._document(row)
+    
+    def add(self, texts: Dict[str, Document]) -> None:
+        overlapping = [chunk_id for chunk_id in texts if chunk_id in self._dict]
+        if overlapping:
+            raise ValueError(f"Tried to add ids that already exist: {overlapping}")
+        self._added.update(texts)
+    
+    def delete(self, ids: List) -> None:
+        missing = [chunk_id for chunk_id in ids if chunk_id not in self._dict]
+        if missing:
+            raise ValueError(f"Tried to delete ids that does not  exist: {missing}")
+        for chunk_id in ids:
+            if self._added.pop(chunk_id, None) is None:
+                self._deleted.add(chunk_id)
+    
+    @property
+    def _dict(self) -> "ChunkDocstoreView":
+        """Mapping of ID to Document, for code written against InMemoryDocstore."""
+        return ChunkDocstoreView(self)
+
+class ChunkDocstoreView(Mapping):
+    """Read-only ID -> Document mapping over a ChunkDocstore."""
+    
+    def __init__(self, docstore: ChunkDocstore):
+        self.docstore = docstore
+    
+    def __getitem__(self, chunk_id: str) -> Document:
+        document = self.docstore.search(chunk_id)
+        if not isinstance(document, Document):
+            raise KeyError(chunk_id)
+        return document
+    
+    def __contains__(self, chunk_id) -> bool:
+        return chunk_id in self.docstore._added or self.docstore._row(chunk_id) is not None
+    
+    def __iter__(self) -> Iterator[str]:
+        for chunk_id in self.docstore.chunks.ids():
+            if chunk_id not in self.docstore._deleted:
+                yield chunk_id
+        yield from self.docstore._added
+    
+    def __len__(self) -> int:
+        docstore = self.docstore
+        return len(docstore.chunks) - len(docstore._deleted) + len(docstore._added)
+
+class ChunkIndexMap(MutableMapping):
+    """FAISS position -> chunk ID, read from the ChunkStore rows on demand."""
+    
+    def __init__(self, chunks: ChunkStore):
+        self.chunks = chunks
+        self._overlay: Dict[int, str] = {}
+        self._removed: set = set()
+    
+    def __getitem__(self, position: int) -> str:
+        if position in self._overlay:
+            return self._overlay[position]
+        if position in self._removed or not 0 <= position < len(self.chunks):
+            raise KeyError(position)
+        return self.chunks.id(position)
+    
+    def __setitem__(self, position: int, chunk_id: str) -> None:
+        self._removed.discard(position)
+        self._overlay[position] = chunk_id
+    
+    def __delitem__(self, position: int) -> None:
+        self[position]
+        self._overlay.pop(position, None)
+        if 0 <= position < len(self.chunks):
+            self._removed.add(position)
+    
+    def __iter__(self) -> Iterator[int]:
+        for position in range(len(self.chunks)):
+            if position not in self._removed and position not in self._overlay:
+                yield position
+        yield from self._overlay
+    
+    def __len__(self) -> int:
+        # Overlay positions are never also in _removed
+        shadowed = sum(1 for position in self._overlay if 0 <= position < len(self.chunks))
+        return len(self.chunks) - len(self._removed) - shadowed + len(self._overlay)
+
 class RAGService:
     """Service for handling RAG operations."""
     
@@ -104,14 +276,21 @@ class RAGService:
         self._embeddings = None
         self._llm = None
         self.sanitizer = DocumentSanitizer()
+        
+        # Warm vector store, reloaded only when the files on disk change
+        self._vector_store = None
+        self._vector_store_path = None
+        self._vector_store_signature = None
+        self._vector_store_lock = threading.Lock()
     
     @property
     def embeddings(self):
         """Get embeddings model, initializing if needed."""
         if self._embeddings is None:
-            self._embeddings = OllamaEmbeddings(
-                model=self.model_config["embedding_model"],
-                base_url=self.model_config["base_url"]
+            model = self.model_config["embedding_model"]
+            self._embeddings = CachedEmbeddings(
+                OllamaEmbeddings(model=model, base_url=self.model_config["base_url"]),
+                get_embedding_cache(model)
             )
         return self._embeddings
     
@@ -126,36 +305,139 @@ class RAGService:
             )
         return self._llm
 
+    @staticmethod
+    def _chunk_rows(vector_store: FAISS) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        """Yield (ID, content, metadata) in index order.
+        
+        Chunks are written as they are: they were sanitized once at ingest,
+        and sanitizing again would escape their entities a second time.
+        """
+        for position in range(vector_store.index.ntotal):
+            chunk_id = vector_store.index_to_docstore_id[position]
+            doc = vector_store.docstore.search(chunk_id)
+            yield chunk_id, doc.page_content, doc.metadata
+
     def save_vector_store(self, vector_store: FAISS, save_path: Optional[str] = None):
-        """Safely save vector store with separate metadata."""
+        """Safely save vector store with a separate chunk store.
+        
+        The FAISS index is written with faiss.write_index and the chunks to
+        a columnar chunk store in index order, so no pickle is involved and
+        loading reads only what a search returns.
+        """
         save_path = Path(save_path or self.rag_config["vector_store_path"])
         save_path.mkdir(parents=True, exist_ok=True)
         
-        # Save FAISS index (already uses a secure binary format)
-        vector_store.save_local(str(save_path), "index")
+        # Chunks first: the index is written last, so a reader never sees an
+        # index with more vectors than the chunk store has rows
+        write_chunk_store(save_path / CHUNK_STORE_FILE, self._chunk_rows(vector_store))
+        faiss = dependable_faiss_import()
+        tmp_index_path = save_path / (INDEX_FILE + ".tmp")
+        faiss.write_index(vector_store.index, str(tmp_index_path))
+        os.replace(tmp_index_path, save_path / INDEX_FILE)
         
-        # Extract and sanitize metadata before saving
-        documents = vector_store.docstore._dict
-        metadata = {
-            str(k): {
-                'page_content': self.sanitizer.sanitize_content(v.page_content),
-                'metadata': self.sanitizer.sanitize_metadata(v.metadata)
-            } for k, v in documents.items()
-        }
+        for name in LEGACY_FILES:
+            (save_path / name).unlink(missing_ok=True)
+        
+        # Keep the in-memory copy warm instead of forcing a reload on next query
+        with self._vector_store_lock:
+            self._vector_store = vector_store
+            self._vector_store_path = save_path.resolve()
+            self._vector_store_signature = self._get_store_signature(save_path)
+
+    @staticmethod
+    def _get_store_signature(store_path: Path) -> Optional[tuple]:
+        """Get a cheap change marker for the files of a saved vector store.
         
-        with open(save_path / "metadata.json", "w", encoding="utf-8") as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        Returns:
+            Tuple of (mtime_ns, size) for index.faiss and the chunk store
+            (metadata.json for stores in the previous format), or None if
+            either file is missing
+        """
+        chunks_path = store_path / CHUNK_STORE_FILE
+        if not chunks_path.exists():
+            chunks_path = store_path / "metadata.json"
+        try:
+            index_stat = (store_path / INDEX_FILE).stat()
+            metadata_stat = chunks_path.stat()
+        except FileNotFoundError:
+            return None
+        return (
+            index_stat.st_mtime_ns, index_stat.st_size,
+            metadata_stat.st_mtime_ns, metadata_stat.st_size
+        )
+
+    def get_vector_store(self, load_path: Optional[str] = None) -> FAISS:
+        """Get the warm vector store, reloading it only if it changed on disk.
+        
+        The loaded index is kept in memory and validated with a stat() of the
+        store files on every call, so repeated queries don't pay for reading
+        the index again.
+        
+        Args:
+            load_path: Optional vector store directory
+            
+        Returns:
+            Loaded FAISS vector store
+        """
+        load_path = Path(load_path or self.rag_config["vector_store_path"]).resolve()
+        signature = self._get_store_signature(load_path)
+        
+        with self._vector_store_lock:
+            if (self._vector_store is not None
+                    and self._vector_store_path == load_path
+                    and signature is not None
+                    and self._vector_store_signature == signature):
+                return self._vector_store
+            
+            logger.info("Loading vector store from disk...")
+            vector_store = self.load_vector_store(str(load_path), allow_faiss_pickle=True)
+            self._vector_store = vector_store
+            self._vector_store_path = load_path
+            self._vector_store_signature = signature
+            return vector_store
+
+    def invalidate_vector_store(self):
+        """Drop the warm vector store so the next query reloads it."""
+        with self._vector_store_lock:
+            self._vector_store = None
+            self._vector_store_path = None
+            self._vector_store_signature = None
 
     def load_vector_store(self, load_path: Optional[str] = None, allow_faiss_pickle: bool = False) -> FAISS:
-        """Safely load vector store with metadata validation."""
+        """Load a vector store without reading its chunks.
+        
+        The chunk store is memory-mapped and chunks are read only when a
+        search returns them, so loading is independent of the corpus size. Stores saved in the previous format (index.pkl and
+        metadata.json) are still loaded, which requires allow_faiss_pickle.
+        """
         load_path = Path(load_path or self.rag_config["vector_store_path"])
         
         # Validate paths exist
-        if not (load_path / "index.faiss").exists():
+        if not (load_path / INDEX_FILE).exists():
             raise ValueError("Vector store index not found")
-        if not (load_path / "metadata.json").exists():
+        if not (load_path / CHUNK_STORE_FILE).exists():
+            if (load_path / "metadata.json").exists():
+                return self._load_legacy_vector_store(load_path, allow_faiss_pickle)
             raise ValueError("Vector store metadata not found")
         
+        chunks = ChunkStore(load_path / CHUNK_STORE_FILE)
+        faiss = dependable_faiss_import()
+        index = faiss.read_index(str(load_path / INDEX_FILE))
+        if index.ntotal != len(chunks):
+            chunks.close()
+            raise ValueError(
+                f"Vector store index has {index.ntotal} vectors but the chunk store has {len(chunks)} chunks"
+            )
+        
+        return FAISS(
+            self.embeddings,
+            index,
+            ChunkDocstore(chunks),
+            ChunkIndexMap(chunks)
+        )
+
+    def _load_legacy_vector_store(self, load_path: Path, allow_faiss_pickle: bool) -> FAISS:
+        """Load a store saved as index.faiss, index.pkl and metadata.json."""
         # Load metadata from JSON (secure)
         with open(load_path / "metadata.json", "r", encoding="utf-8") as f:
             metadata = json.load(f)
@@ -164,15 +446,14 @@ class RAGService:
         if not isinstance(metadata, dict):
             raise ValueError("Invalid metadata format")
         
-        # Reconstruct documents with sanitization
-        documents = {}
+        # Reconstruct documents; their content was sanitized before it was saved
         for k, v in metadata.items():
             if not isinstance(v, dict) or 'page_content' not in v or 'metadata' not in v:
                 raise ValueError(f"Invalid document format for key {k}")
-            documents[k] = Document(
-                page_content=self.sanitizer.sanitize_content(v['page_content']),
-                metadata=self.sanitizer.sanitize_metadata(v['metadata'])
-            )
+        documents = {
+            k: Document(page_content=v['page_content'], metadata=v['metadata'])
+            for k, v in metadata.items()
+        }
         
         if not allow_faiss_pickle:
             raise ValueError(
@@ -191,15 +472,45 @@ class RAGService:
         
         return vector_store
 
-    def process_documents(self, folder_path: str, patterns: Optional[List[str]] = None):
-        """Process documents from a folder."""
-        patterns = patterns or self.rag_config["supported_file_types"]
+    def process_documents(
+        self,
+        folder_path: str,
+        patterns: Optional[List[str]] = None,
+        force_refresh: bool = False
+    ):
+        """Process documents from a folder.
         
-        # Clean up old vector store
+        Ingestion is incremental: a manifest of path, size, mtime and content
+        hash is kept next to the vector store. Unchanged files are skipped,
+        modified files have their old chunks replaced and deleted files have
+        their chunks evicted.
+        
+        Args:
+            folder_path: Path to folder containing documents
+            patterns: Optional list of file patterns to match
+            force_refresh: If True, discard the existing store and re-embed everything
+            
+        Returns:
+            The vector store, or None if it holds no documents
+        """
+        patterns = patterns or self.rag_config["supported_file_types"]
         vector_store_path = Path(self.rag_config["vector_store_path"])
-        if vector_store_path.exists():
-            logger.info("Removing old vector store...")
-            shutil.rmtree(vector_store_path)
+        manifest = IngestionManifest(vector_store_path / "manifest.json").load()
+        
+        # Reuse the existing store unless a full rebuild is requested or needed
+        vector_store = None
+        if not force_refresh and manifest.entries:
+            try:
+                vector_store = self.get_vector_store(str(vector_store_path))
+            except Exception as e:
+                logger.warning(f"Could not load existing vector store, rebuilding: {str(e)}")
+        
+        if vector_store is None:
+            if vector_store_path.exists():
+                logger.info("Removing old vector store...")
+                shutil.rmtree(vector_store_path)
+            self.invalidate_vector_store()
+            manifest.clear()
         
         text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=self.rag_config["chunk_size"],
@@ -214,36 +525,103 @@ class RAGService:
         
         logger.info(f"Found {len(all_files)} files")
         
-        # Process each file with sanitization
-        all_chunks = []
+        # Find new and modified files
+        seen_paths = set()
+        stale_ids = []
+        loaded = []
+        unchanged = 0
         for file_path in all_files:
             try:
-                logger.info(f"Processing {file_path.name}")
+                stats = file_path.stat()
+                seen_paths.add(manifest.key_for(file_path))
+                if manifest.is_unchanged(file_path, stats):
+                    unchanged += 1
+                    continue
+                
                 loader = TextLoader(str(file_path), encoding='utf-8')
                 documents = loader.load()
+                content_hash = compute_document_hash(
+                    "".join(doc.page_content for doc in documents)
+                )
+                if manifest.has_same_content(file_path, content_hash):
+                    # Touched but identical - just refresh size/mtime
+                    manifest.update(file_path, stats, content_hash)
+                    unchanged += 1
+                    continue
                 
-                # Sanitize content and metadata before chunking
-                sanitized_docs = []
-                for doc in documents:
-                    sanitized_docs.append(Document(
-                        page_content=self.sanitizer.sanitize_content(doc.page_content),
-                        metadata=self.sanitizer.sanitize_metadata(doc.metadata)
-                    ))
-                
-                chunks = text_splitter.split_documents(sanitized_docs)
-                all_chunks.extend(chunks)
+                logger.info(f"Processing {file_path.name}")
+                loaded.append((file_path, stats, content_hash, documents))
             except Exception as e:
                 logger.error(f"Error processing {file_path.name}: {str(e)}")
         
-        logger.info(f"Created {len(all_chunks)} chunks")
+        # Sanitize new content once, here, before chunking; chunks already
+        # in the store are never sanitized again
+        contents = self.sanitizer.sanitize_batch(
+            [doc.page_content for _, _, _, documents in loaded for doc in documents]
+        )
+        new_chunks = []
+        new_ids = []
+        pending_entries = []
+        position = 0
+        for file_path, stats, content_hash, documents in loaded:
+            sanitized_docs = []
+            for doc in documents:
+                sanitized_docs.append(Document(
+                    page_content=contents[position],
+                    metadata=self.sanitizer.sanitize_metadata(doc.metadata)
+                ))
+                position += 1
+            
+            chunks = text_splitter.split_documents(sanitized_docs)
+            chunk_ids = [str(uuid.uuid4()) for _ in chunks]
+            
+            existing = manifest.get(file_path)
+            if existing:
+                stale_ids.extend(existing.chunk_ids)
+            new_chunks.extend(chunks)
+            new_ids.extend(chunk_ids)
+            pending_entries.append((file_path, stats, content_hash, chunk_ids))
+        
+        # Evict files that were deleted since the last run
+        for key in manifest.find_deleted(folder_path, seen_paths):
+            logger.info(f"Removing deleted file {Path(key).name}")
+            stale_ids.extend(manifest.remove(key).chunk_ids)
+        
+        logger.info(
+            f"Created {len(new_chunks)} chunks, skipped {unchanged} unchanged files, "
+            f"removing {len(stale_ids)} stale chunks"
+        )
         
-        # Create vector store
-        if all_chunks:
-            vector_store = FAISS.from_documents(all_chunks, self.embeddings)
-            self.save_vector_store(vector_store)
-            logger.info("Vector store saved")
+        if not new_chunks and not stale_ids:
+            if vector_store is not None:
+                manifest.save()
             return vector_store
-        return None
+        
+        if vector_store is not None and stale_ids:
+            stale_ids = [i for i in stale_ids if i in vector_store.docstore._dict]
+            if stale_ids:
+                vector_store.delete(stale_ids)
+        
+        if new_chunks:
+            if vector_store is None:
+                vector_store = FAISS.from_documents(new_chunks, self.embeddings, ids=new_ids)
+            else:
+                vector_store.add_documents(new_chunks, ids=new_ids)
+        
+        for file_path, stats, content_hash, chunk_ids in pending_entries:
+            manifest.update(file_path, stats, content_hash, chunk_ids)
+        
+        if vector_store is None or not vector_store.docstore._dict:
+            # Nothing left to index
+            if vector_store_path.exists():
+                shutil.rmtree(vector_store_path)
+            self.invalidate_vector_store()
+            return None
+        
+        self.save_vector_store(vector_store)
+        manifest.save()
+        logger.info("Vector store saved")
+        return vector_store
 
     def search_documents(self, query: str, num_results: int = 5):
         """Search for documents and generate an AI response."""
@@ -251,8 +629,8 @@ class RAGService:
             # Sanitize the search query
             query = self.sanitizer.sanitize_query(query)
             
-            # Load vector store
-            vector_store = self.load_vector_store(allow_faiss_pickle=True)
+            # Get warm vector store (reloaded only if the store changed on disk)
+            vector_store = self.get_vector_store()
             
             # Get relevant documents
             results = vector_store.similarity_search_with_score(query, k=num_results)
@@ -296,10 +674,23 @@ Answer:"""
         except Exception as e:
             logger.error(f"Error searching: {str(e)}", exc_info=True)
 
+# Shared service instance so the warm vector store survives between calls
+_rag_service = None
+_rag_service_lock = threading.Lock()
+
+def get_rag_service() -> RAGService:
+    """Get the shared RAGService instance, creating it if needed."""
+    global _rag_service
+    if _rag_service is None:
+        with _rag_service_lock:
+            if _rag_service is None:
+                _rag_service = RAGService()
+    return _rag_service
+
 # For backward compatibility
 def save_vector_store(vector_store: FAISS, save_path: str):
     """Backward compatibility wrapper."""
-    rag = RAGService()
+    rag = get_rag_service()
     return rag.save_vector_store(vector_store, save_path)
 
 def load_vector_store(load_path: str, embeddings, allow_faiss_pickle: bool = False) -> FAISS:
@@ -307,14 +698,14 @@ def load_vector_store(load_path: str, embeddings, allow_faiss_pickle: bool = Fal
     rag = RAGService()
     return rag.load_vector_store(load_path, allow_faiss_pickle)
 
-def process_documents(folder_path: str, patterns: List[str] = None):
+def process_documents(folder_path: str, patterns: List[str] = None, force_refresh: bool = False):
     """Backward compatibility wrapper."""
-    rag = RAGService()
-    return rag.process_documents(folder_path, patterns)
+    rag = get_rag_service()
+    return rag.process_documents(folder_path, patterns, force_refresh)
 
 def search_documents(query: str, num_results: int = 5):
     """Backward compatibility wrapper."""
-    rag = RAGService()
+    rag = get_rag_service()
     return rag.search_documents(query, num_results)
 
 if __name__ == "__main__":
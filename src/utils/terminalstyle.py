@@ -1,4 +1,6 @@
+import time
 from rich.console import Console
+from rich.live import Live
 from rich.markdown import Markdown
 from rich.panel import Panel
 from rich.syntax import Syntax
@@ -7,12 +9,68 @@ from rich.box import ROUNDED
 
 console = Console()
 
+def _assistant_panel(text):
+    return Panel(Markdown(text), border_style="green", box=ROUNDED, expand=False, title="AI Agent", title_align="left")
+
 def print_assistant_response(text):
     console.print()  # Add a blank line before the assistant's response
-    md = Markdown(text)
-    console.print(Panel(md, border_style="green", box=ROUNDED, expand=False, title="AI Agent", title_align="left"))
+    console.print(_assistant_panel(text))
     console.print()  # Add a blank line after the assistant's response
 
+class _StreamingResponse:
+    """Live-updating assistant panel that re-renders markdown at most every min_interval seconds.
+
+    The panel only appears once the first chunk arrives, so anything printed
+    before that (tool usage, system messages) stays above it.
+    """
+    def __init__(self, min_interval=0.05):
+        self.min_interval = min_interval
+        self.parts = []
+        self.last_render = 0.0
+        self.live = None
+
+    def __enter__(self):
+        return self
+
+    def add(self, chunk):
+        if not chunk:
+            return
+        if self.live is None:
+            console.print()  # Add a blank line before the assistant's response
+            self.live = Live(_assistant_panel(""), console=console, refresh_per_second=15, vertical_overflow="visible")
+            self.live.__enter__()
+        self.parts.append(chunk)
+        now = time.monotonic()
+        # Re-parsing markdown on every token is quadratic for long answers
+        if now - self.last_render >= self.min_interval:
+            self.live.update(_assistant_panel("".join(self.parts)))
+            self.last_render = now
+
+    def __exit__(self, *exc_info):
+        if self.live is None:
+            return
+        self.live.update(_assistant_panel(self.text))
+        self.live.__exit__(*exc_info)
+        console.print()  # Add a blank line after the assistant's response
+
+    @property
+    def text(self):
+        return "".join(self.parts)
+
+def stream_assistant_response(chunks):
+    """Render an iterable of text chunks as they arrive and return the full text."""
+    with _StreamingResponse() as stream:
+        for chunk in chunks:
+            stream.add(chunk)
+    return stream.text
+
+async def astream_assistant_response(chunks):
+    """Render an async iterable of text chunks as they arrive and return the full text."""
+    with _StreamingResponse() as stream:
+        async for chunk in chunks:
+            stream.add(chunk)
+    return stream.text
+
 def print_system_message(text):
     console.print()  # Add a blank line before the system message
     system_text = Text(text, style="yellow")
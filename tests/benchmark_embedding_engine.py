@@ -0,0 +1,85 @@
+"""Benchmark embedding throughput on CPU in chunks/sec.
+
+Embeds the same synthetic chunks, sized like the DocumentTools splitter's
+output, with a plain SentenceTransformer.encode call as the baseline and
+with EmbeddingEngine on each requested backend. Backends whose packages are
+not installed are skipped. Each backend's vectors are compared with the
+baseline's by cosine similarity.
+
+Usage:
+    python tests/benchmark_embedding_engine.py --chunks 2000 --threads 4 --backends torch,torch-int8,onnx,onnx-int8
+"""
+
+import argparse
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent / "docs" / "reference"))
+from services.document_ingestion.embedding_engine import BACKENDS, EmbeddingEngine
+
+def make_chunks(count: int, seed: int = 0) -> list:
+    """Prose-like chunks of 50 to 1000 characters, mostly near the splitter's chunk size."""
+    rng = random.Random(seed)
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 9))) for _ in range(5000)]
+    chunks = []
+    for _ in range(count):
+        size = rng.choice([rng.randint(50, 400), rng.randint(800, 1000), rng.randint(800, 1000)])
+        text = ""
+        while len(text) < size:
+            text += rng.choice(words) + " "
+        chunks.append(text[:size])
+    return chunks
+
+def timed(embed, chunks):
+    """Warm up, then time one pass; returns (seconds, vectors)."""
+    embed(chunks[:16])
+    started = time.perf_counter()
+    vectors = embed(chunks)
+    return time.perf_counter() - started, np.asarray(vectors, dtype=np.float32)
+
+def cosine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--chunks", type=int, default=2000, help="Chunks to embed")
+    parser.add_argument("--threads", type=int, default=0, help="Inference threads (0: runtime default)")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="Comma-separated EmbeddingEngine backends")
+    parser.add_argument("--batch-tokens", type=int, default=8192, help="Padded tokens per engine batch")
+    args = parser.parse_args()
+
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    chunks = make_chunks(args.chunks)
+    print(f"{len(chunks)} chunks, {sum(map(len, chunks)) / len(chunks):.0f} characters on average, "
+          f"{torch.get_num_threads()} threads")
+
+    # The previous path: HuggingFaceEmbeddings calls encode with its default batch size
+    model = SentenceTransformer(args.model, device="cpu")
+    seconds, baseline = timed(lambda texts: model.encode(texts, batch_size=32, show_progress_bar=False), chunks)
+    print(f"\n{'backend':<14} {'chunks/s':>9} {'speedup':>8} {'min cos':>8}")
+    print(f"{'baseline':<14} {len(chunks) / seconds:>9.1f} {1.0:>7.2f}x {1.0:>8.4f}")
+    baseline_seconds = seconds
+
+    for backend in args.backends.split(","):
+        engine = EmbeddingEngine(args.model, backend=backend, threads=args.threads, batch_tokens=args.batch_tokens)
+        try:
+            engine.model
+        except Exception as e:
+            print(f"{backend:<14} skipped: {e}")
+            continue
+        seconds, vectors = timed(engine.embed_documents, chunks)
+        similarity = cosine(vectors, baseline).min()
+        print(f"{backend:<14} {len(chunks) / seconds:>9.1f} {baseline_seconds / seconds:>7.2f}x {similarity:>8.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Import-time regression benchmark.
+
+Imports each target in a fresh interpreter under `python -X importtime`,
+reports wall time and the slowest modules, and checks that importing the
+tools package leaves the heavy dependencies unloaded. Exits non-zero when a
+target exceeds its budget or a heavy module is loaded eagerly, so it can run
+as a CI check.
+
+Usage:
+    python tests/benchmark_import_time.py --budget 1.0 --top 15
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+SEARCH_PATH = [ROOT / "src", ROOT / "src" / "utils", ROOT / "docs" / "reference"]
+
+# Modules whose cold import must stay within the budget
+TARGETS = ("tools", "main")
+
+# Modules that only tools needing them may import
+HEAVY_MODULES = (
+    "googleapiclient.discovery",
+    "simple_rag",
+    "langchain",
+    "langchain_community",
+    "tools.rag_tools",
+    "tools.google_api_tools",
+    "tools.perplexity_api_tools",
+    "tools.searxng_tools",
+)
+
+IMPORTTIME_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+def _env() -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(str(p) for p in SEARCH_PATH)
+    # Measure imports, not reading stale bytecode from a different tree
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return env
+
+def measure(module: str) -> tuple:
+    """Import a module in a fresh interpreter.
+
+    Returns:
+        (wall seconds, [(cumulative us, self us, module name)] for top-level
+        imports of the target, error output or None)
+    """
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=_env(), cwd=ROOT
+    )
+    wall = time.perf_counter() - start
+
+    entries = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((int(cumulative_us), int(self_us), name, len(indent)))
+    error = result.stderr.strip().splitlines()[-1] if result.returncode else None
+    return wall, entries, error
+
+def loaded_heavy_modules(module: str) -> list:
+    """Heavy modules present in sys.modules after importing a module."""
+    code = (
+        f"import sys, {module}\n"
+        f"print('\\n'.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=_env(), cwd=ROOT)
+    return [line for line in result.stdout.splitlines() if line]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", type=float, default=1.0, help="Maximum cold import time in seconds")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to list")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per target; the fastest is reported")
+    args = parser.parse_args()
+
+    failed = False
+    for target in TARGETS:
+        runs = [measure(target) for _ in range(args.runs)]
+        wall, entries, error = min(runs, key=lambda run: run[0])
+        if error:
+            print(f"{target}: import failed: {error}")
+            failed = True
+            continue
+
+        status = "ok" if wall <= args.budget else "OVER BUDGET"
+        print(f"\n{target}: {wall:.3f}s wall ({status}, budget {args.budget:.3f}s)")
+        print(f"{'cumulative ms':>14} {'self ms':>8}  module")
+        for cumulative_us, self_us, name, _ in sorted(entries, reverse=True)[:args.top]:
+            print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>8.1f}  {name}")
+        failed |= wall > args.budget
+
+    heavy = loaded_heavy_modules("tools")
+    if heavy:
+        print(f"\n'import tools' eagerly loaded: {', '.join(heavy)}")
+        failed = True
+    else:
+        print("\n'import tools' loads no heavy tool modules")
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Benchmark DocumentSanitizer over multi-MB inputs.
+
+Compares the previous sanitize_content (two backtracking regexes and a
+per-character generator) with the single-pass version, on ASCII and
+non-ASCII text, and sanitize_batch in-process against the process pool.
+Outputs are checked to be identical.
+
+Usage:
+    python tests/benchmark_sanitizer.py --size-mb 4 --docs 2000
+"""
+
+import argparse
+import html
+import random
+import re
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+sys.path.append(str(Path(__file__).parent.parent / "src" / "utils"))
+sys.path.append(str(Path(__file__).parent.parent / "docs" / "reference"))
+from simple_rag import DocumentSanitizer
+
+def legacy_sanitize_content(content: str) -> str:
+    """sanitize_content as it was before the single-pass rewrite."""
+    content = re.sub(r'<script\b[^<]*(?:(?!<\/script>)<[^<]*)*<\/script>', '', content)
+    content = re.sub(r'<(style|iframe|object|embed|form)\b[^<]*(?:(?!<\/\1>)<[^<]*)*<\/\1>', '', content)
+    content = ''.join(char for char in content if char >= ' ' or char in '\n\t')
+    content = re.sub(r'\s+', ' ', content).strip()
+    return html.escape(content)
+
+def make_text(size: int, non_ascii: bool, rng: random.Random, words: list) -> str:
+    """Prose-like text with markup, control characters and odd whitespace."""
+    extras = [" ", " ", " ", "\n", "\t\t", "\r\n", "\x00", " & ", "<b>", '"', "  "]
+    if non_ascii:
+        extras += ["\xa0", "é", "—", "中文"]
+    parts = []
+    length = 0
+    while length < size:
+        if rng.random() < 0.001:
+            part = "<script>alert('x')</script>" if rng.random() < 0.5 else "<style>p { color: red }</style>"
+        else:
+            part = rng.choice(words) + rng.choice(extras)
+        parts.append(part)
+        length += len(part)
+    return "".join(parts)
+
+def timed(func, *args, repeat: int = 3):
+    """Best wall time of repeat runs, and the last result."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=float, default=4, help="Size of each single-text input in MB")
+    parser.add_argument("--docs", type=int, default=2000, help="Texts in the batch benchmark")
+    parser.add_argument("--workers", type=int, default=None, help="Processes for sanitize_batch (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    size = int(args.size_mb * 1024 * 1024)
+    words = ["".join(rng.choices(string.ascii_letters, k=rng.randint(2, 10))) for _ in range(2000)]
+
+    print(f"{'input':<24} {'before':>9} {'after':>9} {'speedup':>8}")
+    for label, non_ascii in (("ascii", False), ("non-ascii", True)):
+        text = make_text(size, non_ascii, rng, words)
+        before, expected = timed(legacy_sanitize_content, text)
+        after, result = timed(DocumentSanitizer.sanitize_content, text)
+        assert result == expected, f"outputs differ for {label} input"
+        name = f"{label} {len(text) / 1e6:.1f}M chars"
+        print(f"{name:<24} {before * 1000:>7.0f}ms {after * 1000:>7.0f}ms {before / after:>7.1f}x")
+
+    # Chunk-sized texts, as sanitised on save and load of a vector store
+    texts = [make_text(rng.randint(500, 4000), rng.random() < 0.3, rng, words) for _ in range(args.docs)]
+    total = sum(map(len, texts))
+    serial, expected = timed(lambda: [DocumentSanitizer.sanitize_content(t) for t in texts])
+    pooled, result = timed(DocumentSanitizer.sanitize_batch, texts, args.workers, 0, repeat=1)
+    assert result == expected, "batch outputs differ"
+    print(f"\nBatch of {len(texts)} texts, {total / 1e6:.1f}M chars:")
+    print(f"  in-process   {serial * 1000:>7.0f}ms  {total / serial / 1e6:>6.1f}M chars/s")
+    print(f"  process pool {pooled * 1000:>7.0f}ms  {total / pooled / 1e6:>6.1f}M chars/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Benchmark prompt tokens spent on the tool catalog per turn.
+
+Compares the previous catalog (every tool, name and description) with the
+compact catalog of tools selected for each sample input, and reports tokens
+per turn and the saving. Tokens are counted with tiktoken when installed,
+otherwise estimated as characters / 4.
+
+Usage:
+    python tests/benchmark_tool_prompt.py --top-n 8
+    python tests/benchmark_tool_prompt.py --embed ollama   # semantic selection
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "docs" / "reference"))
+from tools.tool_definitions import get_tool_definitions
+from tools.tool_selector import ToolSelector, format_tool_catalog, ollama_embed
+
+SAMPLE_INPUTS = [
+    "What's on my calendar tomorrow afternoon?",
+    "Summarise the unread emails in my inbox from this week",
+    "Draft a reply to the last email from Alice saying I'll be late",
+    "Add a task to renew my passport next month",
+    "Search my notes for the deployment checklist",
+    "Create a spreadsheet tracking monthly expenses",
+    "What time is it in Tokyo right now?",
+    "Find recent news about the Rust 2024 edition",
+    "Move my 3pm meeting to Thursday",
+    "Remember that I prefer short answers",
+    "Read the file config/settings.yaml",
+    "Switch to the local Ollama model",
+]
+
+def token_counter():
+    """Return a function counting tokens, and the name of the method used."""
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(encoding.encode(text)), "tiktoken cl100k_base"
+    except ImportError:
+        return lambda text: len(text) // 4, "chars / 4 estimate"
+
+def full_catalog(definitions) -> str:
+    """The catalog every prompt carried before tool selection."""
+    lines = [f"- {d['function']['name']}: {d['function']['description']}" for d in definitions]
+    return "Available tools:\n" + "\n".join(lines) + "\n"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--top-n", type=int, default=8, help="Relevant tools selected per turn")
+    parser.add_argument("--embed", choices=("keywords", "ollama"), default="keywords",
+                        help="Rank tools by keyword overlap or by Ollama embeddings")
+    args = parser.parse_args()
+
+    definitions = [d for d in get_tool_definitions() if d["type"] == "function"]
+    count_tokens, method = token_counter()
+    with tempfile.TemporaryDirectory() as cache_dir:
+        selector = ToolSelector(
+            definitions,
+            embed=ollama_embed if args.embed == "ollama" else None,
+            cache_path=str(Path(cache_dir) / "tool_embeddings.json"),
+            top_n=args.top_n
+        )
+        baseline = count_tokens(full_catalog(definitions))
+
+        print(f"{len(definitions)} tools, tokens counted with {method}")
+        print(f"{'before':>7} {'after':>6} {'saved':>6}  input / selected tools")
+        saved = []
+        for text in SAMPLE_INPUTS:
+            selected = selector.select(text)
+            tokens = count_tokens(format_tool_catalog(selected))
+            saved.append(baseline - tokens)
+            names = ", ".join(d["function"]["name"] for d in selected[len(selector.always_include):])
+            print(f"{baseline:>7} {tokens:>6} {baseline - tokens:>6}  {text}\n{'':>23}{names}")
+
+    print(f"\nMean tokens saved per turn: {statistics.mean(saved):.0f} "
+          f"({statistics.mean(saved) / baseline:.0%} of the full catalog)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Benchmark FaissVectorStore index types.
+
+Builds a store per index type over the same synthetic clustered corpus and
+reports build time, recall@k against the exact Flat results, and p50/p99
+query latency. Queries are drawn around the corpus's own cluster centers,
+as real queries land near the documents they are looking for.
+
+Usage:
+    python tests/benchmark_vector_index.py --sizes 10000,100000,1000000 --dim 128
+"""
+
+import argparse
+import asyncio
+import logging
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent / "docs" / "reference"))
+from services.document_ingestion.types import ProcessedDocument
+from services.document_ingestion.vector_store.faiss_store import FaissVectorStore
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("Flat", "IVFPQ", "HNSW")
+STORE_BATCH = 100000
+
+def make_centers(size: int, dim: int, seed: int = 0) -> np.ndarray:
+    """Cluster centers of a corpus, one per thousand rows."""
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal((max(16, size // 1000), dim)).astype(np.float32)
+
+def sample_clusters(centers: np.ndarray, count: int, seed: int) -> np.ndarray:
+    """Vectors scattered around random centers, which resemble real embeddings better than uniform noise."""
+    rng = np.random.default_rng(seed)
+    assignment = rng.integers(0, len(centers), count)
+    return centers[assignment] + 0.3 * rng.standard_normal((count, centers.shape[1])).astype(np.float32)
+
+async def build_store(index_type: str, vectors: np.ndarray, path: Path) -> tuple:
+    """Build a store and return it with its build time in seconds."""
+    store = FaissVectorStore({
+        "dimension": vectors.shape[1],
+        "index_type": index_type,
+        "path": str(path),
+        # Train explicitly below so the timing covers the whole build
+        "ann_threshold": len(vectors) + 1
+    })
+    await store.connect()
+
+    start = time.perf_counter()
+    for offset in range(0, len(vectors), STORE_BATCH):
+        batch = vectors[offset:offset + STORE_BATCH]
+        await store.store_documents([
+            ProcessedDocument(doc_id=str(offset + i), chunks=[""], embeddings=row[None, :], metadata={})
+            for i, row in enumerate(batch)
+        ])
+    if index_type != "Flat":
+        store.build_ann_index()
+    return store, time.perf_counter() - start
+
+async def run_queries(store: FaissVectorStore, queries: np.ndarray, k: int) -> tuple:
+    """Run every query and return the result ids and per-query latencies in ms."""
+    results = []
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        hits = await store.search_similar(query, num_results=k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([hit["doc_id"] for hit in hits])
+    return results, np.array(latencies)
+
+def recall_at_k(results: list, truth: list, k: int) -> float:
+    """Mean fraction of the exact top-k found by the approximate search."""
+    found = sum(len(set(r[:k]) & set(t[:k])) for r, t in zip(results, truth))
+    return found / (len(truth) * k)
+
+async def benchmark(sizes: list, dim: int, num_queries: int, k: int) -> None:
+    """Benchmark every index type at each corpus size."""
+    print(f"{'rows':>9} {'index':>6} {'build s':>8} {'recall@' + str(k):>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for size in sizes:
+        centers = make_centers(size, dim)
+        vectors = sample_clusters(centers, size, seed=1)
+        queries = sample_clusters(centers, num_queries, seed=2)
+        truth = None
+
+        for index_type in INDEX_TYPES:
+            path = Path(tempfile.mkdtemp(prefix=f"bench_{index_type}_"))
+            try:
+                store, build_seconds = await build_store(index_type, vectors, path)
+                results, latencies = await run_queries(store, queries, k)
+                await store.disconnect()
+            except ImportError as e:
+                logger.warning(f"Skipping {index_type}: {str(e)}")
+                continue
+            finally:
+                shutil.rmtree(path, ignore_errors=True)
+
+            if truth is None:
+                truth = results
+            print(
+                f"{size:>9} {index_type:>6} {build_seconds:>8.1f} "
+                f"{recall_at_k(results, truth, k):>9.3f} "
+                f"{np.percentile(latencies, 50):>8.2f} {np.percentile(latencies, 99):>8.2f}"
+            )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma-separated corpus sizes")
+    parser.add_argument("--dim", type=int, default=128, help="Embedding dimension")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries per run")
+    parser.add_argument("-k", type=int, default=10, help="Results per query")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    asyncio.run(benchmark(sizes, args.dim, args.queries, args.k))
+
+if __name__ == "__main__":
+    main()
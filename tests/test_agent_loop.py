@@ -0,0 +1,79 @@
+"""Tests for the multi-step tool-calling loop."""
+
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from tools.agent_loop import FINAL_ANSWER_PROMPT, AgentLoop
+from tools.tool_calls import AssistantTurn, ToolCall
+
+TOOLS = [{"type": "function", "function": {"name": "lookup", "description": "Look something up"}}]
+
+class ScriptedModel:
+    """Returns the given turns in order, recording each transcript it was sent."""
+
+    def __init__(self, *turns):
+        self.turns = list(turns)
+        self.transcripts = []
+
+    def __call__(self, transcript, tools):
+        self.transcripts.append(list(transcript))
+        return self.turns.pop(0)
+
+def calls(*names):
+    return AssistantTurn(tool_calls=[ToolCall(id=f"call_{i}", name=n) for i, n in enumerate(names)])
+
+def run_tools(tool_calls):
+    return [f"{call.name} result " * 100 for call in tool_calls]
+
+def start():
+    return [{"role": "system", "content": "Be brief."}, {"role": "user", "content": "Go"}]
+
+class TestAgentLoop(unittest.TestCase):
+    def test_runs_until_answer(self):
+        model = ScriptedModel(calls("a", "b"), calls("c"), AssistantTurn(text="Done"))
+        result = AgentLoop(model, run_tools).run(start(), TOOLS)
+
+        self.assertEqual(result.text, "Done")
+        self.assertIsNone(result.stopped)
+        self.assertEqual([step.tool_calls for step in result.steps], [["a", "b"], ["c"], []])
+        # Both results of the first response go back in one step
+        self.assertEqual([m["role"] for m in model.transcripts[1][2:]], ["assistant", "tool", "tool"])
+
+    def test_earlier_results_compacted(self):
+        model = ScriptedModel(calls("a"), calls("b"), AssistantTurn(text="Done"))
+        AgentLoop(model, run_tools, compact_result_chars=20).run(start(), TOOLS)
+
+        tool_messages = [m for m in model.transcripts[2] if m["role"] == "tool"]
+        self.assertLess(len(tool_messages[0]["content"]), 60)
+        self.assertEqual(len(tool_messages[1]["content"]), len("b result ") * 100)
+
+    def test_max_steps_forces_answer(self):
+        model = ScriptedModel(calls("a"), calls("b"), calls("c"))
+        result = AgentLoop(model, run_tools, max_steps=2).run(start(), TOOLS)
+
+        self.assertEqual(result.stopped, "max_steps")
+        self.assertEqual(result.skipped_tool_calls, ["c"])
+        self.assertEqual(model.transcripts[-1][-1], {"role": "user", "content": FINAL_ANSWER_PROMPT})
+
+    def test_token_budget_forces_answer(self):
+        model = ScriptedModel(calls("a"), AssistantTurn(text="Partial"))
+        result = AgentLoop(model, run_tools, token_budget=50).run(start(), TOOLS)
+
+        self.assertEqual(result.stopped, "token_budget")
+        self.assertEqual(result.text, "Partial")
+
+    def test_records_step_latency(self):
+        def slow_tools(tool_calls):
+            # Tools of one step run side by side
+            with ThreadPoolExecutor() as pool:
+                return list(pool.map(lambda call: time.sleep(0.05) or "ok", tool_calls))
+
+        model = ScriptedModel(calls("a", "b", "c"), AssistantTurn(text="Done"))
+        result = AgentLoop(model, slow_tools).run(start(), TOOLS)
+        self.assertGreaterEqual(result.steps[0].tool_seconds, 0.05)
+        self.assertLess(result.steps[0].tool_seconds, 0.15)
+        self.assertGreater(result.steps[0].prompt_tokens, 0)
+
+if __name__ == '__main__':
+    unittest.main()
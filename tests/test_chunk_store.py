@@ -0,0 +1,68 @@
+"""Tests for chunk_store.py"""
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from chunk_store import ChunkStore, write_chunk_store
+
+class TestChunkStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = Path(self.temp_dir) / "chunks.bin"
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_round_trip(self):
+        rows = [
+            (f"id-{i:03d}", f"Chunk {i} — ünïcode", {"source": f"doc{i % 3}.txt", "chunk": i % 3})
+            for i in reversed(range(50))
+        ]
+        self.assertEqual(write_chunk_store(self.path, rows), 50)
+
+        store = ChunkStore(self.path)
+        self.assertEqual(len(store), 50)
+        for row, (chunk_id, content, metadata) in enumerate(rows):
+            self.assertEqual(store.id(row), chunk_id)
+            self.assertEqual(store.content(row), content)
+            self.assertEqual(store.metadata(row), metadata)
+        self.assertEqual(list(store.ids()), [r[0] for r in rows])
+        store.close()
+
+    def test_find(self):
+        write_chunk_store(self.path, [(chunk_id, "x", {}) for chunk_id in ("b", "c", "a")])
+        store = ChunkStore(self.path)
+        self.assertEqual([store.find(i) for i in ("a", "b", "c")], [2, 0, 1])
+        self.assertIsNone(store.find("d"))
+        store.close()
+
+    def test_metadata_copies(self):
+        write_chunk_store(self.path, [("a", "x", {"source": "s"}), ("b", "y", {"source": "s"})])
+        store = ChunkStore(self.path)
+        store.metadata(0)["source"] = "changed"
+        self.assertEqual(store.metadata(1), {"source": "s"})
+        store.close()
+
+    def test_empty(self):
+        self.assertEqual(write_chunk_store(self.path, []), 0)
+        store = ChunkStore(self.path)
+        self.assertEqual(len(store), 0)
+        self.assertIsNone(store.find("a"))
+        store.close()
+
+    def test_invalid_file(self):
+        self.path.write_bytes(b"not a chunk store" * 20)
+        with self.assertRaises(ValueError):
+            ChunkStore(self.path)
+
+    def test_truncated_file(self):
+        write_chunk_store(self.path, [("a", "x" * 1000, {})])
+        data = self.path.read_bytes()
+        self.path.write_bytes(data[:len(data) // 2])
+        with self.assertRaises(ValueError):
+            ChunkStore(self.path)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+"""Tests for DatabaseService vector storage and search, against an in-memory connection."""
+
+import asyncio
+import json
+import unittest
+
+from services.db_service import DatabaseService
+
+class FakeConnection:
+    """Just enough of an asyncpg connection for the memory_vectors queries."""
+
+    def __init__(self):
+        self.rows = []
+        self.statements = []
+        self.loads = 0
+
+    def transaction(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, query, *args):
+        self.statements.append(" ".join(query.split()))
+
+    async def fetchval(self, query, *args):
+        if "count(*)" in query:
+            return len(self.rows)
+        if "to_regclass" in query:
+            return False
+        raise AssertionError(query)
+
+    async def fetch(self, query, *args):
+        if "INSERT INTO memory_vectors" in query:
+            texts, embeddings, metadatas = args
+            inserted = []
+            for text, embedding, metadata in zip(texts, embeddings, metadatas):
+                row = {"id": len(self.rows) + 1, "text": text, "embedding_json": embedding, "metadata": metadata}
+                self.rows.append(row)
+                inserted.append({"id": row["id"]})
+            return inserted
+        if "embedding_json IS NOT NULL" in query:
+            self.loads += 1
+            return list(self.rows)
+        if "<=>" in query:
+            return []
+        raise AssertionError(query)
+
+class FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def acquire(self):
+        return self.conn
+
+def service(conn, **attributes):
+    db = DatabaseService(vector_dimension=3)
+    db.pool = FakePool(conn)
+    for name, value in attributes.items():
+        setattr(db, name, value)
+    return db
+
+class TestFallbackVectorSearch(unittest.TestCase):
+    def setUp(self):
+        self.conn = FakeConnection()
+        self.db = service(self.conn)
+
+    def test_store_and_search(self):
+        async def run():
+            ids = await self.db.store_vectors_bulk(
+                ["x", "y"], [[1, 0, 0], [0, 1, 0]], [{"kind": "a"}, {"kind": "b"}]
+            )
+            self.assertEqual(ids, [1, 2])
+            results = await self.db.search_vectors([0.9, 0.1, 0], k=1)
+            self.assertEqual([r["text"] for r in results], ["x"])
+            self.assertAlmostEqual(results[0]["score"], 0.9 / (0.82 ** 0.5), places=5)
+
+            # The matrix is reused until the next write
+            await self.db.search_vectors([0, 1, 0], k=2)
+            self.assertEqual(self.conn.loads, 1)
+            await self.db.store_vectors_bulk(["z"], [[0, 0, 1]])
+            results = await self.db.search_vectors([0, 0, 1], k=1)
+            self.assertEqual([r["text"] for r in results], ["z"])
+            self.assertEqual(self.conn.loads, 2)
+        asyncio.run(run())
+
+    def test_filter_uses_containment(self):
+        metadata = {"tags": ["a", "b"], "source": {"name": "n", "page": 1}, "flag": True}
+
+        async def run():
+            await self.db.store_vectors_bulk(["x", "y"], [[1, 0, 0], [1, 0, 0]], [metadata, {}])
+            for metadata_filter, expected in [
+                ({"tags": ["a"]}, ["x"]),
+                ({"tags": ("b", "a")}, ["x"]),
+                ({"source": {"page": 1}}, ["x"]),
+                ({"flag": True}, ["x"]),
+                ({"flag": 1}, []),
+                ({"tags": "a"}, []),
+                ({"source": {"page": 2}}, []),
+            ]:
+                results = await self.db.search_vectors([1, 0, 0], k=5, metadata_filter=metadata_filter)
+                self.assertEqual([r["text"] for r in results], expected, metadata_filter)
+        asyncio.run(run())
+
+    def test_load_overlapping_write_not_kept(self):
+        async def run():
+            await self.db.store_vectors_bulk(["x"], [[1, 0, 0]])
+            fetch = self.conn.fetch
+
+            async def fetch_during_write(query, *args):
+                rows = await fetch(query, *args)
+                if "embedding_json IS NOT NULL" in query:
+                    self.db.invalidate_vector_cache()
+                return rows
+            self.conn.fetch = fetch_during_write
+            await self.db.search_vectors([1, 0, 0], k=1)
+            self.assertIsNone(self.db._vector_cache)
+        asyncio.run(run())
+
+class TestPgvectorIndex(unittest.TestCase):
+    def setUp(self):
+        self.conn = FakeConnection()
+
+    def test_ivfflat_built_once_table_is_loaded(self):
+        db = service(self.conn, has_vector_extension=True, vector_index_type="ivfflat", vector_ivfflat_lists=2)
+        vectors = lambda n: ([f"t{i}" for i in range(n)], [[1.0, 0.0, 0.0]] * n)
+
+        async def run():
+            await db._create_memory_vectors_index(self.conn)
+            await db.store_vectors_bulk(*vectors(50))
+            self.assertFalse(any("ivfflat" in s for s in self.conn.statements))
+
+            await db.store_vectors_bulk(*vectors(30))
+            self.assertTrue(self.conn.statements[-1].startswith("CREATE INDEX IF NOT EXISTS memory_vectors_embedding_ivfflat"))
+            await db.store_vectors_bulk(*vectors(30))
+            self.assertFalse(any(s.startswith("REINDEX") for s in self.conn.statements))
+
+            # Retrained once the table has doubled since the build
+            await db.store_vectors_bulk(*vectors(50))
+            self.assertEqual(self.conn.statements[-1], "REINDEX INDEX memory_vectors_embedding_ivfflat;")
+        asyncio.run(run())
+
+    def test_filtered_search_scans_further(self):
+        async def settings(version, metadata_filter):
+            self.conn.statements.clear()
+            db = service(self.conn, has_vector_extension=True, vector_index_type="hnsw",
+                         vector_extension_version=version)
+            await db.search_vectors([1, 0, 0], k=5, metadata_filter=metadata_filter)
+            return self.conn.statements
+
+        async def run():
+            self.assertEqual(await settings((0, 7), None), ["SET LOCAL hnsw.ef_search = 64"])
+            self.assertEqual(await settings((0, 7), {"kind": "a"}), ["SET LOCAL hnsw.ef_search = 256"])
+            self.assertEqual(await settings((0, 8), {"kind": "a"}), [
+                "SET LOCAL hnsw.ef_search = 64",
+                "SET LOCAL hnsw.iterative_scan = strict_order"
+            ])
+        asyncio.run(run())
+
+class TestJsonbContains(unittest.TestCase):
+    def test_matches_postgres_semantics(self):
+        contains = DatabaseService._jsonb_contains
+        self.assertTrue(contains({"a": 1, "b": 2}, {"a": 1}))
+        self.assertTrue(contains({"a": [1, 2, 3]}, {"a": [3, 1, 1]}))
+        self.assertTrue(contains({"a": [{"b": 1, "c": 2}]}, {"a": [{"b": 1}]}))
+        self.assertTrue(contains({"a": 1.0}, {"a": 1}))
+        self.assertFalse(contains({"a": [1, 2]}, {"a": 1}))
+        self.assertFalse(contains({"a": 1}, {"a": True}))
+        self.assertFalse(contains({"a": {"b": 1}}, {"a": {"b": 1, "c": 2}}))
+        self.assertFalse(contains({"a": None}, {"b": None}))
+        self.assertTrue(contains(json.loads('{"a": null}'), {"a": None}))
+
+if __name__ == '__main__':
+    unittest.main()
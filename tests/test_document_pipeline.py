@@ -0,0 +1,144 @@
+"""Tests for the DocumentTools.process_directory ingestion pipeline, with stub loaders."""
+
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from langchain.schema import Document as LangChainDocument
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from services.document_tools import DocumentTools
+
+class StubLoader:
+    """Reads a text file on a worker thread, failing on files named bad*."""
+
+    lock = threading.Lock()
+    started = 0
+    delay = 0.0
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+
+    def load(self):
+        with StubLoader.lock:
+            StubLoader.started += 1
+        time.sleep(StubLoader.delay)
+        if Path(self.file_path).name.startswith("bad"):
+            raise ValueError("unreadable file")
+        return [LangChainDocument(page_content=Path(self.file_path).read_text(), metadata={})]
+
+class TestProcessDirectory(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cwd = os.getcwd()
+        # DocumentTools keeps its vector store under the working directory
+        os.chdir(self.temp_dir)
+        self.folder = Path(self.temp_dir) / "docs"
+        self.folder.mkdir()
+        StubLoader.started, StubLoader.delay = 0, 0.0
+
+        self.tools = self.make_tools()
+
+    @staticmethod
+    def make_tools():
+        with mock.patch("services.document_tools.get_embedding_cache", return_value=None), \
+                mock.patch("services.document_tools.CachedEmbeddings", return_value=DeterministicFakeEmbedding(size=16)):
+            tools = DocumentTools(db_service=None)
+        tools.register_loader(".txt", StubLoader)
+        return tools
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, name, text):
+        path = self.folder / name
+        path.write_text(text)
+        # Distinct mtimes, so rewrites within a clock tick still count as modified
+        stamp = time.time() + len(list(self.folder.iterdir()))
+        os.utime(path, (stamp, stamp))
+
+    def process(self):
+        return asyncio.run(self.tools.process_directory(str(self.folder), ["*.txt"]))
+
+    def contents(self):
+        return sorted(d.page_content for d in self.tools.vector_store.docstore._dict.values())
+
+    def test_modified_deleted_and_failed_files(self):
+        self.write("a.txt", "first a")
+        self.write("b.txt", "first b")
+        self.write("bad.txt", "never read")
+        stats = self.process()
+        self.assertEqual((stats["successful_files"], stats["skipped_files"]), (2, 1))
+        self.assertEqual(self.contents(), ["first a", "first b"])
+
+        self.write("a.txt", "second a")
+        (self.folder / "b.txt").unlink()
+        stats = self.process()
+        self.assertEqual(stats["successful_files"], 1)
+        self.assertEqual(stats["removed_files"], 1)
+        self.assertEqual(self.contents(), ["second a"])
+
+        # Nothing changed: nothing is loaded again, except the file that failed
+        StubLoader.started = 0
+        stats = self.process()
+        self.assertEqual((stats["unchanged_files"], StubLoader.started), (1, 1))
+
+    def test_new_instance_continues_incrementally(self):
+        self.write("a.txt", "first a")
+        self.write("b.txt", "first b")
+        self.process()
+
+        # A new process loads the saved store and skips unchanged files
+        StubLoader.started = 0
+        self.tools = self.make_tools()
+        self.assertIsNotNone(self.tools.vector_store)
+        self.write("b.txt", "second b")
+        stats = self.process()
+        self.assertEqual((stats["unchanged_files"], stats["successful_files"], StubLoader.started), (1, 1, 1))
+        self.assertEqual(self.contents(), ["first a", "second b"])
+
+    def test_files_in_flight_bounded(self):
+        for i in range(12):
+            self.write(f"f{i}.txt", f"file {i}")
+        StubLoader.delay = 0.005
+        in_flight = []
+        split = self.tools._split_document
+
+        def slow_split(doc):
+            # Chunking lags loading, so loaded files would pile up without the bound
+            time.sleep(0.02)
+            result = split(doc)
+            # Files started, less those already chunked; this one still holds its slot
+            in_flight.append(StubLoader.started - len(in_flight))
+            return result
+        self.tools._split_document = slow_split
+
+        with mock.patch("services.document_tools.INGEST_MAX_PENDING_FILES", 3):
+            stats = self.process()
+        self.assertEqual(stats["successful_files"], 12)
+        self.assertLessEqual(max(in_flight), 3)
+
+    def test_stage_failure_cancels_loads(self):
+        for i in range(8):
+            self.write(f"f{i}.txt", f"file {i}")
+        StubLoader.delay = 0.05
+        self.tools._write_chunks = mock.Mock(side_effect=RuntimeError("vector store full"))
+
+        async def run():
+            with self.assertRaises(RuntimeError):
+                await self.tools.process_directory(str(self.folder), ["*.txt"])
+            return [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+
+        with mock.patch("services.document_tools.INGEST_FLUSH_CHUNKS", 1), \
+                mock.patch("services.document_tools.INGEST_MAX_PENDING_FILES", 4):
+            self.assertEqual(asyncio.run(run()), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+"""Tests for the persistent embedding cache."""
+
+import asyncio
+import shutil
+import tempfile
+import unittest
+from typing import List
+from unittest import mock
+
+from langchain_core.embeddings import Embeddings
+
+from services.document_ingestion.embedding_cache import CachedEmbeddings, EmbeddingCache, _content_key
+
+class CountingEmbeddings(Embeddings):
+    """Embeds a text as [len, first char], recording every text it is asked for."""
+
+    def __init__(self):
+        self.calls: List[List[str]] = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t)), float(ord(t[0]) if t else 0)] for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+class TestEmbeddingCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_second_pass_needs_no_model_calls(self):
+        model = CountingEmbeddings()
+        embeddings = CachedEmbeddings(model, EmbeddingCache(self.temp_dir, "m"))
+        first = embeddings.embed_documents(["a", "bb", "a", "ccc"])
+        self.assertEqual(model.calls, [["a", "bb", "ccc"]])
+
+        second = embeddings.embed_documents(["ccc", "a", "bb", "a"])
+        self.assertEqual(len(model.calls), 1)
+        self.assertEqual(second, [first[3], first[0], first[1], first[0]])
+
+    def test_persists_across_reopen(self):
+        model = CountingEmbeddings()
+        CachedEmbeddings(model, EmbeddingCache(self.temp_dir, "m")).embed_documents(["a", "bb"])
+
+        reopened = EmbeddingCache(self.temp_dir, "m")
+        self.assertEqual(len(reopened), 2)
+        self.assertEqual(CachedEmbeddings(model, reopened).embed_documents(["bb"]), [[2.0, 98.0]])
+        self.assertEqual(len(model.calls), 1)
+
+    def test_keyed_by_model(self):
+        model = CountingEmbeddings()
+        CachedEmbeddings(model, EmbeddingCache(self.temp_dir, "m1")).embed_documents(["a"])
+        CachedEmbeddings(model, EmbeddingCache(self.temp_dir, "m2")).embed_documents(["a"])
+        self.assertEqual(len(model.calls), 2)
+
+    def test_evicts_least_recently_used(self):
+        # Room for 16 two-dimensional vectors
+        cache = EmbeddingCache(self.temp_dir, "m", max_mb=16 * 8 / (1024 * 1024))
+        model = CountingEmbeddings()
+        texts = [f"text {i}" for i in range(16)]
+        cache.embed(texts, model.embed_documents)
+        cache.embed(texts[:1], model.embed_documents)  # text 0 is now the most recent
+
+        cache.embed(["new"], model.embed_documents)
+        self.assertEqual(len(cache), 16 - 2 + 1)
+        model.calls.clear()
+        cache.embed(["text 0", "text 3"], model.embed_documents)
+        self.assertEqual(model.calls, [], "Recently used entries should survive eviction")
+        cache.embed(["text 1"], model.embed_documents)
+        self.assertEqual(model.calls, [["text 1"]])
+
+    def test_dimension_change_clears_cache(self):
+        cache = EmbeddingCache(self.temp_dir, "m")
+        cache.embed(["a"], lambda texts: [[1.0, 2.0] for _ in texts])
+        self.assertEqual(cache.embed(["b"], lambda texts: [[1.0, 2.0, 3.0] for _ in texts]), [[1.0, 2.0, 3.0]])
+        self.assertEqual(len(cache), 1)
+        cache.close()
+        self.assertEqual(len(EmbeddingCache(self.temp_dir, "m")), 1)
+
+    def test_concurrent_opens_share_entries(self):
+        first = EmbeddingCache(self.temp_dir, "m")
+        second = EmbeddingCache(self.temp_dir, "m")
+        self.assertEqual(first.path, second.path)
+        first.embed(["a"], lambda texts: [[1.0, 1.0] for _ in texts])
+        self.assertEqual(second.embed(["a"], None), [[1.0, 1.0]])
+        second.embed(["b"], lambda texts: [[2.0, 2.0] for _ in texts])
+        self.assertEqual(first.embed(["b"], None), [[2.0, 2.0]])
+        self.assertEqual(len(list(first.path.parent.iterdir())), 1)
+
+    def test_slot_reused_by_other_cache_not_served(self):
+        max_mb = 16 * 8 / (1024 * 1024)
+        first = EmbeddingCache(self.temp_dir, "m", max_mb=max_mb)
+        second = EmbeddingCache(self.temp_dir, "m", max_mb=max_mb)
+        texts = [f"text {i}" for i in range(16)]
+        first.embed(texts, lambda batch: [[float(i), 0.0] for i in range(len(batch))])
+
+        # The second cache evicts the oldest entries and reuses their slots;
+        # a lookup by the first that had already checked the generation must not
+        # return the new vector for an evicted text
+        second.embed(["new"], lambda batch: [[99.0, 99.0]])
+        with mock.patch.object(first, "_refresh"):
+            self.assertEqual(first.get_many([_content_key("text 0")]), [None])
+        self.assertEqual(first.get_many([_content_key("new"), _content_key("text 0")]), [[99.0, 99.0], None])
+
+    def test_async_embed(self):
+        cache = EmbeddingCache(self.temp_dir, "m")
+        calls = []
+
+        async def embed(texts):
+            calls.append(texts)
+            return [[float(len(t))] for t in texts]
+
+        self.assertEqual(asyncio.run(cache.aembed(["a", "bb"], embed)), [[1.0], [2.0]])
+        self.assertEqual(asyncio.run(cache.aembed(["bb", "a"], embed)), [[2.0], [1.0]])
+        self.assertEqual(calls, [["a", "bb"]])
+
+if __name__ == '__main__':
+    unittest.main()
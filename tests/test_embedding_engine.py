@@ -0,0 +1,50 @@
+"""Tests for the batched embedding engine."""
+
+import unittest
+
+import numpy as np
+
+from services.document_ingestion.embedding_engine import EmbeddingEngine
+
+class RecordingModel:
+    """Stands in for a SentenceTransformer, embedding a text as [len]."""
+
+    max_seq_length = 256
+
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, texts, batch_size, show_progress_bar):
+        self.batches.append(list(texts))
+        return np.array([[float(len(t))] for t in texts])
+
+class TestEmbeddingEngine(unittest.TestCase):
+    def setUp(self):
+        self.engine = EmbeddingEngine("model", batch_tokens=400, max_batch_size=8)
+        self.engine._model = RecordingModel()
+        self.texts = [f"{'x' * n}" for n in (900, 10, 400, 40, 10, 1000, 20, 30, 10, 10, 10, 10, 10, 10)]
+
+    def test_batches_sorted_within_budget(self):
+        batches = self.engine.batches(self.texts)
+        self.assertEqual(sorted(i for batch in batches for i in batch), list(range(len(self.texts))))
+
+        order = [len(self.texts[i]) for batch in batches for i in batch]
+        self.assertEqual(order, sorted(order))
+        for batch in batches:
+            longest = max(len(self.texts[i]) // 4 + 2 for i in batch)
+            self.assertLessEqual(len(batch), 8)
+            self.assertTrue(len(batch) == 1 or len(batch) * longest <= 400)
+
+    def test_embeds_in_input_order(self):
+        vectors = self.engine.embed_documents(self.texts)
+        self.assertEqual(vectors, [[float(len(t))] for t in self.texts])
+        self.assertGreater(len(self.engine._model.batches), 1)
+
+    def test_cache_key_per_backend(self):
+        self.assertEqual(EmbeddingEngine("m", backend="onnx").cache_key, "m")
+        self.assertEqual(EmbeddingEngine("m", backend="onnx-int8").cache_key, "m@onnx-int8")
+        with self.assertRaises(ValueError):
+            EmbeddingEngine("m", backend="gpu")
+
+if __name__ == '__main__':
+    unittest.main()
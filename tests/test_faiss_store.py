@@ -0,0 +1,211 @@
+"""Tests for the memory-mapped FaissVectorStore."""
+
+import asyncio
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from services.document_ingestion.types import ProcessedDocument
+from services.document_ingestion.vector_store.faiss_store import FaissVectorStore
+
+DIM = 32
+
+def doc(doc_id, *directions, **metadata):
+    """A document whose chunk embeddings point along the given axes."""
+    embeddings = np.zeros((len(directions), DIM), dtype=np.float32)
+    for i, axis in enumerate(directions):
+        embeddings[i, axis] = 1.0
+    return ProcessedDocument(
+        doc_id=doc_id,
+        chunks=[f"{doc_id} chunk {i}" for i in range(len(directions))],
+        embeddings=embeddings,
+        metadata=metadata
+    )
+
+def axis(i):
+    query = np.zeros(DIM, dtype=np.float32)
+    query[i] = 1.0
+    return query
+
+class TestFaissVectorStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.config = {"dimension": DIM, "path": str(Path(self.temp_dir) / "store")}
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def open(self, **config):
+        store = FaissVectorStore({**self.config, **config})
+        asyncio.run(store.connect())
+        return store
+
+    def test_store_and_search(self):
+        store = self.open()
+        asyncio.run(store.store_documents([doc("a", 0, 1), doc("b", 2), doc("c", 3, kind="x")]))
+
+        results = asyncio.run(store.search_similar(axis(1), num_results=2))
+        self.assertEqual(results[0]["doc_id"], "a")
+        self.assertEqual(results[0]["content"], "a chunk 1")
+        self.assertAlmostEqual(results[0]["score"], 1.0, places=5)
+
+        filtered = asyncio.run(store.search_similar(axis(1), num_results=5, filters={"kind": "x"}))
+        self.assertEqual([r["doc_id"] for r in filtered], ["c"])
+
+    def test_numpy_and_list_embeddings(self):
+        store = self.open()
+        listed = ProcessedDocument(doc_id="l", chunks=["x"], embeddings=[axis(4).tolist()], metadata={})
+        asyncio.run(store.store_documents([doc("n", 5), listed]))
+        self.assertEqual(asyncio.run(store.search_similar(axis(4), 1))[0]["doc_id"], "l")
+        with self.assertRaises(ValueError):
+            asyncio.run(store.store_document(ProcessedDocument(doc_id="e", chunks=["x"], metadata={})))
+
+    def test_delete_and_replace(self):
+        store = self.open(compaction_threshold=1.1)
+        a_id, b_id = asyncio.run(store.store_documents([doc("a", 0), doc("b", 1)]))
+        asyncio.run(store.delete_document(a_id))
+        self.assertEqual([r["doc_id"] for r in asyncio.run(store.search_similar(axis(0), 5))], ["b"])
+
+        # Storing a doc_id again replaces it
+        asyncio.run(store.store_document(doc("b", 2)))
+        results = asyncio.run(store.search_similar(axis(2), 5))
+        self.assertEqual([r["doc_id"] for r in results], ["b"])
+        self.assertEqual(len(store._documents), 1)
+        asyncio.run(store.delete_document(b_id))  # already replaced; ignored
+        self.assertEqual(len(store._documents), 1)
+
+    def test_reopen(self):
+        store = self.open(compaction_threshold=1.1)
+        ids = asyncio.run(store.store_documents([doc(f"d{i}", i) for i in range(20)]))
+        asyncio.run(store.delete_document(ids[3]))
+        asyncio.run(store.disconnect())
+
+        reopened = self.open()
+        self.assertEqual(len(reopened._documents), 19)
+        self.assertEqual(asyncio.run(reopened.search_similar(axis(11), 1))[0]["doc_id"], "d11")
+        self.assertNotEqual(asyncio.run(reopened.search_similar(axis(3), 1))[0]["doc_id"], "d3")
+        asyncio.run(reopened.delete_document(ids[11]))
+        self.assertNotEqual(asyncio.run(reopened.search_similar(axis(11), 1))[0]["doc_id"], "d11")
+
+    def test_log_is_appended(self):
+        store = self.open()
+        asyncio.run(store.store_document(doc("a", 0)))
+        log = Path(self.config["path"]) / "documents.jsonl"
+        first = log.read_bytes()
+        asyncio.run(store.store_document(doc("b", 1)))
+        self.assertTrue(log.read_bytes().startswith(first))
+        self.assertEqual(len(log.read_bytes().splitlines()), 2)
+
+    def test_reader_sees_writes(self):
+        writer = self.open()
+        reader = self.open()
+        asyncio.run(writer.store_document(doc("a", 0)))
+        self.assertEqual(asyncio.run(reader.search_similar(axis(0), 1))[0]["doc_id"], "a")
+        b_id = asyncio.run(writer.store_document(doc("b", 1)))
+        asyncio.run(writer.delete_document(b_id))
+        self.assertEqual([r["doc_id"] for r in asyncio.run(reader.search_similar(axis(1), 5))], ["a"])
+
+    def test_compaction_keeps_documents(self):
+        store = self.open(compaction_threshold=0.0)
+        ids = asyncio.run(store.store_documents([doc(f"d{i}", i, i + 10) for i in range(10)]))
+        asyncio.run(store.delete_document(ids[0]))
+        store.compact()
+        self.assertEqual(store._count, 18)
+        asyncio.run(store.disconnect())
+
+        reopened = self.open()
+        result = asyncio.run(reopened.search_similar(axis(11), 1))[0]
+        self.assertEqual(result["doc_id"], "d1")
+        self.assertEqual(result["content"], "d1 chunk 1")
+
+    def test_writes_during_compaction_kept(self):
+        store = self.open(compaction_threshold=1.1)
+        ids = asyncio.run(store.store_documents([doc(f"d{i}", i, i + 10) for i in range(10)]))
+        asyncio.run(store.delete_document(ids[0]))
+        copy_rows = store._copy_rows
+
+        def copy_then_write(*args):
+            copy_rows(*args)
+            # The lock is free while the rows are copied
+            searcher = threading.Thread(target=store._search, args=(axis(5), 1, None))
+            searcher.start()
+            searcher.join(timeout=5)
+            self.assertFalse(searcher.is_alive())
+            store._store_documents([doc("new", 20)])
+            store._delete_document(ids[1])
+        store._copy_rows = copy_then_write
+
+        store.compact()
+        self.assertEqual((store._count, store._tombstones), (19, 2))
+        self.assertEqual(asyncio.run(store.search_similar(axis(20), 1))[0]["doc_id"], "new")
+        self.assertEqual(asyncio.run(store.search_similar(axis(12), 1))[0]["doc_id"], "d2")
+        self.assertNotIn("d1", [r["doc_id"] for r in asyncio.run(store.search_similar(axis(11), 20))])
+        asyncio.run(store.disconnect())
+
+        reopened = self.open()
+        self.assertEqual(len(reopened._documents), 9)
+        self.assertEqual(asyncio.run(reopened.search_similar(axis(20), 1))[0]["content"], "new chunk 0")
+
+    def test_reopen_each_index_type(self):
+        rng = np.random.default_rng(0)
+
+        def batch(start, count):
+            return [
+                ProcessedDocument(doc_id=f"d{start + i}", chunks=["x"], embeddings=rng.standard_normal((1, DIM)),
+                                  metadata={})
+                for i in range(count)
+            ]
+
+        for index_type in FaissVectorStore.INDEX_TYPES:
+            with self.subTest(index_type=index_type):
+                config = {"path": str(Path(self.temp_dir) / index_type), "index_type": index_type,
+                          "ann_threshold": 300, "nlist": 4, "pq_m": 4}
+                store = self.open(**config)
+                asyncio.run(store.store_documents(batch(0, 300)))
+                if index_type != "Flat":
+                    store.build_ann_index()
+                asyncio.run(store.store_documents(batch(300, 10)))
+                asyncio.run(store.disconnect())
+
+                # Reopen with every row indexed, then add to the loaded index
+                store = self.open(**config)
+                self.assertEqual(store._ann_rows, 0 if index_type == "Flat" else 310)
+                asyncio.run(store.store_documents(batch(310, 10)))
+                self.assertEqual(len(asyncio.run(store.search_similar(rng.standard_normal(DIM), 5))), 5)
+                asyncio.run(store.disconnect())
+
+                # Reopen with rows the saved index is missing
+                store = self.open(**config)
+                asyncio.run(store.store_documents(batch(320, 10)))
+                store._save_state()
+                reopened = self.open(**config)
+                self.assertEqual(reopened._count, 330)
+                if index_type != "Flat":
+                    self.assertEqual(reopened._ann_rows, 330)
+                query = reopened._vectors[325]
+                self.assertEqual(asyncio.run(reopened.search_similar(query, 1))[0]["doc_id"], "d325")
+
+    def test_migrates_documents_json(self):
+        store = self.open()
+        asyncio.run(store.store_document(doc("a", 0)))
+        asyncio.run(store.disconnect())
+        path = Path(self.config["path"])
+        # Rewrite the store as the single-file format of earlier versions
+        state = json.loads((path / "store.json").read_text())
+        del state["log_bytes"], state["log_epoch"]
+        (path / "store.json").write_text(json.dumps(state))
+        (path / "documents.json").write_text(json.dumps({"0": store._documents[0]}))
+        (path / "documents.jsonl").unlink()
+
+        reopened = self.open()
+        self.assertEqual(asyncio.run(reopened.search_similar(axis(0), 1))[0]["doc_id"], "a")
+        self.assertFalse((path / "documents.json").exists())
+        self.assertEqual(len(self.open()._documents), 1)
+
+if __name__ == '__main__':
+    unittest.main()
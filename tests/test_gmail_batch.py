@@ -0,0 +1,137 @@
+"""Tests for batched Gmail message fetching, using a local fake transport."""
+
+import json
+import re
+import unittest
+from unittest.mock import patch
+from urllib.parse import urlparse, parse_qs
+
+import httplib2
+from googleapiclient.discovery import build
+
+from tools.gmail_batch import summarize_messages, GMAIL_BATCH_SIZE
+import tools.google_mail_tools as google_mail_tools
+
+BOUNDARY = "fake_batch_boundary"
+
+class FakeGmailHttp:
+    """Stands in for httplib2.Http and answers Gmail calls from memory.
+
+    Every request() call is one HTTP round-trip, whether it is a single API
+    call or a batch carrying up to 100 calls.
+    """
+
+    def __init__(self, message_count, fail_once=()):
+        self.messages = {
+            f"msg{i}": {"Subject": f"Subject {i}", "From": f"sender{i}@example.com"}
+            for i in range(message_count)
+        }
+        self.fail_once = set(fail_once)
+        self.round_trips = 0
+        self.batch_sizes = []
+        self.requested_queries = []
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        self.round_trips += 1
+        url = urlparse(uri)
+        if url.path.startswith("/batch"):
+            return self._batch(body if isinstance(body, str) else body.decode("utf-8"))
+
+        if url.path.endswith("/messages"):
+            max_results = int(parse_qs(url.query).get("maxResults", ["100"])[0])
+            ids = list(self.messages)[:max_results]
+            return self._json(200, {"messages": [{"id": i, "threadId": i} for i in ids]})
+        raise AssertionError(f"Unexpected request: {method} {uri}")
+
+    def _json(self, status, payload):
+        return httplib2.Response({"status": status, "content-type": "application/json"}), json.dumps(payload).encode("utf-8")
+
+    def _message(self, message_id, query):
+        headers = query.get("metadataHeaders", [])
+        return {
+            "id": message_id,
+            "payload": {
+                "headers": [
+                    {"name": name, "value": value}
+                    for name, value in self.messages[message_id].items()
+                    if name in headers
+                ]
+            }
+        }
+
+    def _batch(self, body):
+        parts = []
+        for content_id, path in re.findall(r"Content-ID: <([^>]+)>.*?GET (\S+) HTTP/1\.1", body, re.S):
+            url = urlparse(path)
+            message_id = url.path.rsplit("/", 1)[-1]
+            query = parse_qs(url.query)
+            self.requested_queries.append(query)
+
+            if message_id in self.fail_once:
+                self.fail_once.discard(message_id)
+                status, payload = "503 Service Unavailable", {"error": {"code": 503, "message": "Backend Error"}}
+            else:
+                status, payload = "200 OK", self._message(message_id, query)
+
+            parts.append(
+                f"--{BOUNDARY}\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status}\r\n"
+                "Content-Type: application/json\r\n\r\n"
+                f"{json.dumps(payload)}\r\n"
+            )
+        self.batch_sizes.append(len(parts))
+        content = "".join(parts) + f"--{BOUNDARY}--\r\n"
+        response = httplib2.Response({"status": 200, "content-type": f"multipart/mixed; boundary={BOUNDARY}"})
+        return response, content.encode("utf-8")
+
+def fake_gmail_service(http):
+    """Build a real Gmail client on top of the fake transport."""
+    return build("gmail", "v1", http=http, static_discovery=True)
+
+class TestGmailBatch(unittest.TestCase):
+    def test_metadata_fetched_in_batches(self):
+        """150 messages need two batch round-trips, not 150 calls."""
+        http = FakeGmailHttp(150)
+        ids = list(http.messages)
+
+        summaries = summarize_messages(fake_gmail_service(http), ids)
+
+        self.assertEqual(http.round_trips, 2)
+        self.assertEqual(http.batch_sizes, [GMAIL_BATCH_SIZE, 50])
+        self.assertEqual([s["id"] for s in summaries], ids)
+        self.assertEqual(summaries[42]["subject"], "Subject 42")
+        self.assertEqual(summaries[42]["from"], "sender42@example.com")
+
+    def test_only_summary_headers_requested(self):
+        """Each call asks for metadata restricted to Subject and From."""
+        http = FakeGmailHttp(3)
+        summarize_messages(fake_gmail_service(http), list(http.messages))
+
+        for query in http.requested_queries:
+            self.assertEqual(query["format"], ["metadata"])
+            self.assertEqual(sorted(query["metadataHeaders"]), ["From", "Subject"])
+
+    def test_failed_calls_retried_in_followup_batch(self):
+        """A call that fails inside a batch is retried once in a second batch."""
+        http = FakeGmailHttp(5, fail_once={"msg3"})
+        summaries = summarize_messages(fake_gmail_service(http), list(http.messages))
+
+        self.assertEqual(http.round_trips, 2)
+        self.assertEqual(http.batch_sizes, [5, 1])
+        self.assertEqual(summaries[3]["subject"], "Subject 3")
+
+    def test_messages_list_round_trips(self):
+        """gmail_messages_list costs one list call plus one call per 100 messages."""
+        http = FakeGmailHttp(100)
+        with patch.object(google_mail_tools, "get_gmail_service", return_value=fake_gmail_service(http)):
+            output = google_mail_tools.gmail_messages_list(max_results=100)
+
+        self.assertEqual(http.round_trips, 2)
+        messages = json.loads(output)
+        self.assertEqual(len(messages), 100)
+        self.assertEqual(messages[0], {"id": "msg0", "subject": "Subject 0", "from": "sender0@example.com"})
+
+if __name__ == '__main__':
+    unittest.main()
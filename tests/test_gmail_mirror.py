@@ -0,0 +1,235 @@
+"""Tests for the local Gmail mirror, using an in-memory fake Gmail service."""
+
+import base64
+import unittest
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+from tools.gmail_mirror import GmailMirror, extract_body
+
+def _encode(text):
+    return base64.urlsafe_b64encode(text.encode("utf-8")).decode("ascii").rstrip("=")
+
+class FakeRequest:
+    def __init__(self, fn):
+        self.fn = fn
+
+    def execute(self):
+        return self.fn()
+
+class FakeBatch:
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        self.service.round_trips += 1
+        for request_id, request in self.requests:
+            try:
+                response = request.execute()
+            except HttpError as e:
+                self.callback(request_id, None, e)
+            else:
+                self.callback(request_id, response, None)
+
+class FakeGmailService:
+    """Implements the subset of the Gmail client used by the mirror.
+
+    Every execute() counts as one round-trip; a batch counts once.
+    """
+
+    def __init__(self):
+        self.mailbox = {}
+        self.changes = []
+        self.history_id = 100
+        self.expired_before = 0
+        self.round_trips = 0
+        self.full_fetches = 0
+        self.failing = set()
+
+    # Mailbox changes, recorded as Gmail history
+
+    def add_message(self, message_id, subject, sender, body, labels=("INBOX", "UNREAD"), date=0):
+        self.history_id += 1
+        self.mailbox[message_id] = {
+            "id": message_id,
+            "threadId": message_id,
+            "historyId": str(self.history_id),
+            "internalDate": str(date),
+            "labelIds": list(labels),
+            "snippet": body[:20],
+            "payload": {
+                "mimeType": "multipart/alternative",
+                "headers": [{"name": "Subject", "value": subject}, {"name": "From", "value": sender}],
+                "parts": [
+                    {"mimeType": "text/plain", "body": {"data": _encode(body)}},
+                    {"mimeType": "text/html", "body": {"data": _encode(f"<p>{body}</p>")}}
+                ]
+            }
+        }
+        self.changes.append((self.history_id, {"messagesAdded": [{"message": {"id": message_id}}]}))
+
+    def delete_message(self, message_id):
+        self.history_id += 1
+        del self.mailbox[message_id]
+        self.changes.append((self.history_id, {"messagesDeleted": [{"message": {"id": message_id}}]}))
+
+    def set_labels(self, message_id, labels):
+        self.history_id += 1
+        self.mailbox[message_id]["labelIds"] = list(labels)
+        self.changes.append((self.history_id, {
+            "labelsRemoved": [{"message": {"id": message_id, "labelIds": list(labels)}}]
+        }))
+
+    # Client surface
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def history(self):
+        return self
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+
+    def _call(self, fn):
+        def run():
+            self.round_trips += 1
+            return fn()
+        return FakeRequest(run)
+
+    def getProfile(self, userId):
+        return self._call(lambda: {"historyId": str(self.history_id)})
+
+    def list(self, userId, maxResults=100, pageToken=None, startHistoryId=None):
+        if startHistoryId is not None:
+            return self._call(lambda: self._history_page(int(startHistoryId)))
+        ids = sorted(self.mailbox)
+        start = int(pageToken or 0)
+
+        def page():
+            response = {"messages": [{"id": i} for i in ids[start:start + maxResults]]}
+            if start + maxResults < len(ids):
+                response["nextPageToken"] = str(start + maxResults)
+            return response
+        return self._call(page)
+
+    def get(self, userId, id, format="full", **kwargs):
+        def fetch():
+            if id in self.failing:
+                raise HttpError(httplib2.Response({"status": 500}), b'{"error": {"code": 500}}')
+            message = self.mailbox[id]
+            if format == "minimal":
+                return {k: message[k] for k in ("id", "threadId", "historyId", "labelIds")}
+            self.full_fetches += 1
+            return message
+        return FakeRequest(fetch)
+
+    def _history_page(self, start):
+        if start < self.expired_before:
+            raise HttpError(httplib2.Response({"status": 404}), b'{"error": {"code": 404}}')
+        records = [record for history_id, record in self.changes if history_id > start]
+        return {"history": records, "historyId": str(self.history_id)}
+
+class TestGmailMirror(unittest.TestCase):
+    def setUp(self):
+        self.service = FakeGmailService()
+        for i in range(5):
+            self.service.add_message(f"m{i}", f"Subject {i}", f"sender{i % 2}@example.com",
+                                     f"Body of message {i}", date=1700000000000 + i * 1000)
+        self.mirror = GmailMirror(":memory:")
+
+    def tearDown(self):
+        self.mirror.close()
+
+    def test_full_sync_stores_headers_and_bodies(self):
+        stats = self.mirror.sync(self.service)
+
+        self.assertEqual(stats["mode"], "full")
+        self.assertEqual(stats["added"], 5)
+        message = self.mirror.get("m3")
+        self.assertEqual(message["subject"], "Subject 3")
+        self.assertEqual(message["from"], "sender1@example.com")
+        self.assertEqual(message["body"], "Body of message 3")
+        self.assertEqual(message["labels"], ["INBOX", "UNREAD"])
+
+    def test_delta_sync_applies_history(self):
+        self.mirror.sync(self.service)
+        self.service.full_fetches = 0
+        self.service.round_trips = 0
+
+        self.service.add_message("m9", "New mail", "boss@example.com", "Please read")
+        self.service.delete_message("m0")
+        self.service.set_labels("m1", ["INBOX"])
+
+        stats = self.mirror.sync(self.service)
+
+        self.assertEqual(stats["mode"], "delta")
+        self.assertEqual((stats["added"], stats["deleted"], stats["updated"]), (1, 1, 1))
+        # One history call plus one batch for the new message
+        self.assertEqual(self.service.round_trips, 2)
+        self.assertEqual(self.service.full_fetches, 1)
+        self.assertIsNone(self.mirror.get("m0"))
+        self.assertEqual(self.mirror.get("m1")["labels"], ["INBOX"])
+        self.assertEqual(self.mirror.get("m9")["body"], "Please read")
+        self.assertEqual(self.mirror.history_id, str(self.service.history_id))
+
+    def test_failed_fetch_retried_next_sync(self):
+        self.mirror.sync(self.service)
+        self.service.add_message("m8", "Flaky", "a@example.com", "Second try")
+        self.service.add_message("m9", "Fine", "b@example.com", "First try")
+        self.service.failing.add("m8")
+
+        stats = self.mirror.sync(self.service)
+        self.assertEqual((stats["added"], stats["failed"]), (1, ["m8"]))
+        self.assertIsNone(self.mirror.get("m8"))
+        self.assertEqual(self.mirror.pending_ids(), ["m8"])
+
+        # The history has moved on, but the pending message is fetched again
+        self.service.failing.clear()
+        stats = self.mirror.sync(self.service)
+        self.assertEqual((stats["added"], stats["failed"]), (1, []))
+        self.assertEqual(self.mirror.get("m8")["body"], "Second try")
+        self.assertEqual(self.mirror.pending_ids(), [])
+
+    def test_expired_history_falls_back_to_full_sync(self):
+        self.mirror.sync(self.service)
+        self.service.full_fetches = 0
+        self.service.add_message("m9", "New mail", "boss@example.com", "Please read")
+        self.service.expired_before = self.service.history_id + 1
+
+        stats = self.mirror.sync(self.service)
+
+        self.assertEqual(stats["mode"], "full")
+        # Only the message missing from the mirror is fetched in full
+        self.assertEqual(self.service.full_fetches, 1)
+        self.assertEqual(stats["total"], 6)
+
+    def test_queries_answer_locally(self):
+        self.mirror.sync(self.service)
+        self.service.round_trips = 0
+
+        hits = self.mirror.search(query="message 2")
+        self.assertIn("m2", [h["id"] for h in hits])
+        self.assertEqual([h["id"] for h in self.mirror.search(sender="sender0", max_results=2)], ["m4", "m2"])
+
+        summary = self.mirror.summary(label="INBOX", top=1)
+        self.assertEqual(summary["total"], 5)
+        self.assertEqual(summary["unread"], 5)
+        self.assertEqual(summary["top_senders"], [{"sender": "sender0@example.com", "count": 3}])
+        self.assertEqual(self.service.round_trips, 0)
+
+    def test_extract_body_falls_back_to_html(self):
+        payload = {"mimeType": "text/html", "body": {"data": _encode("<p>Hello <b>there</b> &amp; bye</p>")}}
+        self.assertEqual(extract_body(payload), "Hello there & bye")
+
+if __name__ == '__main__':
+    unittest.main()
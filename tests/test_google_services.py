@@ -0,0 +1,103 @@
+"""Tests for the shared Google API service registry."""
+
+import asyncio
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from tools.google_services import GoogleServiceRegistry
+
+class FakeCredentials:
+    """Credentials that start expired and count refreshes."""
+
+    def __init__(self):
+        self.valid = False
+        self.refresh_token = "refresh"
+        self.refreshes = 0
+        self.token = None
+
+    def refresh(self, request):
+        self.refreshes += 1
+        self.valid = True
+        self.token = "token"
+
+    def before_request(self, request, method, url, headers):
+        headers["authorization"] = f"Bearer {self.token}"
+
+class TestGoogleServiceRegistry(unittest.TestCase):
+    def setUp(self):
+        self.creds = FakeCredentials()
+        self.registry = GoogleServiceRegistry(credentials_provider=lambda: self.creds, max_workers=4)
+
+    def tearDown(self):
+        self.registry.close()
+
+    def test_service_built_once_and_shared(self):
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            services = list(pool.map(lambda _: self.registry.service("gmail", "v1"), range(8)))
+        self.assertTrue(all(s is services[0] for s in services))
+
+    def test_each_thread_gets_its_own_transport(self):
+        barrier = threading.Barrier(4)
+
+        def transport(_):
+            http = self.registry.http()
+            barrier.wait()
+            return http
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            transports = list(pool.map(transport, range(4)))
+        self.assertEqual(len({id(t) for t in transports}), 4)
+        self.assertIs(self.registry.http(), self.registry.http())
+
+    def test_credentials_shared_and_refreshed_once(self):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            creds = list(pool.map(lambda _: self.registry.credentials(), range(16)))
+        self.assertTrue(all(c is self.creds for c in creds))
+        self.assertEqual(self.creds.refreshes, 1)
+
+    def test_transport_refreshes_under_lock(self):
+        # AuthorizedHttp refreshes through its own credentials object, not credentials()
+        self.creds.refresh = lambda request: self.refreshing()
+        self.creds.before_request = lambda request, method, url, headers: self.refreshing()
+        self.active, self.overlaps = 0, 0
+
+        def request(_):
+            creds = self.registry.http().credentials
+            creds.before_request(None, "GET", "https://example.com", {})
+            creds.refresh(None)
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(request, range(16)))
+        self.assertEqual(self.overlaps, 0)
+        self.assertEqual(self.registry.http().credentials.refresh_token, "refresh")
+
+    def refreshing(self):
+        self.active += 1
+        self.overlaps += self.active > 1
+        threading.Event().wait(0.001)
+        self.active -= 1
+
+    def test_requests_bound_to_calling_thread(self):
+        service = self.registry.service("gmail", "v1")
+        request = service.users().getProfile(userId="me")
+        self.assertIs(request.http, self.registry.http())
+
+        other = ThreadPoolExecutor(max_workers=1).submit(
+            lambda: service.users().getProfile(userId="me").http
+        ).result()
+        self.assertIsNot(other, self.registry.http())
+
+    def test_execute_async_runs_on_executor_transport(self):
+        main_http = self.registry.http()
+
+        class FakeRequest:
+            def execute(self, http=None):
+                return http
+
+        used = asyncio.run(self.registry.execute_async(FakeRequest()))
+        self.assertIsNot(used, main_http)
+        self.assertIsNotNone(used)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+"""Tests for the durable message write queue."""
+
+import asyncio
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from services.message_queue import MessageWriteQueue
+
+class FakeDatabase:
+    """Records stored messages, failing any whose content is in `failing`."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.stored = []
+        self.gate = None
+
+    async def store_message(self, role, content, metadata=None, session_id=None):
+        if self.gate is not None:
+            await self.gate.wait()
+        if content in self.failing:
+            raise ConnectionError("database unavailable")
+        self.stored.append(content)
+
+def spooled(path):
+    return [json.loads(line)["content"] for line in path.read_text().splitlines()]
+
+class TestMessageWriteQueue(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.spool_dir = Path(self.temp_dir) / "spool"
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def queue(self, db):
+        queue = MessageWriteQueue(db, spool_dir=str(self.spool_dir))
+        queue.RETRY_DELAY = 0
+        return queue
+
+    def test_spooled_until_written(self):
+        async def run():
+            db = FakeDatabase()
+            db.gate = asyncio.Event()
+            queue = self.queue(db)
+            await queue.start()
+            queue.enqueue("user", "one")
+            queue.enqueue("assistant", "two")
+            self.assertEqual(spooled(queue.spool_path), ["one", "two"])
+
+            db.gate.set()
+            await queue.flush()
+            self.assertEqual(db.stored, ["one", "two"])
+            self.assertEqual(spooled(queue.spool_path), [])
+            await queue.close()
+            self.assertEqual(list(self.spool_dir.iterdir()), [])
+        asyncio.run(run())
+
+    def test_replays_stopped_queue(self):
+        self.spool_dir.mkdir()
+        lines = [json.dumps({"role": "user", "content": c, "metadata": None, "session_id": "s"}) for c in ("a", "b")]
+        (self.spool_dir / "123-dead.jsonl").write_text("\n".join(lines) + "\n{\"torn")
+
+        async def run():
+            db = FakeDatabase()
+            queue = self.queue(db)
+            await queue.start()
+            self.assertFalse((self.spool_dir / "123-dead.jsonl").exists())
+            await queue.flush()
+            self.assertEqual(db.stored, ["a", "b"])
+            await queue.close()
+        asyncio.run(run())
+
+    def test_running_queue_spool_left_alone(self):
+        async def run():
+            first_db = FakeDatabase()
+            first_db.gate = asyncio.Event()
+            first = self.queue(first_db)
+            await first.start()
+            first.enqueue("user", "pending")
+
+            second_db = FakeDatabase()
+            second = self.queue(second_db)
+            await second.start()
+            await second.flush()
+            self.assertEqual(second_db.stored, [])
+            self.assertEqual(spooled(first.spool_path), ["pending"])
+            await second.close()
+
+            first_db.gate.set()
+            await first.close()
+            self.assertEqual(first_db.stored, ["pending"])
+        asyncio.run(run())
+
+    def test_failed_write_kept_once(self):
+        async def run():
+            db = FakeDatabase(failing={"bad"})
+            queue = self.queue(db)
+            await queue.start()
+            for content in ("one", "bad", "two"):
+                queue.enqueue("user", content)
+            await queue.flush()
+            self.assertEqual(spooled(queue.spool_path), ["bad"])
+
+            # Later writes are still dropped from the spool once stored
+            queue.enqueue("user", "three")
+            await queue.flush()
+            self.assertEqual(spooled(queue.spool_path), ["bad"])
+            await queue.close()
+            self.assertEqual(db.stored, ["one", "two", "three"])
+
+            # The next start writes only the abandoned message
+            db.failing.clear()
+            restarted = self.queue(db)
+            await restarted.start()
+            await restarted.close()
+            self.assertEqual(db.stored, ["one", "two", "three", "bad"])
+            self.assertEqual(list(self.spool_dir.iterdir()), [])
+        asyncio.run(run())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,7 +7,9 @@ from pathlib import Path
 import json
 from langchain.docstore.document import Document
 from langchain_ollama import OllamaEmbeddings
-from simple_rag import RAGService
+from langchain_community.vectorstores import FAISS
+from chunk_store import ChunkStore
+from simple_rag import DocumentSanitizer, RAGService
 
 class TestSimpleRAG(unittest.TestCase):
     def setUp(self):
@@ -31,30 +33,20 @@ class TestSimpleRAG(unittest.TestCase):
         vector_store = self.rag_service.process_documents(self.temp_dir, ["*.txt"])
         self.assertIsNotNone(vector_store, "Vector store should be created")
         
-        # Verify metadata.json exists and has correct format
-        metadata_path = Path(self.rag_service.rag_config["vector_store_path"]) / "metadata.json"
-        self.assertTrue(metadata_path.exists(), "metadata.json should exist")
-        
-        with open(metadata_path, "r", encoding="utf-8") as f:
-            metadata = json.load(f)
-        
-        self.assertIsInstance(metadata, dict, "Metadata should be a dictionary")
+        # Verify the chunk store exists and replaces the pickled docstore
+        store_path = Path(self.rag_service.rag_config["vector_store_path"])
+        self.assertTrue((store_path / "chunks.bin").exists(), "chunks.bin should exist")
+        self.assertFalse((store_path / "index.pkl").exists(), "No pickle should be written")
+        self.assertFalse((store_path / "metadata.json").exists(), "metadata.json should not be written")
         
         # Check content is preserved
-        found_content = False
-        for doc_data in metadata.values():
-            if self.test_content in doc_data['page_content']:
-                found_content = True
-                break
-        self.assertTrue(found_content, "Test content should be in metadata")
+        chunks = ChunkStore(store_path / "chunks.bin")
+        contents = [chunks.content(row) for row in range(len(chunks))]
+        chunks.close()
+        self.assertTrue(any(self.test_content in c for c in contents), "Test content should be in the chunk store")
         
-        # Test loading without pickle permission
-        with self.assertRaises(ValueError) as context:
-            self.rag_service.load_vector_store(allow_faiss_pickle=False)
-        self.assertIn("FAISS requires pickle deserialization", str(context.exception))
-        
-        # Test loading with pickle permission
-        loaded_store = self.rag_service.load_vector_store(allow_faiss_pickle=True)
+        # Loading needs no pickle permission
+        loaded_store = self.rag_service.load_vector_store(allow_faiss_pickle=False)
         self.assertIsNotNone(loaded_store, "Vector store should load successfully")
         
         # Verify document content is preserved after loading
@@ -65,6 +57,126 @@ class TestSimpleRAG(unittest.TestCase):
                 break
         self.assertTrue(found_content, "Test content should be preserved after loading")
 
+    def test_warm_vector_store_reload(self):
+        """Test the vector store stays warm until the store changes on disk."""
+        vector_store = self.rag_service.process_documents(self.temp_dir, ["*.txt"])
+        self.assertIsNotNone(vector_store, "Vector store should be created")
+
+        # Saving keeps the in-memory store warm
+        first = self.rag_service.get_vector_store()
+        self.assertIs(first, vector_store, "Saved store should be reused")
+        self.assertIs(self.rag_service.get_vector_store(), first, "Unchanged store should not reload")
+
+        # Rewriting the store files forces a reload
+        store_path = Path(self.rag_service.rag_config["vector_store_path"])
+        with open(store_path / "chunks.bin", "ab") as f:
+            f.write(b"\0")
+        reloaded = self.rag_service.get_vector_store()
+        self.assertIsNot(reloaded, first, "Changed store should be reloaded")
+
+    def test_incremental_processing(self):
+        """Test unchanged files are skipped and changed/deleted files are updated."""
+        vector_store = self.rag_service.process_documents(self.temp_dir, ["*.txt"], force_refresh=True)
+        initial_ids = set(vector_store.docstore._dict)
+
+        # Re-running without changes keeps the same chunks
+        vector_store = self.rag_service.process_documents(self.temp_dir, ["*.txt"])
+        self.assertEqual(set(vector_store.docstore._dict), initial_ids)
+
+        # Modified file has its chunks replaced
+        test_file = Path(self.temp_dir) / "test.txt"
+        test_file.write_text("This document was edited.")
+        vector_store = self.rag_service.process_documents(self.temp_dir, ["*.txt"])
+        contents = [doc.page_content for doc in vector_store.docstore._dict.values()]
+        self.assertTrue(any("edited" in c for c in contents), "Edited content should be indexed")
+        self.assertFalse(any(self.test_content in c for c in contents), "Old content should be removed")
+
+        # Deleted file is evicted
+        other_file = Path(self.temp_dir) / "other.txt"
+        other_file.write_text("Another document.")
+        self.rag_service.process_documents(self.temp_dir, ["*.txt"])
+        other_file.unlink()
+        vector_store = self.rag_service.process_documents(self.temp_dir, ["*.txt"])
+        contents = [doc.page_content for doc in vector_store.docstore._dict.values()]
+        self.assertFalse(any("Another document" in c for c in contents), "Deleted file should be evicted")
+
+    def test_incremental_updates_escape_once(self):
+        """Test chunks kept across incremental runs are not sanitized again."""
+        special_file = Path(self.temp_dir) / "special.txt"
+        special_file.write_text("Tom & Jerry <b>bold</b>")
+        expected = "Tom &amp; Jerry &lt;b&gt;bold&lt;/b&gt;"
+        self.rag_service.process_documents(self.temp_dir, ["*.txt"], force_refresh=True)
+
+        test_file = Path(self.temp_dir) / "test.txt"
+        for i in range(3):
+            # Each edit elsewhere saves the store again
+            test_file.write_text(f"Edit number {i}.")
+            self.rag_service.process_documents(self.temp_dir, ["*.txt"])
+            for loaded_store in (self.rag_service.get_vector_store(), self.rag_service.load_vector_store()):
+                contents = [doc.page_content for doc in loaded_store.docstore._dict.values()]
+                self.assertIn(expected, contents)
+                sources = [doc.metadata.get("source", "") for doc in loaded_store.docstore._dict.values()]
+                self.assertFalse(any("&amp;" in source for source in sources))
+
+    def test_save_and_load_keep_content(self):
+        """Test loading and saving a store returns chunks exactly as stored."""
+        (Path(self.temp_dir) / "test.txt").write_text("Tom & Jerry <b>bold</b>")
+        self.rag_service.process_documents(self.temp_dir, ["*.txt"], force_refresh=True)
+        expected = ["Tom &amp; Jerry &lt;b&gt;bold&lt;/b&gt;"]
+
+        for _ in range(2):
+            loaded_store = self.rag_service.load_vector_store()
+            contents = [doc.page_content for doc in loaded_store.docstore._dict.values()]
+            self.assertEqual(contents, expected)
+            self.rag_service.save_vector_store(loaded_store)
+
+    def test_load_materializes_only_hits(self):
+        """Test loading reads no chunks and a search reads only its hits."""
+        for i in range(20):
+            (Path(self.temp_dir) / f"doc{i}.txt").write_text(f"Document number {i} about topic {i % 4}.")
+        self.rag_service.process_documents(self.temp_dir, ["*.txt"], force_refresh=True)
+        
+        loaded_store = self.rag_service.load_vector_store()
+        docstore = loaded_store.docstore
+        reads = []
+        content = docstore.chunks.content
+        docstore.chunks.content = lambda row: reads.append(row) or content(row)
+        
+        results = loaded_store.similarity_search("Document number 3", k=2)
+        self.assertEqual(len(results), 2)
+        self.assertEqual(len(reads), 2, "Only the hit chunks should be read")
+
+    def test_legacy_store_still_loads(self):
+        """Test a store saved as index.pkl and metadata.json can be loaded."""
+        vector_store = FAISS.from_documents(
+            [Document(page_content=self.test_content, metadata={"source": "test.txt"})],
+            self.rag_service.embeddings
+        )
+        vector_store.save_local(str(self.vector_store_path), "index")
+        metadata = {
+            k: {'page_content': v.page_content, 'metadata': v.metadata}
+            for k, v in vector_store.docstore._dict.items()
+        }
+        with open(self.vector_store_path / "metadata.json", "w", encoding="utf-8") as f:
+            json.dump(metadata, f)
+        
+        with self.assertRaises(ValueError) as context:
+            self.rag_service.load_vector_store(str(self.vector_store_path), allow_faiss_pickle=False)
+        self.assertIn("FAISS requires pickle deserialization", str(context.exception))
+        
+        loaded_store = self.rag_service.load_vector_store(str(self.vector_store_path), allow_faiss_pickle=True)
+        contents = [doc.page_content for doc in loaded_store.docstore._dict.values()]
+        self.assertTrue(any(self.test_content in c for c in contents))
+
+    def test_invalid_chunk_store(self):
+        """Test a corrupt chunk store is rejected."""
+        self.vector_store_path.mkdir(parents=True)
+        (self.vector_store_path / "chunks.bin").write_bytes(b"not a chunk store" * 20)
+        (self.vector_store_path / "index.faiss").touch()
+        
+        with self.assertRaises(ValueError):
+            self.rag_service.load_vector_store(str(self.vector_store_path))
+
     def test_invalid_metadata(self):
         """Test handling of invalid metadata."""
         # Create invalid metadata file
@@ -127,5 +239,27 @@ class TestSimpleRAG(unittest.TestCase):
         self.assertNotIn('\x00', sanitized)
         self.assertIn('test query', sanitized)
 
+class TestDocumentSanitizer(unittest.TestCase):
+    def test_sanitize_content(self):
+        """Tags, control characters and whitespace are handled as before."""
+        cases = {
+            "a <script>x</script> b": "a b",
+            "<script>x</script><script>y": "&lt;script&gt;y",
+            "<style>p</style>keep<form a=1>f</form>": "keep",
+            "<style>unclosed": "&lt;style&gt;unclosed",
+            "a\x00b\r\nc\x0bd": "ab cd",
+            "  tabs\t\tand\xa0nbsp\u3000 ": "tabs and nbsp",
+            "Tom & \"Jerry\" <b>'s</b>": "Tom &amp; &quot;Jerry&quot; &lt;b&gt;&#x27;s&lt;/b&gt;",
+            "caf\xe9\x01 <iframe>x</iframe>": "caf\xe9",
+        }
+        for content, expected in cases.items():
+            self.assertEqual(DocumentSanitizer.sanitize_content(content), expected, repr(content))
+
+    def test_sanitize_batch(self):
+        contents = [f"doc {i} <script>x</script>\x00 & more" for i in range(50)]
+        expected = [DocumentSanitizer.sanitize_content(c) for c in contents]
+        self.assertEqual(DocumentSanitizer.sanitize_batch(contents), expected)
+        self.assertEqual(DocumentSanitizer.sanitize_batch(contents, max_workers=2, min_parallel_chars=0), expected)
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,104 @@
+"""Tests for the tool result cache."""
+
+import asyncio
+import threading
+import unittest
+from unittest import mock
+
+from tools.tool_cache import ToolResultCache, cached_tool
+
+class CountingTool:
+    """A read-only tool returning its call count."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, label_id: str = "INBOX") -> str:
+        self.calls += 1
+        return f"{label_id} {self.calls}"
+
+class TestToolResultCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = ToolResultCache(max_entries=4)
+
+    def test_entries_expire(self):
+        with mock.patch("tools.tool_cache.time.monotonic", return_value=100.0):
+            self.cache.put("k", "v", ttl=10)
+            self.assertEqual(self.cache.get("k"), (True, "v"))
+        with mock.patch("tools.tool_cache.time.monotonic", return_value=111.0):
+            self.assertEqual(self.cache.get("k"), (False, None))
+
+    def test_lru_eviction(self):
+        for i in range(4):
+            self.cache.put(i, i, ttl=60)
+        self.cache.get(0)
+        self.cache.put(4, 4, ttl=60)
+        self.assertEqual(self.cache.get(1), (False, None))
+        self.assertEqual(self.cache.get(0), (True, 0))
+
+    def test_put_after_invalidation_dropped(self):
+        generation = self.cache.generation("g")
+        self.cache.invalidate_groups(["g"])
+        self.cache.put("k", "stale", ttl=60, group="g", generation=generation)
+        self.assertEqual(self.cache.get("k"), (False, None))
+        self.cache.put("k", "fresh", ttl=60, group="g", generation=self.cache.generation("g"))
+        self.assertEqual(self.cache.get("k"), (True, "fresh"))
+
+class TestCachedTool(unittest.TestCase):
+    def setUp(self):
+        self.cache = ToolResultCache()
+        self.tool = CountingTool()
+        self.list_messages = cached_tool("gmail_messages_list", self.tool, self.cache)
+
+    def test_cached_by_normalised_arguments(self):
+        self.assertEqual(self.list_messages(), "INBOX 1")
+        self.assertEqual(self.list_messages(label_id="INBOX"), "INBOX 1")
+        self.assertEqual(self.list_messages(label_id="SENT"), "SENT 2")
+
+    def test_write_invalidates_groups(self):
+        self.list_messages()
+        rename = cached_tool("gmail_labels_modify", lambda label_id, name=None: "Label updated", self.cache)
+        rename(label_id="INBOX", name="Box")
+        self.assertEqual(self.list_messages(), "INBOX 2")
+
+        # Errors are returned but not cached
+        failing = cached_tool("gmail_labels_list", lambda: "Error: quota exceeded", self.cache)
+        failing()
+        self.assertEqual(self.cache.get(("gmail_labels_list", "{}")), (False, None))
+
+    def test_read_overlapping_write_not_cached(self):
+        started, written = threading.Event(), threading.Event()
+
+        def slow_read(label_id: str = "INBOX") -> str:
+            started.set()
+            written.wait()
+            return "before write"
+
+        read = cached_tool("gmail_messages_list", slow_read, self.cache)
+        send = cached_tool("send_email", lambda to: "Sent", self.cache)
+        reader = threading.Thread(target=read)
+        reader.start()
+        started.wait()
+        send(to="a@example.com")
+        written.set()
+        reader.join()
+
+        # The read began before the send, so its result must not be served after it
+        read = cached_tool("gmail_messages_list", self.tool, self.cache)
+        self.assertEqual(read(), "INBOX 1")
+
+    def test_async_tools(self):
+        async def get_event(event_id: str) -> str:
+            self.tool.calls += 1
+            return event_id
+
+        get = cached_tool("calendar_events_get", get_event, self.cache)
+
+        async def run():
+            await get(event_id="e")
+            await get(event_id="e")
+        asyncio.run(run())
+        self.assertEqual(self.tool.calls, 1)
+
+if __name__ == '__main__':
+    unittest.main()
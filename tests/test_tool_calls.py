@@ -0,0 +1,106 @@
+"""Tests for provider-neutral tool calling."""
+
+import json
+import unittest
+from types import SimpleNamespace
+
+from tools.tool_calls import (
+    AssistantTurn,
+    ChatStream,
+    ToolCall,
+    flatten_messages,
+    parse_anthropic_content,
+    parse_ollama_tool_calls,
+    parse_openai_tool_calls,
+    to_anthropic_messages,
+    to_anthropic_tools,
+    to_ollama_messages,
+    to_openai_messages,
+    tool_result_messages,
+)
+
+CALLS = [
+    ToolCall(id="call_0", name="get_current_datetime"),
+    ToolCall(id="call_1", name="search_local_documents", arguments={"query": "deploy"}),
+]
+
+def conversation():
+    turn = AssistantTurn(text="Checking.", tool_calls=CALLS)
+    return [
+        {"role": "system", "content": "Be brief."},
+        {"role": "user", "content": "When is the deploy?"},
+        turn.message(),
+        *tool_result_messages(CALLS, ["Monday", "Deploy on Tuesday"]),
+    ]
+
+class TestParsing(unittest.TestCase):
+    def test_ollama_multiple_calls(self):
+        message = {"tool_calls": [
+            {"function": {"name": "get_current_datetime", "arguments": {}}},
+            {"function": {"name": "search_local_documents", "arguments": {"query": "deploy"}}},
+        ]}
+        self.assertEqual(parse_ollama_tool_calls(message), CALLS)
+        self.assertEqual(parse_ollama_tool_calls({"content": "hi"}), [])
+
+    def test_openai_json_arguments(self):
+        calls = [
+            SimpleNamespace(id="call_0", function=SimpleNamespace(name="get_current_datetime", arguments="")),
+            SimpleNamespace(id="call_1", function=SimpleNamespace(name="search_local_documents",
+                                                                  arguments='{"query": "deploy"}')),
+        ]
+        self.assertEqual(parse_openai_tool_calls(calls), CALLS)
+
+    def test_anthropic_content_blocks(self):
+        blocks = [
+            SimpleNamespace(type="text", text="Checking."),
+            SimpleNamespace(type="tool_use", id="call_0", name="get_current_datetime", input={}),
+            SimpleNamespace(type="tool_use", id="call_1", name="search_local_documents", input={"query": "deploy"}),
+        ]
+        self.assertEqual(parse_anthropic_content(blocks), AssistantTurn(text="Checking.", tool_calls=CALLS))
+
+class TestConversion(unittest.TestCase):
+    def test_openai_messages(self):
+        messages = to_openai_messages(conversation())
+        self.assertEqual(messages[2]["tool_calls"][1]["function"],
+                         {"name": "search_local_documents", "arguments": json.dumps({"query": "deploy"})})
+        self.assertEqual(messages[4], {"role": "tool", "tool_call_id": "call_1", "content": "Deploy on Tuesday"})
+
+    def test_anthropic_groups_tool_results(self):
+        system, messages = to_anthropic_messages(conversation())
+        self.assertEqual(system, "Be brief.")
+        self.assertEqual([m["role"] for m in messages], ["user", "assistant", "user"])
+        self.assertEqual([b["type"] for b in messages[1]["content"]], ["text", "tool_use", "tool_use"])
+        self.assertEqual([b["tool_use_id"] for b in messages[2]["content"]], ["call_0", "call_1"])
+
+    def test_ollama_messages(self):
+        messages = to_ollama_messages(conversation())
+        self.assertEqual(messages[2]["tool_calls"][1],
+                         {"function": {"name": "search_local_documents", "arguments": {"query": "deploy"}}})
+        self.assertEqual(messages[3], {"role": "tool", "content": "Monday", "tool_name": "get_current_datetime"})
+
+    def test_anthropic_tools(self):
+        definition = {"type": "function", "function": {
+            "name": "read_file", "description": "Read a file",
+            "parameters": {"type": "object", "properties": {"file_path": {"type": "string"}}}
+        }}
+        self.assertEqual(to_anthropic_tools([definition]), [{
+            "name": "read_file",
+            "description": "Read a file",
+            "input_schema": definition["function"]["parameters"]
+        }])
+
+    def test_flatten_messages(self):
+        self.assertEqual(flatten_messages(conversation()[:2]), "Be brief.\n\nUser: When is the deploy?")
+
+class TestChatStream(unittest.TestCase):
+    def test_turn_available_after_iteration(self):
+        def generate():
+            yield "Hello"
+            return AssistantTurn(text="Hello", tool_calls=CALLS[:1])
+
+        stream = ChatStream(generate())
+        self.assertEqual(list(stream), ["Hello"])
+        self.assertEqual(stream.turn.tool_calls, CALLS[:1])
+
+if __name__ == '__main__':
+    unittest.main()
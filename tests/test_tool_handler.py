@@ -0,0 +1,44 @@
+"""Tests for concurrent tool call execution."""
+
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from tools import tool_handler
+
+class TestExecuteToolCalls(unittest.TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+
+        def stuck():
+            self.release.wait()
+            return "late"
+
+        function_map = {"stuck": stuck, "fast": lambda: "done"}
+        executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="tool")
+        patches = [
+            mock.patch.object(tool_handler, "get_function_map", return_value=function_map),
+            mock.patch.object(tool_handler, "TOOL_MAX_WORKERS", 2),
+            mock.patch.object(tool_handler, "DEFAULT_TOOL_TIMEOUT", 0.05),
+            mock.patch.object(tool_handler, "_tool_executor", executor),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.addCleanup(self.release.set)
+        tool_handler._abandoned_calls.clear()
+
+    def test_timed_out_workers_do_not_exhaust_pool(self):
+        outputs = tool_handler.execute_tool_calls([("stuck", {}), ("stuck", {})])
+        self.assertTrue(all("timed out" in output for output in outputs))
+
+        # Both workers are still stuck, so later calls get a new pool
+        self.assertEqual(tool_handler.execute_tool_calls([("fast", {})]), ["done"])
+        self.assertEqual(tool_handler._abandoned_calls, set())
+
+    def test_unknown_tool(self):
+        self.assertEqual(tool_handler.execute_tool_calls([("missing", "{}")]), ["Function missing not found"])
+
+if __name__ == '__main__':
+    unittest.main()
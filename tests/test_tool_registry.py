@@ -0,0 +1,42 @@
+"""Tests for the lazy tool registry."""
+
+import inspect
+import sys
+import unittest
+
+from tools.tool_registry import ToolRegistry
+
+class TestToolRegistry(unittest.TestCase):
+    def setUp(self):
+        sys.modules.pop("json.tool", None)
+        self.registry = ToolRegistry()
+        self.registry.register_many({
+            "dumps": "json:dumps",
+            "tool_main": "json.tool:main",
+        })
+
+    def test_modules_imported_on_first_call(self):
+        tool = self.registry.get("tool_main")
+        self.assertFalse(tool.loaded)
+        self.assertNotIn("json.tool", sys.modules)
+
+        self.registry.resolve("tool_main")
+        self.assertTrue(tool.loaded)
+        self.assertIn("json.tool", sys.modules)
+
+    def test_lazy_tool_calls_through(self):
+        dumps = self.registry.function_map()["dumps"]
+        self.assertEqual(dumps({"a": 1}), '{"a": 1}')
+
+    def test_signature_matches_target(self):
+        import json
+        self.assertEqual(inspect.signature(self.registry.get("dumps")), inspect.signature(json.dumps))
+
+    def test_unknown_tool(self):
+        self.assertNotIn("missing", self.registry)
+        self.assertIsNone(self.registry.get("missing"))
+        with self.assertRaises(KeyError):
+            self.registry.resolve("missing")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+"""Tests for relevance-based tool selection."""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from tools.tool_selector import ToolSelector, format_tool_catalog
+
+TOPICS = ("calendar", "email", "task", "file", "time")
+
+def tool(name, description, **properties):
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": description,
+            "parameters": {
+                "type": "object",
+                "properties": {k: {"type": v, "description": k} for k, v in properties.items()},
+                "required": list(properties)[:1]
+            }
+        }
+    }
+
+DEFINITIONS = [
+    tool("get_current_datetime", "Get the current time"),
+    tool("calendar_events_list", "List calendar events", max_results="integer"),
+    tool("gmail_messages_list", "List email messages", max_results="integer"),
+    tool("tasks_list", "List task items", tasklist="string"),
+    tool("read_file", "Read a file", file_path="string"),
+]
+
+class FakeEmbedder:
+    """One dimension per topic word, counting calls and embedded texts."""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.texts = []
+
+    def __call__(self, texts):
+        if self.fail:
+            raise ConnectionError("embedding service down")
+        self.texts.extend(texts)
+        return [[float(topic in text.lower()) + 0.01 for topic in TOPICS] for text in texts]
+
+class TestToolSelector(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.cache_path = str(Path(self.cache_dir.name) / "tools.json")
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    def selector(self, embed, **kwargs):
+        return ToolSelector(DEFINITIONS, embed=embed, cache_path=self.cache_path,
+                            top_n=1, always_include=("get_current_datetime",), **kwargs)
+
+    def names(self, definitions):
+        return [d["function"]["name"] for d in definitions]
+
+    def test_selects_most_relevant_tools(self):
+        selected = self.selector(FakeEmbedder()).select("what is in my email?")
+        self.assertEqual(self.names(selected), ["get_current_datetime", "gmail_messages_list"])
+
+    def test_tool_embeddings_cached_on_disk(self):
+        self.selector(FakeEmbedder()).select("email")
+
+        embedder = FakeEmbedder()
+        self.selector(embedder).select("calendar")
+        # Only the query is embedded; tool vectors come from the cache
+        self.assertEqual(embedder.texts, ["calendar"])
+
+    def test_cache_ignored_for_other_model(self):
+        self.selector(FakeEmbedder(), model_name="a").select("email")
+        embedder = FakeEmbedder()
+        self.selector(embedder, model_name="b").select("email")
+        self.assertEqual(len(embedder.texts), len(DEFINITIONS) + 1)
+
+    def test_falls_back_to_keywords(self):
+        selected = self.selector(FakeEmbedder(fail=True)).select("list my calendar events")
+        self.assertEqual(self.names(selected), ["get_current_datetime", "calendar_events_list"])
+
+    def test_no_query_returns_every_tool(self):
+        self.assertEqual(self.selector(FakeEmbedder()).select(None), DEFINITIONS)
+
+    def test_compact_catalog(self):
+        catalog = format_tool_catalog(DEFINITIONS[1:2])
+        self.assertEqual(catalog, "Available tools:\n- calendar_events_list(max_results: integer): List calendar events\n")
+
+if __name__ == '__main__':
+    unittest.main()